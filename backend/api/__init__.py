@@ -1,5 +1,6 @@
 """API routers."""
 from api.workflows import router as workflows_router
 from api.executions import router as executions_router
+from api.stats import router as stats_router
 
-__all__ = ["workflows_router", "executions_router"]
+__all__ = ["workflows_router", "executions_router", "stats_router"]
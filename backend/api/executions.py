@@ -1,17 +1,88 @@
 """Execution API — all DB access via PostgreSQL stored functions."""
 import logging
+import re
+from datetime import datetime
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import Response, StreamingResponse
 from psycopg2 import extensions
 
-from core.database import get_db
+from core.compression import negotiate
+from core.database import get_db, get_read_connection, get_read_db, return_connection
 from core import db_pg
-from schemas import WorkflowExecutionRead, ExecutionListItem, StepAttemptRead
+from core.responses import ModelResponse
+from schemas import (
+    WorkflowExecutionRead,
+    WorkflowExecutionSummary,
+    ExecutionListItem,
+    StepAttemptRead,
+    StepAttemptSummary,
+    CancelResponse,
+)
+from services import cancellation
+from services.scheduler import get_scheduler
+from services.export import stream_export
+from utils.enums import AttemptBodyField, ExecutionView, ExportFormat, WorkflowExecutionStatus
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/executions", tags=["executions"])
 
+# Characters per DB round trip when streaming a whole attempt body
+BODY_STREAM_CHUNK_CHARS = 64 * 1024
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _trusted_attempts(rows: list, model: type[StepAttemptRead] | type[StepAttemptSummary]) -> list:
+    """Attempt rows come from our own stored functions with exactly the model's types: skip validation."""
+    return [model.model_construct(**a) for a in rows]
+
+
+def _queue_fields(ex: dict) -> dict:
+    """queue_position / estimated_start_at while the run waits in this process's scheduler."""
+    if ex["status"] != WorkflowExecutionStatus.PENDING.value:
+        return {}
+    queued = get_scheduler().status(ex["id"])
+    if queued is None:
+        return {}
+    return {"queue_position": queued.position, "estimated_start_at": queued.estimated_start_at}
+
+
+def _execution_or_404(conn: extensions.connection, execution_id: int) -> dict:
+    ex = db_pg.execution_get(conn, execution_id)
+    if not ex:
+        raise HTTPException(status_code=404, detail="Execution not found")
+    return ex
+
+
+def _attempt_summary_or_404(conn: extensions.connection, execution_id: int, attempt_id: int) -> dict:
+    attempt = db_pg.step_attempt_summary_get(conn, execution_id, attempt_id)
+    if attempt is None:
+        _execution_or_404(conn, execution_id)
+        raise HTTPException(status_code=404, detail="Attempt not found")
+    return attempt
+
+
+def _parse_range(header: str, total: int) -> tuple[int, int]:
+    """Parse a single 'bytes=start-end' range into an inclusive (start, end). Raises 416 if unsatisfiable."""
+    m = _RANGE_RE.match(header.strip())
+    if not m or (not m.group(1) and not m.group(2)):
+        raise HTTPException(status_code=416, detail="Only a single bytes range is supported",
+                            headers={"Content-Range": f"bytes */{total}"})
+    if m.group(1):
+        start = int(m.group(1))
+        end = int(m.group(2)) if m.group(2) else total - 1
+    else:
+        # Suffix range: last N bytes
+        start = max(total - int(m.group(2)), 0)
+        end = total - 1
+    end = min(end, total - 1)
+    if start >= total or start > end:
+        raise HTTPException(status_code=416, detail="Range not satisfiable",
+                            headers={"Content-Range": f"bytes */{total}"})
+    return start, end
+
 
 @router.get(
     "",
@@ -21,43 +92,174 @@ router = APIRouter(prefix="/executions", tags=["executions"])
 )
 def list_executions(
     workflow_id: int | None = None,
-    conn: Annotated[extensions.connection, Depends(get_db)] = None,
+    conn: Annotated[extensions.connection, Depends(get_read_db)] = None,
 ):
     rows = db_pg.execution_list(conn, workflow_id)
-    return [ExecutionListItem(**r) for r in rows]
+    return ModelResponse([ExecutionListItem(**r) for r in rows])
+
+
+@router.get(
+    "/export",
+    summary="Export executions (streaming)",
+    description="Stream executions with their attempts as **ndjson** (one execution per line) or **csv** "
+                "(one attempt per row). Filter by **workflow_id** and a **since**/**until** window on started_at. "
+                "Response is gzip-encoded when the client's `Accept-Encoding` allows gzip (q > 0).",
+    responses={200: {"content": {"application/x-ndjson": {}, "text/csv": {}}}},
+)
+def export_executions(
+    format: ExportFormat = ExportFormat.NDJSON,
+    workflow_id: int | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    include_bodies: bool = True,
+    accept_encoding: Annotated[str | None, Header()] = None,
+):
+    use_gzip = negotiate(accept_encoding or "", supported=("gzip",)) == "gzip"
+    media_type = "text/csv; charset=utf-8" if format == ExportFormat.CSV else "application/x-ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="executions.{format.value}"'}
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    return StreamingResponse(
+        stream_export(format.value, workflow_id, since, until, include_bodies, gzip=use_gzip),
+        media_type=media_type,
+        headers=headers,
+    )
 
 
 @router.get(
     "/{execution_id}",
-    response_model=WorkflowExecutionRead,
+    response_model=WorkflowExecutionRead | WorkflowExecutionSummary,
     summary="Get execution (poll for status)",
-    description="Get execution status and all step attempts. Use for polling after **POST /workflows/{id}/execute**.",
+    description="Get execution status and all step attempts. Use for polling after **POST /workflows/{id}/execute**. "
+                "Pass **view=summary** to get attempt metadata and body sizes without prompt/response text. "
+                "A queued (pending) run also reports **queue_position** and **estimated_start_at** when it is queued in the "
+                "process serving the request; they count only that process's queue (the concurrency cap and queue "
+                "are per process, so with several workers a run queued elsewhere reports neither).",
 )
 def get_execution(
     execution_id: int,
-    conn: Annotated[extensions.connection, Depends(get_db)] = None,
+    view: ExecutionView = ExecutionView.FULL,
+    conn: Annotated[extensions.connection, Depends(get_read_db)] = None,
 ):
     """Get execution status and all step attempts. Use for polling."""
-    ex = db_pg.execution_get(conn, execution_id)
-    if not ex:
-        raise HTTPException(status_code=404, detail="Execution not found")
+    ex = _execution_or_404(conn, execution_id)
+    queue = _queue_fields(ex)
+    if view == ExecutionView.SUMMARY:
+        attempts = db_pg.execution_get_attempt_summaries(conn, execution_id)
+        return ModelResponse(WorkflowExecutionSummary(
+            **ex, **queue, step_attempts=_trusted_attempts(attempts, StepAttemptSummary),
+        ))
     attempts = db_pg.execution_get_attempts(conn, execution_id)
-    return WorkflowExecutionRead(**ex, step_attempts=[StepAttemptRead(**a) for a in attempts])
+    return ModelResponse(WorkflowExecutionRead(**ex, **queue, step_attempts=_trusted_attempts(attempts, StepAttemptRead)))
 
 
 @router.get(
     "/{execution_id}/attempts",
-    response_model=list[StepAttemptRead],
+    response_model=list[StepAttemptRead] | list[StepAttemptSummary],
     summary="Get execution attempts",
-    description="Get only the step attempts (LLM calls) for an execution.",
+    description="Get only the step attempts (LLM calls) for an execution. **view=summary** omits prompt/response text.",
 )
 def get_execution_attempts(
     execution_id: int,
-    conn: Annotated[extensions.connection, Depends(get_db)] = None,
+    view: ExecutionView = ExecutionView.FULL,
+    conn: Annotated[extensions.connection, Depends(get_read_db)] = None,
 ):
     """Get only the step attempts for an execution."""
-    ex = db_pg.execution_get(conn, execution_id)
-    if not ex:
+    _execution_or_404(conn, execution_id)
+    if view == ExecutionView.SUMMARY:
+        return ModelResponse(_trusted_attempts(db_pg.execution_get_attempt_summaries(conn, execution_id), StepAttemptSummary))
+    return ModelResponse(_trusted_attempts(db_pg.execution_get_attempts(conn, execution_id), StepAttemptRead))
+
+
+@router.post(
+    "/{execution_id}/cancel",
+    response_model=CancelResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Cancel execution",
+    description="Cancel a pending or running execution. A pending run is cancelled immediately; a running one "
+                "aborts its in-flight LLM call and stops within about a second, wherever it runs. "
+                "Poll **GET /executions/{id}** until status is **cancelled**.",
+    responses={
+        202: {"description": "Cancelled, or cancellation requested"},
+        404: {"description": "Execution not found"},
+        409: {"description": "Execution already finished"},
+    },
+)
+def cancel_execution(
+    execution_id: int,
+    conn: Annotated[extensions.connection, Depends(get_db)] = None,
+):
+    new_status = db_pg.execution_request_cancel(conn, execution_id)
+    if new_status is None:
         raise HTTPException(status_code=404, detail="Execution not found")
-    attempts = db_pg.execution_get_attempts(conn, execution_id)
-    return [StepAttemptRead(**a) for a in attempts]
+    if new_status in (WorkflowExecutionStatus.COMPLETED.value, WorkflowExecutionStatus.FAILED.value):
+        raise HTTPException(status_code=409, detail=f"Execution already {new_status}")
+    conn.commit()
+    # A run still queued here never starts; same-process runs stop right away; others pick the
+    # flag up on their next poll
+    get_scheduler().discard(execution_id)
+    cancellation.signal(execution_id)
+    return ModelResponse(CancelResponse(execution_id=execution_id, status=new_status), status_code=status.HTTP_202_ACCEPTED)
+
+
+def _stream_body(execution_id: int, attempt_id: int, field: str):
+    """Yield an attempt body in chunks. Uses its own connection: the request's one is released before streaming."""
+    conn = get_read_connection()
+    try:
+        start = 1
+        while True:
+            chunk = db_pg.step_attempt_body_chunk(conn, execution_id, attempt_id, field, start, BODY_STREAM_CHUNK_CHARS)
+            conn.commit()
+            if not chunk:
+                break
+            yield chunk.encode("utf-8")
+            if len(chunk) < BODY_STREAM_CHUNK_CHARS:
+                break
+            start += BODY_STREAM_CHUNK_CHARS
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        return_connection(conn)
+
+
+@router.get(
+    "/{execution_id}/attempts/{attempt_id}/{field}",
+    summary="Get attempt prompt or response body",
+    description="Serve one attempt's **prompt** or **response** as text/plain. Supports a single "
+                "`Range: bytes=start-end` header (206); without it the body is streamed in chunks.",
+    responses={
+        200: {"content": {"text/plain": {}}, "description": "Full body (streamed)"},
+        206: {"content": {"text/plain": {}}, "description": "Requested byte range"},
+        404: {"description": "Execution, attempt or body not found"},
+        416: {"description": "Range not satisfiable"},
+    },
+)
+def get_attempt_body(
+    execution_id: int,
+    attempt_id: int,
+    field: AttemptBodyField,
+    range_header: Annotated[str | None, Header(alias="Range")] = None,
+    conn: Annotated[extensions.connection, Depends(get_read_db)] = None,
+):
+    attempt = _attempt_summary_or_404(conn, execution_id, attempt_id)
+    total = attempt["prompt_bytes"] if field == AttemptBodyField.PROMPT else attempt["response_bytes"]
+    if total is None:
+        raise HTTPException(status_code=404, detail=f"Attempt has no {field.value}")
+    media_type = "text/plain; charset=utf-8"
+    if range_header:
+        start, end = _parse_range(range_header, total)
+        data = db_pg.step_attempt_body_range(conn, execution_id, attempt_id, field.value, start, end - start + 1)
+        return Response(
+            content=data or b"",
+            status_code=206,
+            media_type=media_type,
+            headers={"Content-Range": f"bytes {start}-{end}/{total}", "Accept-Ranges": "bytes"},
+        )
+    # No Content-Length: the chunks are separate reads that may see a body written after `total`
+    return StreamingResponse(
+        _stream_body(execution_id, attempt_id, field.value),
+        media_type=media_type,
+        headers={"Accept-Ranges": "bytes"},
+    )
@@ -0,0 +1,47 @@
+"""Analytics API — reads incremental rollups (stats_* tables), never scans step_attempts."""
+import logging
+from collections import defaultdict
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+from psycopg2 import extensions
+
+from core.database import get_read_db
+from core import db_pg
+from core.responses import ModelResponse
+from schemas import GlobalStats, ModelHealth, ModelStats, RunStats
+from services import routing
+from services.stats import attempt_rollup, run_rollup
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+
+@router.get(
+    "",
+    response_model=GlobalStats,
+    summary="Global stats",
+    description="Run totals and per-model attempt stats (pass rate, tokens, p50/p95 LLM duration) across all workflows.",
+)
+def global_stats(conn: Annotated[extensions.connection, Depends(get_read_db)]):
+    run_rows = db_pg.stats_workflow_runs_list(conn)
+    by_model: dict[str, list[dict]] = defaultdict(list)
+    for r in db_pg.stats_step_model_list(conn):
+        by_model[r["model"]].append(r)
+    models = [ModelStats(model=m, **attempt_rollup(rows)) for m, rows in sorted(by_model.items())]
+    return ModelResponse(GlobalStats(
+        workflows=len(run_rows),
+        runs=RunStats(**run_rollup(run_rows)),
+        tokens_used=sum(m.tokens_used for m in models),
+        models=models,
+    ))
+
+
+@router.get(
+    "/models/health",
+    response_model=list[ModelHealth],
+    summary="Model health",
+    description="Rolling latency and error rate per model as seen by this process's executor; drives step model routing.",
+)
+def model_health():
+    return ModelResponse([ModelHealth(**routing.snapshot(m)) for m in routing.known_models()])
@@ -1,25 +1,32 @@
 """CRUD API for workflows and steps. All DB access via PostgreSQL stored functions."""
 import logging
-import threading
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from psycopg2 import extensions
 
-from core.database import get_db
+from core.database import get_db, get_read_db
 from core import db_pg
+from core.responses import ModelResponse
 from schemas import (
     WorkflowCreate,
     WorkflowRead,
     WorkflowList,
     WorkflowUpdate,
     StepCreate,
+    StepBulkReplace,
     StepRead,
     StepUpdate,
+    ExecuteRequest,
     ExecuteResponse,
+    WorkflowStats,
+    RunStats,
+    StepModelStats,
 )
-from services.executor import run_execution
-from utils.enums import WorkflowExecutionStatus
+from services.scheduler import get_scheduler
+from services.context import lint_context
+from services.generation import lint_generation
+from services.stats import attempt_rollup, run_rollup
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/workflows", tags=["workflows"])
@@ -33,10 +40,15 @@ def _workflow_or_404(conn: extensions.connection, workflow_id: int) -> dict:
 
 
 # --- Workflows ---
-@router.get("", response_model=list[WorkflowList], summary="List workflows")
-def list_workflows(conn: Annotated[extensions.connection, Depends(get_db)]):
+@router.get(
+    "",
+    response_model=list[WorkflowList],
+    summary="List workflows",
+    description="Latest version of each workflow; **versions** is how many it has. See **GET /workflows/{id}/versions**.",
+)
+def list_workflows(conn: Annotated[extensions.connection, Depends(get_read_db)]):
     rows = db_pg.workflow_list(conn)
-    return [WorkflowList(**r) for r in rows]
+    return ModelResponse([WorkflowList(**r) for r in rows])
 
 
 @router.post("", response_model=WorkflowRead, status_code=status.HTTP_201_CREATED, summary="Create workflow")
@@ -44,10 +56,12 @@ def create_workflow(
     payload: WorkflowCreate,
     conn: Annotated[extensions.connection, Depends(get_db)],
 ):
-    workflow_id = db_pg.workflow_create(conn, payload.name)
+    workflow_id = db_pg.workflow_create(
+        conn, payload.name, payload.deadline_seconds, payload.token_budget, payload.cost_budget_usd,
+    )
     w = db_pg.workflow_get(conn, workflow_id)
     steps = db_pg.step_list_by_workflow(conn, workflow_id)
-    return WorkflowRead(**w, steps=[StepRead(**s) for s in steps])
+    return ModelResponse(WorkflowRead(**w, steps=[StepRead(**s) for s in steps]), status_code=status.HTTP_201_CREATED)
 
 
 @router.post(
@@ -55,39 +69,92 @@ def create_workflow(
     response_model=ExecuteResponse,
     status_code=status.HTTP_202_ACCEPTED,
     summary="Execute workflow",
-    description="Start a workflow run. Returns **execution_id** immediately; run continues in background. Poll **GET /executions/{id}** for status. Returns **409** if this workflow already has a run in progress.",
+    description="Start a workflow run. Returns **execution_id** immediately; run continues in background. Poll **GET /executions/{id}** for status. Returns **409** if this workflow already has a run queued or in progress. "
+                "Optional body: **priority** (`interactive` runs start before any `batch` run) and **tenant** "
+                "(queued runs share the per-process concurrency cap fairly across tenants).",
     responses={
         202: {"description": "Execution started"},
         404: {"description": "Workflow not found"},
-        409: {"description": "A run is already in progress for this workflow"},
+        409: {"description": "A run is already queued or in progress for this workflow"},
     },
 )
 def execute_workflow(
     workflow_id: int,
     conn: Annotated[extensions.connection, Depends(get_db)],
+    payload: ExecuteRequest | None = None,
 ):
     """Start a workflow run. Returns execution_id immediately; run continues in background. Poll GET /executions/{id} for status."""
     _workflow_or_404(conn, workflow_id)
-    rows = db_pg.execution_list(conn, workflow_id)
-    if any(r["status"] == WorkflowExecutionStatus.RUNNING.value for r in rows):
+    if db_pg.workflow_has_running_execution(conn, workflow_id):
         raise HTTPException(
             status_code=409,
-            detail="This workflow already has a run in progress. Wait for it to finish or poll GET /executions.",
+            detail="This workflow already has a run queued or in progress. Wait for it to finish or poll GET /executions.",
         )
-    execution_id = db_pg.execution_create(conn, workflow_id)
-    thread = threading.Thread(target=run_execution, args=(execution_id,), daemon=True)
-    thread.start()
-    return ExecuteResponse(execution_id=execution_id)
+    payload = payload or ExecuteRequest()
+    execution_id = db_pg.execution_create(conn, workflow_id, payload.priority.value, payload.tenant)
+    # The run reads its row on its own connection: commit before it can be admitted
+    conn.commit()
+    get_scheduler().submit(execution_id, payload.priority, payload.tenant)
+    return ModelResponse(ExecuteResponse(execution_id=execution_id), status_code=status.HTTP_202_ACCEPTED)
 
 
 @router.get("/{workflow_id}", response_model=WorkflowRead, summary="Get workflow")
 def get_workflow(
     workflow_id: int,
-    conn: Annotated[extensions.connection, Depends(get_db)],
+    conn: Annotated[extensions.connection, Depends(get_read_db)],
 ):
     w = _workflow_or_404(conn, workflow_id)
     steps = db_pg.step_list_by_workflow(conn, workflow_id)
-    return WorkflowRead(**w, steps=[StepRead(**s) for s in steps])
+    return ModelResponse(WorkflowRead(**w, steps=[StepRead(**s) for s in steps]))
+
+
+@router.post(
+    "/{workflow_id}/versions",
+    response_model=WorkflowRead,
+    status_code=status.HTTP_201_CREATED,
+    summary="Create workflow version",
+    description="New editable version with the same name, limits and steps. Steps are shared with the source version until edited here; runs of either version are unaffected.",
+)
+def create_workflow_version(
+    workflow_id: int,
+    conn: Annotated[extensions.connection, Depends(get_db)],
+):
+    _workflow_or_404(conn, workflow_id)
+    version_id = db_pg.workflow_create_version(conn, workflow_id)
+    w = db_pg.workflow_get(conn, version_id)
+    steps = db_pg.step_list_by_workflow(conn, version_id)
+    return ModelResponse(WorkflowRead(**w, steps=[StepRead(**s) for s in steps]), status_code=status.HTTP_201_CREATED)
+
+
+@router.get("/{workflow_id}/versions", response_model=list[WorkflowList], summary="List workflow versions")
+def list_workflow_versions(
+    workflow_id: int,
+    conn: Annotated[extensions.connection, Depends(get_read_db)],
+):
+    _workflow_or_404(conn, workflow_id)
+    return ModelResponse([WorkflowList(**r) for r in db_pg.workflow_list_versions(conn, workflow_id)])
+
+
+@router.get(
+    "/{workflow_id}/stats",
+    response_model=WorkflowStats,
+    summary="Workflow stats",
+    description="Run success rate and duration percentiles, plus per step/model attempt stats. Served from rollups, O(1) in history size.",
+)
+def get_workflow_stats(
+    workflow_id: int,
+    conn: Annotated[extensions.connection, Depends(get_read_db)],
+):
+    _workflow_or_404(conn, workflow_id)
+    run_row = db_pg.stats_workflow_get(conn, workflow_id)
+    step_rows = db_pg.stats_step_model_list(conn, workflow_id)
+    steps = [StepModelStats(step_id=r["step_id"], model=r["model"], **attempt_rollup([r])) for r in step_rows]
+    return ModelResponse(WorkflowStats(
+        workflow_id=workflow_id,
+        runs=RunStats(**run_rollup([run_row] if run_row else [])),
+        tokens_used=sum(s.tokens_used for s in steps),
+        steps=steps,
+    ))
 
 
 @router.put("/{workflow_id}", response_model=WorkflowRead, summary="Update workflow")
@@ -100,13 +167,16 @@ def update_workflow(
     if db_pg.workflow_has_executions(conn, workflow_id):
         raise HTTPException(
             status_code=400,
-            detail="Workflow is immutable: executions exist. Create a new workflow to modify.",
+            detail="Workflow is immutable: executions exist. Create a new version to modify (POST /workflows/{id}/versions).",
         )
-    if payload.name is not None:
-        db_pg.workflow_update(conn, workflow_id, payload.name)
+    w = db_pg.workflow_get(conn, workflow_id)
+    limits = {k: w[k] for k in ("deadline_seconds", "token_budget", "cost_budget_usd")}
+    limits.update(payload.model_dump(include=set(limits), exclude_unset=True))
+    if payload.name is not None or payload.model_fields_set & set(limits):
+        db_pg.workflow_update(conn, workflow_id, payload.name or w["name"], **limits)
     w = db_pg.workflow_get(conn, workflow_id)
     steps = db_pg.step_list_by_workflow(conn, workflow_id)
-    return WorkflowRead(**w, steps=[StepRead(**s) for s in steps])
+    return ModelResponse(WorkflowRead(**w, steps=[StepRead(**s) for s in steps]))
 
 
 @router.delete("/{workflow_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Delete workflow")
@@ -115,7 +185,8 @@ def delete_workflow(
     conn: Annotated[extensions.connection, Depends(get_db)],
 ):
     _workflow_or_404(conn, workflow_id)
-    if db_pg.workflow_has_executions(conn, workflow_id):
+    # Not the sticky has_executions flag: a workflow whose runs were all dropped by retention can go
+    if db_pg.workflow_executions_exist(conn, workflow_id):
         raise HTTPException(
             status_code=400,
             detail="Workflow cannot be deleted: executions exist.",
@@ -144,12 +215,49 @@ def create_step(
         payload.prompt,
         payload.completion_criteria,
         payload.context_strategy.value,
+        payload.timeout_seconds,
+        payload.fallback_models,
+        payload.routing_policy.value,
+        payload.hedge_percentile,
+        payload.candidates,
+        payload.context_config,
+        payload.max_tokens,
+        payload.temperature,
+        payload.top_p,
+        payload.stop,
+        payload.response_format,
     )
-    s = db_pg.step_get(conn, step_id)
-    return StepRead(**s)
+    s = db_pg.step_get(conn, workflow_id, step_id)
+    return ModelResponse(StepRead(**s), status_code=status.HTTP_201_CREATED)
 
 
-@router.put("/{workflow_id}/steps/{step_id}", response_model=StepRead, summary="Update step")
+@router.put(
+    "/{workflow_id}/steps",
+    response_model=list[StepRead],
+    summary="Replace all steps",
+    description="Replace the workflow's whole ordered step list in one transaction. order_index values must be unique. Step ids change.",
+)
+def replace_steps(
+    workflow_id: int,
+    payload: StepBulkReplace,
+    conn: Annotated[extensions.connection, Depends(get_db)],
+):
+    _workflow_or_404(conn, workflow_id)
+    if db_pg.workflow_has_executions(conn, workflow_id):
+        raise HTTPException(
+            status_code=400,
+            detail="Workflow is immutable: executions exist.",
+        )
+    db_pg.step_replace_all(conn, workflow_id, [s.model_dump(mode="json") for s in payload.steps])
+    return ModelResponse([StepRead(**s) for s in db_pg.step_list_by_workflow(conn, workflow_id)])
+
+
+@router.put(
+    "/{workflow_id}/steps/{step_id}",
+    response_model=StepRead,
+    summary="Update step",
+    description="A step shared with another version of the workflow is copied first, so the response may carry a new step id.",
+)
 def update_step(
     workflow_id: int,
     step_id: int,
@@ -162,17 +270,38 @@ def update_step(
             status_code=400,
             detail="Workflow is immutable: executions exist.",
         )
-    s = db_pg.step_get(conn, step_id)
-    if not s or s["workflow_id"] != workflow_id:
+    s = db_pg.step_get(conn, workflow_id, step_id)
+    if not s:
         raise HTTPException(status_code=404, detail="Step not found")
     order_index = payload.order_index if payload.order_index is not None else s["order_index"]
     model = payload.model if payload.model is not None else s["model"]
     prompt = payload.prompt if payload.prompt is not None else s["prompt"]
     completion_criteria = payload.completion_criteria if payload.completion_criteria is not None else s["completion_criteria"]
     context_strategy = (payload.context_strategy.value if payload.context_strategy is not None else s["context_strategy"])
-    db_pg.step_update(conn, step_id, workflow_id, order_index, model, prompt, completion_criteria, context_strategy)
-    s = db_pg.step_get(conn, step_id)
-    return StepRead(**s)
+    timeout_seconds = payload.timeout_seconds if "timeout_seconds" in payload.model_fields_set else s["timeout_seconds"]
+    fallback_models = payload.fallback_models if payload.fallback_models is not None else s["fallback_models"]
+    routing_policy = payload.routing_policy.value if payload.routing_policy is not None else s["routing_policy"]
+    hedge_percentile = payload.hedge_percentile if "hedge_percentile" in payload.model_fields_set else s["hedge_percentile"]
+    candidates = payload.candidates if payload.candidates is not None else s["candidates"]
+    context_config = payload.context_config if payload.context_config is not None else s["context_config"]
+    fields_set = payload.model_fields_set
+    max_tokens = payload.max_tokens if "max_tokens" in fields_set else s["max_tokens"]
+    temperature = payload.temperature if "temperature" in fields_set else s["temperature"]
+    top_p = payload.top_p if "top_p" in fields_set else s["top_p"]
+    stop = payload.stop if payload.stop is not None else s["stop"]
+    response_format = payload.response_format if "response_format" in fields_set else s["response_format"]
+    problem = lint_context(context_strategy, context_config) or lint_generation(
+        [model, *fallback_models], max_tokens, temperature, stop, response_format,
+    )
+    if problem:
+        raise HTTPException(status_code=422, detail=problem)
+    step_id = db_pg.step_update(
+        conn, step_id, workflow_id, order_index, model, prompt, completion_criteria, context_strategy, timeout_seconds,
+        fallback_models, routing_policy, hedge_percentile, candidates, context_config,
+        max_tokens, temperature, top_p, stop, response_format,
+    )
+    s = db_pg.step_get(conn, workflow_id, step_id)
+    return ModelResponse(StepRead(**s))
 
 
 @router.delete("/{workflow_id}/steps/{step_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Delete step")
@@ -187,7 +316,7 @@ def delete_step(
             status_code=400,
             detail="Workflow is immutable: executions exist.",
         )
-    s = db_pg.step_get(conn, step_id)
-    if not s or s["workflow_id"] != workflow_id:
+    s = db_pg.step_get(conn, workflow_id, step_id)
+    if not s:
         raise HTTPException(status_code=404, detail="Step not found")
     db_pg.step_delete(conn, workflow_id, step_id)
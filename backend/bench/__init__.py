@@ -0,0 +1 @@
+# Load/benchmark harness. Run from backend/: python -m bench.load --help
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Compare two benchmark result files (bench.load or bench.micro output).
+
+Run from backend/:
+    python -m bench.compare bench/results/before.json bench/results/after.json [--filter latency]
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+from bench.report import flatten
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.compare", description="Diff numeric metrics of two result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--filter", default="", help="Only keys containing this substring")
+    args = parser.parse_args(argv)
+
+    a = flatten(json.loads(Path(args.baseline).read_text()).get("metrics", {}))
+    b = flatten(json.loads(Path(args.candidate).read_text()).get("metrics", {}))
+    keys = sorted(k for k in a.keys() | b.keys() if args.filter in k)
+    width = max((len(k) for k in keys), default=10)
+    print(f"{'metric':<{width}}  {'baseline':>12}  {'candidate':>12}  {'delta':>8}")
+    for k in keys:
+        va, vb = a.get(k), b.get(k)
+        delta = f"{(vb - va) / va * 100:+.1f}%" if va not in (None, 0) and vb is not None else ""
+        fa = "" if va is None else f"{va:.1f}"
+        fb = "" if vb is None else f"{vb:.1f}"
+        print(f"{k:<{width}}  {fa:>12}  {fb:>12}  {delta:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test: N concurrent executions of an M-step workflow against the full FastAPI app
+(real HTTP, real executor threads, real DB) with LLM calls served by bench.mock_unbound.
+
+Run from backend/ (needs DATABASE_URL with the schema applied; UNBOUND_* is overridden):
+    python -m bench.load --executions 20 --steps 5 --latency lognormal:5.5:0.6 --rate-429 0.02
+    python -m bench.compare bench/results/load-A.json bench/results/load-B.json
+
+Each execution gets its own workflow (one run per workflow at a time). Workflows are deleted
+afterwards unless --keep. DB round trips are counted on every connection the app opens.
+"""
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+import httpx
+import uvicorn
+from psycopg2 import extensions, pool
+
+from bench import mock_unbound
+from bench.report import environment, save_result, summarize
+from core import database, db_pg
+from core.config import settings
+from core.logging import setup_logging
+
+TERMINAL_STATUSES = {"completed", "failed", "cancelled"}
+
+
+# --- DB round-trip counting ---
+
+class _RoundTrips:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def incr(self) -> None:
+        with self.lock:
+            self.count += 1
+
+    def value(self) -> int:
+        with self.lock:
+            return self.count
+
+
+ROUND_TRIPS = _RoundTrips()
+_counting_cursor_classes: dict[type, type] = {}
+
+
+def _counting_cursor_class(base: type) -> type:
+    cls = _counting_cursor_classes.get(base)
+    if cls is None:
+        def execute(self, query, vars=None):
+            ROUND_TRIPS.incr()
+            return base.execute(self, query, vars)
+
+        cls = type(f"Counting{base.__name__}", (base,), {"execute": execute})
+        _counting_cursor_classes[base] = cls
+    return cls
+
+
+class CountingConnection(extensions.connection):
+    """psycopg2 connection that counts execute/commit/rollback round trips."""
+
+    def cursor(self, *args, **kwargs):
+        kwargs["cursor_factory"] = _counting_cursor_class(kwargs.get("cursor_factory") or extensions.cursor)
+        return super().cursor(*args, **kwargs)
+
+    def commit(self):
+        if self.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+            ROUND_TRIPS.incr()
+        return super().commit()
+
+    def rollback(self):
+        if self.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+            ROUND_TRIPS.incr()
+        return super().rollback()
+
+
+def install_counting_pool(maxconn: int) -> None:
+    """Replace the app's pool before first use so every connection is counted."""
+    if settings.database_is_sqlite:
+        return  # in-process database: no round trips (reported as 0)
+    database._connection_pool = pool.ThreadedConnectionPool(
+        minconn=1, maxconn=maxconn, dsn=settings.database_url, connection_factory=CountingConnection,
+    )
+
+
+# --- Servers ---
+
+class ServerThread:
+    """uvicorn in a daemon thread; start() blocks until it accepts connections."""
+
+    def __init__(self, app, port: int):
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+        self.url = f"http://127.0.0.1:{port}"
+
+    def start(self, timeout: float = 15.0) -> "ServerThread":
+        self.thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if time.monotonic() > deadline or not self.thread.is_alive():
+                raise RuntimeError(f"server on {self.url} did not start")
+            time.sleep(0.05)
+        return self
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+# --- Driver ---
+
+def _create_workflows(client: httpx.Client, n: int, steps: int, model: str) -> list[int]:
+    ids = []
+    for i in range(n):
+        w = client.post("/workflows", json={"name": f"bench-{int(time.time())}-{i}"})
+        w.raise_for_status()
+        wid = w.json()["id"]
+        for j in range(steps):
+            client.post(f"/workflows/{wid}/steps", json={
+                "order_index": j,
+                "model": model,
+                "prompt": f"Benchmark step {j}. Reply with {mock_unbound.PASS_TOKEN}.",
+                "completion_criteria": {"type": "contains_string", "value": mock_unbound.PASS_TOKEN},
+                "context_strategy": "truncate_chars",
+            }).raise_for_status()
+        ids.append(wid)
+    return ids
+
+
+def _ms(a, b) -> float | None:
+    if a is None or b is None:
+        return None
+    return (b - a).total_seconds() * 1000
+
+
+def _phase_metrics(executions: list[dict], attempts_by_execution: dict[int, list[dict]]) -> dict:
+    """Per-phase latencies from DB timestamps (all taken on the DB/app side, same clock)."""
+    queue, run, e2e, attempt_ms = [], [], [], []
+    for ex in executions:
+        queue.append(_ms(ex.get("created_at"), ex.get("started_at")))
+        run.append(_ms(ex.get("started_at"), ex.get("finished_at")))
+        e2e.append(_ms(ex.get("created_at"), ex.get("finished_at")))
+        atts = sorted(attempts_by_execution.get(ex["id"], []), key=lambda a: a["created_at"])
+        # An attempt spans from its insert to the next attempt's insert (or run end):
+        # LLM call + criteria + attempt/stat writes
+        ends = [a["created_at"] for a in atts[1:]] + [ex.get("finished_at")]
+        attempt_ms += [_ms(a["created_at"], end) for a, end in zip(atts, ends)]
+    return {
+        "queue_wait_ms": summarize(queue),
+        "run_ms": summarize(run),
+        "end_to_end_ms": summarize(e2e),
+        "attempt_ms": summarize(attempt_ms),
+    }
+
+
+def run_load(args) -> dict:
+    mock_cfg = mock_unbound.config_from_args(args)
+    mock_stats = mock_unbound.MockStats()
+    mock = ServerThread(mock_unbound.create_app(mock_cfg, mock_stats), args.mock_port).start()
+
+    settings.unbound_api_url = f"{mock.url}/v1/chat/completions"
+    settings.unbound_api_key = "bench"
+    install_counting_pool(args.pool_size or args.executions + 5)
+
+    from main import app  # imported after settings are patched
+    api = ServerThread(app, args.app_port).start()
+    client = httpx.Client(base_url=api.url, timeout=30.0)
+    workflow_ids: list[int] = []
+    try:
+        workflow_ids = _create_workflows(client, args.executions, args.steps, args.model)
+
+        trips_before = ROUND_TRIPS.value()
+        started = time.monotonic()
+
+        def submit(wid: int) -> tuple[int, float]:
+            t0 = time.monotonic()
+            r = client.post(f"/workflows/{wid}/execute")
+            r.raise_for_status()
+            return r.json()["execution_id"], (time.monotonic() - t0) * 1000
+
+        with ThreadPoolExecutor(max_workers=min(args.executions, 64)) as ex:
+            submitted = list(ex.map(submit, workflow_ids))
+        execution_ids = [eid for eid, _ in submitted]
+
+        pending = set(execution_ids)
+        deadline = time.monotonic() + args.timeout
+        while pending and time.monotonic() < deadline:
+            for eid in list(pending):
+                if client.get(f"/executions/{eid}", params={"view": "summary"}).json()["status"] in TERMINAL_STATUSES:
+                    pending.discard(eid)
+            if pending:
+                time.sleep(args.poll_interval)
+        wall_s = time.monotonic() - started
+        round_trips = ROUND_TRIPS.value() - trips_before
+
+        conn = database.get_connection()
+        try:
+            executions = [db_pg.execution_get(conn, eid) for eid in execution_ids]
+            attempts = {eid: db_pg.execution_get_attempt_summaries(conn, eid) for eid in execution_ids}
+            conn.commit()
+        finally:
+            database.return_connection(conn)
+    finally:
+        if workflow_ids and not args.keep:
+            conn = database.get_connection()
+            try:
+                for wid in workflow_ids:
+                    db_pg.workflow_delete(conn, wid)
+                conn.commit()
+            finally:
+                database.return_connection(conn)
+        client.close()
+        api.stop()
+        mock.stop()
+
+    n_attempts = sum(len(a) for a in attempts.values())
+    statuses: dict[str, int] = {}
+    for e in executions:
+        statuses[e["status"]] = statuses.get(e["status"], 0) + 1
+    mock_snapshot = mock_stats.snapshot()
+    return {
+        "kind": "load",
+        "environment": environment(),
+        "config": {
+            "executions": args.executions,
+            "steps": args.steps,
+            "model": args.model,
+            "pool_size": args.pool_size or args.executions + 5,
+            "mock": {k: v for k, v in vars(mock_cfg).items()},
+        },
+        "metrics": {
+            "wall_s": round(wall_s, 3),
+            "timed_out": len(pending),
+            "throughput": {
+                "executions_per_s": round(len(execution_ids) / wall_s, 3),
+                "attempts_per_s": round(n_attempts / wall_s, 3),
+            },
+            "submit_ms": summarize(ms for _, ms in submitted),
+            **_phase_metrics(executions, attempts),
+            "llm_server_ms": summarize(mock_snapshot["latencies_ms"]),
+            "db_round_trips": {
+                "total": round_trips,
+                "per_execution": round(round_trips / max(len(execution_ids), 1), 1),
+                "per_attempt": round(round_trips / max(n_attempts, 1), 1),
+            },
+            "attempts": n_attempts,
+            "mock_requests": mock_snapshot["requests"],
+            "mock_errors": mock_snapshot["errors"],
+            "mock_throttled": mock_snapshot["throttled"],
+        },
+        "statuses": statuses,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.load", description="End-to-end load test with a mock LLM")
+    parser.add_argument("--executions", "-n", type=int, default=10, help="Concurrent executions")
+    parser.add_argument("--steps", "-m", type=int, default=3, help="Steps per workflow")
+    parser.add_argument("--model", default="mock-model")
+    parser.add_argument("--pool-size", type=int, default=None, help="DB pool size (default: executions + 5)")
+    parser.add_argument("--app-port", type=int, default=8765)
+    parser.add_argument("--mock-port", type=int, default=9100)
+    parser.add_argument("--poll-interval", type=float, default=0.25)
+    parser.add_argument("--timeout", type=float, default=600.0, help="Seconds to wait for all executions")
+    parser.add_argument("--keep", action="store_true", help="Keep bench workflows/executions")
+    parser.add_argument("--out", help="Result JSON path (default bench/results/load-<ts>.json)")
+    mock_unbound.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if not settings.database_url:
+        print("DATABASE_URL is not set (see README).")
+        return 1
+    result = run_load(args)
+    path = save_result(result, args.out, "load")
+    m = result["metrics"]
+    print(f"{args.executions} executions x {args.steps} steps in {m['wall_s']}s "
+          f"({m['throughput']['executions_per_s']} exec/s, {m['throughput']['attempts_per_s']} attempts/s)")
+    print(f"  end-to-end p50/p95: {m['end_to_end_ms']['p50']} / {m['end_to_end_ms']['p95']} ms")
+    print(f"  queue wait p50/p95: {m['queue_wait_ms']['p50']} / {m['queue_wait_ms']['p95']} ms")
+    print(f"  attempt    p50/p95: {m['attempt_ms']['p50']} / {m['attempt_ms']['p95']} ms "
+          f"(LLM server p50 {m['llm_server_ms']['p50']} ms)")
+    print(f"  DB round trips: {m['db_round_trips']['total']} ({m['db_round_trips']['per_attempt']}/attempt)")
+    print(f"  statuses: {result['statuses']}  timed out: {m['timed_out']}")
+    print(f"Saved {path}")
+    return 0 if not m["timed_out"] else 1
+
+
+if __name__ == "__main__":
+    setup_logging()
+    sys.exit(main())
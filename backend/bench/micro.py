@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks of the pure-Python hot paths: evaluate_criteria per type, extract_context per
+strategy, row-to-model conversion in the API layer and the executor's prompt assembly. Needs no
+database, network or Unbound key (regex cases start the local regex sandbox workers).
+
+Run from backend/:
+    python -m bench.micro                       # all cases; result in bench/results/micro-<ts>.json
+    python -m bench.micro --check               # fail (exit 1) on regressions against the baseline
+    python -m bench.micro --filter criteria.regex --repeat 15
+    python -m bench.micro --save-baseline       # rewrite bench/baselines/micro.json
+    python -m bench.compare bench/baselines/micro.json bench/results/micro-<ts>.json
+
+Each case is timed like timeit: calls are batched (GC off) until a batch takes at least
+--min-batch-ms, and the result per call is the median (and min) of --repeat batches, in µs.
+--check flags a case whose median is more than --threshold slower than the baseline's and at
+least NOISE_FLOOR_US slower in absolute terms. The checked-in baseline was recorded on the machine
+named in its "environment"; record a new one before checking on different hardware.
+"""
+import argparse
+import gc
+import json
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+from api.executions import _trusted_attempts
+from bench.report import environment, save_result
+from core.config import settings
+from core.responses import ModelResponse
+from core.rows import Row, _row_class
+from schemas import StepAttemptRead, StepRead, WorkflowExecutionRead, WorkflowList, WorkflowRead
+from services.context import extract_context
+from services.criteria import evaluate_criteria, re2
+from services.executor import build_prompt
+from utils.time import utc_now
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baselines" / "micro.json"
+DEFAULT_THRESHOLD = 0.25
+# Differences below this many µs per call are timer and scheduler noise, never a regression
+NOISE_FLOOR_US = 2.0
+# Regex timeout of the catastrophic-backtracking cases (the production default is much longer)
+CATASTROPHIC_TIMEOUT_SECONDS = 0.05
+
+KB = 1024
+MB = 1024 * 1024
+
+
+@dataclass
+class Case:
+    name: str
+    fn: Callable[[], object]
+
+
+def _prose(size: int) -> str:
+    """Word-like text of exactly size characters (compresses and scans like a real response)."""
+    words = "the model returned a structured answer with code and json fields as requested ".split()
+    out, n, i = [], 0, 0
+    while n < size:
+        w = words[i % len(words)] + str(i % 97) + " "
+        out.append(w)
+        n += len(w)
+        i += 1
+    return "".join(out)[:size]
+
+
+def _json_doc(size: int) -> str:
+    """A JSON object of about size characters: {"result": {"items": [{...}, ...]}}."""
+    item = {"id": 0, "name": "item", "tags": ["a", "b"], "score": 0.5, "ok": True}
+    count = max(1, size // (len(json.dumps(item)) + 2))
+    return json.dumps({"result": {"items": [dict(item, id=i) for i in range(count)]}})
+
+
+def _row(d: dict) -> Row:
+    """A db_pg row as the stored functions return it (attribute and key access)."""
+    row = _row_class(tuple(d))()
+    row[:] = d.values()
+    return row
+
+
+def _step_rows(n: int) -> list[Row]:
+    return [_row({
+        "id": i, "workflow_id": 1, "order_index": i, "model": "kimi-k2p5", "prompt": _prose(2 * KB),
+        "completion_criteria": {"type": "regex", "pattern": r"total: \d+"}, "context_strategy": "json_path",
+        "timeout_seconds": 60.0, "fallback_models": ["kimi-k2-instruct-0905"], "routing_policy": "ordered",
+        "hedge_percentile": 0.95, "candidates": 1, "context_config": {"path": "$.result.items[0]"},
+        "max_tokens": 256, "temperature": 0.0, "top_p": None, "stop": ["\n\n"], "response_format": None,
+    }) for i in range(n)]
+
+
+def _attempt_rows(n: int, body: str) -> list[Row]:
+    now = utc_now()
+    return [_row({
+        "id": i, "step_id": 1 + i % 5, "attempt_number": 1 + i % 3, "status": "passed", "prompt_sent": body,
+        "response": body, "criteria_passed": True, "failure_reason": None, "tokens_used": 42, "created_at": now,
+        "model": "kimi-k2p5", "is_hedge": False, "ttfb_ms": 120.5, "llm_ms": 830.2, "criteria_ms": 0.4,
+        "db_write_ms": 1.1, "context_bytes": 512,
+    }) for i in range(n)]
+
+
+def _with_regex_timeout(fn: Callable[[], object]) -> Callable[[], object]:
+    def run():
+        saved = settings.criteria_timeout_seconds
+        settings.criteria_timeout_seconds = CATASTROPHIC_TIMEOUT_SECONDS
+        try:
+            return fn()
+        finally:
+            settings.criteria_timeout_seconds = saved
+
+    return run
+
+
+def build_cases() -> list[Case]:
+    prose_1kb, prose_1mb = _prose(KB), _prose(MB)
+    json_1kb, json_1mb = _json_doc(KB), _json_doc(MB)
+    fenced_json_1mb = f"{_prose(MB // 2)}\n```json\n{_json_doc(MB // 2)}\n```\n"
+    code_1mb = "".join(f"{_prose(4 * KB)}\n```python\nprint({i})\n```\n" for i in range(MB // (4 * KB)))
+    total_1mb = f"{prose_1mb}\ntotal: 42\n"
+    catastrophic = "a" * 28 + "!"
+    crit = lambda criteria, text: lambda: evaluate_criteria(criteria, text)
+    ctx = lambda text, strategy, config=None, history=None: lambda: extract_context(text, strategy, config, history)
+
+    cases = [
+        # --- evaluate_criteria ---
+        Case("criteria.contains_string.1kb", crit({"type": "contains_string", "value": "requested"}, prose_1kb)),
+        Case("criteria.contains_string.1mb_miss", crit({"type": "contains_string", "value": "NOT-THERE"}, prose_1mb)),
+        Case("criteria.regex.1kb", crit({"type": "regex", "pattern": r"fields\s+as"}, prose_1kb)),
+        Case("criteria.regex.1mb_tail_match", crit({"type": "regex", "pattern": r"total: \d+"}, total_1mb)),
+        Case(
+            "criteria.regex.catastrophic_timeout",
+            _with_regex_timeout(crit({"type": "regex", "pattern": r"(a+)+$"}, catastrophic)),
+        ),
+        Case("criteria.has_code_block.1kb", crit({"type": "has_code_block"}, f"{prose_1kb}\n```\nx\n```")),
+        Case("criteria.has_code_block.1mb_language_miss", crit({"type": "has_code_block", "language": "rust"}, code_1mb)),
+        Case("criteria.valid_json.1kb", crit({"type": "valid_json"}, json_1kb)),
+        Case("criteria.valid_json.1mb", crit({"type": "valid_json"}, json_1mb)),
+        Case("criteria.valid_json.1mb_embedded", crit({"type": "valid_json"}, fenced_json_1mb)),
+        Case("criteria.valid_json.1mb_unbalanced", crit({"type": "valid_json"}, "{" * MB)),
+        Case("criteria.valid_json.deep_nesting", crit({"type": "valid_json"}, "[" * 100_000 + "]" * 100_000)),
+        # --- extract_context ---
+        Case("context.full.1mb", ctx(prose_1mb, "full")),
+        Case("context.truncate_chars.1mb", ctx(prose_1mb, "truncate_chars")),
+        Case("context.json_path.1kb", ctx(json_1kb, "json_path", {"path": "$.result.items[0].name"})),
+        Case("context.json_path.1mb_embedded", ctx(fenced_json_1mb, "json_path", {"path": "$.result.items[-1]"})),
+        Case("context.json_path.1mb_unbalanced", ctx("{" * MB, "json_path", {"path": "$.a"})),
+        Case("context.code_block.1mb_last", ctx(code_1mb, "code_block", {"language": "python", "index": -1})),
+        Case("context.regex_group.1kb", ctx(prose_1kb, "regex_group", {"pattern": r"answer(\d+)", "group": 1})),
+        Case("context.regex_group.1mb_tail_match", ctx(total_1mb, "regex_group", {"pattern": r"total: (\d+)"})),
+        Case(
+            "context.last_n_steps.5x8kb_template",
+            ctx("", "last_n_steps", {"n": 5, "template": "Plan:\n{step_1}\n\nDraft:\n{step_4}\n\nLatest:\n{previous}"},
+                [_prose(8 * KB) for _ in range(5)]),
+        ),
+    ]
+    if re2 is not None:
+        cases.append(Case("criteria.regex_re2.1mb_tail_match",
+                          crit({"type": "regex", "pattern": r"total: \d+", "engine": "re2"}, total_1mb)))
+
+    # --- API layer: rows from db_pg to response models (as in api/workflows.py, api/executions.py) ---
+    now = utc_now()
+    workflow = _row({
+        "id": 1, "name": "bench", "created_at": now, "updated_at": now, "deadline_seconds": None,
+        "token_budget": None, "cost_budget_usd": None, "root_id": 1, "parent_id": None, "version": 1,
+    })
+    steps = _step_rows(20)
+    listed = [_row({
+        "id": i, "name": f"workflow {i}", "created_at": now, "updated_at": now, "step_count": 5, "root_id": i,
+        "version": 1, "versions": 1,
+    }) for i in range(100)]
+    execution = _row({
+        "id": 1, "workflow_id": 1, "status": "completed", "current_step_index": None, "started_at": now,
+        "finished_at": now, "created_at": now, "failure_reason": None, "tokens_used": 4200, "cost_usd": 0.5,
+        "priority": "batch", "tenant": None, "queue_wait_ms": 3.5,
+        "step_timings": [{"step_index": i, "step_id": i, "wall_ms": 900.0} for i in range(5)],
+    })
+    attempts = _attempt_rows(100, _prose(8 * KB))
+
+    def execution_read():
+        return WorkflowExecutionRead(**execution, step_attempts=_trusted_attempts(attempts, StepAttemptRead))
+
+    cases += [
+        Case("api.workflow_read.20_steps", lambda: WorkflowRead(**workflow, steps=[StepRead(**s) for s in steps])),
+        Case("api.workflow_list.100", lambda: [WorkflowList(**r) for r in listed]),
+        Case("api.execution_read.100x8kb", execution_read),
+        Case("api.execution_read_render.100x8kb", lambda: ModelResponse(execution_read()).body),
+        Case("api.step_attempt_validate.100x8kb", lambda: [StepAttemptRead(**a) for a in attempts]),
+    ]
+
+    # --- Executor: prompt of a step (run_execution also measures the context's UTF-8 size) ---
+    step_prompt = _prose(2 * KB)
+
+    def prompt_assembly(context: str) -> Callable[[], object]:
+        def run():
+            prompt = build_prompt(step_prompt, context)
+            return prompt, len(context.encode("utf-8"))
+
+        return run
+
+    cases += [
+        Case("executor.prompt.no_context", prompt_assembly("")),
+        Case("executor.prompt.4kb_context", prompt_assembly(_prose(4 * KB))),
+        Case("executor.prompt.1mb_context", prompt_assembly(prose_1mb)),
+    ]
+    return cases
+
+
+def time_case(fn: Callable[[], object], repeat: int, min_batch_seconds: float) -> dict:
+    """Median / min µs per call over repeat batches of calls sized to take min_batch_seconds."""
+    fn()  # warm up (regex workers, caches)
+    loops = 1
+    while True:
+        elapsed = _time_batch(fn, loops)
+        if elapsed >= min_batch_seconds:
+            break
+        loops = max(loops * 2, int(loops * min_batch_seconds / max(elapsed, 1e-9) * 1.2))
+    per_call = [elapsed / loops * 1e6]
+    per_call += [_time_batch(fn, loops) / loops * 1e6 for _ in range(repeat - 1)]
+    return {
+        "us_median": round(statistics.median(per_call), 2),
+        "us_min": round(min(per_call), 2),
+        "loops": loops,
+    }
+
+
+def _time_batch(fn: Callable[[], object], loops: int) -> float:
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        return time.perf_counter() - start
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def find_regressions(baseline: dict, metrics: dict, threshold: float) -> list[tuple[str, float, float]]:
+    """(case, baseline µs, current µs) of each case slower than the baseline beyond threshold and noise."""
+    out = []
+    for name, m in metrics.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        before, after = base["us_median"], m["us_median"]
+        if after > before * (1 + threshold) and after - before >= NOISE_FLOOR_US:
+            out.append((name, before, after))
+    return out
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.micro", description="Micro-benchmarks of pure-Python hot paths")
+    parser.add_argument("--filter", default="", help="Only cases whose name contains this substring")
+    parser.add_argument("--repeat", type=int, default=7, help="Timed batches per case")
+    parser.add_argument("--min-batch-ms", type=float, default=20.0, help="Minimum duration of one batch")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if a case regressed against the baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown of the median per call (0.25 = 25%%)")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH), help="Baseline result file")
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run's result to --baseline")
+    parser.add_argument("--out", help="Result JSON path (default bench/results/micro-<ts>.json)")
+    args = parser.parse_args(argv)
+
+    cases = [c for c in build_cases() if args.filter in c.name]
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text()).get("metrics", {}) if baseline_path.exists() else {}
+    width = max((len(c.name) for c in cases), default=10)
+    print(f"{'case':<{width}}  {'median µs':>12}  {'min µs':>12}  {'baseline':>12}  {'delta':>8}")
+
+    metrics: dict[str, dict] = {}
+    for case in cases:
+        m = time_case(case.fn, args.repeat, args.min_batch_ms / 1000)
+        metrics[case.name] = m
+        base = baseline.get(case.name, {}).get("us_median")
+        delta = f"{(m['us_median'] - base) / base * 100:+.1f}%" if base else ""
+        print(f"{case.name:<{width}}  {m['us_median']:>12.2f}  {m['us_min']:>12.2f}  {base or '':>12}  {delta:>8}")
+
+    result = {
+        "kind": "micro",
+        "environment": environment(),
+        "config": {"repeat": args.repeat, "min_batch_ms": args.min_batch_ms, "filter": args.filter},
+        "metrics": metrics,
+    }
+    path = save_result(result, args.baseline if args.save_baseline else args.out, "micro")
+    print(f"Saved {path}")
+
+    if args.check:
+        if not baseline:
+            print(f"No baseline at {baseline_path}; run with --save-baseline first")
+            return 1
+        regressions = find_regressions(baseline, metrics, args.threshold)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: {before:.2f} -> {after:.2f} µs ({(after - before) / before * 100:+.1f}%)")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {baseline_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
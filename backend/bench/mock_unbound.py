@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI-compatible chat completions server for load tests (no real Unbound calls).
+
+Run from backend/:
+    python -m bench.mock_unbound --port 9100 --latency lognormal:5.5:0.6 --error-rate 0.01 --rate-429 0.02
+
+Latency specs (milliseconds): fixed:MS, uniform:LO:HI, lognormal:MU:SIGMA (of ln ms).
+Requests with "stream": true get SSE chunks spread over the sampled latency.
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+def parse_latency(spec: str):
+    """Return a zero-arg sampler (ms) for a latency spec string."""
+    kind, *args = spec.split(":")
+    nums = [float(a) for a in args]
+    if kind == "fixed" and len(nums) == 1:
+        return lambda: nums[0]
+    if kind == "uniform" and len(nums) == 2:
+        return lambda: random.uniform(nums[0], nums[1])
+    if kind == "lognormal" and len(nums) == 2:
+        return lambda: random.lognormvariate(nums[0], nums[1])
+    raise ValueError(f"Bad latency spec: {spec!r} (fixed:MS, uniform:LO:HI, lognormal:MU:SIGMA)")
+
+
+@dataclass
+class MockConfig:
+    latency: str = "fixed:50"
+    error_rate: float = 0.0
+    rate_429: float = 0.0
+    # Fraction of responses that omit PASS_TOKEN, to exercise criteria retries
+    criteria_fail_rate: float = 0.0
+    response_chars: int = 400
+    stream_chunks: int = 8
+    seed: int | None = None
+    # Answer only one choice regardless of the request's n (like providers without n support)
+    ignore_n: bool = False
+
+
+@dataclass
+class MockStats:
+    """Server-side counters; read by the load driver for per-phase reporting."""
+    requests: int = 0
+    errors: int = 0
+    throttled: int = 0
+    streamed: int = 0
+    latencies_ms: list[float] = field(default_factory=list)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "throttled": self.throttled,
+                "streamed": self.streamed,
+                "latencies_ms": list(self.latencies_ms),
+            }
+
+
+# Criteria used by bench workflows: {"type": "contains_string", "value": PASS_TOKEN}
+PASS_TOKEN = "BENCH_OK"
+
+
+def _content(cfg: MockConfig) -> str:
+    body = ("lorem ipsum dolor sit amet " * (cfg.response_chars // 27 + 1))[: cfg.response_chars]
+    if random.random() < cfg.criteria_fail_rate:
+        return body
+    return f"{PASS_TOKEN}\n{body}"
+
+
+def _usage(prompt: str, *contents: str) -> dict:
+    prompt_tokens = max(1, len(prompt) // 4)
+    completion_tokens = sum(max(1, len(c) // 4) for c in contents)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def create_app(cfg: MockConfig, stats: MockStats | None = None) -> FastAPI:
+    stats = stats or MockStats()
+    sample = parse_latency(cfg.latency)
+    if cfg.seed is not None:
+        random.seed(cfg.seed)
+    app = FastAPI(title="Mock Unbound")
+    app.state.stats = stats
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        with stats.lock:
+            stats.requests += 1
+        latency_ms = sample()
+        roll = random.random()
+        if roll < cfg.rate_429:
+            with stats.lock:
+                stats.throttled += 1
+            await asyncio.sleep(min(latency_ms, 20) / 1000)
+            return JSONResponse({"error": {"message": "rate limited"}}, status_code=429, headers={"Retry-After": "1"})
+        if roll < cfg.rate_429 + cfg.error_rate:
+            with stats.lock:
+                stats.errors += 1
+            await asyncio.sleep(latency_ms / 1000)
+            return JSONResponse({"error": {"message": "mock upstream error"}}, status_code=500)
+
+        prompt = "".join(m.get("content") or "" for m in payload.get("messages") or [])
+        content = _content(cfg)
+        model = payload.get("model") or "mock"
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        started = time.monotonic()
+
+        n = 1 if cfg.ignore_n else max(1, int(payload.get("n") or 1))
+        contents = [content] + [_content(cfg) for _ in range(n - 1)]
+
+        if payload.get("stream"):
+            with stats.lock:
+                stats.streamed += 1
+
+            async def events():
+                chunks = max(1, cfg.stream_chunks)
+                step = max(1, len(content) // chunks)
+                pieces = [[c[i : i + step] for i in range(0, len(c), step)] for c in contents]
+                rounds = max(len(p) for p in pieces)
+                for r in range(rounds):
+                    await asyncio.sleep(latency_ms / 1000 / rounds)
+                    last = r == rounds - 1
+                    chunk = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "model": model,
+                        "choices": [
+                            {
+                                "index": i,
+                                "delta": {"content": p[r] if r < len(p) else ""},
+                                "finish_reason": "stop" if last else None,
+                            }
+                            for i, p in enumerate(pieces)
+                        ],
+                    }
+                    if last:
+                        chunk["usage"] = _usage(prompt, *contents)
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                yield "data: [DONE]\n\n"
+                with stats.lock:
+                    stats.latencies_ms.append((time.monotonic() - started) * 1000)
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        await asyncio.sleep(latency_ms / 1000)
+        with stats.lock:
+            stats.latencies_ms.append((time.monotonic() - started) * 1000)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "model": model,
+            "choices": [
+                {"index": i, "message": {"role": "assistant", "content": c}, "finish_reason": "stop"}
+                for i, c in enumerate(contents)
+            ],
+            "usage": _usage(prompt, *contents),
+        }
+
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Mock options shared with bench.load."""
+    parser.add_argument("--latency", default="fixed:50", help="fixed:MS | uniform:LO:HI | lognormal:MU:SIGMA")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 500 responses")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Fraction of 429 responses")
+    parser.add_argument("--criteria-fail-rate", type=float, default=0.0, help="Fraction of responses missing the pass token")
+    parser.add_argument("--response-chars", type=int, default=400)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--ignore-n", action="store_true", help="Always return one choice, ignoring n")
+
+
+def config_from_args(args) -> MockConfig:
+    return MockConfig(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_429=args.rate_429,
+        criteria_fail_rate=args.criteria_fail_rate,
+        response_chars=args.response_chars,
+        seed=args.seed,
+        ignore_n=args.ignore_n,
+    )
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(prog="python -m bench.mock_unbound", description="Mock Unbound chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
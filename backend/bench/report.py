@@ -0,0 +1,60 @@
+"""Latency summaries and JSON result files shared by the benchmark commands."""
+import json
+import math
+import platform
+from pathlib import Path
+from typing import Iterable
+
+from utils.time import utc_now
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def percentile(sorted_values: list[float], q: float) -> float | None:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(values: Iterable[float | None]) -> dict:
+    """count / mean / p50 / p95 / p99 / max, rounded to 0.1 (units of the input)."""
+    vals = sorted(v for v in values if v is not None)
+    if not vals:
+        return {"count": 0, "mean": None, "p50": None, "p95": None, "p99": None, "max": None}
+
+    def r(v):
+        return round(v, 1) if v is not None else None
+
+    return {
+        "count": len(vals),
+        "mean": r(sum(vals) / len(vals)),
+        "p50": r(percentile(vals, 0.50)),
+        "p95": r(percentile(vals, 0.95)),
+        "p99": r(percentile(vals, 0.99)),
+        "max": r(vals[-1]),
+    }
+
+
+def environment() -> dict:
+    return {"python": platform.python_version(), "platform": platform.platform(), "machine": platform.machine()}
+
+
+def save_result(result: dict, out: str | None, prefix: str) -> Path:
+    """Write result JSON to `out`, or bench/results/<prefix>-<utc timestamp>.json."""
+    path = Path(out) if out else RESULTS_DIR / f"{prefix}-{utc_now():%Y%m%dT%H%M%SZ}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(result, indent=2, default=str))
+    return path
+
+
+def flatten(data, prefix: str = "") -> dict[str, float]:
+    """Numeric leaves keyed by dotted path (lists are skipped)."""
+    out: dict[str, float] = {}
+    if isinstance(data, dict):
+        for k, v in data.items():
+            out.update(flatten(v, f"{prefix}{k}."))
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        out[prefix.rstrip(".")] = data
+    return out
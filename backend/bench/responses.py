@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Response pipeline benchmark for GET /executions/{id}: one execution with N attempts whose prompt
+and response are B bytes each, served in-process (TestClient, no DB or network: the two db_pg
+reads return prebuilt rows).
+
+    python -m bench.responses --attempts 100 --body-bytes 8192
+
+"before" is the previous handler (full validation of every attempt, response_model re-validation,
+stdlib JSON, no compression); "after" is the current route with each Accept-Encoding.
+Reports median ms per request and bytes on the wire.
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from bench.report import environment, save_result
+from core import compression, db_pg
+from core.database import get_db, get_read_db
+from schemas import StepAttemptRead, WorkflowExecutionRead
+from utils.time import utc_now
+
+EXECUTION_ID = 1
+
+
+def _rows(attempts: int, body_bytes: int) -> tuple[db_pg.Row, list[db_pg.Row]]:
+    now = utc_now()
+    ex = {
+        "id": EXECUTION_ID, "workflow_id": 1, "status": "completed", "current_step_index": None,
+        "started_at": now, "finished_at": now, "created_at": now, "failure_reason": None,
+        "tokens_used": 42 * attempts, "cost_usd": 0.5,
+    }
+    # Lorem-like text compresses like real prompts/responses, unlike a repeated single byte
+    words = "the model returned a structured answer with code and json fields as requested ".split()
+    body = " ".join(words[i % len(words)] + str(i % 97) for i in range(body_bytes))[:body_bytes]
+    attempt = lambda i: {
+        "id": i, "step_id": 1 + i % 8, "attempt_number": 1, "status": "passed",
+        "prompt_sent": body, "response": body, "criteria_passed": True, "failure_reason": None,
+        "tokens_used": 42, "created_at": now, "model": "mock-model", "is_hedge": False,
+    }
+
+    def to_row(d: dict) -> db_pg.Row:
+        row = db_pg._row_class(tuple(d))()
+        for i, v in enumerate(d.values()):
+            row[i] = v
+        return row
+
+    return to_row(ex), [to_row(attempt(i)) for i in range(1, attempts + 1)]
+
+
+def _legacy_app() -> FastAPI:
+    """The handler as it was before ModelResponse/model_construct/compression."""
+    app = FastAPI()
+
+    @app.get("/executions/{execution_id}", response_model=WorkflowExecutionRead)
+    def get_execution(execution_id: int):
+        ex = db_pg.execution_get(None, execution_id)
+        attempts = db_pg.execution_get_attempts(None, execution_id)
+        return WorkflowExecutionRead(**ex, step_attempts=[StepAttemptRead(**a) for a in attempts])
+
+    return app
+
+
+def _time(client: TestClient, headers: dict, repeat: int) -> dict:
+    url = f"/executions/{EXECUTION_ID}"
+    r = client.get(url, headers=headers)
+    r.raise_for_status()
+    wire = int(r.headers.get("content-length") or len(r.content))
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        client.get(url, headers=headers)
+        times.append((time.perf_counter() - t0) * 1000)
+    return {
+        "ms_median": round(statistics.median(times), 2),
+        "ms_min": round(min(times), 2),
+        "wire_bytes": wire,
+        "content_encoding": r.headers.get("content-encoding", "identity"),
+    }
+
+
+def run_responses(args) -> dict:
+    ex, attempts = _rows(args.attempts, args.body_bytes)
+    db_pg.execution_get = lambda conn, execution_id: ex
+    db_pg.execution_get_attempts = lambda conn, execution_id: attempts
+
+    from main import app  # no lifespan: TestClient is not used as a context manager
+    app.dependency_overrides[get_db] = lambda: None
+    app.dependency_overrides[get_read_db] = lambda: None
+
+    identity = {"Accept-Encoding": "identity"}
+    metrics = {"before": _time(TestClient(_legacy_app()), identity, args.repeat)}
+    metrics["after_identity"] = _time(TestClient(app), identity, args.repeat)
+    metrics["after_gzip"] = _time(TestClient(app), {"Accept-Encoding": "gzip"}, args.repeat)
+    if compression.brotli is not None:
+        metrics["after_br"] = _time(TestClient(app), {"Accept-Encoding": "br, gzip"}, args.repeat)
+    return {
+        "kind": "responses",
+        "environment": environment(),
+        "config": {"attempts": args.attempts, "body_bytes": args.body_bytes, "repeat": args.repeat},
+        "metrics": metrics,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.responses", description="GET /executions/{id} serialization")
+    parser.add_argument("--attempts", "-n", type=int, default=100)
+    parser.add_argument("--body-bytes", type=int, default=8192, help="Size of each prompt_sent/response")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--out", help="Result JSON path (default bench/results/responses-<ts>.json)")
+    args = parser.parse_args(argv)
+
+    result = run_responses(args)
+    path = save_result(result, args.out, "responses")
+    for name, m in result["metrics"].items():
+        print(f"  {name:<15} {m['ms_median']:>8} ms  {m['wire_bytes']:>9} bytes  ({m['content_encoding']})")
+    print(f"Saved {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
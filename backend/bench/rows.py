@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Row materialization benchmark: time and memory to fetch N step attempts through
+execution_get_attempts(), comparing the old RealDictCursor + dict() copy path with db_pg.RowCursor,
+each alone ("fetch") and including StepAttemptRead(**row) for every row ("models").
+
+Run from backend/ (needs DATABASE_URL with the schema applied):
+    python -m bench.rows --attempts 10000 --body-bytes 200
+    python -m bench.compare bench/results/rows-A.json bench/results/rows-B.json
+
+Seeds one throwaway workflow/execution with N attempts (deleted afterwards unless --keep).
+Memory is the tracemalloc peak while fetching and the size still held by the result.
+"""
+import argparse
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+from psycopg2.extras import RealDictCursor
+
+from bench.report import environment, save_result
+from core import database, db_pg
+from core.config import settings
+from schemas import StepAttemptRead
+
+
+def _fetch_dicts(conn, execution_id: int) -> list[dict]:
+    """The pre-RowCursor _fetch_all: RealDictRow per row, then a dict() copy of each."""
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute("SELECT * FROM execution_get_attempts(%s)", (execution_id,))
+        return [dict(r) for r in cur.fetchall()]
+
+
+def _fetch_rows(conn, execution_id: int) -> list:
+    return db_pg.execution_get_attempts(conn, execution_id)
+
+
+PATHS = {"dict": _fetch_dicts, "row": _fetch_rows}
+
+
+def _seed(conn, attempts: int, body_bytes: int) -> tuple[int, int]:
+    workflow_id = db_pg.workflow_create(conn, f"bench-rows-{int(time.time())}")
+    step_id = db_pg.step_create(
+        conn, workflow_id, 0, "mock-model", "Benchmark step.", {"type": "contains_string", "value": "OK"}, "full",
+    )
+    execution_id = db_pg.execution_create(conn, workflow_id)
+    created_at = db_pg.execution_get(conn, execution_id)["created_at"]
+    body = "x" * body_bytes
+    for i in range(attempts):
+        db_pg.step_attempt_insert(
+            conn, execution_id, step_id, i + 1, status="passed", prompt_sent=body, response=body,
+            criteria_passed=True, tokens_used=42, execution_created_at=created_at, model="mock-model",
+        )
+    conn.commit()
+    return workflow_id, execution_id
+
+
+def _measure(conn, fetch, execution_id: int, with_models: bool, repeat: int) -> dict:
+    def run():
+        rows = fetch(conn, execution_id)
+        conn.commit()
+        return [StepAttemptRead(**r) for r in rows] if with_models else rows
+
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        run()
+        times.append((time.perf_counter() - t0) * 1000)
+
+    tracemalloc.start()
+    result = run()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    n = len(result)
+    del result
+    return {
+        "rows": n,
+        "ms_min": round(min(times), 1),
+        "ms_median": round(statistics.median(times), 1),
+        "peak_kib": round(peak / 1024, 1),
+        "retained_kib": round(retained / 1024, 1),
+    }
+
+
+def run_rows(args) -> dict:
+    conn = database.get_connection()
+    workflow_id = None
+    try:
+        workflow_id, execution_id = _seed(conn, args.attempts, args.body_bytes)
+        metrics = {
+            stage: {name: _measure(conn, fetch, execution_id, stage == "models", args.repeat) for name, fetch in PATHS.items()}
+            for stage in ("fetch", "models")
+        }
+    finally:
+        conn.rollback()
+        if workflow_id is not None and not args.keep:
+            db_pg.workflow_delete(conn, workflow_id)
+            conn.commit()
+        database.return_connection(conn)
+    per_10k = 10_000 / max(args.attempts, 1)
+    for stage in metrics.values():
+        for m in stage.values():
+            m["ms_per_10k"] = round(m["ms_median"] * per_10k, 1)
+            m["peak_kib_per_10k"] = round(m["peak_kib"] * per_10k, 1)
+    return {
+        "kind": "rows",
+        "environment": environment(),
+        "config": {"attempts": args.attempts, "body_bytes": args.body_bytes, "repeat": args.repeat},
+        "metrics": metrics,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.rows", description="Row materialization: dict vs RowCursor")
+    parser.add_argument("--attempts", "-n", type=int, default=10_000)
+    parser.add_argument("--body-bytes", type=int, default=200, help="Size of each prompt_sent/response")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per path (median reported)")
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded workflow/execution")
+    parser.add_argument("--out", help="Result JSON path (default bench/results/rows-<ts>.json)")
+    args = parser.parse_args(argv)
+
+    if not settings.database_url:
+        print("DATABASE_URL is not set (see README).")
+        return 1
+    result = run_rows(args)
+    path = save_result(result, args.out, "rows")
+    for stage, paths in result["metrics"].items():
+        for name, m in paths.items():
+            print(f"  {stage:<6} {name:<4}  {m['ms_median']:>8} ms  peak {m['peak_kib']:>9} KiB  "
+                  f"retained {m['retained_kib']:>9} KiB  ({m['rows']} rows)")
+    print(f"Saved {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
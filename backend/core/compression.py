@@ -0,0 +1,138 @@
+"""
+Response compression (ASGI middleware): brotli when the client accepts it and the optional brotli
+package is installed, else gzip. Bodies under minimum_size are sent as-is.
+
+Left untouched: responses that already carry a Content-Encoding (the export stream gzips
+itself), byte-range responses (Accept-Ranges / Content-Range; ranges address the identity
+body), and event streams.
+"""
+import zlib
+from typing import Callable
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli  # optional: pip install brotli
+except ImportError:
+    brotli = None
+
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4  # brotli's fast range; 11 is far too slow per request
+
+
+def negotiate(accept_encoding: str, supported: tuple[str, ...] = ("br", "gzip")) -> str | None:
+    """Pick the first of supported ('br', 'gzip') an Accept-Encoding header allows (q=0 excludes), or None."""
+    accepted: dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.strip()] = q
+    wildcard = accepted.get("*", 0.0)
+    for encoding in supported:
+        if encoding == "br" and brotli is None:
+            continue
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+def _compressor(encoding: str) -> tuple[Callable[[bytes], bytes], Callable[[], bytes]]:
+    """(compress chunk, finish) for a streaming encoder."""
+    if encoding == "br":
+        c = brotli.Compressor(quality=BROTLI_QUALITY)
+        return c.process, c.finish
+    z = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    return z.compress, z.flush
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _Responder(self.app, encoding, self.minimum_size)(scope, receive, send)
+
+
+class _Responder:
+    def __init__(self, app: ASGIApp, encoding: str, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send: Send | None = None
+        self.start: Message | None = None
+        self.passthrough = False
+        self.compress: Callable[[bytes], bytes] | None = None
+        self.finish: Callable[[], bytes] | None = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_wrapper)
+
+    def _skip(self, headers: Headers) -> bool:
+        return (
+            "content-encoding" in headers
+            or "content-range" in headers
+            or "accept-ranges" in headers
+            or headers.get("content-type", "").startswith("text/event-stream")
+        )
+
+    def _encoded_start(self, length: int | None) -> Message:
+        headers = MutableHeaders(raw=self.start["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(length)
+        return self.start
+
+    async def send_wrapper(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            self.passthrough = self._skip(Headers(raw=message["headers"]))
+            if self.passthrough:
+                await self.send(message)
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compress is None:
+            if not more_body:
+                # Whole body in one message (JSON responses): compress it or send as-is
+                if len(body) < self.minimum_size:
+                    await self.send(self.start)
+                    await self.send(message)
+                    return
+                compress, finish = _compressor(self.encoding)
+                data = compress(body) + finish()
+                await self.send(self._encoded_start(len(data)))
+                await self.send({"type": "http.response.body", "body": data})
+                return
+            # Streaming: encode chunk by chunk, length unknown
+            self.compress, self.finish = _compressor(self.encoding)
+            await self.send(self._encoded_start(None))
+        if more_body:
+            data = self.compress(body)
+            if data:
+                await self.send({"type": "http.response.body", "body": data, "more_body": True})
+        else:
+            await self.send({"type": "http.response.body", "body": self.compress(body) + self.finish()})
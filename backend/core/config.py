@@ -6,16 +6,50 @@ class Settings(BaseSettings):
     """Application settings loaded from environment."""
 
     # Supabase / PostgreSQL (set in .env). Run db/schema.sql in Supabase SQL Editor.
+    # sqlite:///path/to/file.db selects the embedded SQLite backend instead (core.db_sqlite)
     database_url: str = ""
+    # Optional read replica for GET requests (core.database.get_read_db): reads fall back to the
+    # primary when it lags by more than max_lag, or for retry seconds after a connection failure
+    database_read_url: str = ""
+    read_replica_max_lag_seconds: float = 5.0
+    read_replica_retry_seconds: float = 30.0
 
     # Unbound API — load from env
     unbound_api_url: str = "https://api.getunbound.ai/v1/chat/completions"
     unbound_api_key: str = ""
 
+    # Hedged LLM requests (steps with hedge_percentile): extra requests allowed per hedged-step
+    # request, and max backup requests in flight per process
+    hedge_budget_ratio: float = 0.1
+    hedge_max_in_flight: int = 8
+
+    # Regex completion criteria run in worker processes: per-search time limit and max concurrent searches
+    criteria_timeout_seconds: float = 1.0
+    criteria_workers: int = 2
+
+    # Execution admission (services.scheduler): runs executing at once per process (not shared across
+    # workers, so the deployment-wide cap is workers x this), and relative share of each tenant within
+    # a priority class (JSON, e.g. {"team-a": 3}; unlisted tenants get 1)
+    max_concurrent_executions: int = 8
+    tenant_weights: dict[str, float] = {}
+
+    # Responses at least this large are gzip/brotli-compressed when the client accepts it
+    compression_min_bytes: int = 1024
+
+    # Logging (core.logging): "text" or "json" lines; records buffered for the writer thread
+    # (dropped when full); per-second limit per message template below WARNING (0 = off)
+    log_format: str = "text"
+    log_queue_size: int = 10_000
+    log_rate_limit: float = 20.0
+
     # Server (for run from main.py)
     host: str = "0.0.0.0"
     port: int = 8000
 
+    @property
+    def database_is_sqlite(self) -> bool:
+        return self.database_url.startswith("sqlite:")
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
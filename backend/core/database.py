@@ -1,20 +1,82 @@
-"""PostgreSQL connection pool. All queries go through stored functions in db/schema.sql."""
+"""
+PostgreSQL connection pools. All queries go through stored functions in db/schema.sql.
+
+With DATABASE_URL=sqlite:///path/to/file.db the pool hands out core.db_sqlite read connections
+instead (writes go through that module's writer thread) and the read replica settings are ignored.
+
+With DATABASE_READ_URL set, read-only requests (get_read_db) use a second pool on that server,
+normally a streaming replica. A read falls back to the primary when the replica is unreachable
+(then skipped for READ_REPLICA_RETRY_SECONDS), lags by more than READ_REPLICA_MAX_LAG_SECONDS, or
+has not replayed the client's last write: write requests answer with an X-Write-LSN header, and a
+read that sends it back as X-Min-LSN is served by the replica only once it has replayed that far.
+"""
 import logging
+import threading
+import time
 from contextlib import contextmanager
+from typing import TYPE_CHECKING
 
 import psycopg2
-from psycopg2 import pool
-from psycopg2.extras import RealDictCursor
+from fastapi import Request
+from psycopg2 import extensions, pool
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from core import db_pg
 from core.config import settings
+from core.db_pg import RowCursor
+
+if TYPE_CHECKING:
+    from core import db_sqlite
 
 logger = logging.getLogger(__name__)
 
-_connection_pool: pool.ThreadedConnectionPool | None = None
+WRITE_LSN_HEADER = "X-Write-LSN"
+MIN_LSN_HEADER = "X-Min-LSN"
+# Replica lag/position is re-read at most this often, unless a request needs a newer position
+REPLICA_STATUS_TTL_SECONDS = 1.0
+
+_connection_pool: "pool.ThreadedConnectionPool | db_sqlite.ConnectionPool | None" = None
+_read_pool: pool.ThreadedConnectionPool | None = None
+_read_pool_lock = threading.Lock()
+
+
+class ReadConnection(extensions.connection):
+    """Connection from the read pool: every transaction is READ ONLY."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.set_session(readonly=True)
+
+
+class _ReplicaHealth:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.down_until = 0.0
+        self.replay_lsn = 0
+        self.lag_seconds = 0.0
+        self.checked_at = float("-inf")
+
+
+_replica = _ReplicaHealth()
+
+
+def parse_lsn(lsn: str) -> int:
+    """'16/B374D848' -> comparable integer. Raises ValueError on malformed input."""
+    high, _, low = lsn.strip().partition("/")
+    return (int(high, 16) << 32) | int(low, 16)
+
+
+def _replica_configured() -> bool:
+    return bool(settings.database_read_url) and not settings.database_is_sqlite
 
 
 def _get_pool():
     global _connection_pool
+    if _connection_pool is None and settings.database_is_sqlite:
+        # Imported lazily: importing it registers sqlite3 adapters and converters process-wide
+        from core import db_sqlite
+        _connection_pool = db_sqlite.ConnectionPool(db_sqlite.database_path(settings.database_url), maxconn=10)
     if _connection_pool is None:
         _connection_pool = pool.ThreadedConnectionPool(
             minconn=1,
@@ -24,22 +86,94 @@ def _get_pool():
     return _connection_pool
 
 
+def _get_read_pool():
+    global _read_pool
+    with _read_pool_lock:
+        if _read_pool is None:
+            _read_pool = pool.ThreadedConnectionPool(
+                minconn=1,
+                maxconn=10,
+                dsn=settings.database_read_url,
+                connection_factory=ReadConnection,
+            )
+        return _read_pool
+
+
 def get_connection():
     """Yield a connection from the pool. Caller must close or use as context manager."""
     return _get_pool().getconn()
 
 
 def return_connection(conn):
-    """Return connection to the pool."""
-    _get_pool().putconn(conn)
+    """Return connection to the pool it came from (primary or read)."""
+    if isinstance(conn, ReadConnection):
+        _read_pool.putconn(conn, close=bool(conn.closed))
+    else:
+        _get_pool().putconn(conn)
+
+
+def _mark_replica_down(error: Exception) -> None:
+    with _replica.lock:
+        if time.monotonic() >= _replica.down_until:
+            logger.warning(
+                "Read replica unavailable, reading from the primary for %.0fs: %s",
+                settings.read_replica_retry_seconds, error,
+            )
+        _replica.down_until = time.monotonic() + settings.read_replica_retry_seconds
+
+
+def _replica_ready(conn, min_lsn: int) -> bool:
+    """Whether the replica is within the lag limit and has replayed min_lsn (re-checked at most every TTL)."""
+    now = time.monotonic()
+    with _replica.lock:
+        cached = now - _replica.checked_at < REPLICA_STATUS_TTL_SECONDS and _replica.replay_lsn >= min_lsn
+        if cached:
+            return _replica.lag_seconds <= settings.read_replica_max_lag_seconds
+    row = db_pg.replica_status(conn)
+    with _replica.lock:
+        _replica.replay_lsn = parse_lsn(row["replay_lsn"])
+        _replica.lag_seconds = row["lag_seconds"]
+        _replica.checked_at = now
+        return _replica.replay_lsn >= min_lsn and _replica.lag_seconds <= settings.read_replica_max_lag_seconds
+
+
+def get_read_connection(min_lsn: str | None = None):
+    """
+    A read-pool connection if DATABASE_READ_URL is set and the replica is up, within the lag
+    limit and at or past min_lsn (a client's X-Min-LSN); otherwise a primary connection.
+    Return it with return_connection().
+    """
+    if not _replica_configured() or time.monotonic() < _replica.down_until:
+        return get_connection()
+    try:
+        wanted = parse_lsn(min_lsn) if min_lsn else 0
+    except ValueError:
+        wanted = 0
+    try:
+        conn = _get_read_pool().getconn()
+    except pool.PoolError:
+        return get_connection()  # read pool exhausted
+    except psycopg2.Error as e:
+        _mark_replica_down(e)
+        return get_connection()
+    try:
+        ready = _replica_ready(conn, wanted)
+    except psycopg2.Error as e:
+        _read_pool.putconn(conn, close=True)
+        _mark_replica_down(e)
+        return get_connection()
+    if ready:
+        return conn
+    _read_pool.putconn(conn)
+    return get_connection()
 
 
 @contextmanager
 def cursor():
-    """Context manager: get connection, get dict cursor, yield it, then close and return connection."""
+    """Context manager: get connection, get a cursor with dict-like rows (db_pg.Row), yield it, then close and return connection."""
     conn = get_connection()
     try:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        with conn.cursor(cursor_factory=RowCursor) as cur:
             yield cur
         conn.commit()
     except Exception:
@@ -49,12 +183,19 @@ def cursor():
         return_connection(conn)
 
 
-def get_db():
-    """FastAPI dependency: yield a connection; commit on success, rollback on error."""
+def get_db(request: Request):
+    """
+    FastAPI dependency: yield a connection; commit on success, rollback on error.
+    With a read replica configured, a committed write request records the WAL position for the
+    X-Write-LSN response header.
+    """
     conn = get_connection()
     try:
         yield conn
         conn.commit()
+        if _replica_configured() and request.method not in ("GET", "HEAD"):
+            request.state.write_lsn = db_pg.wal_position(conn)
+            conn.commit()
     except Exception:
         conn.rollback()
         raise
@@ -62,10 +203,64 @@ def get_db():
         return_connection(conn)
 
 
+def get_read_db(request: Request):
+    """FastAPI dependency for read-only handlers: like get_db, on the read replica when it can serve the request."""
+    conn = get_read_connection(request.headers.get(MIN_LSN_HEADER))
+    try:
+        yield conn
+        conn.commit()
+    except Exception as e:
+        if isinstance(conn, ReadConnection) and conn.closed:
+            _mark_replica_down(e)
+        else:
+            conn.rollback()
+        raise
+    finally:
+        return_connection(conn)
+
+
+class WriteLSNMiddleware:
+    """Adds X-Write-LSN (set by get_db after a committed write) to the response headers."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not _replica_configured():
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_lsn(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                lsn = scope.get("state", {}).get("write_lsn")
+                if lsn:
+                    MutableHeaders(scope=message)[WRITE_LSN_HEADER] = lsn
+            await send(message)
+
+        await self.app(scope, receive, send_with_lsn)
+
+
 def init_db():
-    """Verify DB connectivity. Schema must be applied separately (run db/schema.sql)."""
+    """
+    Verify DB connectivity and create upcoming month partitions. On PostgreSQL the schema must be
+    applied separately (run db/schema.sql); SQLite applies db/schema_sqlite.sql on first connect.
+    """
     try:
         with cursor() as cur:
             cur.execute("SELECT 1")
     except Exception as e:
         logger.warning("Database not ready: %s", e)
+        return
+    if settings.database_is_sqlite:
+        from core import db_sqlite
+        logger.info("Using SQLite database %s", db_sqlite.database_path(settings.database_url))
+        return
+    try:
+        with cursor() as cur:
+            cur.execute("SELECT partition_ensure_upcoming(2)")
+    except Exception as e:
+        logger.warning("Could not ensure execution partitions (schema out of date?): %s", e)
+    if _replica_configured():
+        conn = get_read_connection()
+        logger.info("Read replica %s", "in use" if isinstance(conn, ReadConnection) else "not ready; reading from the primary")
+        return_connection(conn)
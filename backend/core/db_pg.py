@@ -1,17 +1,49 @@
-"""Call PostgreSQL stored functions only. No inline SQL."""
+"""
+Call PostgreSQL stored functions only. No inline SQL.
+
+This module is the storage interface: with DATABASE_URL=sqlite:///... the functions below are
+replaced by their core.db_sqlite twins (same signatures and row shapes) by _use_sqlite() at the end
+of the module, which fails the import unless db_sqlite.__all__ names exactly these functions minus
+POSTGRES_ONLY. On SQLite, commit() and rollback() do not delimit transactions (see core.db_sqlite).
+"""
 import json
-from typing import Any
+import uuid
+from typing import Any, Iterator
 
-from psycopg2.extras import RealDictCursor
+from psycopg2 import extensions
 
+from core.config import settings
+from core.rows import Row, _row_class
 
-def _fetch_all(conn, sql: str, params: tuple = ()) -> list[dict]:
-    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+
+class RowCursor(extensions.cursor):
+    """
+    Cursor whose rows are Row objects, filled directly by psycopg2 (row_factory): no per-row dict
+    and no second copy. The row class is resolved from the description on the first row of each
+    result (works for named cursors, whose description arrives with the first fetch).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.row_factory = self._first_row
+
+    def execute(self, query, vars=None):
+        self.row_factory = self._first_row
+        return super().execute(query, vars)
+
+    def _first_row(self, _cursor) -> Row:
+        cls = _row_class(tuple(d.name for d in self.description))
+        self.row_factory = cls
+        return cls()
+
+
+def _fetch_all(conn, sql: str, params: tuple = ()) -> list[Row]:
+    with conn.cursor(cursor_factory=RowCursor) as cur:
         cur.execute(sql, params)
-        return [dict(r) for r in cur.fetchall()]
+        return cur.fetchall()
 
 
-def _fetch_one(conn, sql: str, params: tuple = ()) -> dict | None:
+def _fetch_one(conn, sql: str, params: tuple = ()) -> Row | None:
     rows = _fetch_all(conn, sql, params)
     return rows[0] if rows else None
 
@@ -30,11 +62,16 @@ def _execute_returning_int(conn, sql: str, params: tuple = ()) -> int:
 
 # --- Workflows ---
 
-def workflow_list(conn) -> list[dict]:
+def workflow_list(conn) -> list[Row]:
+    """Latest version of each workflow, with its version count."""
     return _fetch_all(conn, "SELECT * FROM workflow_list()")
 
 
-def workflow_get(conn, workflow_id: int) -> dict | None:
+def workflow_list_versions(conn, workflow_id: int) -> list[Row]:
+    return _fetch_all(conn, "SELECT * FROM workflow_list_versions(%s)", (workflow_id,))
+
+
+def workflow_get(conn, workflow_id: int) -> Row | None:
     return _fetch_one(conn, "SELECT * FROM workflow_get(%s)", (workflow_id,))
 
 
@@ -43,12 +80,49 @@ def workflow_has_executions(conn, workflow_id: int) -> bool:
     return row and row["ok"] is True
 
 
-def workflow_create(conn, name: str) -> int:
-    return _execute_returning_int(conn, "SELECT workflow_create(%s)", (name,))
+def workflow_executions_exist(conn, workflow_id: int) -> bool:
+    """Probes the stored runs (workflow_has_executions is sticky and stays true after retention)."""
+    row = _fetch_one(conn, "SELECT workflow_executions_exist(%s) AS ok", (workflow_id,))
+    return row and row["ok"] is True
+
+
+def workflow_has_running_execution(conn, workflow_id: int) -> bool:
+    row = _fetch_one(conn, "SELECT workflow_has_running_execution(%s) AS ok", (workflow_id,))
+    return row and row["ok"] is True
+
+
+def workflow_create(
+    conn,
+    name: str,
+    deadline_seconds: float | None = None,
+    token_budget: int | None = None,
+    cost_budget_usd: float | None = None,
+) -> int:
+    return _execute_returning_int(
+        conn,
+        "SELECT workflow_create(%s, %s, %s, %s)",
+        (name, deadline_seconds, token_budget, cost_budget_usd),
+    )
+
+
+def workflow_update(
+    conn,
+    workflow_id: int,
+    name: str,
+    deadline_seconds: float | None = None,
+    token_budget: int | None = None,
+    cost_budget_usd: float | None = None,
+) -> None:
+    _execute(
+        conn,
+        "SELECT workflow_update(%s, %s, %s, %s, %s)",
+        (workflow_id, name, deadline_seconds, token_budget, cost_budget_usd),
+    )
 
 
-def workflow_update(conn, workflow_id: int, name: str) -> None:
-    _execute(conn, "SELECT workflow_update(%s, %s)", (workflow_id, name))
+def workflow_create_version(conn, workflow_id: int) -> int | None:
+    """New version sharing the step rows of workflow_id. Returns its id (None if not found)."""
+    return _execute_returning_int(conn, "SELECT workflow_create_version(%s)", (workflow_id,))
 
 
 def workflow_delete(conn, workflow_id: int) -> None:
@@ -57,12 +131,12 @@ def workflow_delete(conn, workflow_id: int) -> None:
 
 # --- Steps ---
 
-def step_list_by_workflow(conn, workflow_id: int) -> list[dict]:
+def step_list_by_workflow(conn, workflow_id: int) -> list[Row]:
     return _fetch_all(conn, "SELECT * FROM step_list_by_workflow(%s)", (workflow_id,))
 
 
-def step_get(conn, step_id: int) -> dict | None:
-    return _fetch_one(conn, "SELECT * FROM step_get(%s)", (step_id,))
+def step_get(conn, workflow_id: int, step_id: int) -> Row | None:
+    return _fetch_one(conn, "SELECT * FROM step_get(%s, %s)", (workflow_id, step_id))
 
 
 def step_create(
@@ -73,11 +147,27 @@ def step_create(
     prompt: str,
     completion_criteria: dict[str, Any],
     context_strategy: str,
+    timeout_seconds: float | None = None,
+    fallback_models: list[str] | None = None,
+    routing_policy: str = "ordered",
+    hedge_percentile: float | None = None,
+    candidates: int = 1,
+    context_config: dict[str, Any] | None = None,
+    max_tokens: int | None = None,
+    temperature: float | None = None,
+    top_p: float | None = None,
+    stop: list[str] | None = None,
+    response_format: dict[str, Any] | None = None,
 ) -> int:
     return _execute_returning_int(
         conn,
-        "SELECT step_create(%s, %s, %s, %s, %s::jsonb, %s)",
-        (workflow_id, order_index, model, prompt, json.dumps(completion_criteria), context_strategy),
+        "SELECT step_create(%s, %s, %s, %s, %s::jsonb, %s, %s, %s::jsonb, %s, %s, %s, %s::jsonb, %s, %s, %s, %s::jsonb, %s::jsonb)",
+        (
+            workflow_id, order_index, model, prompt, json.dumps(completion_criteria), context_strategy,
+            timeout_seconds, json.dumps(fallback_models or []), routing_policy, hedge_percentile, candidates,
+            json.dumps(context_config or {}), max_tokens, temperature, top_p, json.dumps(stop or []),
+            None if response_format is None else json.dumps(response_format),
+        ),
     )
 
 
@@ -90,11 +180,36 @@ def step_update(
     prompt: str,
     completion_criteria: dict[str, Any],
     context_strategy: str,
-) -> None:
-    _execute(
+    timeout_seconds: float | None = None,
+    fallback_models: list[str] | None = None,
+    routing_policy: str = "ordered",
+    hedge_percentile: float | None = None,
+    candidates: int = 1,
+    context_config: dict[str, Any] | None = None,
+    max_tokens: int | None = None,
+    temperature: float | None = None,
+    top_p: float | None = None,
+    stop: list[str] | None = None,
+    response_format: dict[str, Any] | None = None,
+) -> int | None:
+    """Returns the step id now in the workflow: a new id if the step was shared with another version."""
+    return _execute_returning_int(
         conn,
-        "SELECT step_update(%s, %s, %s, %s, %s, %s::jsonb, %s)",
-        (step_id, workflow_id, order_index, model, prompt, json.dumps(completion_criteria), context_strategy),
+        "SELECT step_update(%s, %s, %s, %s, %s, %s::jsonb, %s, %s, %s::jsonb, %s, %s, %s, %s::jsonb, %s, %s, %s, %s::jsonb, %s::jsonb)",
+        (
+            step_id, workflow_id, order_index, model, prompt,
+            json.dumps(completion_criteria), context_strategy, timeout_seconds,
+            json.dumps(fallback_models or []), routing_policy, hedge_percentile, candidates,
+            json.dumps(context_config or {}), max_tokens, temperature, top_p, json.dumps(stop or []),
+            None if response_format is None else json.dumps(response_format),
+        ),
+    )
+
+
+def step_replace_all(conn, workflow_id: int, steps: list[dict[str, Any]]) -> int:
+    """Replace every step of a workflow in one call. steps: step_create fields as JSON-ready dicts."""
+    return _execute_returning_int(
+        conn, "SELECT step_replace_all(%s, %s::jsonb)", (workflow_id, json.dumps(steps)),
     )
 
 
@@ -104,23 +219,87 @@ def step_delete(conn, workflow_id: int, step_id: int) -> None:
 
 # --- Executions ---
 
-def execution_list(conn, workflow_id: int | None = None) -> list[dict]:
+def execution_list(conn, workflow_id: int | None = None) -> list[Row]:
     if workflow_id is None:
         return _fetch_all(conn, "SELECT * FROM execution_list(NULL)")
     return _fetch_all(conn, "SELECT * FROM execution_list(%s)", (workflow_id,))
 
 
-def execution_get(conn, execution_id: int) -> dict | None:
+def execution_get(conn, execution_id: int) -> Row | None:
     return _fetch_one(conn, "SELECT * FROM execution_get(%s)", (execution_id,))
 
 
-def execution_get_attempts(conn, execution_id: int) -> list[dict]:
+def execution_get_attempts(conn, execution_id: int) -> list[Row]:
     return _fetch_all(conn, "SELECT * FROM execution_get_attempts(%s)", (execution_id,))
 
 
+def execution_get_attempt_summaries(conn, execution_id: int) -> list[Row]:
+    """Attempt metadata plus prompt_bytes/response_bytes; never reads the TEXT bodies."""
+    return _fetch_all(conn, "SELECT * FROM execution_get_attempt_summaries(%s)", (execution_id,))
+
+
+def step_attempt_summary_get(conn, execution_id: int, attempt_id: int) -> Row | None:
+    """One attempt's summary row (as execution_get_attempt_summaries), or None if not in the execution."""
+    return _fetch_one(conn, "SELECT * FROM step_attempt_summary_get(%s, %s)", (execution_id, attempt_id))
+
+
+def step_attempt_body_range(
+    conn,
+    execution_id: int,
+    attempt_id: int,
+    field: str,
+    offset: int = 0,
+    length: int | None = None,
+) -> bytes | None:
+    """UTF-8 bytes [offset, offset + length) of an attempt's 'prompt' or 'response'."""
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT step_attempt_body_range(%s, %s, %s, %s, %s)",
+            (execution_id, attempt_id, field, offset, length),
+        )
+        row = cur.fetchone()
+    if not row or row[0] is None:
+        return None
+    return bytes(row[0])
+
+
+def step_attempt_body_chunk(conn, execution_id: int, attempt_id: int, field: str, start: int, count: int) -> str | None:
+    """Characters [start, start + count) (1-based) of an attempt's 'prompt' or 'response'."""
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT step_attempt_body_chunk(%s, %s, %s, %s, %s)",
+            (execution_id, attempt_id, field, start, count),
+        )
+        row = cur.fetchone()
+    return row[0] if row else None
+
+
+def execution_export_iter(
+    conn,
+    workflow_id: int | None = None,
+    since: Any = None,
+    until: Any = None,
+    include_bodies: bool = True,
+    itersize: int = 500,
+) -> Iterator[Row]:
+    """
+    Stream execution_export() rows through a server-side (named) cursor, itersize rows
+    per round trip, so memory stays flat regardless of result size. Must run inside
+    the caller's transaction; do not commit until iteration finishes.
+    """
+    with conn.cursor(name=f"execution_export_{uuid.uuid4().hex}", cursor_factory=RowCursor) as cur:
+        cur.itersize = itersize
+        cur.execute(
+            "SELECT * FROM execution_export(%s, %s, %s, %s)",
+            (workflow_id, since, until, include_bodies),
+        )
+        for r in cur:
+            yield r
+
+
 # Phase 3
-def execution_create(conn, workflow_id: int) -> int:
-    return _execute_returning_int(conn, "SELECT execution_create(%s)", (workflow_id,))
+def execution_create(conn, workflow_id: int, priority: str = "batch", tenant: str | None = None) -> int:
+    return _execute_returning_int(conn, "SELECT execution_create(%s, %s, %s)", (workflow_id, priority, tenant))
 
 
 def execution_update(
@@ -130,14 +309,46 @@ def execution_update(
     current_step_index: int | None = None,
     started_at: Any = None,
     finished_at: Any = None,
+    failure_reason: str | None = None,
+    queue_wait_ms: float | None = None,
 ) -> None:
     _execute(
         conn,
-        "SELECT execution_update(%s, %s, %s, %s, %s)",
-        (execution_id, status, current_step_index, started_at, finished_at),
+        "SELECT execution_update(%s, %s, %s, %s, %s, %s, %s)",
+        (execution_id, status, current_step_index, started_at, finished_at, failure_reason, queue_wait_ms),
     )
 
 
+def execution_claim(conn, execution_id: int, started_at: Any, queue_wait_ms: float | None = None) -> bool:
+    """pending -> running; False if the run is no longer pending (another process started it, or cancelled)."""
+    row = _fetch_one(conn, "SELECT execution_claim(%s, %s, %s) AS ok", (execution_id, started_at, queue_wait_ms))
+    return row and row["ok"] is True
+
+
+def execution_list_pending(conn) -> list[Row]:
+    """id, priority, tenant of every pending run, oldest first."""
+    return _fetch_all(conn, "SELECT * FROM execution_list_pending()")
+
+
+def execution_record_step(conn, execution_id: int, step_index: int, step_id: int, wall_ms: float) -> None:
+    _execute(conn, "SELECT execution_record_step(%s, %s, %s, %s)", (execution_id, step_index, step_id, wall_ms))
+
+
+def execution_add_usage(conn, execution_id: int, tokens_used: int | None, cost_usd: float | None) -> None:
+    _execute(conn, "SELECT execution_add_usage(%s, %s, %s)", (execution_id, tokens_used, cost_usd))
+
+
+def execution_request_cancel(conn, execution_id: int) -> str | None:
+    """Flag (running) or cancel (pending) an execution. Returns the resulting status, None if not found."""
+    row = _fetch_one(conn, "SELECT execution_request_cancel(%s) AS status", (execution_id,))
+    return row["status"] if row else None
+
+
+def execution_cancel_requested(conn, execution_ids: list[int]) -> list[int]:
+    rows = _fetch_all(conn, "SELECT * FROM execution_cancel_requested(%s)", (list(execution_ids),))
+    return [r["id"] for r in rows]
+
+
 def step_attempt_insert(
     conn,
     execution_id: int,
@@ -149,13 +360,22 @@ def step_attempt_insert(
     criteria_passed: bool | None = None,
     failure_reason: str | None = None,
     tokens_used: int | None = None,
+    execution_created_at: Any = None,
+    model: str | None = None,
+    is_hedge: bool = False,
+    ttfb_ms: float | None = None,
+    llm_ms: float | None = None,
+    criteria_ms: float | None = None,
+    db_write_ms: float | None = None,
+    context_bytes: int | None = None,
 ) -> int:
     return _execute_returning_int(
         conn,
-        "SELECT step_attempt_insert(%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+        "SELECT step_attempt_insert(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
         (
             execution_id, step_id, attempt_number, status,
             prompt_sent, response, criteria_passed, failure_reason, tokens_used,
+            execution_created_at, model, is_hedge, ttfb_ms, llm_ms, criteria_ms, db_write_ms, context_bytes,
         ),
     )
 
@@ -168,9 +388,115 @@ def step_attempt_update(
     criteria_passed: bool | None = None,
     failure_reason: str | None = None,
     tokens_used: int | None = None,
+    execution_created_at: Any = None,
+    ttfb_ms: float | None = None,
+    llm_ms: float | None = None,
+    criteria_ms: float | None = None,
+    db_write_ms: float | None = None,
+) -> None:
+    _execute(
+        conn,
+        "SELECT step_attempt_update(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+        (
+            attempt_id, status, response, criteria_passed, failure_reason, tokens_used, execution_created_at,
+            ttfb_ms, llm_ms, criteria_ms, db_write_ms,
+        ),
+    )
+
+
+# --- Partitions (monthly workflow_executions / step_attempts) ---
+
+def partition_ensure_upcoming(conn, months_ahead: int = 2) -> None:
+    _execute(conn, "SELECT partition_ensure_upcoming(%s)", (months_ahead,))
+
+
+def partition_ensure_month(conn, month: Any) -> None:
+    _execute(conn, "SELECT partition_ensure_month(%s)", (month,))
+
+
+def partition_list_months(conn, before: Any = None) -> list[Row]:
+    return _fetch_all(conn, "SELECT * FROM partition_list_months(%s)", (before,))
+
+
+def partition_drop_month(conn, month: Any) -> None:
+    _execute(conn, "SELECT partition_drop_month(%s)", (month,))
+
+
+# --- Stats (incremental rollups) ---
+
+def stats_record_attempt(
+    conn,
+    workflow_id: int,
+    step_id: int,
+    model: str,
+    passed: bool | None,
+    tokens_used: int | None = None,
+    duration_ms: float | None = None,
 ) -> None:
+    """passed=None records an LLM/transport error rather than a criteria result."""
     _execute(
         conn,
-        "SELECT step_attempt_update(%s, %s, %s, %s, %s, %s)",
-        (attempt_id, status, response, criteria_passed, failure_reason, tokens_used),
+        "SELECT stats_record_attempt(%s, %s, %s, %s, %s, %s)",
+        (workflow_id, step_id, model, passed, tokens_used, duration_ms),
     )
+
+
+def stats_record_run(conn, workflow_id: int, status: str, duration_ms: float | None = None) -> None:
+    _execute(conn, "SELECT stats_record_run(%s, %s, %s)", (workflow_id, status, duration_ms))
+
+
+def stats_workflow_get(conn, workflow_id: int) -> Row | None:
+    return _fetch_one(conn, "SELECT * FROM stats_workflow_get(%s)", (workflow_id,))
+
+
+def stats_step_model_list(conn, workflow_id: int | None = None) -> list[Row]:
+    return _fetch_all(conn, "SELECT * FROM stats_step_model_list(%s)", (workflow_id,))
+
+
+def stats_workflow_runs_list(conn) -> list[Row]:
+    return _fetch_all(conn, "SELECT * FROM stats_workflow_runs_list()")
+
+
+def stats_backfill(conn) -> None:
+    _execute(conn, "SELECT stats_backfill()")
+
+
+# --- Read replica ---
+
+def wal_position(conn) -> str:
+    with conn.cursor() as cur:
+        cur.execute("SELECT wal_position()")
+        return cur.fetchone()[0]
+
+
+def replica_status(conn) -> Row | None:
+    """replay_lsn (text LSN) and lag_seconds of the server conn points at."""
+    return _fetch_one(conn, "SELECT * FROM replica_status()")
+
+
+# --- Backend selection: DATABASE_URL=sqlite:///... swaps in the SQLite implementation ---
+
+# Storage functions without a SQLite twin: the read replica and month partitions
+POSTGRES_ONLY = frozenset({"wal_position", "replica_status", "partition_drop_month"})
+
+
+def _use_sqlite() -> None:
+    """Replace every storage function with its core.db_sqlite twin; fail if the two modules differ."""
+    from core import db_sqlite
+
+    expected = {
+        name for name, value in globals().items()
+        if callable(value) and getattr(value, "__module__", None) == __name__
+        and not name.startswith("_") and not isinstance(value, type)
+    } - POSTGRES_ONLY
+    exported = set(db_sqlite.__all__)
+    if exported != expected:
+        raise ImportError(
+            f"core.db_sqlite does not implement core.db_pg: missing {sorted(expected - exported)}, "
+            f"unexpected {sorted(exported - expected)}"
+        )
+    globals().update({name: getattr(db_sqlite, name) for name in sorted(exported)})
+
+
+if settings.database_is_sqlite:
+    _use_sqlite()
@@ -0,0 +1,1161 @@
+"""
+SQLite implementation of the core.db_pg functions: same names, arguments and row shapes.
+core.db_pg re-exports these when DATABASE_URL is sqlite:///path/to/file.db.
+
+SQLite has no stored functions, so the statements of each function are module constants;
+sqlite3 prepares a statement once per connection and reuses it from the connection's cache.
+
+- Reads run on the caller's connection (connect(): autocommit, query-only). In WAL mode they
+  never wait for the writer or for each other, and see every write that has returned.
+- Writes run on one writer thread per database file, which owns the only write connection. Each
+  write function is one job, applied atomically in a SAVEPOINT; jobs that queue up while a
+  transaction commits are applied together and committed once (group commit). A write is
+  committed when the function returns, so the caller's commit()/rollback() have nothing to do.
+- Transaction semantics therefore differ from PostgreSQL: SQLiteConnection.commit() and
+  rollback() are no-ops. Each write function is its own transaction, so a caller's sequence of
+  writes (the executor's per-step updates, scripts.backfill_stats, a request handler that fails
+  halfway) is not atomic, and rollback() after an error does not undo the writes that already
+  returned. Reads are autocommit too: each statement sees the latest committed data, so a caller
+  that reads in several calls (_stream_body's chunks in api/executions.py, list-then-get
+  handlers) may see writes made in between, as under PostgreSQL's READ COMMITTED once it has
+  committed between the reads.
+- db/schema_sqlite.sql is applied when the writer opens the database.
+"""
+import functools
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from core.rows import Row, _row_class
+from utils.sketch import SKETCH_BUCKETS, bucket_for_ms
+
+logger = logging.getLogger(__name__)
+
+# What core.db_pg swaps in: its functions minus db_pg.POSTGRES_ONLY (checked when db_pg is imported)
+__all__ = [
+    "workflow_list", "workflow_list_versions", "workflow_get", "workflow_has_executions",
+    "workflow_executions_exist", "workflow_has_running_execution", "workflow_create", "workflow_update",
+    "workflow_create_version", "workflow_delete",
+    "step_list_by_workflow", "step_get", "step_create", "step_update", "step_replace_all", "step_delete",
+    "execution_list", "execution_get", "execution_get_attempts", "execution_get_attempt_summaries",
+    "step_attempt_summary_get", "step_attempt_body_range", "step_attempt_body_chunk", "execution_export_iter",
+    "execution_create",
+    "execution_update", "execution_claim", "execution_list_pending", "execution_record_step",
+    "execution_add_usage", "execution_request_cancel", "execution_cancel_requested", "step_attempt_insert",
+    "step_attempt_update",
+    "partition_ensure_upcoming", "partition_ensure_month", "partition_list_months",
+    "stats_record_attempt", "stats_record_run", "stats_workflow_get", "stats_step_model_list",
+    "stats_workflow_runs_list", "stats_backfill",
+]
+
+SCHEMA_PATH = Path(__file__).resolve().parent.parent / "db" / "schema_sqlite.sql"
+BUSY_TIMEOUT_SECONDS = 5.0
+STATEMENT_CACHE_SIZE = 256
+# Most write jobs applied in one transaction
+WRITE_BATCH_MAX = 64
+
+# Columns added after the first SQLite release: (table, column, declaration), applied to older files
+ADDED_COLUMNS = [
+    ("steps", "max_tokens", "INTEGER"),
+    ("steps", "temperature", "REAL"),
+    ("steps", "top_p", "REAL"),
+    ("steps", "stop", "JSONB NOT NULL DEFAULT '[]'"),
+    ("steps", "response_format", "JSONB"),
+]
+
+_TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%f+00:00"
+_EMPTY_BUCKETS = json.dumps([0] * SKETCH_BUCKETS)
+
+
+def _format_timestamp(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime(_TIMESTAMP_FORMAT)
+
+
+def clock_timestamp() -> str:
+    """Now, as stored in TIMESTAMPTZ columns (fixed-width UTC text, so text order is time order)."""
+    return _format_timestamp(datetime.now(timezone.utc))
+
+
+sqlite3.register_adapter(datetime, _format_timestamp)
+sqlite3.register_converter("TIMESTAMPTZ", lambda b: datetime.fromisoformat(b.decode()))
+sqlite3.register_converter("JSONB", json.loads)
+sqlite3.register_converter("BOOLEAN", lambda b: b != b"0")
+
+
+def database_path(url: str) -> str:
+    """sqlite:///data/app.db -> data/app.db (relative), sqlite:////var/lib/app.db -> /var/lib/app.db."""
+    if not url.startswith("sqlite:///"):
+        raise ValueError(f"Not an sqlite:/// URL: {url!r}")
+    path = url[len("sqlite:///"):].split("?", 1)[0]
+    if not path or path == ":memory:":
+        raise ValueError("The SQLite backend needs a database file (readers and the writer thread share it)")
+    return path
+
+
+def _make_row(cursor: sqlite3.Cursor, values: tuple) -> Row:
+    row = list.__new__(_row_class(tuple(d[0] for d in cursor.description)))
+    list.__init__(row, values)
+    return row
+
+
+class SQLiteCursor(sqlite3.Cursor):
+    """Cursor usable as a context manager, like a psycopg2 cursor."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class SQLiteConnection(sqlite3.Connection):
+    """
+    Read connection handed to callers (pooled by core.database). Autocommit and query-only:
+    writes go through the writer thread, so commit() and rollback() are no-ops.
+    """
+    path: str
+
+    def cursor(self, factory=SQLiteCursor, cursor_factory=None, name=None) -> SQLiteCursor:
+        # cursor_factory / name: psycopg2 arguments (rows are always Row objects here)
+        return super().cursor(factory)
+
+
+class _WriteConnection(sqlite3.Connection):
+    # Read by the bulk_step_write() SQL function in the updated_at triggers
+    bulk_step_write = False
+
+
+def _open(path: str, factory: type[sqlite3.Connection]) -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        path,
+        factory=factory,
+        timeout=BUSY_TIMEOUT_SECONDS,
+        isolation_level=None,
+        detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
+    conn.row_factory = _make_row
+    return conn
+
+
+class _Writer:
+    """The single writer of one database file: a daemon thread applying queued jobs."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.jobs: queue.SimpleQueue = queue.SimpleQueue()
+        ready: Future = Future()
+        self.thread = threading.Thread(target=self._run, args=(ready,), name="sqlite-writer", daemon=True)
+        self.thread.start()
+        ready.result()  # schema applied; raises if the database cannot be opened
+
+    def submit(self, fn: Callable, args: tuple, kwargs: dict) -> Any:
+        future: Future = Future()
+        self.jobs.put((fn, args, kwargs, future))
+        return future.result()
+
+    def _connect(self) -> _WriteConnection:
+        conn = _open(self.path, _WriteConnection)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.create_function("clock_timestamp", 0, clock_timestamp)
+        conn.create_function("bulk_step_write", 0, lambda: conn.bulk_step_write)
+        conn.executescript(SCHEMA_PATH.read_text())
+        for table, column, declaration in ADDED_COLUMNS:
+            if column not in {r["name"] for r in conn.execute(f"PRAGMA table_info({table})")}:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+        return conn
+
+    def _run(self, ready: Future) -> None:
+        try:
+            conn = self._connect()
+        except Exception as e:
+            ready.set_exception(e)
+            return
+        ready.set_result(None)
+        while True:
+            batch = [self.jobs.get()]
+            while len(batch) < WRITE_BATCH_MAX:
+                try:
+                    batch.append(self.jobs.get_nowait())
+                except queue.Empty:
+                    break
+            self._apply(conn, batch)
+
+    def _apply(self, conn: _WriteConnection, batch: list) -> None:
+        done = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for fn, args, kwargs, future in batch:
+                conn.execute("SAVEPOINT job")
+                try:
+                    result = fn(conn, *args, **kwargs)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO job")
+                    conn.execute("RELEASE job")
+                    future.set_exception(e)
+                    continue
+                conn.execute("RELEASE job")
+                done.append((future, result))
+            conn.execute("COMMIT")
+        except Exception as e:
+            logger.warning("SQLite write transaction failed (%d jobs): %s", len(batch), e)
+            if conn.in_transaction:
+                conn.rollback()
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, result in done:
+            future.set_result(result)
+
+
+_writers: dict[str, _Writer] = {}
+_writers_lock = threading.Lock()
+
+
+def _writer(path: str) -> _Writer:
+    key = os.path.abspath(path)
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = _writers[key] = _Writer(key)
+        return writer
+
+
+def connect(path: str) -> SQLiteConnection:
+    """Read connection to the database file (starting its writer, which applies the schema, on first use)."""
+    _writer(path)
+    conn = _open(path, SQLiteConnection)
+    conn.path = path
+    conn.execute("PRAGMA query_only = ON")
+    return conn
+
+
+class ConnectionPool:
+    """Keeps up to maxconn idle read connections; getconn/putconn like psycopg2's pools."""
+
+    def __init__(self, path: str, maxconn: int = 10):
+        self.path = path
+        self.maxconn = maxconn
+        self._idle: list[SQLiteConnection] = []
+        self._lock = threading.Lock()
+
+    def getconn(self) -> SQLiteConnection:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return connect(self.path)
+
+    def putconn(self, conn: SQLiteConnection, close: bool = False) -> None:
+        if conn.in_transaction:
+            conn.rollback()  # a cursor left unfinished keeps its read snapshot open
+        with self._lock:
+            if not close and len(self._idle) < self.maxconn:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+
+def _writes(fn: Callable) -> Callable:
+    """fn(w, ...) runs on the writer thread as one atomic job; callers pass their read connection."""
+    @functools.wraps(fn)
+    def submit(conn, *args, **kwargs):
+        return _writer(conn.path).submit(fn, args, kwargs)
+    return submit
+
+
+@contextmanager
+def _bulk_step_write(w: _WriteConnection):
+    w.bulk_step_write = True
+    try:
+        yield
+    finally:
+        w.bulk_step_write = False
+
+
+def _fetch_all(conn, sql: str, params: tuple | dict = ()) -> list[Row]:
+    return conn.execute(sql, params).fetchall()
+
+
+def _fetch_one(conn, sql: str, params: tuple | dict = ()) -> Row | None:
+    rows = _fetch_all(conn, sql, params)
+    return rows[0] if rows else None
+
+
+def _returning_int(conn, sql: str, params: tuple | dict = ()) -> int | None:
+    # fetchall: a RETURNING statement must run to completion before the savepoint is released
+    rows = conn.execute(sql, params).fetchall()
+    return rows[0][0] if rows else None
+
+
+# --- Workflows ---
+
+WORKFLOW_LIST = """
+SELECT w.id, w.name, w.created_at, w.updated_at, w.step_count, w.lineage_id AS root_id, w.version,
+       w.n_versions AS versions
+FROM (
+    SELECT v.id, v.name, v.created_at, v.updated_at, v.version, v.step_count,
+           COALESCE(v.root_id, v.id) AS lineage_id,
+           ROW_NUMBER() OVER (PARTITION BY COALESCE(v.root_id, v.id) ORDER BY v.version DESC) AS rn,
+           COUNT(*) OVER (PARTITION BY COALESCE(v.root_id, v.id)) AS n_versions
+    FROM workflows v
+) w
+WHERE w.rn = 1
+ORDER BY w.updated_at DESC
+"""
+
+WORKFLOW_LIST_VERSIONS = """
+SELECT v.id, v.name, v.created_at, v.updated_at, v.step_count, COALESCE(v.root_id, v.id) AS root_id,
+       v.version, COUNT(*) OVER () AS versions
+FROM workflows v
+WHERE COALESCE(v.root_id, v.id) = (SELECT COALESCE(w.root_id, w.id) FROM workflows w WHERE w.id = ?)
+ORDER BY v.version DESC
+"""
+
+WORKFLOW_GET = """
+SELECT w.id, w.name, w.created_at, w.updated_at, w.deadline_seconds, w.token_budget, w.cost_budget_usd,
+       COALESCE(w.root_id, w.id) AS root_id, w.parent_id, w.version
+FROM workflows w WHERE w.id = ?
+"""
+
+WORKFLOW_HAS_EXECUTIONS = "SELECT w.has_executions FROM workflows w WHERE w.id = ?"
+
+WORKFLOW_EXECUTIONS_EXIST = """
+SELECT EXISTS (SELECT 1 FROM workflow_executions e WHERE e.workflow_id = ?) AS "ok [BOOLEAN]"
+"""
+
+WORKFLOW_HAS_RUNNING_EXECUTION = """
+SELECT EXISTS (
+    SELECT 1 FROM workflow_executions e WHERE e.workflow_id = ? AND e.status IN ('pending', 'running')
+) AS "ok [BOOLEAN]"
+"""
+
+WORKFLOW_CREATE = """
+INSERT INTO workflows (name, created_at, updated_at, deadline_seconds, token_budget, cost_budget_usd)
+VALUES (?, clock_timestamp(), clock_timestamp(), ?, ?, ?)
+RETURNING id
+"""
+
+WORKFLOW_UPDATE = """
+UPDATE workflows
+SET name = ?, deadline_seconds = ?, token_budget = ?, cost_budget_usd = ?, updated_at = clock_timestamp()
+WHERE id = ?
+"""
+
+WORKFLOW_CREATE_VERSION = """
+INSERT INTO workflows (
+    name, created_at, updated_at, deadline_seconds, token_budget, cost_budget_usd, root_id, parent_id, version
+)
+SELECT w.name, clock_timestamp(), clock_timestamp(), w.deadline_seconds, w.token_budget, w.cost_budget_usd,
+       COALESCE(w.root_id, w.id), w.id,
+       (SELECT MAX(v.version) + 1 FROM workflows v WHERE COALESCE(v.root_id, v.id) = COALESCE(w.root_id, w.id))
+FROM workflows w WHERE w.id = ?
+RETURNING id
+"""
+
+WORKFLOW_STEPS_COPY = """
+INSERT INTO workflow_steps (workflow_id, step_id, order_index)
+SELECT ?, ws.step_id, ws.order_index FROM workflow_steps ws WHERE ws.workflow_id = ?
+"""
+
+WORKFLOW_STEPS_UNLINK_ALL = "DELETE FROM workflow_steps WHERE workflow_id = ? RETURNING step_id"
+
+STEP_RELEASE_DELETE = """
+DELETE FROM steps
+WHERE id IN (SELECT value FROM json_each(?))
+  AND NOT EXISTS (SELECT 1 FROM workflow_steps ws WHERE ws.step_id = steps.id)
+"""
+
+STEP_RELEASE_REASSIGN = """
+UPDATE steps
+SET workflow_id = (SELECT MIN(ws.workflow_id) FROM workflow_steps ws WHERE ws.step_id = steps.id)
+WHERE id IN (SELECT value FROM json_each(?))
+  AND NOT EXISTS (SELECT 1 FROM workflow_steps ws WHERE ws.step_id = steps.id AND ws.workflow_id = steps.workflow_id)
+"""
+
+WORKFLOW_REPARENT = """
+UPDATE workflows SET parent_id = (SELECT w.parent_id FROM workflows w WHERE w.id = ?) WHERE parent_id = ?
+"""
+
+WORKFLOW_DELETE = "DELETE FROM workflows WHERE id = ?"
+
+
+def workflow_list(conn) -> list[Row]:
+    """Latest version of each workflow, with its version count."""
+    return _fetch_all(conn, WORKFLOW_LIST)
+
+
+def workflow_list_versions(conn, workflow_id: int) -> list[Row]:
+    return _fetch_all(conn, WORKFLOW_LIST_VERSIONS, (workflow_id,))
+
+
+def workflow_get(conn, workflow_id: int) -> Row | None:
+    return _fetch_one(conn, WORKFLOW_GET, (workflow_id,))
+
+
+def workflow_has_executions(conn, workflow_id: int) -> bool:
+    row = _fetch_one(conn, WORKFLOW_HAS_EXECUTIONS, (workflow_id,))
+    return bool(row and row["has_executions"])
+
+
+def workflow_executions_exist(conn, workflow_id: int) -> bool:
+    return _fetch_one(conn, WORKFLOW_EXECUTIONS_EXIST, (workflow_id,))["ok"]
+
+
+def workflow_has_running_execution(conn, workflow_id: int) -> bool:
+    return _fetch_one(conn, WORKFLOW_HAS_RUNNING_EXECUTION, (workflow_id,))["ok"]
+
+
+@_writes
+def workflow_create(
+    w,
+    name: str,
+    deadline_seconds: float | None = None,
+    token_budget: int | None = None,
+    cost_budget_usd: float | None = None,
+) -> int:
+    return _returning_int(w, WORKFLOW_CREATE, (name, deadline_seconds, token_budget, cost_budget_usd))
+
+
+@_writes
+def workflow_update(
+    w,
+    workflow_id: int,
+    name: str,
+    deadline_seconds: float | None = None,
+    token_budget: int | None = None,
+    cost_budget_usd: float | None = None,
+) -> None:
+    w.execute(WORKFLOW_UPDATE, (name, deadline_seconds, token_budget, cost_budget_usd, workflow_id))
+
+
+@_writes
+def workflow_create_version(w, workflow_id: int) -> int | None:
+    """New version sharing the step rows of workflow_id. Returns its id (None if not found)."""
+    version_id = _returning_int(w, WORKFLOW_CREATE_VERSION, (workflow_id,))
+    if version_id is not None:
+        w.execute(WORKFLOW_STEPS_COPY, (version_id, workflow_id))
+    return version_id
+
+
+def _step_release(w, step_ids: list[int]) -> None:
+    """Delete steps no version links any more; hand the others to a version that links them."""
+    ids = json.dumps(step_ids)
+    w.execute(STEP_RELEASE_DELETE, (ids,))
+    w.execute(STEP_RELEASE_REASSIGN, (ids,))
+
+
+@_writes
+def workflow_delete(w, workflow_id: int) -> None:
+    with _bulk_step_write(w):
+        unlinked = [r[0] for r in w.execute(WORKFLOW_STEPS_UNLINK_ALL, (workflow_id,)).fetchall()]
+        _step_release(w, unlinked)
+    w.execute(WORKFLOW_REPARENT, (workflow_id, workflow_id))
+    w.execute(WORKFLOW_DELETE, (workflow_id,))
+
+
+# --- Steps ---
+
+_STEP_SELECT = """
+SELECT s.id, ws.workflow_id, ws.order_index, s.model, s.prompt, s.completion_criteria, s.context_strategy,
+       s.timeout_seconds, s.fallback_models, s.routing_policy, s.hedge_percentile, s.candidates, s.context_config,
+       s.max_tokens, s.temperature, s.top_p, s.stop, s.response_format
+FROM workflow_steps ws
+JOIN steps s ON s.id = ws.step_id
+"""
+
+STEP_LIST_BY_WORKFLOW = _STEP_SELECT + "WHERE ws.workflow_id = ? ORDER BY ws.order_index"
+
+STEP_GET = _STEP_SELECT + "WHERE ws.workflow_id = ? AND ws.step_id = ?"
+
+STEP_INSERT = """
+INSERT INTO steps (
+    workflow_id, order_index, model, prompt, completion_criteria, context_strategy, timeout_seconds,
+    fallback_models, routing_policy, hedge_percentile, candidates, context_config,
+    max_tokens, temperature, top_p, stop, response_format
+)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+RETURNING id
+"""
+
+STEP_LINK = "INSERT INTO workflow_steps (workflow_id, step_id, order_index) VALUES (?, ?, ?)"
+
+STEP_IS_LINKED = "SELECT 1 FROM workflow_steps WHERE workflow_id = ? AND step_id = ?"
+
+STEP_IS_SHARED = "SELECT 1 FROM workflow_steps WHERE step_id = ? AND workflow_id <> ? LIMIT 1"
+
+STEP_RELINK = """
+UPDATE workflow_steps SET step_id = ?, order_index = ? WHERE workflow_id = ? AND step_id = ?
+"""
+
+STEP_UPDATE = """
+UPDATE steps
+SET order_index = ?, model = ?, prompt = ?, completion_criteria = ?, context_strategy = ?,
+    timeout_seconds = ?, fallback_models = ?, routing_policy = ?, hedge_percentile = ?,
+    candidates = ?, context_config = ?, max_tokens = ?, temperature = ?, top_p = ?, stop = ?,
+    response_format = ?
+WHERE id = ?
+"""
+
+STEP_REORDER = "UPDATE workflow_steps SET order_index = ? WHERE workflow_id = ? AND step_id = ?"
+
+STEP_INSERT_MANY = """
+INSERT INTO steps (
+    workflow_id, order_index, model, prompt, completion_criteria, context_strategy, timeout_seconds,
+    fallback_models, routing_policy, hedge_percentile, candidates, context_config,
+    max_tokens, temperature, top_p, stop, response_format
+)
+SELECT ?, json_extract(r.value, '$.order_index'), json_extract(r.value, '$.model'),
+       json_extract(r.value, '$.prompt'), json_extract(r.value, '$.completion_criteria'),
+       COALESCE(json_extract(r.value, '$.context_strategy'), 'full'), json_extract(r.value, '$.timeout_seconds'),
+       COALESCE(json_extract(r.value, '$.fallback_models'), '[]'),
+       COALESCE(json_extract(r.value, '$.routing_policy'), 'ordered'),
+       json_extract(r.value, '$.hedge_percentile'), COALESCE(json_extract(r.value, '$.candidates'), 1),
+       COALESCE(json_extract(r.value, '$.context_config'), '{}'),
+       json_extract(r.value, '$.max_tokens'), json_extract(r.value, '$.temperature'),
+       json_extract(r.value, '$.top_p'), COALESCE(json_extract(r.value, '$.stop'), '[]'),
+       json_extract(r.value, '$.response_format')
+FROM json_each(?) r
+RETURNING id, order_index
+"""
+
+STEP_UNLINK = "DELETE FROM workflow_steps WHERE workflow_id = ? AND step_id = ?"
+
+WORKFLOW_TOUCH = "UPDATE workflows SET updated_at = clock_timestamp() WHERE id = ?"
+
+
+def _step_values(
+    order_index, model, prompt, completion_criteria, context_strategy, timeout_seconds,
+    fallback_models, routing_policy, hedge_percentile, candidates, context_config,
+    max_tokens, temperature, top_p, stop, response_format,
+) -> tuple:
+    return (
+        order_index, model, prompt, json.dumps(completion_criteria), context_strategy, timeout_seconds,
+        json.dumps(fallback_models or []), routing_policy or "ordered", hedge_percentile,
+        1 if candidates is None else candidates, json.dumps(context_config or {}),
+        max_tokens, temperature, top_p, json.dumps(stop or []),
+        None if response_format is None else json.dumps(response_format),
+    )
+
+
+def step_list_by_workflow(conn, workflow_id: int) -> list[Row]:
+    return _fetch_all(conn, STEP_LIST_BY_WORKFLOW, (workflow_id,))
+
+
+def step_get(conn, workflow_id: int, step_id: int) -> Row | None:
+    return _fetch_one(conn, STEP_GET, (workflow_id, step_id))
+
+
+@_writes
+def step_create(
+    w,
+    workflow_id: int,
+    order_index: int,
+    model: str,
+    prompt: str,
+    completion_criteria: dict[str, Any],
+    context_strategy: str,
+    timeout_seconds: float | None = None,
+    fallback_models: list[str] | None = None,
+    routing_policy: str = "ordered",
+    hedge_percentile: float | None = None,
+    candidates: int = 1,
+    context_config: dict[str, Any] | None = None,
+    max_tokens: int | None = None,
+    temperature: float | None = None,
+    top_p: float | None = None,
+    stop: list[str] | None = None,
+    response_format: dict[str, Any] | None = None,
+) -> int:
+    values = _step_values(
+        order_index, model, prompt, completion_criteria, context_strategy, timeout_seconds,
+        fallback_models, routing_policy, hedge_percentile, candidates, context_config,
+        max_tokens, temperature, top_p, stop, response_format,
+    )
+    step_id = _returning_int(w, STEP_INSERT, (workflow_id, *values))
+    w.execute(STEP_LINK, (workflow_id, step_id, order_index))
+    return step_id
+
+
+@_writes
+def step_update(
+    w,
+    step_id: int,
+    workflow_id: int,
+    order_index: int,
+    model: str,
+    prompt: str,
+    completion_criteria: dict[str, Any],
+    context_strategy: str,
+    timeout_seconds: float | None = None,
+    fallback_models: list[str] | None = None,
+    routing_policy: str = "ordered",
+    hedge_percentile: float | None = None,
+    candidates: int = 1,
+    context_config: dict[str, Any] | None = None,
+    max_tokens: int | None = None,
+    temperature: float | None = None,
+    top_p: float | None = None,
+    stop: list[str] | None = None,
+    response_format: dict[str, Any] | None = None,
+) -> int | None:
+    """Returns the step id now in the workflow: a new id if the step was shared with another version."""
+    if not _fetch_one(w, STEP_IS_LINKED, (workflow_id, step_id)):
+        return None
+    values = _step_values(
+        order_index, model, prompt, completion_criteria, context_strategy, timeout_seconds,
+        fallback_models, routing_policy, hedge_percentile, candidates, context_config,
+        max_tokens, temperature, top_p, stop, response_format,
+    )
+    if _fetch_one(w, STEP_IS_SHARED, (step_id, workflow_id)):
+        # Copy-on-write: other versions keep the original
+        new_id = _returning_int(w, STEP_INSERT, (workflow_id, *values))
+        w.execute(STEP_RELINK, (new_id, order_index, workflow_id, step_id))
+        _step_release(w, [step_id])
+        return new_id
+    w.execute(STEP_UPDATE, (*values, step_id))
+    w.execute(STEP_REORDER, (order_index, workflow_id, step_id))
+    return step_id
+
+
+@_writes
+def step_replace_all(w, workflow_id: int, steps: list[dict[str, Any]]) -> int:
+    """Replace every step of a workflow in one call. steps: step_create fields as JSON-ready dicts."""
+    with _bulk_step_write(w):
+        unlinked = [r[0] for r in w.execute(WORKFLOW_STEPS_UNLINK_ALL, (workflow_id,)).fetchall()]
+        _step_release(w, unlinked)
+        created = w.execute(STEP_INSERT_MANY, (workflow_id, json.dumps(steps))).fetchall()
+        w.executemany(STEP_LINK, [(workflow_id, r[0], r[1]) for r in created])
+    w.execute(WORKFLOW_TOUCH, (workflow_id,))
+    return len(created)
+
+
+@_writes
+def step_delete(w, workflow_id: int, step_id: int) -> None:
+    w.execute(STEP_UNLINK, (workflow_id, step_id))
+    _step_release(w, [step_id])
+
+
+# --- Executions ---
+
+_EXECUTION_LIST_SELECT = """
+SELECT e.id, e.workflow_id, e.status, e.started_at, e.finished_at, e.failure_reason, e.tokens_used, e.cost_usd
+FROM workflow_executions e
+"""
+
+# DESC puts NULLs last in SQLite (NULLS LAST in db/schema.sql), matching the started_at indexes
+EXECUTION_LIST = _EXECUTION_LIST_SELECT + "ORDER BY e.started_at DESC"
+
+EXECUTION_LIST_BY_WORKFLOW = _EXECUTION_LIST_SELECT + "WHERE e.workflow_id = ? ORDER BY e.started_at DESC"
+
+EXECUTION_GET = """
+SELECT e.id, e.workflow_id, e.status, e.current_step_index, e.started_at, e.finished_at, e.created_at,
+       e.failure_reason, e.tokens_used, e.cost_usd, e.priority, e.tenant, e.queue_wait_ms, e.step_timings
+FROM workflow_executions e WHERE e.id = ?
+"""
+
+EXECUTION_GET_ATTEMPTS = """
+SELECT a.id, a.step_id, a.attempt_number, a.status, a.prompt_sent, a.response,
+       a.criteria_passed, a.failure_reason, a.tokens_used, a.created_at, a.model, a.is_hedge,
+       a.ttfb_ms, a.llm_ms, a.criteria_ms, a.db_write_ms, a.context_bytes
+FROM step_attempts a
+WHERE a.workflow_execution_id = ?
+ORDER BY a.created_at
+"""
+
+EXECUTION_GET_ATTEMPT_SUMMARIES = """
+SELECT a.id, a.step_id, a.attempt_number, a.status,
+       a.criteria_passed, a.failure_reason, a.tokens_used, a.created_at,
+       length(CAST(a.prompt_sent AS BLOB)) AS prompt_bytes, length(CAST(a.response AS BLOB)) AS response_bytes,
+       a.model, a.is_hedge, a.ttfb_ms, a.llm_ms, a.criteria_ms, a.db_write_ms, a.context_bytes
+FROM step_attempts a
+WHERE a.workflow_execution_id = ?
+ORDER BY a.created_at
+"""
+
+STEP_ATTEMPT_SUMMARY_GET = """
+SELECT a.id, a.step_id, a.attempt_number, a.status,
+       a.criteria_passed, a.failure_reason, a.tokens_used, a.created_at,
+       length(CAST(a.prompt_sent AS BLOB)) AS prompt_bytes, length(CAST(a.response AS BLOB)) AS response_bytes,
+       a.model, a.is_hedge, a.ttfb_ms, a.llm_ms, a.criteria_ms, a.db_write_ms, a.context_bytes
+FROM step_attempts a
+WHERE a.id = ? AND a.workflow_execution_id = ?
+"""
+
+STEP_ATTEMPT_BODY_BYTES = """
+SELECT CAST(CASE ? WHEN 'prompt' THEN a.prompt_sent WHEN 'response' THEN a.response END AS BLOB) AS body
+FROM step_attempts a WHERE a.id = ? AND a.workflow_execution_id = ?
+"""
+
+STEP_ATTEMPT_BODY_CHUNK = """
+SELECT substr(CASE ? WHEN 'prompt' THEN a.prompt_sent WHEN 'response' THEN a.response END, ?, ?) AS chunk
+FROM step_attempts a WHERE a.id = ? AND a.workflow_execution_id = ?
+"""
+
+EXECUTION_EXPORT = """
+SELECT e.id AS execution_id, e.workflow_id, e.status AS execution_status, e.current_step_index,
+       e.started_at, e.finished_at,
+       a.id AS attempt_id, a.step_id, a.attempt_number, a.status AS attempt_status, a.model, a.is_hedge,
+       CASE WHEN :include_bodies THEN a.prompt_sent END AS prompt_sent,
+       CASE WHEN :include_bodies THEN a.response END AS response,
+       a.criteria_passed, a.failure_reason, a.tokens_used, a.created_at
+FROM workflow_executions e
+LEFT JOIN step_attempts a ON a.workflow_execution_id = e.id
+WHERE (:workflow_id IS NULL OR e.workflow_id = :workflow_id)
+  AND (:since IS NULL OR e.started_at >= :since)
+  AND (:until IS NULL OR e.started_at < :until)
+ORDER BY e.id, a.created_at
+"""
+
+EXECUTION_CREATE = """
+INSERT INTO workflow_executions (workflow_id, status, priority, tenant, created_at)
+VALUES (?, 'pending', ?, ?, clock_timestamp())
+RETURNING id
+"""
+
+EXECUTION_UPDATE = """
+UPDATE workflow_executions
+SET status = :status,
+    current_step_index = COALESCE(:current_step_index, current_step_index),
+    started_at = COALESCE(:started_at, started_at),
+    finished_at = COALESCE(:finished_at, finished_at),
+    failure_reason = COALESCE(:failure_reason, failure_reason),
+    queue_wait_ms = COALESCE(:queue_wait_ms, queue_wait_ms)
+WHERE id = :id
+  -- A cancelled run is final: never let a late executor write resurrect it
+  AND (status <> 'cancelled' OR :status = 'cancelled')
+"""
+
+EXECUTION_RECORD_STEP = """
+UPDATE workflow_executions
+SET step_timings = json_insert(step_timings, '$[#]', json_object('step_index', ?, 'step_id', ?, 'wall_ms', ?))
+WHERE id = ?
+"""
+
+EXECUTION_ADD_USAGE = """
+UPDATE workflow_executions
+SET tokens_used = tokens_used + COALESCE(?, 0), cost_usd = cost_usd + COALESCE(?, 0)
+WHERE id = ?
+"""
+
+EXECUTION_CLAIM = """
+UPDATE workflow_executions SET status = 'running', started_at = ?, queue_wait_ms = ?
+WHERE id = ? AND status = 'pending'
+RETURNING id
+"""
+
+EXECUTION_LIST_PENDING = """
+SELECT e.id, e.priority, e.tenant FROM workflow_executions e
+WHERE e.status = 'pending'
+ORDER BY e.created_at, e.id
+"""
+
+EXECUTION_REQUEST_CANCEL = """
+UPDATE workflow_executions
+SET cancel_requested_at = COALESCE(cancel_requested_at, clock_timestamp()),
+    status = CASE WHEN status = 'pending' THEN 'cancelled' ELSE status END,
+    finished_at = CASE WHEN status = 'pending' THEN clock_timestamp() ELSE finished_at END
+WHERE id = ? AND status IN ('pending', 'running')
+RETURNING status
+"""
+
+EXECUTION_STATUS = "SELECT e.status FROM workflow_executions e WHERE e.id = ?"
+
+EXECUTION_CANCEL_REQUESTED = """
+SELECT e.id FROM workflow_executions e
+WHERE e.id IN (SELECT value FROM json_each(?)) AND e.cancel_requested_at IS NOT NULL
+"""
+
+STEP_ATTEMPT_INSERT = """
+INSERT INTO step_attempts (
+    workflow_execution_id, step_id, attempt_number, status, prompt_sent, response, criteria_passed,
+    failure_reason, tokens_used, created_at, model, is_hedge, ttfb_ms, llm_ms, criteria_ms, db_write_ms,
+    context_bytes
+)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, clock_timestamp(), ?, ?, ?, ?, ?, ?, ?)
+RETURNING id
+"""
+
+STEP_ATTEMPT_UPDATE = """
+UPDATE step_attempts
+SET status = COALESCE(?, status),
+    response = COALESCE(?, response),
+    criteria_passed = COALESCE(?, criteria_passed),
+    failure_reason = COALESCE(?, failure_reason),
+    tokens_used = COALESCE(?, tokens_used),
+    ttfb_ms = COALESCE(?, ttfb_ms),
+    llm_ms = COALESCE(?, llm_ms),
+    criteria_ms = COALESCE(?, criteria_ms),
+    db_write_ms = COALESCE(?, db_write_ms)
+WHERE id = ?
+"""
+
+
+def execution_list(conn, workflow_id: int | None = None) -> list[Row]:
+    if workflow_id is None:
+        return _fetch_all(conn, EXECUTION_LIST)
+    return _fetch_all(conn, EXECUTION_LIST_BY_WORKFLOW, (workflow_id,))
+
+
+def execution_get(conn, execution_id: int) -> Row | None:
+    return _fetch_one(conn, EXECUTION_GET, (execution_id,))
+
+
+def execution_get_attempts(conn, execution_id: int) -> list[Row]:
+    return _fetch_all(conn, EXECUTION_GET_ATTEMPTS, (execution_id,))
+
+
+def execution_get_attempt_summaries(conn, execution_id: int) -> list[Row]:
+    """Attempt metadata plus prompt_bytes/response_bytes; the TEXT bodies are not returned."""
+    return _fetch_all(conn, EXECUTION_GET_ATTEMPT_SUMMARIES, (execution_id,))
+
+
+def step_attempt_summary_get(conn, execution_id: int, attempt_id: int) -> Row | None:
+    """One attempt's summary row (as execution_get_attempt_summaries), or None if not in the execution."""
+    return _fetch_one(conn, STEP_ATTEMPT_SUMMARY_GET, (attempt_id, execution_id))
+
+
+def step_attempt_body_range(
+    conn,
+    execution_id: int,
+    attempt_id: int,
+    field: str,
+    offset: int = 0,
+    length: int | None = None,
+) -> bytes | None:
+    """UTF-8 bytes [offset, offset + length) of an attempt's 'prompt' or 'response'."""
+    row = _fetch_one(conn, STEP_ATTEMPT_BODY_BYTES, (field, attempt_id, execution_id))
+    if not row or row["body"] is None:
+        return None
+    body = row["body"]
+    return bytes(body[offset:] if length is None else body[offset:offset + length])
+
+
+def step_attempt_body_chunk(conn, execution_id: int, attempt_id: int, field: str, start: int, count: int) -> str | None:
+    """Characters [start, start + count) (1-based) of an attempt's 'prompt' or 'response'."""
+    row = _fetch_one(conn, STEP_ATTEMPT_BODY_CHUNK, (field, start, count, attempt_id, execution_id))
+    return row["chunk"] if row else None
+
+
+def execution_export_iter(
+    conn,
+    workflow_id: int | None = None,
+    since: Any = None,
+    until: Any = None,
+    include_bodies: bool = True,
+    itersize: int = 500,
+) -> Iterator[Row]:
+    """
+    Stream export rows (columns of execution_export() in db/schema.sql) straight from the
+    statement, one row at a time, so memory stays flat. itersize is accepted for db_pg
+    compatibility; the read snapshot lasts until iteration finishes.
+    """
+    with conn.cursor() as cur:
+        cur.execute(EXECUTION_EXPORT, {
+            "workflow_id": workflow_id, "since": since, "until": until, "include_bodies": include_bodies,
+        })
+        yield from cur
+
+
+@_writes
+def execution_create(w, workflow_id: int, priority: str = "batch", tenant: str | None = None) -> int:
+    return _returning_int(w, EXECUTION_CREATE, (workflow_id, priority, tenant))
+
+
+@_writes
+def execution_update(
+    w,
+    execution_id: int,
+    status: str,
+    current_step_index: int | None = None,
+    started_at: Any = None,
+    finished_at: Any = None,
+    failure_reason: str | None = None,
+    queue_wait_ms: float | None = None,
+) -> None:
+    w.execute(EXECUTION_UPDATE, {
+        "id": execution_id, "status": status, "current_step_index": current_step_index,
+        "started_at": started_at, "finished_at": finished_at, "failure_reason": failure_reason,
+        "queue_wait_ms": queue_wait_ms,
+    })
+
+
+@_writes
+def execution_claim(w, execution_id: int, started_at: Any, queue_wait_ms: float | None = None) -> bool:
+    """pending -> running; False if the run is no longer pending (another process started it, or cancelled)."""
+    return _fetch_one(w, EXECUTION_CLAIM, (started_at, queue_wait_ms, execution_id)) is not None
+
+
+def execution_list_pending(conn) -> list[Row]:
+    return _fetch_all(conn, EXECUTION_LIST_PENDING)
+
+
+@_writes
+def execution_record_step(w, execution_id: int, step_index: int, step_id: int, wall_ms: float) -> None:
+    w.execute(EXECUTION_RECORD_STEP, (step_index, step_id, wall_ms, execution_id))
+
+
+@_writes
+def execution_add_usage(w, execution_id: int, tokens_used: int | None, cost_usd: float | None) -> None:
+    w.execute(EXECUTION_ADD_USAGE, (tokens_used, cost_usd, execution_id))
+
+
+@_writes
+def execution_request_cancel(w, execution_id: int) -> str | None:
+    """Flag (running) or cancel (pending) an execution. Returns the resulting status, None if not found."""
+    row = _fetch_one(w, EXECUTION_REQUEST_CANCEL, (execution_id,)) or _fetch_one(w, EXECUTION_STATUS, (execution_id,))
+    return row["status"] if row else None
+
+
+def execution_cancel_requested(conn, execution_ids: list[int]) -> list[int]:
+    rows = _fetch_all(conn, EXECUTION_CANCEL_REQUESTED, (json.dumps(list(execution_ids)),))
+    return [r["id"] for r in rows]
+
+
+@_writes
+def step_attempt_insert(
+    w,
+    execution_id: int,
+    step_id: int,
+    attempt_number: int,
+    status: str = "pending",
+    prompt_sent: str | None = None,
+    response: str | None = None,
+    criteria_passed: bool | None = None,
+    failure_reason: str | None = None,
+    tokens_used: int | None = None,
+    execution_created_at: Any = None,
+    model: str | None = None,
+    is_hedge: bool = False,
+    ttfb_ms: float | None = None,
+    llm_ms: float | None = None,
+    criteria_ms: float | None = None,
+    db_write_ms: float | None = None,
+    context_bytes: int | None = None,
+) -> int:
+    # execution_created_at is PostgreSQL's partition key; SQLite tables are not partitioned
+    return _returning_int(w, STEP_ATTEMPT_INSERT, (
+        execution_id, step_id, attempt_number, status, prompt_sent, response, criteria_passed,
+        failure_reason, tokens_used, model, bool(is_hedge), ttfb_ms, llm_ms, criteria_ms, db_write_ms,
+        context_bytes,
+    ))
+
+
+@_writes
+def step_attempt_update(
+    w,
+    attempt_id: int,
+    status: str | None = None,
+    response: str | None = None,
+    criteria_passed: bool | None = None,
+    failure_reason: str | None = None,
+    tokens_used: int | None = None,
+    execution_created_at: Any = None,
+    ttfb_ms: float | None = None,
+    llm_ms: float | None = None,
+    criteria_ms: float | None = None,
+    db_write_ms: float | None = None,
+) -> None:
+    w.execute(STEP_ATTEMPT_UPDATE, (
+        status, response, criteria_passed, failure_reason, tokens_used,
+        ttfb_ms, llm_ms, criteria_ms, db_write_ms, attempt_id,
+    ))
+
+
+# --- Partitions: SQLite tables are not partitioned (scripts/partitions.py is PostgreSQL-only) ---
+
+def partition_ensure_upcoming(conn, months_ahead: int = 2) -> None:
+    return None
+
+
+def partition_ensure_month(conn, month: Any) -> None:
+    return None
+
+
+def partition_list_months(conn, before: Any = None) -> list[Row]:
+    return []
+
+
+# --- Stats (incremental rollups) ---
+
+STATS_STEP_MODEL_INIT = """
+INSERT INTO stats_step_model (workflow_id, step_id, model, duration_buckets, updated_at)
+VALUES (?, ?, ?, ?, clock_timestamp())
+ON CONFLICT (workflow_id, step_id, model) DO NOTHING
+"""
+
+# :bucket is the JSON path of the duration's histogram bucket, NULL when there is no duration
+STATS_STEP_MODEL_RECORD = """
+UPDATE stats_step_model
+SET attempts = attempts + 1,
+    passed = passed + (:passed IS 1),
+    failed = failed + (:passed IS 0),
+    errors = errors + (:passed IS NULL),
+    tokens_used = tokens_used + COALESCE(:tokens_used, 0),
+    duration_buckets = CASE WHEN :bucket IS NULL THEN duration_buckets
+                            ELSE json_set(duration_buckets, :bucket, json_extract(duration_buckets, :bucket) + 1) END,
+    updated_at = clock_timestamp()
+WHERE workflow_id = :workflow_id AND step_id = :step_id AND model = :model
+"""
+
+STATS_WORKFLOW_RUNS_INIT = """
+INSERT INTO stats_workflow_runs (workflow_id, duration_buckets, updated_at)
+VALUES (?, ?, clock_timestamp())
+ON CONFLICT (workflow_id) DO NOTHING
+"""
+
+STATS_WORKFLOW_RUNS_RECORD = """
+UPDATE stats_workflow_runs
+SET runs = runs + 1,
+    completed = completed + (:status = 'completed'),
+    failed = failed + (:status <> 'completed'),
+    duration_buckets = CASE WHEN :bucket IS NULL THEN duration_buckets
+                            ELSE json_set(duration_buckets, :bucket, json_extract(duration_buckets, :bucket) + 1) END,
+    updated_at = clock_timestamp()
+WHERE workflow_id = :workflow_id
+"""
+
+STATS_WORKFLOW_GET = """
+SELECT r.workflow_id, r.runs, r.completed, r.failed, r.duration_buckets
+FROM stats_workflow_runs r WHERE r.workflow_id = ?
+"""
+
+_STATS_STEP_MODEL_SELECT = """
+SELECT s.workflow_id, s.step_id, s.model, s.attempts, s.passed, s.failed, s.errors, s.tokens_used, s.duration_buckets
+FROM stats_step_model s
+"""
+
+STATS_STEP_MODEL_LIST = _STATS_STEP_MODEL_SELECT + "ORDER BY s.workflow_id, s.step_id, s.model"
+
+STATS_STEP_MODEL_LIST_BY_WORKFLOW = _STATS_STEP_MODEL_SELECT + "WHERE s.workflow_id = ? ORDER BY s.step_id, s.model"
+
+STATS_WORKFLOW_RUNS_LIST = """
+SELECT r.workflow_id, r.runs, r.completed, r.failed, r.duration_buckets
+FROM stats_workflow_runs r ORDER BY r.workflow_id
+"""
+
+STATS_BACKFILL_STEP_MODEL = """
+INSERT INTO stats_step_model (
+    workflow_id, step_id, model, attempts, passed, failed, errors, tokens_used, duration_buckets, updated_at
+)
+SELECT e.workflow_id, a.step_id, COALESCE(a.model, s.model),
+       COUNT(*),
+       COUNT(*) FILTER (WHERE a.criteria_passed IS 1),
+       COUNT(*) FILTER (WHERE a.criteria_passed IS 0 AND a.response IS NOT NULL),
+       COUNT(*) FILTER (WHERE a.criteria_passed IS NOT 1 AND a.response IS NULL),
+       COALESCE(SUM(a.tokens_used), 0),
+       ?, clock_timestamp()
+FROM step_attempts a
+JOIN workflow_executions e ON e.id = a.workflow_execution_id
+JOIN steps s ON s.id = a.step_id
+WHERE a.status IN ('passed', 'failed')
+GROUP BY e.workflow_id, a.step_id, COALESCE(a.model, s.model)
+"""
+
+STATS_BACKFILL_ATTEMPT_DURATIONS = """
+SELECT e.workflow_id, a.step_id, COALESCE(a.model, s.model) AS model, a.llm_ms
+FROM step_attempts a
+JOIN workflow_executions e ON e.id = a.workflow_execution_id
+JOIN steps s ON s.id = a.step_id
+WHERE a.status IN ('passed', 'failed') AND a.llm_ms IS NOT NULL
+"""
+
+STATS_BACKFILL_STEP_MODEL_BUCKETS = """
+UPDATE stats_step_model SET duration_buckets = ? WHERE workflow_id = ? AND step_id = ? AND model = ?
+"""
+
+STATS_BACKFILL_FINISHED_RUNS = """
+SELECT e.workflow_id, e.status, e.started_at, e.finished_at
+FROM workflow_executions e
+WHERE e.status IN ('completed', 'failed')
+"""
+
+STATS_BACKFILL_WORKFLOW_RUNS = """
+INSERT INTO stats_workflow_runs (workflow_id, runs, completed, failed, duration_buckets, updated_at)
+VALUES (?, ?, ?, ?, ?, clock_timestamp())
+"""
+
+
+def _bucket_path(duration_ms: float | None) -> str | None:
+    return None if duration_ms is None else f"$[{bucket_for_ms(duration_ms) - 1}]"
+
+
+@_writes
+def stats_record_attempt(
+    w,
+    workflow_id: int,
+    step_id: int,
+    model: str,
+    passed: bool | None,
+    tokens_used: int | None = None,
+    duration_ms: float | None = None,
+) -> None:
+    """passed=None records an LLM/transport error rather than a criteria result."""
+    w.execute(STATS_STEP_MODEL_INIT, (workflow_id, step_id, model, _EMPTY_BUCKETS))
+    w.execute(STATS_STEP_MODEL_RECORD, {
+        "workflow_id": workflow_id, "step_id": step_id, "model": model, "passed": passed,
+        "tokens_used": tokens_used, "bucket": _bucket_path(duration_ms),
+    })
+
+
+@_writes
+def stats_record_run(w, workflow_id: int, status: str, duration_ms: float | None = None) -> None:
+    w.execute(STATS_WORKFLOW_RUNS_INIT, (workflow_id, _EMPTY_BUCKETS))
+    w.execute(STATS_WORKFLOW_RUNS_RECORD, {
+        "workflow_id": workflow_id, "status": status, "bucket": _bucket_path(duration_ms),
+    })
+
+
+def stats_workflow_get(conn, workflow_id: int) -> Row | None:
+    return _fetch_one(conn, STATS_WORKFLOW_GET, (workflow_id,))
+
+
+def stats_step_model_list(conn, workflow_id: int | None = None) -> list[Row]:
+    if workflow_id is None:
+        return _fetch_all(conn, STATS_STEP_MODEL_LIST)
+    return _fetch_all(conn, STATS_STEP_MODEL_LIST_BY_WORKFLOW, (workflow_id,))
+
+
+def stats_workflow_runs_list(conn) -> list[Row]:
+    return _fetch_all(conn, STATS_WORKFLOW_RUNS_LIST)
+
+
+@_writes
+def stats_backfill(w) -> None:
+    """Rebuild both rollups from history, as stats_backfill() in db/schema.sql."""
+    w.execute("DELETE FROM stats_step_model")
+    w.execute("DELETE FROM stats_workflow_runs")
+    w.execute(STATS_BACKFILL_STEP_MODEL, (_EMPTY_BUCKETS,))
+    histograms: dict[tuple[int, int, str], list[int]] = {}
+    for r in w.execute(STATS_BACKFILL_ATTEMPT_DURATIONS):
+        buckets = histograms.setdefault((r["workflow_id"], r["step_id"], r["model"]), [0] * SKETCH_BUCKETS)
+        buckets[bucket_for_ms(r["llm_ms"]) - 1] += 1
+    w.executemany(STATS_BACKFILL_STEP_MODEL_BUCKETS, [
+        (json.dumps(buckets), workflow_id, step_id, model)
+        for (workflow_id, step_id, model), buckets in histograms.items()
+    ])
+    runs: dict[int, list] = {}
+    for r in w.execute(STATS_BACKFILL_FINISHED_RUNS):
+        totals = runs.setdefault(r["workflow_id"], [0, 0, 0, [0] * SKETCH_BUCKETS])
+        totals[0] += 1
+        totals[1 if r["status"] == "completed" else 2] += 1
+        if r["started_at"] is not None and r["finished_at"] is not None:
+            ms = (r["finished_at"] - r["started_at"]).total_seconds() * 1000
+            totals[3][bucket_for_ms(ms) - 1] += 1
+    w.executemany(STATS_BACKFILL_WORKFLOW_RUNS, [
+        (workflow_id, n, completed, failed, json.dumps(buckets))
+        for workflow_id, (n, completed, failed, buckets) in runs.items()
+    ])
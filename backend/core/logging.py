@@ -1,13 +1,195 @@
-"""Structured logging configuration."""
+"""
+Structured logging configuration.
+
+Records are handed to a bounded queue in the calling thread and written to stdout by a
+background listener thread, so executor threads never block on log I/O. When the queue is full
+a record is dropped (and counted) rather than waiting. Below WARNING, each message template is
+rate-limited per logger (settings.log_rate_limit per second, with the same burst); suppressed
+counts are reported on the next record that gets through.
+
+Records carry execution_id / step_id / attempt from set_log_context() (per thread, via
+contextvars). LOG_FORMAT=json writes one JSON object per line; the default text format appends
+the context fields.
+"""
+import atexit
+import contextvars
+import json
 import logging
+import queue
 import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from core.config import settings
+
+CONTEXT_FIELDS = ("execution_id", "step_id", "attempt")
+
+_context: contextvars.ContextVar[dict] = contextvars.ContextVar("log_context", default={})
+_listener: "_Listener | None" = None
+_handler: "DroppingQueueHandler | None" = None
+
+
+def set_log_context(**fields) -> None:
+    """Merge fields (execution_id, step_id, attempt) into this thread's log context; None removes one."""
+    merged = {**_context.get(), **fields}
+    _context.set({k: v for k, v in merged.items() if v is not None})
+
+
+def clear_log_context() -> None:
+    _context.set({})
+
+
+class ContextFilter(logging.Filter):
+    """Copy the caller's log context onto the record (runs in the calling thread)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in _context.get().items():
+            setattr(record, key, value)
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per (logger, level, message template) for records below WARNING."""
+
+    def __init__(self, per_second: float):
+        super().__init__()
+        self.per_second = per_second
+        self._lock = threading.Lock()
+        self._buckets: dict[tuple, list] = {}  # key -> [tokens, last refill, suppressed]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.per_second <= 0 or record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, record.levelno, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.per_second, now, 0]
+            bucket[0] = min(self.per_second, bucket[0] + (now - bucket[1]) * self.per_second)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            if bucket[2]:
+                record.suppressed = bucket[2]
+                bucket[2] = 0
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks: a full queue drops the record and counts it."""
+
+    def __init__(self, q: queue.Queue):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Freeze the message now (args may change later) but leave traceback formatting,
+        # the expensive part of logger.exception, to the writer thread.
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _DropReporter(logging.Handler):
+    """Writer-side wrapper: at most once per second, writes how many records were dropped."""
+
+    def __init__(self, target: logging.Handler, source: DroppingQueueHandler):
+        super().__init__()
+        self.target = target
+        self.source = source
+        self._reported = 0
+        self._reported_at = 0.0
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        dropped = self.source.dropped
+        now = time.monotonic()
+        if dropped != self._reported and now - self._reported_at >= 1.0:
+            self._reported_at = now
+            self.target.handle(logging.makeLogRecord({
+                "name": __name__, "levelno": logging.WARNING, "levelname": "WARNING",
+                "msg": f"Log queue full: dropped {dropped - self._reported} records",
+            }))
+            self._reported = dropped
+        return self.target.handle(record)
+
+    def flush(self) -> None:
+        self.target.flush()
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Blocking put: on shutdown the queue may be full, and the writer is draining it
+        self.queue.put(self._sentinel)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key in CONTEXT_FIELDS:
+            if hasattr(record, key):
+                entry[key] = getattr(record, key)
+        if getattr(record, "suppressed", None):
+            entry["suppressed"] = record.suppressed
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s | %(levelname)s | %(name)s | %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        line = super().formatMessage(record)
+        extra = [f"{key}={getattr(record, key)}" for key in CONTEXT_FIELDS if hasattr(record, key)]
+        if getattr(record, "suppressed", None):
+            extra.append(f"(+{record.suppressed} suppressed)")
+        return f"{line} | {' '.join(extra)}" if extra else line
 
 
 def setup_logging(level: int = logging.INFO) -> None:
-    """Configure application logging."""
-    logging.basicConfig(
-        level=level,
-        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-        handlers=[logging.StreamHandler(sys.stdout)],
-    )
+    """Configure application logging: queue + background writer to stdout. Safe to call twice."""
+    global _listener, _handler
+    if _listener is not None:
+        return
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if settings.log_format == "json" else TextFormatter())
+
+    _handler = DroppingQueueHandler(queue.Queue(maxsize=max(settings.log_queue_size, 1)))
+    _handler.addFilter(ContextFilter())
+    _handler.addFilter(RateLimitFilter(settings.log_rate_limit))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(_handler)
+    _listener = _Listener(_handler.queue, _DropReporter(stream, _handler))
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Write out queued records and stop the writer thread."""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
@@ -0,0 +1,31 @@
+"""JSON response classes: orjson for plain payloads when installed, pydantic-core for models."""
+import json
+from typing import Any
+
+import pydantic_core
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson  # optional: pip install orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """App-wide default: orjson when available, else compact stdlib json."""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class ModelResponse(JSONResponse):
+    """
+    A pydantic model (or list of models) built by the handler, serialized once by pydantic-core
+    straight to JSON bytes. Returning a Response makes FastAPI skip response_model validation
+    and jsonable_encoder; keep response_model on the route for the OpenAPI schema.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return pydantic_core.to_json(content)
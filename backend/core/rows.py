@@ -0,0 +1,68 @@
+"""Result rows shared by the storage backends (core.db_pg, core.db_sqlite)."""
+from typing import Any
+
+
+class Row(list):
+    """
+    One result row, built in place by the backend (db_pg.RowCursor, db_sqlite's row factory): the
+    values in column order, with the column index shared by every row of the same shape (a
+    per-shape subclass holds it, so a row costs one list). Reads like a read-only dict: row["id"],
+    row.get(), "id" in row, **row, dict(row); also row.id. Iterating yields column names, as with a dict.
+    """
+    __slots__ = ()
+    _index: dict[str, int] = {}
+    _nones: tuple = ()
+
+    def __init__(self, _cursor=None):
+        super().__init__(self._nones)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                key = self._index[key]
+            except KeyError:
+                raise KeyError(key) from None
+        return super().__getitem__(key)
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return super().__getitem__(self._index[name])
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        i = self._index.get(key)
+        return default if i is None else super().__getitem__(i)
+
+    def keys(self):
+        return self._index.keys()
+
+    def values(self) -> list:
+        return list(super().__iter__())
+
+    def items(self):
+        return zip(self._index, super().__iter__())
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __contains__(self, key) -> bool:
+        return key in self._index
+
+    def __repr__(self) -> str:
+        return f"Row({dict(self.items())!r})"
+
+
+_row_classes: dict[tuple[str, ...], type[Row]] = {}
+
+
+def _row_class(columns: tuple[str, ...]) -> type[Row]:
+    cls = _row_classes.get(columns)
+    if cls is None:
+        cls = type("Row", (Row,), {
+            "__slots__": (),
+            "_index": {c: i for i, c in enumerate(columns)},
+            "_nones": (None,) * len(columns),
+        })
+        _row_classes[columns] = cls  # a few dozen shapes (one per stored function)
+    return cls
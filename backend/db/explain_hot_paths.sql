@@ -0,0 +1,108 @@
+-- Plans of the hot read paths on a seeded dataset: ~1M step attempts (100,000 executions of 200
+-- workflows with 5 steps, 10 attempts each), spread over the past and current months.
+-- Everything runs in one transaction that is rolled back, so it leaves the database as it was.
+--
+--   psql "$DATABASE_URL" -f db/explain_hot_paths.sql
+--
+-- Each EXPLAIN is the query inside the stored function named above it, with a literal in place
+-- of the parameter. Expected plan shapes are listed in the README ("Indexes & counters").
+
+\set ON_ERROR_STOP on
+\timing off
+BEGIN;
+
+SELECT partition_ensure_upcoming(2);
+
+INSERT INTO workflows (name)
+SELECT 'explain-' || g FROM generate_series(1, 200) g;
+
+CREATE TEMP TABLE seed_workflows ON COMMIT DROP AS
+SELECT id, row_number() OVER (ORDER BY id) AS n FROM workflows WHERE name LIKE 'explain-%';
+
+WITH new_steps AS (
+    INSERT INTO steps (workflow_id, order_index, model, prompt, completion_criteria)
+    SELECT w.id, i, 'mock-model', 'Step ' || i, '{"type": "contains_string", "value": "ok"}'::jsonb
+    FROM seed_workflows w, generate_series(0, 4) i
+    RETURNING id, workflow_id, order_index
+)
+INSERT INTO workflow_steps (workflow_id, step_id, order_index)
+SELECT workflow_id, id, order_index FROM new_steps;
+
+-- 500 executions per workflow over the last ~120 days (older months land in the default
+-- partition); the first workflow's newest 20 runs are still running
+INSERT INTO workflow_executions (workflow_id, status, started_at, finished_at, created_at)
+SELECT w.id,
+       CASE WHEN g > 480 AND w.n <= 1 THEN 'running' ELSE 'completed' END,
+       t, t + interval '40 seconds', t
+FROM seed_workflows w,
+     generate_series(1, 500) g,
+     LATERAL (SELECT clock_timestamp() - (500 - g) * interval '6 hours' - w.n * interval '1 minute' AS t) ts;
+
+INSERT INTO step_attempts (
+    workflow_execution_id, execution_created_at, step_id, attempt_number, status,
+    prompt_sent, response, criteria_passed, tokens_used, created_at, model
+)
+SELECT e.id, e.created_at, s.id, a, CASE WHEN a = 2 THEN 'passed' ELSE 'failed' END,
+       repeat('p', 200), repeat('r', 400), a = 2, 42,
+       e.created_at + (s.order_index * 2 + a) * interval '1 second', 'mock-model'
+FROM workflow_executions e
+JOIN seed_workflows w ON w.id = e.workflow_id
+JOIN steps s ON s.workflow_id = e.workflow_id
+CROSS JOIN generate_series(1, 2) a;
+
+ANALYZE workflows, steps, workflow_steps, workflow_executions, step_attempts;
+
+SELECT (SELECT COUNT(*) FROM step_attempts) AS attempts,
+       (SELECT COUNT(*) FROM workflow_executions) AS executions;
+
+\echo '=== execution_get_attempts: one execution, attempts in created_at order'
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT a.id, a.step_id, a.attempt_number, a.status, a.prompt_sent, a.response, a.created_at
+FROM step_attempts a
+WHERE a.workflow_execution_id = (SELECT MAX(id) / 2 FROM workflow_executions)
+ORDER BY a.created_at;
+
+\echo '=== execution_list(NULL): newest first (first page; rows stream from the index, no full sort)'
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT e.id, e.workflow_id, e.status, e.started_at, e.finished_at
+FROM workflow_executions e
+ORDER BY e.started_at DESC NULLS LAST
+LIMIT 50;
+
+\echo '=== execution_list(workflow_id)'
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT e.id, e.workflow_id, e.status, e.started_at, e.finished_at
+FROM workflow_executions e
+WHERE e.workflow_id = (SELECT MIN(id) FROM seed_workflows)
+ORDER BY e.started_at DESC NULLS LAST;
+
+\echo '=== workflow_has_running_execution (partial index on pending/running)'
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT EXISTS (
+    SELECT 1 FROM workflow_executions e
+    WHERE e.workflow_id = (SELECT MIN(id) FROM seed_workflows) AND e.status IN ('pending', 'running')
+);
+
+\echo '=== workflow_has_executions (denormalized flag)'
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT w.has_executions FROM workflows w WHERE w.id = (SELECT MIN(id) FROM seed_workflows);
+
+\echo '=== workflow_list (denormalized step_count, no per-workflow count)'
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT w.id, w.name, w.created_at, w.updated_at, w.step_count::BIGINT, w.lineage_id, w.version, w.n_versions
+FROM (
+    SELECT DISTINCT ON (COALESCE(v.root_id, v.id))
+           v.id, v.name, v.created_at, v.updated_at, v.version, v.step_count,
+           COALESCE(v.root_id, v.id) AS lineage_id,
+           COUNT(*) OVER (PARTITION BY COALESCE(v.root_id, v.id)) AS n_versions
+    FROM workflows v
+    ORDER BY COALESCE(v.root_id, v.id), v.version DESC
+) w
+ORDER BY w.updated_at DESC;
+
+\echo '=== counters match the link table'
+SELECT COUNT(*) FILTER (WHERE w.step_count <> (SELECT COUNT(*) FROM workflow_steps ws WHERE ws.workflow_id = w.id)) AS step_count_mismatches,
+       COUNT(*) FILTER (WHERE w.has_executions <> EXISTS (SELECT 1 FROM workflow_executions e WHERE e.workflow_id = w.id)) AS has_executions_mismatches
+FROM workflows w;
+
+ROLLBACK;
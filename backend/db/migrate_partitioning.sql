@@ -0,0 +1,106 @@
+-- Migration: unpartitioned workflow_executions / step_attempts → monthly range partitions.
+-- Run ONCE on an install created from the pre-partitioning schema, then re-run db/schema.sql
+-- (it drops/recreates the functions whose signatures changed).
+--
+--   psql "$DATABASE_URL" -f db/migrate_partitioning.sql
+--   psql "$DATABASE_URL" -f db/schema.sql
+--
+-- Runs in one transaction and takes ACCESS EXCLUSIVE locks on both tables: stop the backend first.
+-- Existing ids are kept; the original SERIAL sequences are reused by the new tables.
+
+BEGIN;
+
+ALTER TABLE step_attempts RENAME TO step_attempts_legacy;
+ALTER TABLE workflow_executions RENAME TO workflow_executions_legacy;
+ALTER SEQUENCE workflow_executions_id_seq OWNED BY NONE;
+ALTER SEQUENCE step_attempts_id_seq OWNED BY NONE;
+ALTER INDEX IF EXISTS idx_workflow_executions_workflow_id RENAME TO idx_workflow_executions_workflow_id_legacy;
+ALTER INDEX IF EXISTS idx_step_attempts_execution_id RENAME TO idx_step_attempts_execution_id_legacy;
+
+CREATE TABLE workflow_executions (
+    id                  INTEGER NOT NULL DEFAULT nextval('workflow_executions_id_seq'),
+    workflow_id         INTEGER NOT NULL REFERENCES workflows(id) ON DELETE CASCADE,
+    status              VARCHAR(32) NOT NULL DEFAULT 'pending',
+    current_step_index  INTEGER,
+    started_at          TIMESTAMPTZ,
+    finished_at         TIMESTAMPTZ,
+    created_at          TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE TABLE step_attempts (
+    id                      INTEGER NOT NULL DEFAULT nextval('step_attempts_id_seq'),
+    workflow_execution_id   INTEGER NOT NULL,
+    execution_created_at    TIMESTAMPTZ NOT NULL,
+    step_id                 INTEGER NOT NULL REFERENCES steps(id) ON DELETE CASCADE,
+    attempt_number          INTEGER NOT NULL,
+    status                  VARCHAR(32) NOT NULL DEFAULT 'pending',
+    prompt_sent             TEXT,
+    response                TEXT,
+    criteria_passed         BOOLEAN,
+    failure_reason          TEXT,
+    tokens_used             INTEGER,
+    created_at              TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
+    PRIMARY KEY (id, execution_created_at),
+    FOREIGN KEY (workflow_execution_id, execution_created_at)
+        REFERENCES workflow_executions(id, created_at) ON DELETE CASCADE
+) PARTITION BY RANGE (execution_created_at);
+
+ALTER SEQUENCE workflow_executions_id_seq OWNED BY workflow_executions.id;
+ALTER SEQUENCE step_attempts_id_seq OWNED BY step_attempts.id;
+
+CREATE TABLE workflow_executions_default PARTITION OF workflow_executions DEFAULT;
+CREATE TABLE step_attempts_default PARTITION OF step_attempts DEFAULT;
+
+CREATE INDEX idx_workflow_executions_workflow_id ON workflow_executions(workflow_id);
+CREATE INDEX idx_step_attempts_execution_id ON step_attempts(workflow_execution_id);
+
+-- The old table had no created_at: use started_at, else the first attempt, else now.
+CREATE TEMP TABLE _execution_created ON COMMIT DROP AS
+SELECT e.id,
+       COALESCE(e.started_at,
+                (SELECT MIN(a.created_at) FROM step_attempts_legacy a WHERE a.workflow_execution_id = e.id),
+                clock_timestamp()) AS created_at
+FROM workflow_executions_legacy e;
+
+-- One partition per month that has data, plus the current and next two months so runs started
+-- right after the migration do not land in DEFAULT (partition_ensure_upcoming(2) does the same
+-- on startup, but is only defined once db/schema.sql has been re-run).
+DO $$
+DECLARE
+    m DATE;
+BEGIN
+    FOR m IN
+        SELECT date_trunc('month', created_at)::DATE FROM _execution_created
+        UNION
+        SELECT (date_trunc('month', clock_timestamp()) + make_interval(months => i))::DATE
+        FROM generate_series(0, 2) AS i
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF workflow_executions FOR VALUES FROM (%L) TO (%L)',
+            'workflow_executions_p' || to_char(m, 'YYYY_MM'), m, (m + INTERVAL '1 month')::DATE);
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF step_attempts FOR VALUES FROM (%L) TO (%L)',
+            'step_attempts_p' || to_char(m, 'YYYY_MM'), m, (m + INTERVAL '1 month')::DATE);
+    END LOOP;
+END;
+$$;
+
+INSERT INTO workflow_executions (id, workflow_id, status, current_step_index, started_at, finished_at, created_at)
+SELECT e.id, e.workflow_id, e.status, e.current_step_index, e.started_at, e.finished_at, c.created_at
+FROM workflow_executions_legacy e
+JOIN _execution_created c ON c.id = e.id;
+
+INSERT INTO step_attempts (
+    id, workflow_execution_id, execution_created_at, step_id, attempt_number, status,
+    prompt_sent, response, criteria_passed, failure_reason, tokens_used, created_at
+)
+SELECT a.id, a.workflow_execution_id, c.created_at, a.step_id, a.attempt_number, a.status,
+       a.prompt_sent, a.response, a.criteria_passed, a.failure_reason, a.tokens_used, a.created_at
+FROM step_attempts_legacy a
+JOIN _execution_created c ON c.id = a.workflow_execution_id;
+
+DROP TABLE step_attempts_legacy;
+DROP TABLE workflow_executions_legacy;
+
+COMMIT;
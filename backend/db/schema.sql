@@ -10,7 +10,21 @@ CREATE TABLE IF NOT EXISTS workflows (
     id              SERIAL PRIMARY KEY,
     name            VARCHAR(255) NOT NULL,
     created_at      TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
-    updated_at      TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()
+    updated_at      TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
+    -- Run-level limits (NULL = unlimited)
+    deadline_seconds    REAL,
+    token_budget        INTEGER,
+    cost_budget_usd     NUMERIC(12, 4),
+    -- Versions: every version is its own row (executions reference it). root_id is the lineage
+    -- id (NULL on the first version, whose own id is the lineage id); not a FK, so the lineage
+    -- survives deleting its first version. parent_id is the version this one was created from.
+    root_id         INTEGER,
+    parent_id       INTEGER,
+    version         INTEGER NOT NULL DEFAULT 1,
+    -- Maintained by triggers (see DENORMALIZED COUNTERS): linked steps, and whether any run of
+    -- this version was ever created (sticky: archiving its runs does not make it editable again)
+    step_count      INTEGER NOT NULL DEFAULT 0,
+    has_executions  BOOLEAN NOT NULL DEFAULT FALSE
 );
 
 CREATE TABLE IF NOT EXISTS steps (
@@ -20,21 +34,63 @@ CREATE TABLE IF NOT EXISTS steps (
     model               VARCHAR(64) NOT NULL,
     prompt              TEXT NOT NULL,
     completion_criteria  JSONB NOT NULL,
-    context_strategy    VARCHAR(32) NOT NULL DEFAULT 'full'
+    context_strategy    VARCHAR(32) NOT NULL DEFAULT 'full',
+    -- Wall-clock limit for all attempts of this step (NULL = only the run deadline applies)
+    timeout_seconds     REAL,
+    -- Ordered alternative models and how attempts pick among model + fallbacks (RoutingPolicy)
+    fallback_models     JSONB NOT NULL DEFAULT '[]'::jsonb,
+    routing_policy      VARCHAR(32) NOT NULL DEFAULT 'ordered',
+    -- Send a backup request once an attempt is slower than this latency percentile (NULL = off)
+    hedge_percentile    REAL,
+    -- Completions requested per LLM call (n); each is stored as its own attempt
+    candidates          INTEGER NOT NULL DEFAULT 1,
+    -- Options of context_strategy (path, pattern, template, ...; see services/context.py)
+    context_config      JSONB NOT NULL DEFAULT '{}'::jsonb,
+    -- Generation parameters sent with every call (NULL = provider default; see services/generation.py)
+    max_tokens          INTEGER,
+    temperature         DOUBLE PRECISION,
+    top_p               DOUBLE PRECISION,
+    stop                JSONB NOT NULL DEFAULT '[]'::jsonb,
+    response_format     JSONB
 );
 
+-- Which steps a workflow version has, and in what order. Versions share step rows until one of
+-- them edits a step (copy-on-write, see step_update). steps.workflow_id is the owning version:
+-- always one that still links the step, so ON DELETE CASCADE never removes a shared step.
+CREATE TABLE IF NOT EXISTS workflow_steps (
+    workflow_id         INTEGER NOT NULL REFERENCES workflows(id) ON DELETE CASCADE,
+    step_id             INTEGER NOT NULL REFERENCES steps(id) ON DELETE CASCADE,
+    order_index         INTEGER NOT NULL,
+    PRIMARY KEY (workflow_id, step_id)
+);
+
+-- workflow_executions and step_attempts are range-partitioned by month (see PARTITIONS below).
+-- Attempts are partitioned on their execution's created_at, so an execution and all of its
+-- attempts always live in the same month and a month can be archived/dropped as a unit.
+-- Existing unpartitioned installs: run db/migrate_partitioning.sql first.
 CREATE TABLE IF NOT EXISTS workflow_executions (
-    id                  SERIAL PRIMARY KEY,
+    id                  SERIAL,
     workflow_id         INTEGER NOT NULL REFERENCES workflows(id) ON DELETE CASCADE,
     status              VARCHAR(32) NOT NULL DEFAULT 'pending',
     current_step_index  INTEGER,
     started_at          TIMESTAMPTZ,
-    finished_at         TIMESTAMPTZ
-);
+    finished_at         TIMESTAMPTZ,
+    created_at          TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
+    cancel_requested_at TIMESTAMPTZ,
+    failure_reason      TEXT,
+    tokens_used         BIGINT NOT NULL DEFAULT 0,
+    cost_usd            NUMERIC(12, 6) NOT NULL DEFAULT 0,
+    priority            VARCHAR(16) NOT NULL DEFAULT 'batch',
+    tenant              VARCHAR(64),
+    queue_wait_ms       REAL,  -- execute request to run start (scheduler queue)
+    step_timings        JSONB NOT NULL DEFAULT '[]'::jsonb,  -- [{step_id, step_index, wall_ms}] per step run
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
 
 CREATE TABLE IF NOT EXISTS step_attempts (
-    id                      SERIAL PRIMARY KEY,
-    workflow_execution_id   INTEGER NOT NULL REFERENCES workflow_executions(id) ON DELETE CASCADE,
+    id                      SERIAL,
+    workflow_execution_id   INTEGER NOT NULL,
+    execution_created_at    TIMESTAMPTZ NOT NULL,
     step_id                 INTEGER NOT NULL REFERENCES steps(id) ON DELETE CASCADE,
     attempt_number          INTEGER NOT NULL,
     status                  VARCHAR(32) NOT NULL DEFAULT 'pending',
@@ -43,86 +99,374 @@ CREATE TABLE IF NOT EXISTS step_attempts (
     criteria_passed         BOOLEAN,
     failure_reason          TEXT,
     tokens_used             INTEGER,
-    created_at              TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()
+    created_at              TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
+    model                   VARCHAR(64),  -- model that served this attempt (step model or a fallback)
+    is_hedge                BOOLEAN NOT NULL DEFAULT FALSE,  -- backup request sharing attempt_number
+    -- Timings (ms, monotonic clock): response headers received, whole LLM request, criteria
+    -- evaluation, and DB writes for this attempt other than the update that stores these values
+    ttfb_ms                 REAL,
+    llm_ms                  REAL,
+    criteria_ms             REAL,
+    db_write_ms             REAL,
+    context_bytes           INTEGER,  -- size (UTF-8) of the previous steps' context in prompt_sent
+    PRIMARY KEY (id, execution_created_at),
+    FOREIGN KEY (workflow_execution_id, execution_created_at)
+        REFERENCES workflow_executions(id, created_at) ON DELETE CASCADE
+) PARTITION BY RANGE (execution_created_at);
+
+-- Analytics rollups, updated incrementally by the executor (stats_record_*). Durations are kept
+-- as log-scale histograms: bucket i (1-based) counts values in (1.1^(i-2), 1.1^(i-1)] ms, which gives
+-- ~5% relative error on percentiles. See services/stats.py for the read side.
+CREATE TABLE IF NOT EXISTS stats_step_model (
+    workflow_id         INTEGER NOT NULL REFERENCES workflows(id) ON DELETE CASCADE,
+    step_id             INTEGER NOT NULL,
+    model               VARCHAR(64) NOT NULL,
+    attempts            BIGINT NOT NULL DEFAULT 0,
+    passed              BIGINT NOT NULL DEFAULT 0,
+    failed              BIGINT NOT NULL DEFAULT 0,
+    errors              BIGINT NOT NULL DEFAULT 0,
+    tokens_used         BIGINT NOT NULL DEFAULT 0,
+    duration_buckets    BIGINT[] NOT NULL DEFAULT array_fill(0::BIGINT, ARRAY[160]),
+    updated_at          TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
+    PRIMARY KEY (workflow_id, step_id, model)
+);
+
+CREATE TABLE IF NOT EXISTS stats_workflow_runs (
+    workflow_id         INTEGER PRIMARY KEY REFERENCES workflows(id) ON DELETE CASCADE,
+    runs                BIGINT NOT NULL DEFAULT 0,
+    completed           BIGINT NOT NULL DEFAULT 0,
+    failed              BIGINT NOT NULL DEFAULT 0,
+    duration_buckets    BIGINT[] NOT NULL DEFAULT array_fill(0::BIGINT, ARRAY[160]),
+    updated_at          TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()
 );
 
--- Indexes for common lookups
+CREATE TABLE IF NOT EXISTS workflow_executions_default PARTITION OF workflow_executions DEFAULT;
+
+-- Columns added after the initial release (no-ops on fresh installs)
+ALTER TABLE workflow_executions ADD COLUMN IF NOT EXISTS cancel_requested_at TIMESTAMPTZ;
+ALTER TABLE workflow_executions ADD COLUMN IF NOT EXISTS failure_reason TEXT;
+ALTER TABLE workflow_executions ADD COLUMN IF NOT EXISTS tokens_used BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE workflow_executions ADD COLUMN IF NOT EXISTS cost_usd NUMERIC(12, 6) NOT NULL DEFAULT 0;
+ALTER TABLE workflows ADD COLUMN IF NOT EXISTS deadline_seconds REAL;
+ALTER TABLE workflows ADD COLUMN IF NOT EXISTS token_budget INTEGER;
+ALTER TABLE workflows ADD COLUMN IF NOT EXISTS cost_budget_usd NUMERIC(12, 4);
+ALTER TABLE steps ADD COLUMN IF NOT EXISTS timeout_seconds REAL;
+ALTER TABLE steps ADD COLUMN IF NOT EXISTS fallback_models JSONB NOT NULL DEFAULT '[]'::jsonb;
+ALTER TABLE steps ADD COLUMN IF NOT EXISTS routing_policy VARCHAR(32) NOT NULL DEFAULT 'ordered';
+ALTER TABLE step_attempts ADD COLUMN IF NOT EXISTS model VARCHAR(64);
+ALTER TABLE steps ADD COLUMN IF NOT EXISTS hedge_percentile REAL;
+ALTER TABLE steps ADD COLUMN IF NOT EXISTS candidates INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE step_attempts ADD COLUMN IF NOT EXISTS is_hedge BOOLEAN NOT NULL DEFAULT FALSE;
+ALTER TABLE workflows ADD COLUMN IF NOT EXISTS root_id INTEGER;
+ALTER TABLE workflows ADD COLUMN IF NOT EXISTS parent_id INTEGER;
+ALTER TABLE workflows ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE workflow_executions ADD COLUMN IF NOT EXISTS priority VARCHAR(16) NOT NULL DEFAULT 'batch';
+ALTER TABLE workflow_executions ADD COLUMN IF NOT EXISTS tenant VARCHAR(64);
+ALTER TABLE workflow_executions ADD COLUMN IF NOT EXISTS queue_wait_ms REAL;
+ALTER TABLE workflow_executions ADD COLUMN IF NOT EXISTS step_timings JSONB NOT NULL DEFAULT '[]'::jsonb;
+ALTER TABLE step_attempts ADD COLUMN IF NOT EXISTS ttfb_ms REAL;
+ALTER TABLE step_attempts ADD COLUMN IF NOT EXISTS llm_ms REAL;
+ALTER TABLE step_attempts ADD COLUMN IF NOT EXISTS criteria_ms REAL;
+ALTER TABLE step_attempts ADD COLUMN IF NOT EXISTS db_write_ms REAL;
+ALTER TABLE steps ADD COLUMN IF NOT EXISTS context_config JSONB NOT NULL DEFAULT '{}'::jsonb;
+ALTER TABLE step_attempts ADD COLUMN IF NOT EXISTS context_bytes INTEGER;
+ALTER TABLE workflows ADD COLUMN IF NOT EXISTS step_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE workflows ADD COLUMN IF NOT EXISTS has_executions BOOLEAN NOT NULL DEFAULT FALSE;
+ALTER TABLE steps ADD COLUMN IF NOT EXISTS max_tokens INTEGER;
+ALTER TABLE steps ADD COLUMN IF NOT EXISTS temperature DOUBLE PRECISION;
+ALTER TABLE steps ADD COLUMN IF NOT EXISTS top_p DOUBLE PRECISION;
+ALTER TABLE steps ADD COLUMN IF NOT EXISTS stop JSONB NOT NULL DEFAULT '[]'::jsonb;
+ALTER TABLE steps ADD COLUMN IF NOT EXISTS response_format JSONB;
+-- temperature / top_p were REAL (0.7 read back as 0.699999988); via text the REAL's shortest
+-- form is kept, so stored values read back as written. Skipped once the columns are converted.
+DO $$
+BEGIN
+    IF (SELECT atttypid FROM pg_attribute WHERE attrelid = 'steps'::regclass AND attname = 'temperature')
+       = 'real'::regtype THEN
+        ALTER TABLE steps
+            ALTER COLUMN temperature TYPE DOUBLE PRECISION USING temperature::text::DOUBLE PRECISION,
+            ALTER COLUMN top_p TYPE DOUBLE PRECISION USING top_p::text::DOUBLE PRECISION;
+    END IF;
+END;
+$$;
+
+-- Installs from before versioning: every step is linked to its own workflow (no-op afterwards)
+INSERT INTO workflow_steps (workflow_id, step_id, order_index)
+SELECT s.workflow_id, s.id, s.order_index FROM steps s
+ON CONFLICT DO NOTHING;
+
+-- Recompute the trigger-maintained counters (a no-op when they are already right)
+UPDATE workflows w SET step_count = c.n
+FROM (
+    SELECT v.id, COUNT(ws.step_id)::INTEGER AS n
+    FROM workflows v LEFT JOIN workflow_steps ws ON ws.workflow_id = v.id
+    GROUP BY v.id
+) c
+WHERE c.id = w.id AND w.step_count <> c.n;
+UPDATE workflows w SET has_executions = TRUE
+WHERE NOT w.has_executions AND EXISTS (SELECT 1 FROM workflow_executions e WHERE e.workflow_id = w.id);
+
+CREATE TABLE IF NOT EXISTS step_attempts_default PARTITION OF step_attempts DEFAULT;
+
+-- Indexes for common lookups (created on every partition)
 CREATE INDEX IF NOT EXISTS idx_steps_workflow_id ON steps(workflow_id);
-CREATE INDEX IF NOT EXISTS idx_workflow_executions_workflow_id ON workflow_executions(workflow_id);
-CREATE INDEX IF NOT EXISTS idx_step_attempts_execution_id ON step_attempts(workflow_execution_id);
+CREATE INDEX IF NOT EXISTS idx_workflow_steps_step_id ON workflow_steps(step_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_workflows_lineage_version ON workflows((COALESCE(root_id, id)), version);
+-- execution_list (newest first, optionally per workflow); the composite one also serves plain
+-- workflow_id lookups and the FK cascade from workflows
+CREATE INDEX IF NOT EXISTS idx_workflow_executions_workflow_started
+    ON workflow_executions(workflow_id, started_at DESC NULLS LAST);
+CREATE INDEX IF NOT EXISTS idx_workflow_executions_started ON workflow_executions(started_at DESC NULLS LAST);
+-- In-flight runs only (a few rows however long the history): workflow_has_running_execution
+CREATE INDEX IF NOT EXISTS idx_workflow_executions_active
+    ON workflow_executions(workflow_id) WHERE status IN ('pending', 'running');
+-- execution_get_attempts / _summaries: one execution's attempts already in created_at order
+CREATE INDEX IF NOT EXISTS idx_step_attempts_execution_created ON step_attempts(workflow_execution_id, created_at);
+-- Superseded by the composite indexes above
+DROP INDEX IF EXISTS idx_workflow_executions_workflow_id;
+DROP INDEX IF EXISTS idx_step_attempts_execution_id;
+
+-- Functions whose argument or result columns have changed between releases are dropped by
+-- name first, so CREATE OR REPLACE below never hits "cannot change return type" or leaves an
+-- ambiguous overload behind when this file is re-run on an existing database.
+DO $$
+DECLARE
+    r RECORD;
+BEGIN
+    FOR r IN
+        SELECT p.oid::regprocedure AS sig
+        FROM pg_proc p
+        WHERE p.pronamespace = 'public'::regnamespace
+          AND p.proname IN (
+              'workflow_list', 'workflow_get', 'workflow_create', 'workflow_update', 'workflow_delete',
+              'step_list_by_workflow', 'step_get', 'step_create', 'step_update', 'step_delete',
+              'execution_list', 'execution_get', 'execution_create', 'execution_update',
+              'execution_get_attempts', 'execution_get_attempt_summaries', 'execution_export',
+              'step_attempt_insert', 'step_attempt_update'
+          )
+    LOOP
+        EXECUTE 'DROP FUNCTION ' || r.sig;
+    END LOOP;
+END;
+$$;
 
 -- =============================================================================
 -- WORKFLOW FUNCTIONS
 -- =============================================================================
 
+-- One row per logical workflow: the latest version of each lineage, plus how many versions it has.
 CREATE OR REPLACE FUNCTION workflow_list()
 RETURNS TABLE(
     id INTEGER,
     name VARCHAR(255),
     created_at TIMESTAMPTZ,
     updated_at TIMESTAMPTZ,
-    step_count BIGINT
+    step_count BIGINT,
+    root_id INTEGER,
+    version INTEGER,
+    versions BIGINT
 ) AS $$
 BEGIN
     RETURN QUERY
-    SELECT w.id, w.name, w.created_at, w.updated_at, COUNT(s.id)::BIGINT
-    FROM workflows w
-    LEFT JOIN steps s ON s.workflow_id = w.id
-    GROUP BY w.id
+    SELECT w.id, w.name, w.created_at, w.updated_at, w.step_count::BIGINT,
+           w.lineage_id, w.version, w.n_versions
+    FROM (
+        SELECT DISTINCT ON (COALESCE(v.root_id, v.id))
+               v.id, v.name, v.created_at, v.updated_at, v.version, v.step_count,
+               COALESCE(v.root_id, v.id) AS lineage_id,
+               COUNT(*) OVER (PARTITION BY COALESCE(v.root_id, v.id)) AS n_versions
+        FROM workflows v
+        ORDER BY COALESCE(v.root_id, v.id), v.version DESC
+    ) w
     ORDER BY w.updated_at DESC;
 END;
 $$ LANGUAGE plpgsql;
 
 
+-- Every version in the lineage of p_workflow_id (any version of it), newest first.
+CREATE OR REPLACE FUNCTION workflow_list_versions(p_workflow_id INTEGER)
+RETURNS TABLE(
+    id INTEGER,
+    name VARCHAR(255),
+    created_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ,
+    step_count BIGINT,
+    root_id INTEGER,
+    version INTEGER,
+    versions BIGINT
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT v.id, v.name, v.created_at, v.updated_at, v.step_count::BIGINT,
+           COALESCE(v.root_id, v.id), v.version,
+           COUNT(*) OVER ()
+    FROM workflows v
+    WHERE COALESCE(v.root_id, v.id) = (
+        SELECT COALESCE(w.root_id, w.id) FROM workflows w WHERE w.id = p_workflow_id
+    )
+    ORDER BY v.version DESC;
+END;
+$$ LANGUAGE plpgsql;
+
+
 CREATE OR REPLACE FUNCTION workflow_get(p_workflow_id INTEGER)
 RETURNS TABLE(
     id INTEGER,
     name VARCHAR(255),
     created_at TIMESTAMPTZ,
-    updated_at TIMESTAMPTZ
+    updated_at TIMESTAMPTZ,
+    deadline_seconds REAL,
+    token_budget INTEGER,
+    cost_budget_usd NUMERIC(12, 4),
+    root_id INTEGER,
+    parent_id INTEGER,
+    version INTEGER
 ) AS $$
 BEGIN
-    RETURN QUERY SELECT w.id, w.name, w.created_at, w.updated_at
+    RETURN QUERY SELECT w.id, w.name, w.created_at, w.updated_at,
+                        w.deadline_seconds, w.token_budget, w.cost_budget_usd,
+                        COALESCE(w.root_id, w.id), w.parent_id, w.version
     FROM workflows w WHERE w.id = p_workflow_id;
 END;
 $$ LANGUAGE plpgsql;
 
 
-CREATE OR REPLACE FUNCTION workflow_create(p_name VARCHAR(255))
+CREATE OR REPLACE FUNCTION workflow_create(
+    p_name VARCHAR(255),
+    p_deadline_seconds REAL DEFAULT NULL,
+    p_token_budget INTEGER DEFAULT NULL,
+    p_cost_budget_usd NUMERIC(12, 4) DEFAULT NULL
+)
 RETURNS INTEGER AS $$
 DECLARE
     new_id INTEGER;
 BEGIN
-    INSERT INTO workflows (name, updated_at)
-    VALUES (p_name, clock_timestamp())
+    INSERT INTO workflows (name, updated_at, deadline_seconds, token_budget, cost_budget_usd)
+    VALUES (p_name, clock_timestamp(), p_deadline_seconds, p_token_budget, p_cost_budget_usd)
     RETURNING id INTO new_id;
     RETURN new_id;
 END;
 $$ LANGUAGE plpgsql;
 
 
-CREATE OR REPLACE FUNCTION workflow_update(p_id INTEGER, p_name VARCHAR(255))
+CREATE OR REPLACE FUNCTION workflow_update(
+    p_id INTEGER,
+    p_name VARCHAR(255),
+    p_deadline_seconds REAL DEFAULT NULL,
+    p_token_budget INTEGER DEFAULT NULL,
+    p_cost_budget_usd NUMERIC(12, 4) DEFAULT NULL
+)
 RETURNS VOID AS $$
 BEGIN
-    UPDATE workflows SET name = p_name, updated_at = clock_timestamp() WHERE id = p_id;
+    UPDATE workflows
+    SET name = p_name, deadline_seconds = p_deadline_seconds, token_budget = p_token_budget,
+        cost_budget_usd = p_cost_budget_usd, updated_at = clock_timestamp()
+    WHERE id = p_id;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- New version of p_workflow_id: copies the workflow row (same name and limits, next version number
+-- in the lineage) and links it to the same step rows, which stay shared until either version edits
+-- them. Returns the new workflow id (NULL if p_workflow_id is unknown). Concurrent calls on one
+-- lineage queue on a transaction-scoped advisory lock, so MAX(version) + 1 (taken in a new
+-- snapshot once the lock is held) never collides on idx_workflows_lineage_version.
+CREATE OR REPLACE FUNCTION workflow_create_version(p_workflow_id INTEGER)
+RETURNS INTEGER AS $$
+    SELECT pg_advisory_xact_lock(hashtext('workflow_lineage'), COALESCE(w.root_id, w.id))
+    FROM workflows w WHERE w.id = p_workflow_id;
+
+    WITH src AS (
+        SELECT w.id, COALESCE(w.root_id, w.id) AS lineage_id, w.name,
+               w.deadline_seconds, w.token_budget, w.cost_budget_usd
+        FROM workflows w WHERE w.id = p_workflow_id
+    ), new_version AS (
+        INSERT INTO workflows (
+            name, updated_at, deadline_seconds, token_budget, cost_budget_usd, root_id, parent_id, version
+        )
+        SELECT src.name, clock_timestamp(), src.deadline_seconds, src.token_budget, src.cost_budget_usd,
+               src.lineage_id, src.id,
+               (SELECT MAX(v.version) + 1 FROM workflows v WHERE COALESCE(v.root_id, v.id) = src.lineage_id)
+        FROM src
+        RETURNING id
+    ), links AS (
+        INSERT INTO workflow_steps (workflow_id, step_id, order_index)
+        SELECT nv.id, ws.step_id, ws.order_index
+        FROM new_version nv, workflow_steps ws
+        WHERE ws.workflow_id = p_workflow_id
+    )
+    SELECT id FROM new_version;
+$$ LANGUAGE sql;
+
+
+-- Steps no longer linked to any version are deleted; steps still linked elsewhere are handed to
+-- one of those versions, keeping steps.workflow_id pointing at a version that uses the step.
+CREATE OR REPLACE FUNCTION step_release(p_step_ids INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM steps s
+    WHERE s.id = ANY(p_step_ids)
+      AND NOT EXISTS (SELECT 1 FROM workflow_steps ws WHERE ws.step_id = s.id);
+    UPDATE steps s
+    SET workflow_id = o.workflow_id
+    FROM (
+        SELECT ws.step_id, MIN(ws.workflow_id) AS workflow_id
+        FROM workflow_steps ws
+        WHERE ws.step_id = ANY(p_step_ids)
+        GROUP BY ws.step_id
+    ) o
+    WHERE s.id = o.step_id
+      AND NOT EXISTS (SELECT 1 FROM workflow_steps ws WHERE ws.step_id = s.id AND ws.workflow_id = s.workflow_id);
 END;
 $$ LANGUAGE plpgsql;
 
 
 CREATE OR REPLACE FUNCTION workflow_delete(p_id INTEGER)
 RETURNS VOID AS $$
+DECLARE
+    v_parent INTEGER;
+    v_steps INTEGER[];
 BEGIN
+    -- Shared steps outlive this version; later versions now descend from its parent
+    PERFORM set_config('app.bulk_step_write', 'on', true);
+    WITH unlinked AS (
+        DELETE FROM workflow_steps WHERE workflow_id = p_id RETURNING step_id
+    )
+    SELECT array_agg(step_id) INTO v_steps FROM unlinked;
+    PERFORM step_release(v_steps);
+    PERFORM set_config('app.bulk_step_write', 'off', true);
+    SELECT w.parent_id INTO v_parent FROM workflows w WHERE w.id = p_id;
+    UPDATE workflows SET parent_id = v_parent WHERE parent_id = p_id;
     DELETE FROM workflows WHERE id = p_id;
 END;
 $$ LANGUAGE plpgsql;
 
 
+-- Reads the trigger-maintained flag: one primary-key lookup instead of probing every partition.
 CREATE OR REPLACE FUNCTION workflow_has_executions(p_workflow_id INTEGER)
 RETURNS BOOLEAN AS $$
-BEGIN
-    RETURN EXISTS (SELECT 1 FROM workflow_executions WHERE workflow_id = p_workflow_id);
-END;
-$$ LANGUAGE plpgsql;
+    SELECT COALESCE((SELECT w.has_executions FROM workflows w WHERE w.id = p_workflow_id), FALSE);
+$$ LANGUAGE sql STABLE;
+
+
+-- Whether runs of this workflow are still stored. Unlike the sticky flag above this probes the
+-- table (the (workflow_id, started_at) index of every partition), so it turns false once
+-- partition retention has dropped all of them; workflow deletion uses it.
+CREATE OR REPLACE FUNCTION workflow_executions_exist(p_workflow_id INTEGER)
+RETURNS BOOLEAN AS $$
+    SELECT EXISTS (SELECT 1 FROM workflow_executions e WHERE e.workflow_id = p_workflow_id);
+$$ LANGUAGE sql STABLE;
+
+
+-- Whether a run of this workflow is queued or executing now (the execute guard). Same predicate
+-- as the partial index on pending/running executions, so it is used.
+CREATE OR REPLACE FUNCTION workflow_has_running_execution(p_workflow_id INTEGER)
+RETURNS BOOLEAN AS $$
+    SELECT EXISTS (
+        SELECT 1 FROM workflow_executions e
+        WHERE e.workflow_id = p_workflow_id AND e.status IN ('pending', 'running')
+    );
+$$ LANGUAGE sql STABLE;
 
 
 -- =============================================================================
@@ -137,19 +481,34 @@ RETURNS TABLE(
     model VARCHAR(64),
     prompt TEXT,
     completion_criteria JSONB,
-    context_strategy VARCHAR(32)
+    context_strategy VARCHAR(32),
+    timeout_seconds REAL,
+    fallback_models JSONB,
+    routing_policy VARCHAR(32),
+    hedge_percentile REAL,
+    candidates INTEGER,
+    context_config JSONB,
+    max_tokens INTEGER,
+    temperature DOUBLE PRECISION,
+    top_p DOUBLE PRECISION,
+    stop JSONB,
+    response_format JSONB
 ) AS $$
 BEGIN
     RETURN QUERY
-    SELECT s.id, s.workflow_id, s.order_index, s.model, s.prompt, s.completion_criteria, s.context_strategy
-    FROM steps s
-    WHERE s.workflow_id = p_workflow_id
-    ORDER BY s.order_index;
+    SELECT s.id, ws.workflow_id, ws.order_index, s.model, s.prompt, s.completion_criteria, s.context_strategy,
+           s.timeout_seconds, s.fallback_models, s.routing_policy, s.hedge_percentile,
+           s.candidates, s.context_config, s.max_tokens, s.temperature, s.top_p, s.stop, s.response_format
+    FROM workflow_steps ws
+    JOIN steps s ON s.id = ws.step_id
+    WHERE ws.workflow_id = p_workflow_id
+    ORDER BY ws.order_index;
 END;
 $$ LANGUAGE plpgsql;
 
 
-CREATE OR REPLACE FUNCTION step_get(p_step_id INTEGER)
+-- A step as seen from one workflow version (order_index is per version).
+CREATE OR REPLACE FUNCTION step_get(p_workflow_id INTEGER, p_step_id INTEGER)
 RETURNS TABLE(
     id INTEGER,
     workflow_id INTEGER,
@@ -157,12 +516,27 @@ RETURNS TABLE(
     model VARCHAR(64),
     prompt TEXT,
     completion_criteria JSONB,
-    context_strategy VARCHAR(32)
+    context_strategy VARCHAR(32),
+    timeout_seconds REAL,
+    fallback_models JSONB,
+    routing_policy VARCHAR(32),
+    hedge_percentile REAL,
+    candidates INTEGER,
+    context_config JSONB,
+    max_tokens INTEGER,
+    temperature DOUBLE PRECISION,
+    top_p DOUBLE PRECISION,
+    stop JSONB,
+    response_format JSONB
 ) AS $$
 BEGIN
     RETURN QUERY
-    SELECT s.id, s.workflow_id, s.order_index, s.model, s.prompt, s.completion_criteria, s.context_strategy
-    FROM steps s WHERE s.id = p_step_id;
+    SELECT s.id, ws.workflow_id, ws.order_index, s.model, s.prompt, s.completion_criteria, s.context_strategy,
+           s.timeout_seconds, s.fallback_models, s.routing_policy, s.hedge_percentile,
+           s.candidates, s.context_config, s.max_tokens, s.temperature, s.top_p, s.stop, s.response_format
+    FROM workflow_steps ws
+    JOIN steps s ON s.id = ws.step_id
+    WHERE ws.workflow_id = p_workflow_id AND ws.step_id = p_step_id;
 END;
 $$ LANGUAGE plpgsql;
 
@@ -173,20 +547,44 @@ CREATE OR REPLACE FUNCTION step_create(
     p_model VARCHAR(64),
     p_prompt TEXT,
     p_completion_criteria JSONB,
-    p_context_strategy VARCHAR(32)
+    p_context_strategy VARCHAR(32),
+    p_timeout_seconds REAL DEFAULT NULL,
+    p_fallback_models JSONB DEFAULT '[]'::jsonb,
+    p_routing_policy VARCHAR(32) DEFAULT 'ordered',
+    p_hedge_percentile REAL DEFAULT NULL,
+    p_candidates INTEGER DEFAULT 1,
+    p_context_config JSONB DEFAULT '{}'::jsonb,
+    p_max_tokens INTEGER DEFAULT NULL,
+    p_temperature DOUBLE PRECISION DEFAULT NULL,
+    p_top_p DOUBLE PRECISION DEFAULT NULL,
+    p_stop JSONB DEFAULT '[]'::jsonb,
+    p_response_format JSONB DEFAULT NULL
 )
 RETURNS INTEGER AS $$
 DECLARE
     new_id INTEGER;
 BEGIN
-    INSERT INTO steps (workflow_id, order_index, model, prompt, completion_criteria, context_strategy)
-    VALUES (p_workflow_id, p_order_index, p_model, p_prompt, p_completion_criteria, p_context_strategy)
+    INSERT INTO steps (
+        workflow_id, order_index, model, prompt, completion_criteria, context_strategy, timeout_seconds,
+        fallback_models, routing_policy, hedge_percentile, candidates, context_config,
+        max_tokens, temperature, top_p, stop, response_format
+    )
+    VALUES (
+        p_workflow_id, p_order_index, p_model, p_prompt, p_completion_criteria, p_context_strategy, p_timeout_seconds,
+        COALESCE(p_fallback_models, '[]'::jsonb), COALESCE(p_routing_policy, 'ordered'), p_hedge_percentile,
+        COALESCE(p_candidates, 1), COALESCE(p_context_config, '{}'::jsonb),
+        p_max_tokens, p_temperature, p_top_p, COALESCE(p_stop, '[]'::jsonb), p_response_format
+    )
     RETURNING id INTO new_id;
+    INSERT INTO workflow_steps (workflow_id, step_id, order_index) VALUES (p_workflow_id, new_id, p_order_index);
     RETURN new_id;
 END;
 $$ LANGUAGE plpgsql;
 
 
+-- Copy-on-write: a step shared with another version is copied and this version relinked to the
+-- copy, so the other versions keep the original. Returns the step id now linked (NULL if the
+-- step is not part of p_workflow_id).
 CREATE OR REPLACE FUNCTION step_update(
     p_step_id INTEGER,
     p_workflow_id INTEGER,
@@ -194,22 +592,115 @@ CREATE OR REPLACE FUNCTION step_update(
     p_model VARCHAR(64),
     p_prompt TEXT,
     p_completion_criteria JSONB,
-    p_context_strategy VARCHAR(32)
+    p_context_strategy VARCHAR(32),
+    p_timeout_seconds REAL DEFAULT NULL,
+    p_fallback_models JSONB DEFAULT '[]'::jsonb,
+    p_routing_policy VARCHAR(32) DEFAULT 'ordered',
+    p_hedge_percentile REAL DEFAULT NULL,
+    p_candidates INTEGER DEFAULT 1,
+    p_context_config JSONB DEFAULT '{}'::jsonb,
+    p_max_tokens INTEGER DEFAULT NULL,
+    p_temperature DOUBLE PRECISION DEFAULT NULL,
+    p_top_p DOUBLE PRECISION DEFAULT NULL,
+    p_stop JSONB DEFAULT '[]'::jsonb,
+    p_response_format JSONB DEFAULT NULL
 )
-RETURNS VOID AS $$
+RETURNS INTEGER AS $$
+DECLARE
+    v_step_id INTEGER := p_step_id;
 BEGIN
-    UPDATE steps
-    SET order_index = p_order_index, model = p_model, prompt = p_prompt,
-        completion_criteria = p_completion_criteria, context_strategy = p_context_strategy
-    WHERE id = p_step_id AND workflow_id = p_workflow_id;
+    IF NOT EXISTS (SELECT 1 FROM workflow_steps WHERE workflow_id = p_workflow_id AND step_id = p_step_id) THEN
+        RETURN NULL;
+    END IF;
+    IF EXISTS (SELECT 1 FROM workflow_steps WHERE step_id = p_step_id AND workflow_id <> p_workflow_id) THEN
+        INSERT INTO steps (
+            workflow_id, order_index, model, prompt, completion_criteria, context_strategy, timeout_seconds,
+            fallback_models, routing_policy, hedge_percentile, candidates, context_config,
+            max_tokens, temperature, top_p, stop, response_format
+        )
+        VALUES (
+            p_workflow_id, p_order_index, p_model, p_prompt, p_completion_criteria, p_context_strategy, p_timeout_seconds,
+            COALESCE(p_fallback_models, '[]'::jsonb), COALESCE(p_routing_policy, 'ordered'), p_hedge_percentile,
+            COALESCE(p_candidates, 1), COALESCE(p_context_config, '{}'::jsonb),
+            p_max_tokens, p_temperature, p_top_p, COALESCE(p_stop, '[]'::jsonb), p_response_format
+        )
+        RETURNING id INTO v_step_id;
+        UPDATE workflow_steps SET step_id = v_step_id, order_index = p_order_index
+        WHERE workflow_id = p_workflow_id AND step_id = p_step_id;
+        -- The original may have been owned by this version
+        PERFORM step_release(ARRAY[p_step_id]);
+    ELSE
+        UPDATE steps
+        SET order_index = p_order_index, model = p_model, prompt = p_prompt,
+            completion_criteria = p_completion_criteria, context_strategy = p_context_strategy,
+            timeout_seconds = p_timeout_seconds,
+            fallback_models = COALESCE(p_fallback_models, '[]'::jsonb),
+            routing_policy = COALESCE(p_routing_policy, 'ordered'),
+            hedge_percentile = p_hedge_percentile,
+            candidates = COALESCE(p_candidates, 1),
+            context_config = COALESCE(p_context_config, '{}'::jsonb),
+            max_tokens = p_max_tokens, temperature = p_temperature, top_p = p_top_p,
+            stop = COALESCE(p_stop, '[]'::jsonb), response_format = p_response_format
+        WHERE id = p_step_id;
+        UPDATE workflow_steps SET order_index = p_order_index
+        WHERE workflow_id = p_workflow_id AND step_id = p_step_id;
+    END IF;
+    RETURN v_step_id;
 END;
 $$ LANGUAGE plpgsql;
 
 
+-- Replace all steps of a workflow in one statement pair. p_steps is a JSON array of step objects
+-- (same fields as step_create). The per-row step triggers are skipped for the batch and
+-- workflows.updated_at is set once. Step rows shared with other versions are left to them.
+-- Returns the number of steps written.
+CREATE OR REPLACE FUNCTION step_replace_all(p_workflow_id INTEGER, p_steps JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+    n INTEGER;
+    v_old INTEGER[];
+BEGIN
+    PERFORM set_config('app.bulk_step_write', 'on', true);
+    WITH unlinked AS (
+        DELETE FROM workflow_steps WHERE workflow_id = p_workflow_id RETURNING step_id
+    )
+    SELECT array_agg(step_id) INTO v_old FROM unlinked;
+    PERFORM step_release(v_old);
+    WITH new_steps AS (
+        INSERT INTO steps (
+            workflow_id, order_index, model, prompt, completion_criteria, context_strategy, timeout_seconds,
+            fallback_models, routing_policy, hedge_percentile, candidates, context_config,
+            max_tokens, temperature, top_p, stop, response_format
+        )
+        SELECT p_workflow_id, r.order_index, r.model, r.prompt, r.completion_criteria,
+               COALESCE(r.context_strategy, 'full'), r.timeout_seconds,
+               COALESCE(r.fallback_models, '[]'::jsonb), COALESCE(r.routing_policy, 'ordered'),
+               r.hedge_percentile, COALESCE(r.candidates, 1), COALESCE(r.context_config, '{}'::jsonb),
+               r.max_tokens, r.temperature, r.top_p, COALESCE(r.stop, '[]'::jsonb), r.response_format
+        FROM jsonb_to_recordset(p_steps) AS r(
+            order_index INTEGER, model VARCHAR(64), prompt TEXT, completion_criteria JSONB,
+            context_strategy VARCHAR(32), timeout_seconds REAL, fallback_models JSONB,
+            routing_policy VARCHAR(32), hedge_percentile REAL, candidates INTEGER, context_config JSONB,
+            max_tokens INTEGER, temperature DOUBLE PRECISION, top_p DOUBLE PRECISION, stop JSONB, response_format JSONB
+        )
+        RETURNING id, order_index
+    )
+    INSERT INTO workflow_steps (workflow_id, step_id, order_index)
+    SELECT p_workflow_id, new_steps.id, new_steps.order_index FROM new_steps;
+    GET DIAGNOSTICS n = ROW_COUNT;
+    PERFORM set_config('app.bulk_step_write', 'off', true);
+    UPDATE workflows SET updated_at = clock_timestamp() WHERE id = p_workflow_id;
+    RETURN n;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Unlinks the step from this version; the row itself goes only when no other version uses it.
 CREATE OR REPLACE FUNCTION step_delete(p_workflow_id INTEGER, p_step_id INTEGER)
 RETURNS VOID AS $$
 BEGIN
-    DELETE FROM steps WHERE id = p_step_id AND workflow_id = p_workflow_id;
+    DELETE FROM workflow_steps WHERE workflow_id = p_workflow_id AND step_id = p_step_id;
+    PERFORM step_release(ARRAY[p_step_id]);
 END;
 $$ LANGUAGE plpgsql;
 
@@ -224,11 +715,15 @@ RETURNS TABLE(
     workflow_id INTEGER,
     status VARCHAR(32),
     started_at TIMESTAMPTZ,
-    finished_at TIMESTAMPTZ
+    finished_at TIMESTAMPTZ,
+    failure_reason TEXT,
+    tokens_used BIGINT,
+    cost_usd NUMERIC(12, 6)
 ) AS $$
 BEGIN
     RETURN QUERY
-    SELECT e.id, e.workflow_id, e.status, e.started_at, e.finished_at
+    SELECT e.id, e.workflow_id, e.status, e.started_at, e.finished_at,
+           e.failure_reason, e.tokens_used, e.cost_usd
     FROM workflow_executions e
     WHERE (p_workflow_id IS NULL OR e.workflow_id = p_workflow_id)
     ORDER BY e.started_at DESC NULLS LAST;
@@ -243,11 +738,20 @@ RETURNS TABLE(
     status VARCHAR(32),
     current_step_index INTEGER,
     started_at TIMESTAMPTZ,
-    finished_at TIMESTAMPTZ
+    finished_at TIMESTAMPTZ,
+    created_at TIMESTAMPTZ,
+    failure_reason TEXT,
+    tokens_used BIGINT,
+    cost_usd NUMERIC(12, 6),
+    priority VARCHAR(16),
+    tenant VARCHAR(64),
+    queue_wait_ms REAL,
+    step_timings JSONB
 ) AS $$
 BEGIN
     RETURN QUERY
-    SELECT e.id, e.workflow_id, e.status, e.current_step_index, e.started_at, e.finished_at
+    SELECT e.id, e.workflow_id, e.status, e.current_step_index, e.started_at, e.finished_at, e.created_at,
+           e.failure_reason, e.tokens_used, e.cost_usd, e.priority, e.tenant, e.queue_wait_ms, e.step_timings
     FROM workflow_executions e WHERE e.id = p_execution_id;
 END;
 $$ LANGUAGE plpgsql;
@@ -264,12 +768,20 @@ RETURNS TABLE(
     criteria_passed BOOLEAN,
     failure_reason TEXT,
     tokens_used INTEGER,
-    created_at TIMESTAMPTZ
+    created_at TIMESTAMPTZ,
+    model VARCHAR(64),
+    is_hedge BOOLEAN,
+    ttfb_ms REAL,
+    llm_ms REAL,
+    criteria_ms REAL,
+    db_write_ms REAL,
+    context_bytes INTEGER
 ) AS $$
 BEGIN
     RETURN QUERY
     SELECT a.id, a.step_id, a.attempt_number, a.status, a.prompt_sent, a.response,
-           a.criteria_passed, a.failure_reason, a.tokens_used, a.created_at
+           a.criteria_passed, a.failure_reason, a.tokens_used, a.created_at, a.model, a.is_hedge,
+           a.ttfb_ms, a.llm_ms, a.criteria_ms, a.db_write_ms, a.context_bytes
     FROM step_attempts a
     WHERE a.workflow_execution_id = p_execution_id
     ORDER BY a.created_at;
@@ -277,14 +789,180 @@ END;
 $$ LANGUAGE plpgsql;
 
 
+-- Attempt metadata without the TEXT bodies. octet_length() reads the TOAST header only,
+-- so prompt/response are never detoasted here.
+CREATE OR REPLACE FUNCTION execution_get_attempt_summaries(p_execution_id INTEGER)
+RETURNS TABLE(
+    id INTEGER,
+    step_id INTEGER,
+    attempt_number INTEGER,
+    status VARCHAR(32),
+    criteria_passed BOOLEAN,
+    failure_reason TEXT,
+    tokens_used INTEGER,
+    created_at TIMESTAMPTZ,
+    prompt_bytes INTEGER,
+    response_bytes INTEGER,
+    model VARCHAR(64),
+    is_hedge BOOLEAN,
+    ttfb_ms REAL,
+    llm_ms REAL,
+    criteria_ms REAL,
+    db_write_ms REAL,
+    context_bytes INTEGER
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT a.id, a.step_id, a.attempt_number, a.status,
+           a.criteria_passed, a.failure_reason, a.tokens_used, a.created_at,
+           octet_length(a.prompt_sent), octet_length(a.response), a.model, a.is_hedge,
+           a.ttfb_ms, a.llm_ms, a.criteria_ms, a.db_write_ms, a.context_bytes
+    FROM step_attempts a
+    WHERE a.workflow_execution_id = p_execution_id
+    ORDER BY a.created_at;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- One attempt's summary (same columns as execution_get_attempt_summaries), for body reads; no
+-- row if the attempt is not part of p_execution_id.
+CREATE OR REPLACE FUNCTION step_attempt_summary_get(p_execution_id INTEGER, p_attempt_id INTEGER)
+RETURNS TABLE(
+    id INTEGER,
+    step_id INTEGER,
+    attempt_number INTEGER,
+    status VARCHAR(32),
+    criteria_passed BOOLEAN,
+    failure_reason TEXT,
+    tokens_used INTEGER,
+    created_at TIMESTAMPTZ,
+    prompt_bytes INTEGER,
+    response_bytes INTEGER,
+    model VARCHAR(64),
+    is_hedge BOOLEAN,
+    ttfb_ms REAL,
+    llm_ms REAL,
+    criteria_ms REAL,
+    db_write_ms REAL,
+    context_bytes INTEGER
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT a.id, a.step_id, a.attempt_number, a.status,
+           a.criteria_passed, a.failure_reason, a.tokens_used, a.created_at,
+           octet_length(a.prompt_sent), octet_length(a.response), a.model, a.is_hedge,
+           a.ttfb_ms, a.llm_ms, a.criteria_ms, a.db_write_ms, a.context_bytes
+    FROM step_attempts a
+    WHERE a.id = p_attempt_id AND a.workflow_execution_id = p_execution_id;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Byte range of one attempt body ('prompt' or 'response'). p_offset is 0-based;
+-- NULL p_length reads to the end. Returns NULL when the attempt or body does not exist.
+CREATE OR REPLACE FUNCTION step_attempt_body_range(
+    p_execution_id INTEGER,
+    p_attempt_id INTEGER,
+    p_field VARCHAR(16),
+    p_offset INTEGER DEFAULT 0,
+    p_length INTEGER DEFAULT NULL
+)
+RETURNS BYTEA AS $$
+DECLARE
+    body TEXT;
+BEGIN
+    SELECT CASE p_field WHEN 'prompt' THEN a.prompt_sent WHEN 'response' THEN a.response END
+    INTO body
+    FROM step_attempts a
+    WHERE a.id = p_attempt_id AND a.workflow_execution_id = p_execution_id;
+    IF body IS NULL THEN
+        RETURN NULL;
+    END IF;
+    IF p_length IS NULL THEN
+        RETURN substring(convert_to(body, 'UTF8') FROM p_offset + 1);
+    END IF;
+    RETURN substring(convert_to(body, 'UTF8') FROM p_offset + 1 FOR p_length);
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Character slice of one attempt body, for chunked streaming. p_start is 1-based.
+-- substr() on a TOASTed value only decompresses up to the requested slice.
+CREATE OR REPLACE FUNCTION step_attempt_body_chunk(
+    p_execution_id INTEGER,
+    p_attempt_id INTEGER,
+    p_field VARCHAR(16),
+    p_start INTEGER,
+    p_count INTEGER
+)
+RETURNS TEXT AS $$
+BEGIN
+    RETURN (
+        SELECT substr(CASE p_field WHEN 'prompt' THEN a.prompt_sent WHEN 'response' THEN a.response END,
+                      p_start, p_count)
+        FROM step_attempts a
+        WHERE a.id = p_attempt_id AND a.workflow_execution_id = p_execution_id
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Export: one row per attempt (executions without attempts get one row with NULL attempt
+-- columns), ordered by execution. Plain SQL + STABLE so the planner inlines it and a
+-- server-side cursor streams rows instead of materialising the whole result set.
+CREATE OR REPLACE FUNCTION execution_export(
+    p_workflow_id INTEGER DEFAULT NULL,
+    p_since TIMESTAMPTZ DEFAULT NULL,
+    p_until TIMESTAMPTZ DEFAULT NULL,
+    p_include_bodies BOOLEAN DEFAULT TRUE
+)
+RETURNS TABLE(
+    execution_id INTEGER,
+    workflow_id INTEGER,
+    execution_status VARCHAR(32),
+    current_step_index INTEGER,
+    started_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ,
+    attempt_id INTEGER,
+    step_id INTEGER,
+    attempt_number INTEGER,
+    attempt_status VARCHAR(32),
+    model VARCHAR(64),
+    is_hedge BOOLEAN,
+    prompt_sent TEXT,
+    response TEXT,
+    criteria_passed BOOLEAN,
+    failure_reason TEXT,
+    tokens_used INTEGER,
+    created_at TIMESTAMPTZ
+) AS $$
+    SELECT e.id, e.workflow_id, e.status, e.current_step_index, e.started_at, e.finished_at,
+           a.id, a.step_id, a.attempt_number, a.status, a.model, a.is_hedge,
+           CASE WHEN p_include_bodies THEN a.prompt_sent END,
+           CASE WHEN p_include_bodies THEN a.response END,
+           a.criteria_passed, a.failure_reason, a.tokens_used, a.created_at
+    FROM workflow_executions e
+    LEFT JOIN step_attempts a
+           ON a.workflow_execution_id = e.id AND a.execution_created_at = e.created_at
+    WHERE (p_workflow_id IS NULL OR e.workflow_id = p_workflow_id)
+      AND (p_since IS NULL OR e.started_at >= p_since)
+      AND (p_until IS NULL OR e.started_at < p_until)
+    ORDER BY e.id, a.created_at;
+$$ LANGUAGE sql STABLE;
+
+
 -- Phase 3: execution lifecycle
-CREATE OR REPLACE FUNCTION execution_create(p_workflow_id INTEGER)
+CREATE OR REPLACE FUNCTION execution_create(
+    p_workflow_id INTEGER,
+    p_priority VARCHAR(16) DEFAULT 'batch',
+    p_tenant VARCHAR(64) DEFAULT NULL
+)
 RETURNS INTEGER AS $$
 DECLARE
     new_id INTEGER;
 BEGIN
-    INSERT INTO workflow_executions (workflow_id, status)
-    VALUES (p_workflow_id, 'pending')
+    INSERT INTO workflow_executions (workflow_id, status, priority, tenant)
+    VALUES (p_workflow_id, 'pending', p_priority, p_tenant)
     RETURNING id INTO new_id;
     RETURN new_id;
 END;
@@ -296,7 +974,9 @@ CREATE OR REPLACE FUNCTION execution_update(
     p_status VARCHAR(32),
     p_current_step_index INTEGER DEFAULT NULL,
     p_started_at TIMESTAMPTZ DEFAULT NULL,
-    p_finished_at TIMESTAMPTZ DEFAULT NULL
+    p_finished_at TIMESTAMPTZ DEFAULT NULL,
+    p_failure_reason TEXT DEFAULT NULL,
+    p_queue_wait_ms REAL DEFAULT NULL
 )
 RETURNS VOID AS $$
 BEGIN
@@ -304,12 +984,115 @@ BEGIN
     SET status = p_status,
         current_step_index = COALESCE(p_current_step_index, current_step_index),
         started_at = COALESCE(p_started_at, started_at),
-        finished_at = COALESCE(p_finished_at, finished_at)
+        finished_at = COALESCE(p_finished_at, finished_at),
+        failure_reason = COALESCE(p_failure_reason, failure_reason),
+        queue_wait_ms = COALESCE(p_queue_wait_ms, queue_wait_ms)
+    WHERE id = p_execution_id
+      -- A cancelled run is final: never let a late executor write resurrect it
+      AND (status <> 'cancelled' OR p_status = 'cancelled');
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Start a pending run: pending -> running in one statement, so when two processes hold the same
+-- queued run (one re-queued it at startup) only one of them runs it. FALSE if it is no longer
+-- pending (started elsewhere, cancelled or finished).
+CREATE OR REPLACE FUNCTION execution_claim(
+    p_execution_id INTEGER,
+    p_started_at TIMESTAMPTZ,
+    p_queue_wait_ms REAL DEFAULT NULL
+)
+RETURNS BOOLEAN AS $$
+BEGIN
+    UPDATE workflow_executions
+    SET status = 'running', started_at = p_started_at, queue_wait_ms = p_queue_wait_ms
+    WHERE id = p_execution_id AND status = 'pending';
+    RETURN FOUND;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Runs waiting to start, oldest first (re-queued by services.scheduler at startup).
+CREATE OR REPLACE FUNCTION execution_list_pending()
+RETURNS TABLE(id INTEGER, priority VARCHAR(16), tenant VARCHAR(64)) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT e.id, e.priority, e.tenant FROM workflow_executions e
+    WHERE e.status = 'pending'
+    ORDER BY e.created_at, e.id;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Append one step's wall-clock time (first attempt start to pass/fail) to the execution.
+CREATE OR REPLACE FUNCTION execution_record_step(
+    p_execution_id INTEGER,
+    p_step_index INTEGER,
+    p_step_id INTEGER,
+    p_wall_ms REAL
+)
+RETURNS VOID AS $$
+BEGIN
+    UPDATE workflow_executions
+    SET step_timings = step_timings || jsonb_build_array(
+        jsonb_build_object('step_index', p_step_index, 'step_id', p_step_id, 'wall_ms', p_wall_ms)
+    )
     WHERE id = p_execution_id;
 END;
 $$ LANGUAGE plpgsql;
 
 
+-- Add one attempt's consumption to the execution's running totals.
+CREATE OR REPLACE FUNCTION execution_add_usage(
+    p_execution_id INTEGER,
+    p_tokens_used INTEGER,
+    p_cost_usd NUMERIC
+)
+RETURNS VOID AS $$
+BEGIN
+    UPDATE workflow_executions
+    SET tokens_used = tokens_used + COALESCE(p_tokens_used, 0),
+        cost_usd = cost_usd + COALESCE(p_cost_usd, 0)
+    WHERE id = p_execution_id;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Request cancellation. Pending runs (not yet picked up) are cancelled outright; running ones
+-- are flagged and the owning executor (any process) stops and sets the final status.
+-- Returns the status after the call, or NULL if the execution does not exist.
+CREATE OR REPLACE FUNCTION execution_request_cancel(p_execution_id INTEGER)
+RETURNS VARCHAR(32) AS $$
+DECLARE
+    v_status VARCHAR(32);
+BEGIN
+    UPDATE workflow_executions
+    SET cancel_requested_at = COALESCE(cancel_requested_at, clock_timestamp()),
+        status = CASE WHEN status = 'pending' THEN 'cancelled' ELSE status END,
+        finished_at = CASE WHEN status = 'pending' THEN clock_timestamp() ELSE finished_at END
+    WHERE id = p_execution_id AND status IN ('pending', 'running')
+    RETURNING status INTO v_status;
+    IF v_status IS NULL THEN
+        SELECT e.status INTO v_status FROM workflow_executions e WHERE e.id = p_execution_id;
+    END IF;
+    RETURN v_status;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Which of the given executions have a pending cancel request (polled by each executor process).
+CREATE OR REPLACE FUNCTION execution_cancel_requested(p_execution_ids INTEGER[])
+RETURNS TABLE(id INTEGER) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT e.id FROM workflow_executions e
+    WHERE e.id = ANY(p_execution_ids) AND e.cancel_requested_at IS NOT NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- p_execution_created_at is the partition key; pass it when known (the executor has it)
+-- to skip the lookup. Otherwise it is read from workflow_executions.
 CREATE OR REPLACE FUNCTION step_attempt_insert(
     p_execution_id INTEGER,
     p_step_id INTEGER,
@@ -319,19 +1102,34 @@ CREATE OR REPLACE FUNCTION step_attempt_insert(
     p_response TEXT DEFAULT NULL,
     p_criteria_passed BOOLEAN DEFAULT NULL,
     p_failure_reason TEXT DEFAULT NULL,
-    p_tokens_used INTEGER DEFAULT NULL
+    p_tokens_used INTEGER DEFAULT NULL,
+    p_execution_created_at TIMESTAMPTZ DEFAULT NULL,
+    p_model VARCHAR(64) DEFAULT NULL,
+    p_is_hedge BOOLEAN DEFAULT FALSE,
+    p_ttfb_ms REAL DEFAULT NULL,
+    p_llm_ms REAL DEFAULT NULL,
+    p_criteria_ms REAL DEFAULT NULL,
+    p_db_write_ms REAL DEFAULT NULL,
+    p_context_bytes INTEGER DEFAULT NULL
 )
 RETURNS INTEGER AS $$
 DECLARE
     new_id INTEGER;
+    v_execution_created_at TIMESTAMPTZ := p_execution_created_at;
 BEGIN
+    IF v_execution_created_at IS NULL THEN
+        SELECT e.created_at INTO v_execution_created_at
+        FROM workflow_executions e WHERE e.id = p_execution_id;
+    END IF;
     INSERT INTO step_attempts (
-        workflow_execution_id, step_id, attempt_number, status,
-        prompt_sent, response, criteria_passed, failure_reason, tokens_used
+        workflow_execution_id, execution_created_at, step_id, attempt_number, status,
+        prompt_sent, response, criteria_passed, failure_reason, tokens_used, model, is_hedge,
+        ttfb_ms, llm_ms, criteria_ms, db_write_ms, context_bytes
     )
     VALUES (
-        p_execution_id, p_step_id, p_attempt_number, p_status,
-        p_prompt_sent, p_response, p_criteria_passed, p_failure_reason, p_tokens_used
+        p_execution_id, v_execution_created_at, p_step_id, p_attempt_number, p_status,
+        p_prompt_sent, p_response, p_criteria_passed, p_failure_reason, p_tokens_used, p_model, COALESCE(p_is_hedge, FALSE),
+        p_ttfb_ms, p_llm_ms, p_criteria_ms, p_db_write_ms, p_context_bytes
     )
     RETURNING id INTO new_id;
     RETURN new_id;
@@ -339,31 +1137,60 @@ END;
 $$ LANGUAGE plpgsql;
 
 
+-- With p_execution_created_at the UPDATE is pruned to a single partition.
 CREATE OR REPLACE FUNCTION step_attempt_update(
     p_attempt_id INTEGER,
     p_status VARCHAR(32) DEFAULT NULL,
     p_response TEXT DEFAULT NULL,
     p_criteria_passed BOOLEAN DEFAULT NULL,
     p_failure_reason TEXT DEFAULT NULL,
-    p_tokens_used INTEGER DEFAULT NULL
+    p_tokens_used INTEGER DEFAULT NULL,
+    p_execution_created_at TIMESTAMPTZ DEFAULT NULL,
+    p_ttfb_ms REAL DEFAULT NULL,
+    p_llm_ms REAL DEFAULT NULL,
+    p_criteria_ms REAL DEFAULT NULL,
+    p_db_write_ms REAL DEFAULT NULL
 )
 RETURNS VOID AS $$
 BEGIN
+    IF p_execution_created_at IS NOT NULL THEN
+        UPDATE step_attempts
+        SET status = COALESCE(p_status, status),
+            response = COALESCE(p_response, response),
+            criteria_passed = COALESCE(p_criteria_passed, criteria_passed),
+            failure_reason = COALESCE(p_failure_reason, failure_reason),
+            tokens_used = COALESCE(p_tokens_used, tokens_used),
+            ttfb_ms = COALESCE(p_ttfb_ms, ttfb_ms),
+            llm_ms = COALESCE(p_llm_ms, llm_ms),
+            criteria_ms = COALESCE(p_criteria_ms, criteria_ms),
+            db_write_ms = COALESCE(p_db_write_ms, db_write_ms)
+        WHERE id = p_attempt_id AND execution_created_at = p_execution_created_at;
+        RETURN;
+    END IF;
     UPDATE step_attempts
     SET status = COALESCE(p_status, status),
         response = COALESCE(p_response, response),
         criteria_passed = COALESCE(p_criteria_passed, criteria_passed),
         failure_reason = COALESCE(p_failure_reason, failure_reason),
-        tokens_used = COALESCE(p_tokens_used, tokens_used)
+        tokens_used = COALESCE(p_tokens_used, tokens_used),
+        ttfb_ms = COALESCE(p_ttfb_ms, ttfb_ms),
+        llm_ms = COALESCE(p_llm_ms, llm_ms),
+        criteria_ms = COALESCE(p_criteria_ms, criteria_ms),
+        db_write_ms = COALESCE(p_db_write_ms, db_write_ms)
     WHERE id = p_attempt_id;
 END;
 $$ LANGUAGE plpgsql;
 
 
--- Optional: trigger to keep workflows.updated_at in sync on step changes
+-- Keep workflows.updated_at in sync on step changes: link rows cover adding, removing and
+-- reordering steps; in-place edits of a step row touch its (sole) owning version.
 CREATE OR REPLACE FUNCTION set_workflow_updated_at()
 RETURNS TRIGGER AS $$
 BEGIN
+    -- step_replace_all touches the workflow once itself
+    IF current_setting('app.bulk_step_write', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
     UPDATE workflows SET updated_at = clock_timestamp() WHERE id = COALESCE(NEW.workflow_id, OLD.workflow_id);
     RETURN COALESCE(NEW, OLD);
 END;
@@ -371,5 +1198,355 @@ $$ LANGUAGE plpgsql;
 
 DROP TRIGGER IF EXISTS tr_steps_updated ON steps;
 CREATE TRIGGER tr_steps_updated
-    AFTER INSERT OR UPDATE OR DELETE ON steps
+    AFTER UPDATE ON steps
+    FOR EACH ROW
+    WHEN (OLD.workflow_id = NEW.workflow_id)  -- not when step_release hands a step to another version
+    EXECUTE PROCEDURE set_workflow_updated_at();
+
+DROP TRIGGER IF EXISTS tr_workflow_steps_updated ON workflow_steps;
+CREATE TRIGGER tr_workflow_steps_updated
+    AFTER INSERT OR UPDATE OR DELETE ON workflow_steps
     FOR EACH ROW EXECUTE PROCEDURE set_workflow_updated_at();
+
+
+-- =============================================================================
+-- DENORMALIZED COUNTERS (workflows.step_count, workflows.has_executions)
+-- =============================================================================
+
+-- Statement-level with transition tables: step_replace_all and workflow_create_version link many
+-- steps in one statement and update each workflow row once.
+CREATE OR REPLACE FUNCTION workflow_steps_count_insert()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE workflows w SET step_count = w.step_count + c.n
+    FROM (SELECT workflow_id, COUNT(*)::INTEGER AS n FROM new_links GROUP BY workflow_id) c
+    WHERE w.id = c.workflow_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION workflow_steps_count_delete()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE workflows w SET step_count = GREATEST(w.step_count - c.n, 0)
+    FROM (SELECT workflow_id, COUNT(*)::INTEGER AS n FROM old_links GROUP BY workflow_id) c
+    WHERE w.id = c.workflow_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS tr_workflow_steps_count_insert ON workflow_steps;
+CREATE TRIGGER tr_workflow_steps_count_insert
+    AFTER INSERT ON workflow_steps
+    REFERENCING NEW TABLE AS new_links
+    FOR EACH STATEMENT EXECUTE PROCEDURE workflow_steps_count_insert();
+
+DROP TRIGGER IF EXISTS tr_workflow_steps_count_delete ON workflow_steps;
+CREATE TRIGGER tr_workflow_steps_count_delete
+    AFTER DELETE ON workflow_steps
+    REFERENCING OLD TABLE AS old_links
+    FOR EACH STATEMENT EXECUTE PROCEDURE workflow_steps_count_delete();
+
+-- First run of a version flips has_executions; later runs match no row, so they take no lock
+-- on the workflow.
+CREATE OR REPLACE FUNCTION workflow_mark_has_executions()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE workflows SET has_executions = TRUE WHERE id = NEW.workflow_id AND NOT has_executions;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS tr_workflow_executions_mark ON workflow_executions;
+CREATE TRIGGER tr_workflow_executions_mark
+    AFTER INSERT ON workflow_executions
+    FOR EACH ROW EXECUTE PROCEDURE workflow_mark_has_executions();
+
+
+-- =============================================================================
+-- PARTITIONS (monthly, workflow_executions + step_attempts)
+-- =============================================================================
+
+-- Create the month partitions containing p_month for both tables (idempotent).
+-- If rows for that month already landed in a DEFAULT partition, creation is skipped with a warning.
+CREATE OR REPLACE FUNCTION partition_ensure_month(p_month DATE)
+RETURNS VOID AS $$
+DECLARE
+    v_from DATE := date_trunc('month', p_month)::DATE;
+    v_to DATE := (date_trunc('month', p_month) + INTERVAL '1 month')::DATE;
+    v_suffix TEXT := to_char(v_from, 'YYYY_MM');
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS %I PARTITION OF workflow_executions FOR VALUES FROM (%L) TO (%L)',
+        'workflow_executions_p' || v_suffix, v_from, v_to);
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS %I PARTITION OF step_attempts FOR VALUES FROM (%L) TO (%L)',
+        'step_attempts_p' || v_suffix, v_from, v_to);
+EXCEPTION WHEN check_violation THEN
+    RAISE WARNING 'partition for % not created: rows exist in the default partition', v_suffix;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Current month plus p_months_ahead future months. Called on startup and by scripts.partitions.
+CREATE OR REPLACE FUNCTION partition_ensure_upcoming(p_months_ahead INTEGER DEFAULT 2)
+RETURNS VOID AS $$
+BEGIN
+    FOR i IN 0..p_months_ahead LOOP
+        PERFORM partition_ensure_month((date_trunc('month', clock_timestamp()) + make_interval(months => i))::DATE);
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Month partitions (first day of month) strictly older than p_before, oldest first.
+CREATE OR REPLACE FUNCTION partition_list_months(p_before DATE DEFAULT NULL)
+RETURNS TABLE(
+    month DATE,
+    executions_table TEXT,
+    attempts_table TEXT
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT to_date(substr(c.relname, length('workflow_executions_p') + 1), 'YYYY_MM'),
+           c.relname::TEXT,
+           'step_attempts_p' || substr(c.relname, length('workflow_executions_p') + 1)
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'workflow_executions'::regclass
+      AND c.relname ~ '^workflow_executions_p[0-9]{4}_[0-9]{2}$'
+      AND (p_before IS NULL
+           OR to_date(substr(c.relname, length('workflow_executions_p') + 1), 'YYYY_MM') < date_trunc('month', p_before)::DATE)
+    ORDER BY 1;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Detach and drop one month. Attempts go first: the executions partition is referenced by their FK.
+CREATE OR REPLACE FUNCTION partition_drop_month(p_month DATE)
+RETURNS VOID AS $$
+DECLARE
+    v_suffix TEXT := to_char(date_trunc('month', p_month), 'YYYY_MM');
+BEGIN
+    IF to_regclass('step_attempts_p' || v_suffix) IS NOT NULL THEN
+        EXECUTE format('ALTER TABLE step_attempts DETACH PARTITION %I', 'step_attempts_p' || v_suffix);
+        EXECUTE format('DROP TABLE %I', 'step_attempts_p' || v_suffix);
+    END IF;
+    IF to_regclass('workflow_executions_p' || v_suffix) IS NOT NULL THEN
+        EXECUTE format('ALTER TABLE workflow_executions DETACH PARTITION %I', 'workflow_executions_p' || v_suffix);
+        EXECUTE format('DROP TABLE %I', 'workflow_executions_p' || v_suffix);
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT partition_ensure_upcoming(2);
+
+
+-- =============================================================================
+-- STATS (incremental rollups)
+-- =============================================================================
+
+-- 1-based histogram bucket for a duration in ms; NULL stays NULL. Mirrors utils/sketch.py.
+CREATE OR REPLACE FUNCTION stats_duration_bucket(p_ms DOUBLE PRECISION)
+RETURNS INTEGER AS $$
+    SELECT CASE WHEN p_ms IS NULL THEN NULL
+                ELSE LEAST(GREATEST(CEIL(LN(GREATEST(p_ms, 1.0)) / LN(1.1))::INTEGER, 0), 159) + 1 END;
+$$ LANGUAGE sql IMMUTABLE;
+
+
+-- One finished attempt. p_passed NULL means the LLM call itself errored.
+CREATE OR REPLACE FUNCTION stats_record_attempt(
+    p_workflow_id INTEGER,
+    p_step_id INTEGER,
+    p_model VARCHAR(64),
+    p_passed BOOLEAN,
+    p_tokens_used INTEGER DEFAULT NULL,
+    p_duration_ms DOUBLE PRECISION DEFAULT NULL
+)
+RETURNS VOID AS $$
+DECLARE
+    b INTEGER := stats_duration_bucket(p_duration_ms);
+BEGIN
+    INSERT INTO stats_step_model (workflow_id, step_id, model)
+    VALUES (p_workflow_id, p_step_id, p_model)
+    ON CONFLICT (workflow_id, step_id, model) DO NOTHING;
+
+    UPDATE stats_step_model
+    SET attempts = attempts + 1,
+        passed = passed + CASE WHEN p_passed IS TRUE THEN 1 ELSE 0 END,
+        failed = failed + CASE WHEN p_passed IS FALSE THEN 1 ELSE 0 END,
+        errors = errors + CASE WHEN p_passed IS NULL THEN 1 ELSE 0 END,
+        tokens_used = tokens_used + COALESCE(p_tokens_used, 0),
+        duration_buckets[COALESCE(b, 1)] = duration_buckets[COALESCE(b, 1)] + CASE WHEN b IS NULL THEN 0 ELSE 1 END,
+        updated_at = clock_timestamp()
+    WHERE workflow_id = p_workflow_id AND step_id = p_step_id AND model = p_model;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- One finished run (completed or failed).
+CREATE OR REPLACE FUNCTION stats_record_run(
+    p_workflow_id INTEGER,
+    p_status VARCHAR(32),
+    p_duration_ms DOUBLE PRECISION DEFAULT NULL
+)
+RETURNS VOID AS $$
+DECLARE
+    b INTEGER := stats_duration_bucket(p_duration_ms);
+BEGIN
+    INSERT INTO stats_workflow_runs (workflow_id)
+    VALUES (p_workflow_id)
+    ON CONFLICT (workflow_id) DO NOTHING;
+
+    UPDATE stats_workflow_runs
+    SET runs = runs + 1,
+        completed = completed + CASE WHEN p_status = 'completed' THEN 1 ELSE 0 END,
+        failed = failed + CASE WHEN p_status = 'completed' THEN 0 ELSE 1 END,
+        duration_buckets[COALESCE(b, 1)] = duration_buckets[COALESCE(b, 1)] + CASE WHEN b IS NULL THEN 0 ELSE 1 END,
+        updated_at = clock_timestamp()
+    WHERE workflow_id = p_workflow_id;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION stats_workflow_get(p_workflow_id INTEGER)
+RETURNS TABLE(
+    workflow_id INTEGER,
+    runs BIGINT,
+    completed BIGINT,
+    failed BIGINT,
+    duration_buckets BIGINT[]
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT r.workflow_id, r.runs, r.completed, r.failed, r.duration_buckets
+    FROM stats_workflow_runs r WHERE r.workflow_id = p_workflow_id;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- p_workflow_id NULL = every workflow (global stats are merged from these rows).
+CREATE OR REPLACE FUNCTION stats_step_model_list(p_workflow_id INTEGER DEFAULT NULL)
+RETURNS TABLE(
+    workflow_id INTEGER,
+    step_id INTEGER,
+    model VARCHAR(64),
+    attempts BIGINT,
+    passed BIGINT,
+    failed BIGINT,
+    errors BIGINT,
+    tokens_used BIGINT,
+    duration_buckets BIGINT[]
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT s.workflow_id, s.step_id, s.model, s.attempts, s.passed, s.failed, s.errors,
+           s.tokens_used, s.duration_buckets
+    FROM stats_step_model s
+    WHERE (p_workflow_id IS NULL OR s.workflow_id = p_workflow_id)
+    ORDER BY s.workflow_id, s.step_id, s.model;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION stats_workflow_runs_list()
+RETURNS TABLE(
+    workflow_id INTEGER,
+    runs BIGINT,
+    completed BIGINT,
+    failed BIGINT,
+    duration_buckets BIGINT[]
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT r.workflow_id, r.runs, r.completed, r.failed, r.duration_buckets
+    FROM stats_workflow_runs r ORDER BY r.workflow_id;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Rebuild both rollups from history (scripts.backfill_stats). Attempts with no recorded
+-- duration count towards totals but not the duration histogram.
+CREATE OR REPLACE FUNCTION stats_backfill()
+RETURNS VOID AS $$
+BEGIN
+    LOCK TABLE stats_step_model, stats_workflow_runs IN EXCLUSIVE MODE;
+    DELETE FROM stats_step_model;
+    DELETE FROM stats_workflow_runs;
+
+    -- Keyed like the live rollup: by the model that served the attempt (older rows without one
+    -- fall back to the step's model); durations are the attempt's llm_ms, as recorded live.
+    WITH att AS (
+        SELECT e.workflow_id, a.step_id, COALESCE(a.model, s.model) AS model, a.criteria_passed,
+               a.response IS NULL AS no_response, a.tokens_used, stats_duration_bucket(a.llm_ms) AS b
+        FROM step_attempts a
+        JOIN workflow_executions e ON e.id = a.workflow_execution_id AND e.created_at = a.execution_created_at
+        JOIN steps s ON s.id = a.step_id
+        WHERE a.status IN ('passed', 'failed')
+    ), hist AS (
+        SELECT att.workflow_id, att.step_id, att.model, att.b, COUNT(*)::BIGINT AS n
+        FROM att WHERE att.b IS NOT NULL
+        GROUP BY att.workflow_id, att.step_id, att.model, att.b
+    )
+    INSERT INTO stats_step_model (
+        workflow_id, step_id, model, attempts, passed, failed, errors, tokens_used, duration_buckets
+    )
+    SELECT t.workflow_id, t.step_id, t.model,
+           COUNT(*),
+           COUNT(*) FILTER (WHERE t.criteria_passed IS TRUE),
+           COUNT(*) FILTER (WHERE t.criteria_passed IS FALSE AND NOT t.no_response),
+           COUNT(*) FILTER (WHERE t.criteria_passed IS NOT TRUE AND t.no_response),
+           COALESCE(SUM(t.tokens_used), 0),
+           (SELECT array_agg(COALESCE(h.n, 0) ORDER BY g.i)
+            FROM generate_series(1, 160) g(i)
+            LEFT JOIN hist h ON h.workflow_id = t.workflow_id AND h.step_id = t.step_id
+                            AND h.model = t.model AND h.b = g.i)
+    FROM att t
+    GROUP BY t.workflow_id, t.step_id, t.model;
+
+    INSERT INTO stats_workflow_runs (workflow_id, runs, completed, failed, duration_buckets)
+    SELECT e.workflow_id,
+           COUNT(*),
+           COUNT(*) FILTER (WHERE e.status = 'completed'),
+           COUNT(*) FILTER (WHERE e.status <> 'completed'),
+           (SELECT array_agg(COALESCE(h.n, 0) ORDER BY g.i)
+            FROM generate_series(1, 160) g(i)
+            LEFT JOIN (
+                SELECT stats_duration_bucket(EXTRACT(EPOCH FROM (e2.finished_at - e2.started_at)) * 1000) AS i,
+                       COUNT(*)::BIGINT AS n
+                FROM workflow_executions e2
+                WHERE e2.workflow_id = e.workflow_id
+                  AND e2.status IN ('completed', 'failed')
+                  AND e2.started_at IS NOT NULL AND e2.finished_at IS NOT NULL
+                GROUP BY 1
+            ) h ON h.i = g.i)
+    FROM workflow_executions e
+    WHERE e.status IN ('completed', 'failed')
+    GROUP BY e.workflow_id;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- =============================================================================
+-- READ REPLICA (DATABASE_READ_URL)
+-- =============================================================================
+
+-- WAL position after a write request's commit; readers pass it back to wait for the replica.
+CREATE OR REPLACE FUNCTION wal_position()
+RETURNS TEXT AS $$
+    SELECT pg_current_wal_lsn()::TEXT;
+$$ LANGUAGE sql;
+
+
+-- How far this server has replayed, and replay lag in seconds (0 when fully replayed or when it
+-- is not a standby, e.g. the read URL points at the primary).
+CREATE OR REPLACE FUNCTION replica_status()
+RETURNS TABLE(
+    replay_lsn TEXT,
+    lag_seconds DOUBLE PRECISION
+) AS $$
+    SELECT CASE WHEN pg_is_in_recovery() THEN pg_last_wal_replay_lsn() ELSE pg_current_wal_lsn() END::TEXT,
+           CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE COALESCE(EXTRACT(EPOCH FROM clock_timestamp() - pg_last_xact_replay_timestamp()), 0)
+           END::DOUBLE PRECISION;
+$$ LANGUAGE sql;
@@ -0,0 +1,184 @@
+-- Agentic Workflow Builder — SQLite schema (DATABASE_URL=sqlite:///path/to/file.db)
+-- Applied automatically by core/db_sqlite.py when the writer opens the database; every statement
+-- is idempotent. Same tables and columns as db/schema.sql, minus partitioning. The statements of
+-- each core.db_pg function live in core/db_sqlite.py (SQLite has no stored functions).
+--
+-- Types: TIMESTAMPTZ columns hold ISO-8601 UTC text ('2026-01-31T12:00:00.000000+00:00', so text
+-- order is time order), JSONB columns JSON text, BOOLEAN 0/1 and histograms a JSON array of 160
+-- counts. core/db_sqlite.py registers converters for these declared types.
+--
+-- clock_timestamp() and bulk_step_write() are application functions registered on the writer
+-- connection; the triggers below need them, so write through the application, not the sqlite3 shell.
+--
+-- SQLite has no ADD COLUMN IF NOT EXISTS: columns added after a table's first release are listed
+-- in ADDED_COLUMNS in core/db_sqlite.py and added to older files when the writer opens them.
+
+PRAGMA foreign_keys = ON;
+
+CREATE TABLE IF NOT EXISTS workflows (
+    id                  INTEGER PRIMARY KEY AUTOINCREMENT,
+    name                VARCHAR(255) NOT NULL,
+    created_at          TIMESTAMPTZ NOT NULL,
+    updated_at          TIMESTAMPTZ NOT NULL,
+    deadline_seconds    REAL,
+    token_budget        INTEGER,
+    cost_budget_usd     REAL,
+    root_id             INTEGER,
+    parent_id           INTEGER,
+    version             INTEGER NOT NULL DEFAULT 1,
+    step_count          INTEGER NOT NULL DEFAULT 0,
+    has_executions      BOOLEAN NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS steps (
+    id                  INTEGER PRIMARY KEY AUTOINCREMENT,
+    workflow_id         INTEGER NOT NULL REFERENCES workflows(id) ON DELETE CASCADE,
+    order_index         INTEGER NOT NULL,
+    model               VARCHAR(64) NOT NULL,
+    prompt              TEXT NOT NULL,
+    completion_criteria JSONB NOT NULL,
+    context_strategy    VARCHAR(32) NOT NULL DEFAULT 'full',
+    timeout_seconds     REAL,
+    fallback_models     JSONB NOT NULL DEFAULT '[]',
+    routing_policy      VARCHAR(32) NOT NULL DEFAULT 'ordered',
+    hedge_percentile    REAL,
+    candidates          INTEGER NOT NULL DEFAULT 1,
+    context_config      JSONB NOT NULL DEFAULT '{}',
+    max_tokens          INTEGER,
+    temperature         REAL,
+    top_p               REAL,
+    stop                JSONB NOT NULL DEFAULT '[]',
+    response_format     JSONB
+);
+
+CREATE TABLE IF NOT EXISTS workflow_steps (
+    workflow_id         INTEGER NOT NULL REFERENCES workflows(id) ON DELETE CASCADE,
+    step_id             INTEGER NOT NULL REFERENCES steps(id) ON DELETE CASCADE,
+    order_index         INTEGER NOT NULL,
+    PRIMARY KEY (workflow_id, step_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS workflow_executions (
+    id                  INTEGER PRIMARY KEY AUTOINCREMENT,
+    workflow_id         INTEGER NOT NULL REFERENCES workflows(id) ON DELETE CASCADE,
+    status              VARCHAR(32) NOT NULL DEFAULT 'pending',
+    current_step_index  INTEGER,
+    started_at          TIMESTAMPTZ,
+    finished_at         TIMESTAMPTZ,
+    created_at          TIMESTAMPTZ NOT NULL,
+    cancel_requested_at TIMESTAMPTZ,
+    failure_reason      TEXT,
+    tokens_used         INTEGER NOT NULL DEFAULT 0,
+    cost_usd            REAL NOT NULL DEFAULT 0,
+    priority            VARCHAR(16) NOT NULL DEFAULT 'batch',
+    tenant              VARCHAR(64),
+    queue_wait_ms       REAL,
+    step_timings        JSONB NOT NULL DEFAULT '[]'
+);
+
+CREATE TABLE IF NOT EXISTS step_attempts (
+    id                      INTEGER PRIMARY KEY AUTOINCREMENT,
+    workflow_execution_id   INTEGER NOT NULL REFERENCES workflow_executions(id) ON DELETE CASCADE,
+    step_id                 INTEGER NOT NULL REFERENCES steps(id) ON DELETE CASCADE,
+    attempt_number          INTEGER NOT NULL,
+    status                  VARCHAR(32) NOT NULL DEFAULT 'pending',
+    prompt_sent             TEXT,
+    response                TEXT,
+    criteria_passed         BOOLEAN,
+    failure_reason          TEXT,
+    tokens_used             INTEGER,
+    created_at              TIMESTAMPTZ NOT NULL,
+    model                   VARCHAR(64),
+    is_hedge                BOOLEAN NOT NULL DEFAULT 0,
+    ttfb_ms                 REAL,
+    llm_ms                  REAL,
+    criteria_ms             REAL,
+    db_write_ms             REAL,
+    context_bytes           INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS stats_step_model (
+    workflow_id         INTEGER NOT NULL REFERENCES workflows(id) ON DELETE CASCADE,
+    step_id             INTEGER NOT NULL,
+    model               VARCHAR(64) NOT NULL,
+    attempts            INTEGER NOT NULL DEFAULT 0,
+    passed              INTEGER NOT NULL DEFAULT 0,
+    failed              INTEGER NOT NULL DEFAULT 0,
+    errors              INTEGER NOT NULL DEFAULT 0,
+    tokens_used         INTEGER NOT NULL DEFAULT 0,
+    duration_buckets    JSONB NOT NULL,
+    updated_at          TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (workflow_id, step_id, model)
+);
+
+CREATE TABLE IF NOT EXISTS stats_workflow_runs (
+    workflow_id         INTEGER PRIMARY KEY REFERENCES workflows(id) ON DELETE CASCADE,
+    runs                INTEGER NOT NULL DEFAULT 0,
+    completed           INTEGER NOT NULL DEFAULT 0,
+    failed              INTEGER NOT NULL DEFAULT 0,
+    duration_buckets    JSONB NOT NULL,
+    updated_at          TIMESTAMPTZ NOT NULL
+);
+
+-- Same lookups as db/schema.sql
+CREATE INDEX IF NOT EXISTS idx_steps_workflow_id ON steps(workflow_id);
+CREATE INDEX IF NOT EXISTS idx_workflow_steps_step_id ON workflow_steps(step_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_workflows_lineage_version ON workflows(COALESCE(root_id, id), version);
+CREATE INDEX IF NOT EXISTS idx_workflow_executions_workflow_started
+    ON workflow_executions(workflow_id, started_at DESC);
+CREATE INDEX IF NOT EXISTS idx_workflow_executions_started ON workflow_executions(started_at DESC);
+CREATE INDEX IF NOT EXISTS idx_workflow_executions_active
+    ON workflow_executions(workflow_id) WHERE status IN ('pending', 'running');
+CREATE INDEX IF NOT EXISTS idx_step_attempts_execution_created ON step_attempts(workflow_execution_id, created_at);
+
+-- workflows.updated_at follows step changes (see set_workflow_updated_at in db/schema.sql);
+-- step_replace_all and workflow_delete switch this off and touch the workflow once themselves
+CREATE TRIGGER IF NOT EXISTS tr_steps_updated
+    AFTER UPDATE ON steps
+    FOR EACH ROW WHEN OLD.workflow_id = NEW.workflow_id AND NOT bulk_step_write()
+BEGIN
+    UPDATE workflows SET updated_at = clock_timestamp() WHERE id = NEW.workflow_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_workflow_steps_inserted
+    AFTER INSERT ON workflow_steps
+    FOR EACH ROW WHEN NOT bulk_step_write()
+BEGIN
+    UPDATE workflows SET updated_at = clock_timestamp() WHERE id = NEW.workflow_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_workflow_steps_updated
+    AFTER UPDATE ON workflow_steps
+    FOR EACH ROW WHEN NOT bulk_step_write()
+BEGIN
+    UPDATE workflows SET updated_at = clock_timestamp() WHERE id = NEW.workflow_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_workflow_steps_deleted
+    AFTER DELETE ON workflow_steps
+    FOR EACH ROW WHEN NOT bulk_step_write()
+BEGIN
+    UPDATE workflows SET updated_at = clock_timestamp() WHERE id = OLD.workflow_id;
+END;
+
+-- Denormalized counters (workflows.step_count, workflows.has_executions)
+CREATE TRIGGER IF NOT EXISTS tr_workflow_steps_count_insert
+    AFTER INSERT ON workflow_steps
+    FOR EACH ROW
+BEGIN
+    UPDATE workflows SET step_count = step_count + 1 WHERE id = NEW.workflow_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_workflow_steps_count_delete
+    AFTER DELETE ON workflow_steps
+    FOR EACH ROW
+BEGIN
+    UPDATE workflows SET step_count = MAX(step_count - 1, 0) WHERE id = OLD.workflow_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_workflow_executions_mark
+    AFTER INSERT ON workflow_executions
+    FOR EACH ROW
+BEGIN
+    UPDATE workflows SET has_executions = 1 WHERE id = NEW.workflow_id AND NOT has_executions;
+END;
@@ -1,20 +1,33 @@
 """FastAPI application entry point."""
+import logging
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from api import workflows_router, executions_router
-from core.database import init_db
-from core.logging import setup_logging
+from api import workflows_router, executions_router, stats_router
+from core.compression import CompressionMiddleware
+from core.config import settings
+from core.database import WRITE_LSN_HEADER, WriteLSNMiddleware, init_db
+from core.logging import setup_logging, shutdown_logging
+from core.responses import FastJSONResponse
+from services import regex_sandbox, scheduler
+
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     setup_logging()
     init_db()
+    try:
+        scheduler.resume_pending()
+    except Exception as e:
+        logger.warning("Could not re-queue pending executions: %s", e)
     yield
     # shutdown
+    regex_sandbox.shutdown()
+    shutdown_logging()
 
 
 APP_DESCRIPTION = """
@@ -23,14 +36,30 @@ APP_DESCRIPTION = """
 ### Phase 1 — Data & API
 - **Workflows & steps**: CRUD for workflow definitions and steps (model, prompt, completion criteria, context strategy). Workflows are immutable once they have runs.
 - **Executions**: List, get by id, get attempts. Poll GET /executions/{id} for run status.
+- **Lightweight polling**: `?view=summary` on GET /executions/{id} and /attempts returns metadata and body sizes only; fetch a body with GET /executions/{id}/attempts/{attempt_id}/prompt|response (supports `Range: bytes=`).
+- **Cancel**: POST /executions/{id}/cancel stops a pending/running run (aborts the in-flight LLM call; works across processes).
+- **Versions**: POST /workflows/{id}/versions creates an editable copy that shares unchanged steps; GET /workflows lists the latest version of each workflow.
+- **Bulk steps**: PUT /workflows/{id}/steps replaces the whole ordered step list in one transaction.
+- **Budgets**: optional workflow deadline, token and cost budgets and per-step timeouts; runs that exceed them fail with a distinct failure_reason.
+- **Routing**: steps can name fallback models and route attempts to the first healthy or fastest one; each attempt records the model that served it.
+- **Hedging**: opt-in per step; a backup request is sent when an attempt exceeds a latency percentile, and the loser is aborted.
+- **Candidates**: steps can request several completions per LLM call and keep the first that passes.
+- **Generation parameters**: steps can set max_tokens, temperature, top_p, stop sequences and response_format, checked against each of the step's models when saved.
+- **Stats**: GET /workflows/{id}/stats and GET /stats read incrementally maintained rollups (pass rates, tokens, p50/p95 durations).
+- **Scheduling**: runs carry a priority and tenant; a per-process queue admits interactive runs first and shares the concurrency cap fairly across tenants; runs still pending at startup are re-queued. GET /executions/{id} shows queue position and estimated start.
+- **Timings**: attempts record LLM time-to-first-byte, total LLM time, criteria time and DB write time; executions record queue wait and per-step wall time.
+- **Compression**: JSON responses over `COMPRESSION_MIN_BYTES` are brotli- or gzip-encoded per `Accept-Encoding`.
+- **SQLite**: `DATABASE_URL=sqlite:///file.db` runs on an embedded SQLite database (WAL, single writer thread) instead of PostgreSQL; same API and behaviour.
+- **Read replica**: with `DATABASE_READ_URL`, GET requests read from a replica while it keeps up; clients echo `X-Write-LSN` as `X-Min-LSN` to read their own writes.
+- **Export**: GET /executions/export streams NDJSON or CSV (filter by workflow_id, since/until) from a server-side cursor; gzip when accepted.
 
 ### Phase 2 — LLM & criteria (internal)
-- **Unbound integration**: Internal service calls the Unbound chat completions API (model, messages, max_tokens, temperature). No public "run step" endpoint.
-- **Completion criteria**: Rule-based evaluation of LLM output — `contains_string`, `regex`, `has_code_block`, `valid_json`. Returns pass/fail + reason.
+- **Unbound integration**: Internal service calls the Unbound chat completions API (model, messages and the step's generation parameters). No public "run step" endpoint.
+- **Completion criteria**: Rule-based evaluation of LLM output — `contains_string`, `regex`, `has_code_block`, `valid_json`. Returns pass/fail + reason. Regexes run in worker processes under a time limit (or with RE2), and risky patterns are rejected when a step is saved.
 
 ### Phase 3 — Execution engine
-- **POST /workflows/{id}/execute**: Start a run (returns execution_id immediately; run continues in background). Guard: 409 if a run is already in progress.
-- **Executor**: Sequential steps, context passing (full or truncate_chars), retries per step (max 3), every attempt persisted. GET /executions/{id} and GET /executions/{id}/attempts for polling.
+- **POST /workflows/{id}/execute**: Start a run (returns execution_id immediately; run continues in background). Guard: 409 if a run is already queued or in progress.
+- **Executor**: Sequential steps, context passing (full, truncate_chars, json_path, code_block, regex_group, last_n_steps), retries per step (max 3), every attempt persisted. GET /executions/{id} and GET /executions/{id}/attempts for polling.
 """
 
 app = FastAPI(
@@ -38,6 +67,7 @@ app = FastAPI(
     description=APP_DESCRIPTION.strip(),
     version="0.2.0",
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 app.add_middleware(
@@ -46,10 +76,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[WRITE_LSN_HEADER],
 )
+app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_min_bytes)
+app.add_middleware(WriteLSNMiddleware)
 
 app.include_router(workflows_router)
 app.include_router(executions_router)
+app.include_router(stats_router)
 
 
 @app.get("/health")
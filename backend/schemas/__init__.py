@@ -5,14 +5,28 @@ from schemas.workflow import (
     WorkflowList,
     WorkflowUpdate,
     StepCreate,
+    StepBulkReplace,
     StepRead,
     StepUpdate,
 )
 from schemas.execution import (
     WorkflowExecutionRead,
     StepAttemptRead,
+    StepAttemptSummary,
+    StepTiming,
+    WorkflowExecutionSummary,
     ExecutionListItem,
+    ExecuteRequest,
     ExecuteResponse,
+    CancelResponse,
+)
+from schemas.stats import (
+    StepModelStats,
+    ModelStats,
+    RunStats,
+    WorkflowStats,
+    GlobalStats,
+    ModelHealth,
 )
 
 __all__ = [
@@ -21,10 +35,22 @@ __all__ = [
     "WorkflowList",
     "WorkflowUpdate",
     "StepCreate",
+    "StepBulkReplace",
     "StepRead",
     "StepUpdate",
     "WorkflowExecutionRead",
     "StepAttemptRead",
+    "StepAttemptSummary",
+    "StepTiming",
+    "WorkflowExecutionSummary",
     "ExecutionListItem",
+    "ExecuteRequest",
     "ExecuteResponse",
+    "CancelResponse",
+    "StepModelStats",
+    "ModelStats",
+    "RunStats",
+    "WorkflowStats",
+    "GlobalStats",
+    "ModelHealth",
 ]
@@ -1,7 +1,9 @@
 """Pydantic schemas for execution API I/O."""
 from datetime import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from utils.enums import ExecutionPriority
 
 
 class StepAttemptRead(BaseModel):
@@ -16,11 +18,52 @@ class StepAttemptRead(BaseModel):
     failure_reason: str | None
     tokens_used: int | None
     created_at: datetime
+    model: str | None = None  # model that served the attempt
+    is_hedge: bool = False  # backup request of a hedged attempt (same attempt_number)
+    # Timings in ms (monotonic clock): response headers, whole LLM request, criteria evaluation,
+    # and this attempt's DB writes other than the one storing these values
+    ttfb_ms: float | None = None
+    llm_ms: float | None = None
+    criteria_ms: float | None = None
+    db_write_ms: float | None = None
+    context_bytes: int | None = None  # size of the previous steps' context within the prompt
 
     class Config:
         from_attributes = True
 
 
+class StepAttemptSummary(BaseModel):
+    """Attempt metadata without bodies. Fetch bodies via /attempts/{id}/prompt|response."""
+    id: int
+    step_id: int
+    attempt_number: int
+    status: str
+    criteria_passed: bool | None
+    failure_reason: str | None
+    tokens_used: int | None
+    created_at: datetime
+    model: str | None = None  # model that served the attempt
+    is_hedge: bool = False  # backup request of a hedged attempt (same attempt_number)
+    prompt_bytes: int | None
+    response_bytes: int | None
+    # Timings in ms, as on StepAttemptRead
+    ttfb_ms: float | None = None
+    llm_ms: float | None = None
+    criteria_ms: float | None = None
+    db_write_ms: float | None = None
+    context_bytes: int | None = None  # size of the previous steps' context within the prompt
+
+    class Config:
+        from_attributes = True
+
+
+class StepTiming(BaseModel):
+    """Wall-clock time of one step of a run, first attempt start to pass/fail (monotonic clock)."""
+    step_index: int
+    step_id: int
+    wall_ms: float
+
+
 class WorkflowExecutionRead(BaseModel):
     """Execution status and attempts."""
     id: int
@@ -29,12 +72,46 @@ class WorkflowExecutionRead(BaseModel):
     current_step_index: int | None
     started_at: datetime | None
     finished_at: datetime | None
+    failure_reason: str | None = None
+    tokens_used: int = 0
+    cost_usd: float = 0.0
+    priority: str = ExecutionPriority.BATCH.value
+    tenant: str | None = None
+    # While pending in this process's scheduler queue (services.scheduler): 0 = starts next
+    queue_position: int | None = None
+    estimated_start_at: datetime | None = None
+    queue_wait_ms: float | None = None  # execute request to run start
+    step_timings: list[StepTiming] = []
     step_attempts: list[StepAttemptRead] = []
 
     class Config:
         from_attributes = True
 
 
+class WorkflowExecutionSummary(BaseModel):
+    """Execution status and attempt metadata (?view=summary)."""
+    id: int
+    workflow_id: int
+    status: str
+    current_step_index: int | None
+    started_at: datetime | None
+    finished_at: datetime | None
+    failure_reason: str | None = None
+    tokens_used: int = 0
+    cost_usd: float = 0.0
+    priority: str = ExecutionPriority.BATCH.value
+    tenant: str | None = None
+    # While pending in this process's scheduler queue (services.scheduler): 0 = starts next
+    queue_position: int | None = None
+    estimated_start_at: datetime | None = None
+    queue_wait_ms: float | None = None  # execute request to run start
+    step_timings: list[StepTiming] = []
+    step_attempts: list[StepAttemptSummary] = []
+
+    class Config:
+        from_attributes = True
+
+
 class ExecutionListItem(BaseModel):
     """Execution list item."""
     id: int
@@ -42,11 +119,26 @@ class ExecutionListItem(BaseModel):
     status: str
     started_at: datetime | None
     finished_at: datetime | None
+    failure_reason: str | None = None
+    tokens_used: int = 0
+    cost_usd: float = 0.0
 
     class Config:
         from_attributes = True
 
 
+class ExecuteRequest(BaseModel):
+    """Optional body of POST /workflows/{id}/execute."""
+    priority: ExecutionPriority = ExecutionPriority.BATCH
+    tenant: str | None = Field(None, max_length=64, description="Owner/team key for fair sharing of run slots")
+
+
 class ExecuteResponse(BaseModel):
     """Response from POST /workflows/{id}/execute."""
     execution_id: int
+
+
+class CancelResponse(BaseModel):
+    """Response from POST /executions/{id}/cancel."""
+    execution_id: int
+    status: str
@@ -0,0 +1,65 @@
+"""Pydantic schemas for analytics (rollup) endpoints."""
+from pydantic import BaseModel
+
+
+class StepModelStats(BaseModel):
+    """Attempt rollup for one (step, model) pair."""
+    step_id: int
+    model: str
+    attempts: int
+    passed: int
+    failed: int
+    errors: int
+    pass_rate: float | None
+    tokens_used: int
+    duration_p50_ms: float | None
+    duration_p95_ms: float | None
+
+
+class ModelStats(BaseModel):
+    """Attempt rollup for one model across all workflows."""
+    model: str
+    attempts: int
+    passed: int
+    failed: int
+    errors: int
+    pass_rate: float | None
+    tokens_used: int
+    duration_p50_ms: float | None
+    duration_p95_ms: float | None
+
+
+class RunStats(BaseModel):
+    """Run (execution) rollup."""
+    runs: int = 0
+    completed: int = 0
+    failed: int = 0
+    success_rate: float | None = None
+    duration_p50_ms: float | None = None
+    duration_p95_ms: float | None = None
+
+
+class WorkflowStats(BaseModel):
+    """GET /workflows/{id}/stats."""
+    workflow_id: int
+    runs: RunStats
+    tokens_used: int
+    steps: list[StepModelStats] = []
+
+
+class GlobalStats(BaseModel):
+    """GET /stats."""
+    workflows: int
+    runs: RunStats
+    tokens_used: int
+    models: list[ModelStats] = []
+
+
+class ModelHealth(BaseModel):
+    """Rolling health of one model in this API process (GET /stats/models/health)."""
+    model: str
+    samples: int
+    error_rate: float | None
+    p50_ms: float | None
+    p95_ms: float | None
+    healthy: bool
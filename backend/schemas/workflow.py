@@ -2,9 +2,31 @@
 from datetime import datetime
 from typing import Any
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator, model_validator
 
-from utils.enums import ContextStrategy
+from services.context import lint_context
+from services.criteria import lint_criteria
+from services.generation import MAX_STOP_SEQUENCES, lint_generation
+from utils.enums import ContextStrategy, RoutingPolicy
+
+MAX_FALLBACK_MODELS = 5
+# Candidates per request count against the executor's 3 attempts per step
+MAX_CANDIDATES = 3
+
+
+def _validate_fallback_models(models: list[str]) -> list[str]:
+    if any(not m or len(m) > 64 for m in models):
+        raise ValueError("fallback model names must be 1-64 characters")
+    if len(set(models)) != len(models):
+        raise ValueError("fallback_models must not repeat a model")
+    return models
+
+
+def _lint_criteria(criteria: dict[str, Any]) -> dict[str, Any]:
+    problem = lint_criteria(criteria)
+    if problem:
+        raise ValueError(problem)
+    return criteria
 
 
 # --- Step ---
@@ -15,11 +37,60 @@ class StepBase(BaseModel):
     prompt: str = Field(..., min_length=1)
     completion_criteria: dict[str, Any] = Field(...)  # opaque JSON
     context_strategy: ContextStrategy = ContextStrategy.FULL
+    context_config: dict[str, Any] = Field(default_factory=dict)  # options of context_strategy
+    timeout_seconds: float | None = Field(None, gt=0)  # wall clock for all attempts of this step
+    fallback_models: list[str] = Field(default_factory=list, max_length=MAX_FALLBACK_MODELS)
+    routing_policy: RoutingPolicy = RoutingPolicy.ORDERED
+    # Latency percentile (e.g. 0.95) after which an attempt sends a backup request; None = no hedging
+    hedge_percentile: float | None = Field(None, ge=0.5, lt=1)
+    # Completions per LLM call (n); the first that passes the criteria is kept
+    candidates: int = Field(1, ge=1, le=MAX_CANDIDATES)
+    # Generation parameters sent with every request of the step; None = default (services.generation)
+    max_tokens: int | None = Field(None, ge=1)
+    temperature: float | None = Field(None, ge=0, le=2)
+    top_p: float | None = Field(None, gt=0, le=1)
+    stop: list[str] = Field(default_factory=list, max_length=MAX_STOP_SEQUENCES)
+    response_format: dict[str, Any] | None = None  # {"type": "json_object"} etc.
+
+    @field_validator("fallback_models")
+    @classmethod
+    def _check_fallbacks(cls, v: list[str]) -> list[str]:
+        return _validate_fallback_models(v)
 
 
 class StepCreate(StepBase):
-    """Create step request."""
-    pass
+    """
+    Create step request. Regex criteria, context options and generation parameters (per model) are
+    linted here, not on StepRead, so stored steps always load.
+    """
+
+    @field_validator("completion_criteria")
+    @classmethod
+    def _check_criteria(cls, v: dict[str, Any]) -> dict[str, Any]:
+        return _lint_criteria(v)
+
+    @model_validator(mode="after")
+    def _check_context(self) -> "StepCreate":
+        problem = lint_context(self.context_strategy.value, self.context_config) or lint_generation(
+            [self.model, *self.fallback_models], self.max_tokens, self.temperature, self.stop, self.response_format,
+        )
+        if problem:
+            raise ValueError(problem)
+        return self
+
+
+class StepBulkReplace(BaseModel):
+    """PUT /workflows/{id}/steps: the complete ordered step list."""
+    steps: list[StepCreate]
+
+    @model_validator(mode="after")
+    def _unique_order(self) -> "StepBulkReplace":
+        seen: set[int] = set()
+        for s in self.steps:
+            if s.order_index in seen:
+                raise ValueError(f"duplicate order_index {s.order_index}")
+            seen.add(s.order_index)
+        return self
 
 
 class StepRead(StepBase):
@@ -38,12 +109,39 @@ class StepUpdate(BaseModel):
     prompt: str | None = None
     completion_criteria: dict[str, Any] | None = None
     context_strategy: ContextStrategy | None = None
+    context_config: dict[str, Any] | None = None  # checked against the resulting strategy on save
+    timeout_seconds: float | None = Field(None, gt=0)
+    fallback_models: list[str] | None = Field(None, max_length=MAX_FALLBACK_MODELS)
+    routing_policy: RoutingPolicy | None = None
+    hedge_percentile: float | None = Field(None, ge=0.5, lt=1)
+    candidates: int | None = Field(None, ge=1, le=MAX_CANDIDATES)
+    # Checked against the resulting models on save; max_tokens, temperature, top_p and
+    # response_format present in the body (even as null) are replaced
+    max_tokens: int | None = Field(None, ge=1)
+    temperature: float | None = Field(None, ge=0, le=2)
+    top_p: float | None = Field(None, gt=0, le=1)
+    stop: list[str] | None = Field(None, max_length=MAX_STOP_SEQUENCES)
+    response_format: dict[str, Any] | None = None
+
+    @field_validator("fallback_models")
+    @classmethod
+    def _check_fallbacks(cls, v: list[str] | None) -> list[str] | None:
+        return v if v is None else _validate_fallback_models(v)
+
+    @field_validator("completion_criteria")
+    @classmethod
+    def _check_criteria(cls, v: dict[str, Any] | None) -> dict[str, Any] | None:
+        return v if v is None else _lint_criteria(v)
 
 
 # --- Workflow ---
 class WorkflowBase(BaseModel):
     """Shared workflow fields."""
     name: str = Field(..., min_length=1, max_length=255)
+    # Run limits; None = unlimited
+    deadline_seconds: float | None = Field(None, gt=0)
+    token_budget: int | None = Field(None, gt=0)
+    cost_budget_usd: float | None = Field(None, gt=0)
 
 
 class WorkflowCreate(WorkflowBase):
@@ -56,6 +154,9 @@ class WorkflowRead(WorkflowBase):
     id: int
     created_at: datetime
     updated_at: datetime
+    root_id: int | None = None  # lineage id shared by all versions (id of the first version)
+    parent_id: int | None = None  # version this one was created from
+    version: int = 1
     steps: list[StepRead] = []
 
     class Config:
@@ -63,17 +164,23 @@ class WorkflowRead(WorkflowBase):
 
 
 class WorkflowList(BaseModel):
-    """Workflow list item (no steps)."""
+    """Workflow list item (no steps). GET /workflows lists the latest version of each workflow."""
     id: int
     name: str
     created_at: datetime
     updated_at: datetime
     step_count: int = 0
+    root_id: int | None = None
+    version: int = 1
+    versions: int = 1
 
     class Config:
         from_attributes = True
 
 
 class WorkflowUpdate(BaseModel):
-    """Partial workflow update."""
+    """Partial workflow update. Budget fields present in the body (even as null) are replaced."""
     name: str | None = None
+    deadline_seconds: float | None = Field(None, gt=0)
+    token_budget: int | None = Field(None, gt=0)
+    cost_budget_usd: float | None = Field(None, gt=0)
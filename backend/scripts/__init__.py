@@ -0,0 +1 @@
+# Maintenance commands. Run from backend/: python -m scripts.partitions --help
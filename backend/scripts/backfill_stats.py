@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Rebuild the analytics rollups (stats_step_model, stats_workflow_runs) from history.
+
+Run from backend/ once after applying the stats tables, or any time the rollups drift:
+    python -m scripts.backfill_stats
+
+Locks the rollup tables for the duration; executors that finish attempts meanwhile wait.
+Attempts recorded before durations were tracked count towards totals but not percentiles.
+"""
+import sys
+from pathlib import Path
+
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+from core.database import get_connection, return_connection
+from core import db_pg
+from core.logging import setup_logging
+
+
+def main() -> int:
+    conn = get_connection()
+    try:
+        db_pg.stats_backfill(conn)
+        workflows = db_pg.stats_workflow_runs_list(conn)
+        rows = db_pg.stats_step_model_list(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        return_connection(conn)
+    print(f"Backfilled {len(rows)} step/model rows and {len(workflows)} workflow run rows.")
+    return 0
+
+
+if __name__ == "__main__":
+    setup_logging()
+    sys.exit(main())
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Partition maintenance for workflow_executions / step_attempts (monthly partitions).
+
+Run from backend/:
+    python -m scripts.partitions ensure [--months-ahead 2]
+    python -m scripts.partitions retain --keep-months 6 [--archive-dir archive/] [--dry-run]
+    python -m scripts.partitions restore --archive-dir archive/ --execution-id 42 [--execution-id 43]
+    python -m scripts.partitions restore --archive-dir archive/ --month 2026-01
+
+retain: every month partition older than --keep-months is dumped to
+<archive-dir>/<YYYY_MM>/{workflow_executions,step_attempts}.csv.gz (+ manifest.json) and then
+dropped. Without --archive-dir old months are dropped without a copy.
+
+restore: re-creates the month partition and loads archived rows back, either whole months or
+only the given executions (with their attempts). A restored month is older than the retention
+window, so the next `retain` run drops it again unless --keep-months is raised.
+
+COPY has no stored-function equivalent, so this is the one place that builds SQL in Python
+(partition names come from partition_list_months()).
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import logging
+import sys
+from datetime import date
+from pathlib import Path
+
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+from psycopg2 import sql
+
+from core.config import settings
+from core.database import get_connection, return_connection
+from core import db_pg
+from core.logging import setup_logging
+from utils.time import utc_now
+
+logger = logging.getLogger("scripts.partitions")
+
+EXECUTIONS_FILE = "workflow_executions.csv.gz"
+ATTEMPTS_FILE = "step_attempts.csv.gz"
+MANIFEST_FILE = "manifest.json"
+
+
+def _month_cutoff(keep_months: int) -> date:
+    """First day of the oldest month to keep (current month counts as one)."""
+    today = utc_now().date()
+    total = today.year * 12 + (today.month - 1) - (keep_months - 1)
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def _parse_month(value: str) -> date:
+    year, month = value.split("-")
+    return date(int(year), int(month), 1)
+
+
+def _copy_out(conn, table: str, path: Path) -> int:
+    """COPY one partition to a gzip CSV file. Returns the number of rows written."""
+    with conn.cursor() as cur, gzip.open(path, "wb") as f:
+        cur.copy_expert(
+            sql.SQL("COPY {} TO STDOUT WITH (FORMAT csv, HEADER)").format(sql.Identifier(table)),
+            f,
+        )
+        return cur.rowcount
+
+
+def archive_month(conn, row: dict, archive_dir: Path) -> dict:
+    month_dir = archive_dir / row["month"].strftime("%Y_%m")
+    month_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {
+        "month": row["month"].isoformat(),
+        "archived_at": utc_now().isoformat(),
+        "workflow_executions": _copy_out(conn, row["executions_table"], month_dir / EXECUTIONS_FILE),
+        "step_attempts": _copy_out(conn, row["attempts_table"], month_dir / ATTEMPTS_FILE),
+    }
+    (month_dir / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def cmd_ensure(args) -> int:
+    conn = get_connection()
+    try:
+        db_pg.partition_ensure_upcoming(conn, args.months_ahead)
+        conn.commit()
+        for row in db_pg.partition_list_months(conn):
+            print(f"  {row['month']:%Y-%m}  {row['executions_table']}  {row['attempts_table']}")
+        conn.commit()
+    finally:
+        return_connection(conn)
+    return 0
+
+
+def cmd_retain(args) -> int:
+    cutoff = _month_cutoff(args.keep_months)
+    archive_dir = Path(args.archive_dir) if args.archive_dir else None
+    conn = get_connection()
+    try:
+        months = db_pg.partition_list_months(conn, cutoff)
+        conn.commit()
+        if not months:
+            print(f"Nothing older than {cutoff:%Y-%m}.")
+            return 0
+        for row in months:
+            label = f"{row['month']:%Y-%m}"
+            if args.dry_run:
+                print(f"  would {'archive and ' if archive_dir else ''}drop {label}")
+                continue
+            if archive_dir:
+                manifest = archive_month(conn, row, archive_dir)
+                print(f"  archived {label}: {manifest['workflow_executions']} executions, "
+                      f"{manifest['step_attempts']} attempts")
+            # Archive is on disk before the drop; each month commits on its own
+            db_pg.partition_drop_month(conn, row["month"])
+            conn.commit()
+            print(f"  dropped {label}")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        return_connection(conn)
+    return 0
+
+
+def _copy_in(conn, table: str, header: list[str], data) -> None:
+    with conn.cursor() as cur:
+        cur.copy_expert(
+            sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv, HEADER)").format(
+                sql.Identifier(table), sql.SQL(", ").join(map(sql.Identifier, header)),
+            ),
+            data,
+        )
+
+
+def _filtered_csv(path: Path, column: str, keep: set[str]) -> tuple[list[str], io.StringIO, set[str]]:
+    """Rows of an archived CSV whose `column` is in keep. Returns (header, csv buffer, matched ids)."""
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    matched: set[str] = set()
+    with gzip.open(path, "rt", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        idx = header.index(column)
+        writer.writerow(header)
+        for rec in reader:
+            if rec[idx] in keep:
+                writer.writerow(rec)
+                matched.add(rec[idx])
+    out.seek(0)
+    return header, out, matched
+
+
+def _header(path: Path) -> list[str]:
+    with gzip.open(path, "rt", newline="") as f:
+        return next(csv.reader(f))
+
+
+def cmd_restore(args) -> int:
+    archive_dir = Path(args.archive_dir)
+    if args.month:
+        month_dirs = [archive_dir / _parse_month(m).strftime("%Y_%m") for m in args.month]
+    else:
+        month_dirs = sorted(p for p in archive_dir.iterdir() if (p / MANIFEST_FILE).exists())
+    wanted = {str(i) for i in args.execution_id or []}
+    if not wanted and not args.month:
+        print("Pass --execution-id and/or --month.")
+        return 2
+
+    conn = get_connection()
+    try:
+        for month_dir in month_dirs:
+            manifest = json.loads((month_dir / MANIFEST_FILE).read_text())
+            month = date.fromisoformat(manifest["month"])
+            if wanted:
+                ex_header, ex_rows, found = _filtered_csv(month_dir / EXECUTIONS_FILE, "id", wanted)
+                if not found:
+                    continue
+                at_header, at_rows, _ = _filtered_csv(month_dir / ATTEMPTS_FILE, "workflow_execution_id", found)
+            else:
+                found = None
+                ex_header, ex_rows = _header(month_dir / EXECUTIONS_FILE), gzip.open(month_dir / EXECUTIONS_FILE, "rb")
+                at_header, at_rows = _header(month_dir / ATTEMPTS_FILE), gzip.open(month_dir / ATTEMPTS_FILE, "rb")
+            try:
+                db_pg.partition_ensure_month(conn, month)
+                _copy_in(conn, "workflow_executions", ex_header, ex_rows)
+                _copy_in(conn, "step_attempts", at_header, at_rows)
+                conn.commit()
+            finally:
+                ex_rows.close()
+                at_rows.close()
+            what = f"executions {', '.join(sorted(found, key=int))}" if found else "all executions"
+            print(f"  restored {what} from {month:%Y-%m}")
+            if wanted:
+                wanted -= found
+                if not wanted:
+                    break
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        return_connection(conn)
+    if wanted:
+        print(f"  not found in archive: {', '.join(sorted(wanted, key=int))}")
+        return 1
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m scripts.partitions", description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("ensure", help="Create partitions for the current and upcoming months")
+    p.add_argument("--months-ahead", type=int, default=2)
+    p.set_defaults(func=cmd_ensure)
+
+    p = sub.add_parser("retain", help="Archive (optional) and drop month partitions past retention")
+    p.add_argument("--keep-months", type=int, required=True, help="Months to keep, including the current one")
+    p.add_argument("--archive-dir", help="Write gzip CSVs here before dropping; omit to drop only")
+    p.add_argument("--dry-run", action="store_true")
+    p.set_defaults(func=cmd_retain)
+
+    p = sub.add_parser("restore", help="Load archived executions back into the database")
+    p.add_argument("--archive-dir", required=True)
+    p.add_argument("--execution-id", type=int, action="append", help="Repeatable; restores only these executions")
+    p.add_argument("--month", action="append", help="YYYY-MM; repeatable. Restores the whole month unless --execution-id is given")
+    p.set_defaults(func=cmd_restore)
+
+    args = parser.parse_args(argv)
+    if settings.database_is_sqlite:
+        parser.error("month partitions exist only on PostgreSQL; SQLite tables are not partitioned")
+    if getattr(args, "keep_months", 1) < 1:
+        parser.error("--keep-months must be >= 1")
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    setup_logging()
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Per-run limits: workflow deadline, per-step timeout, token budget and cost budget.
+
+Deadlines use time.monotonic(). The executor asks the budget how long the next LLM call may take
+(timeout_for), whether a retry can still finish in time (can_retry), and charges each attempt's
+usage (charge). Every limit that trips raises BudgetExceeded with its ExecutionFailureReason.
+"""
+import time
+
+from services.pricing import cost_for_tokens
+from utils.enums import ExecutionFailureReason
+
+# Don't start an attempt with less time than this left; it would only time out
+MIN_ATTEMPT_SECONDS = 1.0
+
+
+class BudgetExceeded(Exception):
+    """A deadline or budget ran out. reason is stored on the execution."""
+
+    def __init__(self, reason: ExecutionFailureReason, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class ExecutionBudget:
+    """Limits of one run (None = unlimited) and what it has consumed so far."""
+
+    def __init__(
+        self,
+        deadline_seconds: float | None = None,
+        token_budget: int | None = None,
+        cost_budget_usd: float | None = None,
+    ):
+        now = time.monotonic()
+        self.run_deadline = now + deadline_seconds if deadline_seconds else None
+        self.token_budget = token_budget
+        self.cost_budget_usd = float(cost_budget_usd) if cost_budget_usd is not None else None
+        self.tokens_used = 0
+        self.cost_usd = 0.0
+        self.step_deadline: float | None = None
+
+    @classmethod
+    def for_workflow(cls, workflow: dict) -> "ExecutionBudget":
+        return cls(workflow.get("deadline_seconds"), workflow.get("token_budget"), workflow.get("cost_budget_usd"))
+
+    def start_step(self, timeout_seconds: float | None) -> None:
+        """Start the clock for a step's own timeout (covers all of its attempts)."""
+        self.step_deadline = time.monotonic() + timeout_seconds if timeout_seconds else None
+
+    def _nearest_deadline(self) -> tuple[float | None, ExecutionFailureReason]:
+        if self.step_deadline is not None and (self.run_deadline is None or self.step_deadline < self.run_deadline):
+            return self.step_deadline, ExecutionFailureReason.STEP_DEADLINE_EXCEEDED
+        return self.run_deadline, ExecutionFailureReason.DEADLINE_EXCEEDED
+
+    def remaining_seconds(self) -> float | None:
+        deadline, _ = self._nearest_deadline()
+        return None if deadline is None else deadline - time.monotonic()
+
+    def check(self) -> None:
+        """Raise BudgetExceeded if any limit is already used up."""
+        deadline, reason = self._nearest_deadline()
+        if deadline is not None and time.monotonic() >= deadline:
+            raise BudgetExceeded(reason, "Deadline reached")
+        if self.token_budget is not None and self.tokens_used >= self.token_budget:
+            raise BudgetExceeded(
+                ExecutionFailureReason.TOKEN_BUDGET_EXCEEDED,
+                f"Token budget exhausted ({self.tokens_used}/{self.token_budget})",
+            )
+        if self.cost_budget_usd is not None and self.cost_usd >= self.cost_budget_usd:
+            raise BudgetExceeded(
+                ExecutionFailureReason.COST_BUDGET_EXCEEDED,
+                f"Cost budget exhausted (${self.cost_usd:.4f}/${self.cost_budget_usd:.4f})",
+            )
+
+    def timeout_for(self, default_seconds: float) -> float:
+        """Timeout for the next LLM call: the default, capped by the nearest deadline."""
+        remaining = self.remaining_seconds()
+        if remaining is None:
+            return default_seconds
+        if remaining < MIN_ATTEMPT_SECONDS:
+            _, reason = self._nearest_deadline()
+            raise BudgetExceeded(reason, f"Deadline reached ({remaining:.1f}s left, need {MIN_ATTEMPT_SECONDS}s)")
+        return min(default_seconds, remaining)
+
+    def can_retry(self, last_attempt_seconds: float) -> bool:
+        """False when the time left is shorter than the previous attempt took."""
+        remaining = self.remaining_seconds()
+        return remaining is None or remaining >= max(last_attempt_seconds, MIN_ATTEMPT_SECONDS)
+
+    def max_tokens_for(self, default_max_tokens: int) -> int:
+        """Cap completion length at the tokens left in the budget."""
+        if self.token_budget is None:
+            return default_max_tokens
+        return max(1, min(default_max_tokens, self.token_budget - self.tokens_used))
+
+    def deadline_reason(self) -> ExecutionFailureReason:
+        return self._nearest_deadline()[1]
+
+    def charge(self, model: str, tokens_used: int | None) -> float:
+        """Record one attempt's usage. Returns its cost in USD."""
+        cost = cost_for_tokens(model, tokens_used)
+        self.tokens_used += tokens_used or 0
+        self.cost_usd += cost
+        return cost
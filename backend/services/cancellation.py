@@ -0,0 +1,111 @@
+"""
+Cooperative cancellation for running executions.
+
+The source of truth is workflow_executions.cancel_requested_at, so a cancel issued by any API
+process reaches the executor wherever it runs. Each process keeps a registry of the executions it
+is running; one watcher thread polls execution_cancel_requested() for all of them every
+CANCEL_POLL_SECONDS and sets their tokens. Cancels issued in the same process set the token directly.
+(Polling rather than LISTEN/NOTIFY: Supabase's transaction pooler does not support LISTEN.)
+"""
+import logging
+import threading
+import time
+
+from core.database import get_connection, return_connection
+from core import db_pg
+
+logger = logging.getLogger(__name__)
+
+CANCEL_POLL_SECONDS = 1.0
+
+
+class ExecutionCancelled(Exception):
+    """Raised inside the executor when its execution has been cancelled."""
+
+
+class CancelToken:
+    """Set once; checked between attempts and polled while an LLM request is in flight."""
+
+    def __init__(self, execution_id: int, parent: "CancelToken | None" = None):
+        self.execution_id = execution_id
+        self.parent = parent
+        self._event = threading.Event()
+
+    def child(self) -> "CancelToken":
+        """Token for one request: cancelled with the execution, or on its own (e.g. a lost hedge)."""
+        return CancelToken(self.execution_id, parent=self)
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    def is_cancelled(self) -> bool:
+        return self._event.is_set() or (self.parent is not None and self.parent.is_cancelled())
+
+    def wait(self, timeout: float) -> bool:
+        """Sleep up to timeout; returns True early if this token (not its parent) is cancelled."""
+        return self._event.wait(timeout)
+
+    def raise_if_cancelled(self) -> None:
+        if self.is_cancelled():
+            raise ExecutionCancelled(f"Execution {self.execution_id} cancelled")
+
+
+_tokens: dict[int, CancelToken] = {}
+_lock = threading.Lock()
+_watcher: threading.Thread | None = None
+
+
+def register(execution_id: int) -> CancelToken:
+    """Track a run owned by this process. Pair with unregister() in a finally block."""
+    global _watcher
+    token = CancelToken(execution_id)
+    with _lock:
+        _tokens[execution_id] = token
+        if _watcher is None or not _watcher.is_alive():
+            _watcher = threading.Thread(target=_watch, name="cancel-watcher", daemon=True)
+            _watcher.start()
+    return token
+
+
+def unregister(execution_id: int) -> None:
+    with _lock:
+        _tokens.pop(execution_id, None)
+
+
+def signal(execution_id: int) -> bool:
+    """Fast path for cancels issued in this process. Returns True if the run is local."""
+    with _lock:
+        token = _tokens.get(execution_id)
+    if token:
+        token.cancel()
+    return token is not None
+
+
+def _poll_once() -> None:
+    with _lock:
+        ids = [i for i, t in _tokens.items() if not t.is_cancelled()]
+    if not ids:
+        return
+    conn = get_connection()
+    try:
+        cancelled = db_pg.execution_cancel_requested(conn, ids)
+        conn.commit()
+    finally:
+        return_connection(conn)
+    for execution_id in cancelled:
+        signal(execution_id)
+
+
+def _watch() -> None:
+    """Runs while this process has registered executions; exits when idle (restarted by register())."""
+    global _watcher
+    while True:
+        with _lock:
+            if not _tokens:
+                _watcher = None
+                return
+        try:
+            _poll_once()
+        except Exception as e:
+            logger.warning("Cancel watcher poll failed: %s", e)
+        time.sleep(CANCEL_POLL_SECONDS)
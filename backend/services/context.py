@@ -1,23 +1,222 @@
-"""Context extraction from previous step output. Full or truncate only."""
+"""
+Context extraction: what a step forwards to the next step's prompt, per its context_strategy and
+context_config.
+
+- full: the whole response.
+- truncate_chars: the first max_chars characters (default TRUNCATE_CHARS_LIMIT).
+- json_path: one value from the JSON in the response, e.g. {"path": "$.result.items[0].name"}.
+  The JSON is the whole response, else its first parseable object/array (fenced blocks included)
+  among the first MAX_JSON_CANDIDATES places one could start.
+- code_block: the body of a fenced code block, {"language": "python", "index": -1} (optional;
+  default the first block of any language).
+- regex_group: one capture group of the first match, {"pattern": "...", "group": 1 or "name"};
+  runs in the regex sandbox like regex criteria (or on RE2 with "engine": "re2").
+- last_n_steps: the last n step responses (this one included) merged with template, e.g.
+  {"n": 2, "template": "Plan:\\n{step_1}\\n\\nReview:\\n{previous}"}. {step_<i>} is the response of
+  the i-th step (1-based position), {previous} the latest; without a template each response is
+  listed under a "--- Step i ---" header.
+
+json_path, code_block and regex_group fall back to truncate_chars when nothing matches, so the next
+step never silently loses its input.
+"""
+import json
+import logging
+import re
+from typing import Any
+
+from core.config import settings
+from services import regex_sandbox
+from services.criteria import lint_regex, re2
 from utils.enums import ContextStrategy
 
-# Hardcoded limit for truncate_chars (no config in UI yet)
+logger = logging.getLogger(__name__)
+
 TRUNCATE_CHARS_LIMIT = 4000
+DEFAULT_LAST_N = 2
+MAX_LAST_N = 20
+
+_PATH_TOKEN = re.compile(r"\[(-?\d+)\]|\[['\"]([^'\"]+)['\"]\]|\.?([^.\[\]]+)")
+_CODE_BLOCK = re.compile(r"```[ \t]*([\w+#.-]*)[^\n]*\n(.*?)```", re.DOTALL)
+_TEMPLATE_FIELD = re.compile(r"\{(step_(\d+)|previous)\}")
+# Where an embedded JSON object/array can start: "{" before a key or "}", "[" before a value or "]"
+_JSON_START = re.compile(r'\{\s*["}]|\[\s*[-\d"{\[\]tfnNI]')
+# Each failed decode costs up to O(len(text)) (scanning, and the error's line/column), so only
+# this many candidates are tried: linear, not quadratic, on text full of brackets
+MAX_JSON_CANDIDATES = 32
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars] + "\n\n[... truncated]"
+
+
+def _parse_path(path: str) -> list[str | int] | None:
+    path = path.strip()
+    if path.startswith("$"):
+        path = path[1:]
+    keys: list[str | int] = []
+    pos = 0
+    while pos < len(path):
+        m = _PATH_TOKEN.match(path, pos)
+        if not m or m.end() == pos:
+            return None
+        index, quoted, name = m.groups()
+        keys.append(int(index) if index is not None else quoted if quoted is not None else name)
+        pos = m.end()
+    return keys
+
+
+def _find_json(text: str) -> Any:
+    """The whole text as JSON, else the first object/array that parses. Raises ValueError if none."""
+    # RecursionError: nesting deeper than the C decoder's limit
+    try:
+        return json.loads(text)
+    except (json.JSONDecodeError, RecursionError):
+        pass
+    scan_once = json.JSONDecoder().scan_once
+    for attempt, m in enumerate(_JSON_START.finditer(text)):
+        if attempt == MAX_JSON_CANDIDATES:
+            break
+        try:
+            return scan_once(text, m.start())[0]
+        except (StopIteration, json.JSONDecodeError, RecursionError):
+            continue
+    raise ValueError("no JSON found")
+
 
+def _json_path(text: str, path: str) -> str | None:
+    keys = _parse_path(path)
+    if keys is None:
+        return None
+    try:
+        value = _find_json(text)
+    except ValueError:
+        return None
+    for key in keys:
+        if isinstance(value, list):
+            try:
+                value = value[int(key)]
+            except (ValueError, IndexError):
+                return None
+        elif isinstance(value, dict) and str(key) in value:
+            value = value[str(key)]
+        else:
+            return None
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
 
-def extract_context(previous_output: str, strategy: str) -> str:
+
+def _code_block(text: str, language: str | None, index: int) -> str | None:
+    blocks = [
+        body for lang, body in _CODE_BLOCK.findall(text)
+        if not language or lang.lower() == language.lower()
+    ]
+    try:
+        return blocks[index].rstrip("\n")
+    except IndexError:
+        return None
+
+
+def _regex_group(text: str, pattern: str, group: int | str, engine: str) -> str | None:
+    if engine == "re2" and re2 is not None:
+        try:
+            m = re2.search("(?s)" + pattern, text)
+            return m.group(group) if m else None
+        except (IndexError, re2.error) as e:
+            logger.warning("regex_group context extraction failed: %s", e)
+            return None
+    try:
+        return regex_sandbox.search_group(
+            pattern, text, group, re.DOTALL,
+            timeout=settings.criteria_timeout_seconds, max_workers=settings.criteria_workers,
+        )
+    except (re.error, regex_sandbox.RegexTimeout, regex_sandbox.RegexWorkerError) as e:
+        logger.warning("regex_group context extraction failed: %s", e)
+        return None
+
+
+def _merge_steps(history: list[str], n: int, template: str | None) -> str:
+    first = max(len(history) - n, 0)
+    window = {i + 1: history[i].strip() for i in range(first, len(history))}
+    if not template:
+        return "\n\n".join(f"--- Step {i} ---\n{text}" for i, text in window.items())
+
+    def field(m: re.Match) -> str:
+        if m.group(1) == "previous":
+            return history[-1].strip() if history else ""
+        return window.get(int(m.group(2)), "")
+
+    return _TEMPLATE_FIELD.sub(field, template)
+
+
+def extract_context(
+    previous_output: str,
+    strategy: str,
+    config: dict[str, Any] | None = None,
+    history: list[str] | None = None,
+) -> str:
     """
     Build context string to inject into the next step's prompt.
     previous_output: raw text from the previous step's LLM response.
-    strategy: 'full' or 'truncate_chars'.
+    strategy / config: that step's context_strategy and context_config.
+    history: every step's chosen response so far, in step order (previous_output last);
+    only last_n_steps reads it.
     """
+    config = config or {}
+    if strategy == ContextStrategy.LAST_N_STEPS.value:
+        steps = history if history else [previous_output or ""]
+        n = int(config.get("n") or DEFAULT_LAST_N)
+        return _merge_steps(steps, max(1, min(n, MAX_LAST_N)), config.get("template"))
     if not previous_output:
         return ""
     text = previous_output.strip()
+    max_chars = int(config.get("max_chars") or TRUNCATE_CHARS_LIMIT)
     if strategy == ContextStrategy.FULL.value:
         return text
     if strategy == ContextStrategy.TRUNCATE_CHARS.value:
-        if len(text) <= TRUNCATE_CHARS_LIMIT:
-            return text
-        return text[:TRUNCATE_CHARS_LIMIT] + "\n\n[... truncated]"
-    return text
+        return _truncate(text, max_chars)
+
+    if strategy == ContextStrategy.JSON_PATH.value:
+        extracted = _json_path(text, str(config.get("path") or "$"))
+    elif strategy == ContextStrategy.CODE_BLOCK.value:
+        extracted = _code_block(text, config.get("language"), int(config.get("index") or 0))
+    elif strategy == ContextStrategy.REGEX_GROUP.value:
+        extracted = _regex_group(text, str(config.get("pattern") or ""), config.get("group", 1), config.get("engine") or "re")
+    else:
+        return text
+    if extracted is None:
+        logger.info("Context strategy %s found nothing; forwarding truncated response", strategy)
+        return _truncate(text, max_chars)
+    return extracted
+
+
+def lint_context(strategy: str, config: dict[str, Any]) -> str | None:
+    """Save-time checks for a step's context_config. Returns a problem description or None."""
+    if strategy == ContextStrategy.JSON_PATH.value:
+        path = config.get("path")
+        if not isinstance(path, str) or _parse_path(path) is None:
+            return "json_path requires a 'path' such as \"$.result.items[0]\""
+    elif strategy == ContextStrategy.CODE_BLOCK.value:
+        if not isinstance(config.get("index", 0), int):
+            return "code_block 'index' must be an integer"
+    elif strategy == ContextStrategy.REGEX_GROUP.value:
+        pattern = config.get("pattern")
+        if not isinstance(pattern, str) or not pattern:
+            return "regex_group requires a string 'pattern'"
+        group = config.get("group", 1)
+        if not isinstance(group, (int, str)) or isinstance(group, bool):
+            return "regex_group 'group' must be a group number or name"
+        return lint_regex(pattern, config.get("engine") or "re")
+    elif strategy == ContextStrategy.LAST_N_STEPS.value:
+        n = config.get("n", DEFAULT_LAST_N)
+        if not isinstance(n, int) or isinstance(n, bool) or not 1 <= n <= MAX_LAST_N:
+            return f"last_n_steps 'n' must be an integer from 1 to {MAX_LAST_N}"
+        template = config.get("template")
+        if template is not None and not isinstance(template, str):
+            return "last_n_steps 'template' must be a string"
+    max_chars = config.get("max_chars")
+    if max_chars is not None and (not isinstance(max_chars, int) or max_chars < 1):
+        return "'max_chars' must be a positive integer"
+    return None
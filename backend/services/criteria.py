@@ -1,8 +1,34 @@
-"""Completion criteria evaluators — rule-based, deterministic."""
+"""
+Completion criteria evaluators — rule-based, deterministic.
+
+User regexes (type "regex") never run on the executor thread. The default engine ("re") runs them
+in worker processes under settings.criteria_timeout_seconds (see services/regex_sandbox.py); a
+search that times out fails the attempt. engine "re2" uses the linear-time RE2 engine in-process
+(optional google-re2 package; no backreferences or lookaround).
+"""
 import json
 import re
 from typing import Any
 
+try:
+    import re2  # optional: pip install google-re2
+except ImportError:
+    re2 = None
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants
+    import sre_parse
+
+from core.config import settings
+from services import regex_sandbox
+
+REGEX_ENGINES = ("re", "re2")
+_REPEATS = (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT)
+# Single-character items that every iteration of a repeated group must consume
+_REQUIRED_CHAR = (sre_constants.LITERAL, sre_constants.NOT_LITERAL, sre_constants.IN, sre_constants.ANY)
+
 
 def _get_config(criteria: dict[str, Any], key: str) -> Any:
     """Read from criteria.config.key or criteria.key (supports both shapes)."""
@@ -12,6 +38,120 @@ def _get_config(criteria: dict[str, Any], key: str) -> Any:
     return criteria.get(key)
 
 
+def _has_unbounded_repeat(items) -> bool:
+    for op, av in items:
+        if op in _REPEATS:
+            if av[1] == sre_constants.MAXREPEAT or _has_unbounded_repeat(av[2]):
+                return True
+        elif op == sre_constants.SUBPATTERN:
+            if _has_unbounded_repeat(av[-1]):
+                return True
+        elif op == sre_constants.BRANCH:
+            if any(_has_unbounded_repeat(b) for b in av[1]):
+                return True
+    return False
+
+
+def _flatten_groups(items) -> list:
+    out = []
+    for op, av in items:
+        if op == sre_constants.SUBPATTERN:
+            out.extend(_flatten_groups(av[-1]))
+        else:
+            out.append((op, av))
+    return out
+
+
+def _find_nested_repeat(items) -> bool:
+    """
+    An unbounded repeat whose body holds another unbounded repeat and no required single
+    character to separate iterations, e.g. (a+)+ or (\\w+\\s?)*. (\\d+,)+ is fine: each iteration
+    must consume a comma. Atomic groups and possessive repeats never backtrack and are skipped.
+    """
+    for op, av in items:
+        if op in _REPEATS:
+            body = _flatten_groups(av[2])
+            if (
+                av[1] == sre_constants.MAXREPEAT
+                and _has_unbounded_repeat(body)
+                and not any(o in _REQUIRED_CHAR for o, _ in body)
+            ):
+                return True
+            if _find_nested_repeat(av[2]):
+                return True
+        elif op == sre_constants.SUBPATTERN:
+            if _find_nested_repeat(av[-1]):
+                return True
+        elif op == sre_constants.BRANCH:
+            if any(_find_nested_repeat(b) for b in av[1]):
+                return True
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            if _find_nested_repeat(av[1]):
+                return True
+    return False
+
+
+def lint_regex(pattern: str, engine: str = "re") -> str | None:
+    """
+    Static check run when a step is saved. Returns a problem description, or None if the pattern
+    is acceptable for the engine. The backtracking check is a heuristic (nested quantifiers).
+    """
+    if engine not in REGEX_ENGINES:
+        return f"Unknown regex engine {engine!r} (expected one of {', '.join(REGEX_ENGINES)})"
+    if engine == "re2":
+        if re2 is None:
+            return "regex engine 're2' requires the google-re2 package on the server"
+        try:
+            re2.compile(pattern)
+        except re2.error as e:
+            return f"Invalid regex for re2: {e}"
+        return None
+    try:
+        parsed = sre_parse.parse(pattern, re.DOTALL)
+    except re.error as e:
+        return f"Invalid regex: {e}"
+    if _find_nested_repeat(list(parsed)):
+        return (
+            "Regex has a nested quantifier that can backtrack catastrophically (e.g. (a+)+); "
+            "rewrite it or set \"engine\": \"re2\""
+        )
+    return None
+
+
+def lint_criteria(completion_criteria: dict[str, Any]) -> str | None:
+    """Save-time checks for completion_criteria; currently regex patterns only."""
+    if completion_criteria.get("type") != "regex":
+        return None
+    pattern = _get_config(completion_criteria, "pattern")
+    if not isinstance(pattern, str):
+        return "regex requires a string 'pattern'"
+    return lint_regex(pattern, _get_config(completion_criteria, "engine") or "re")
+
+
+def _regex_search(pattern: str, response: str, engine: str) -> tuple[bool, str | None]:
+    if engine == "re2" and re2 is not None:
+        try:
+            return re2.search("(?s)" + pattern, response) is not None, None
+        except re2.error as e:
+            return False, f"Invalid regex: {e}"
+    # Unknown engine, or re2 configured but the package is missing here: sandboxed re
+    try:
+        found = regex_sandbox.search(
+            pattern, response, re.DOTALL,
+            timeout=settings.criteria_timeout_seconds, max_workers=settings.criteria_workers,
+        )
+    except re.error as e:
+        return False, f"Invalid regex: {e}"
+    except regex_sandbox.RegexTimeout:
+        return False, (
+            f"Regex evaluation timed out after {settings.criteria_timeout_seconds:g}s "
+            "(pattern likely backtracks catastrophically on this response)"
+        )
+    except regex_sandbox.RegexWorkerError as e:
+        return False, f"Regex evaluation failed: {e}"
+    return found, None
+
+
 def evaluate_criteria(completion_criteria: dict[str, Any], response: str) -> tuple[bool, str | None]:
     """
     Evaluate response against step's completion_criteria (opaque JSON).
@@ -39,11 +179,11 @@ def evaluate_criteria(completion_criteria: dict[str, Any], response: str) -> tup
         pattern = _get_config(completion_criteria, "pattern")
         if pattern is None:
             return False, "regex requires 'pattern'"
-        try:
-            if re.search(pattern, response, re.DOTALL):
-                return True, None
-        except re.error as e:
-            return False, f"Invalid regex: {e}"
+        found, error = _regex_search(str(pattern), response, _get_config(completion_criteria, "engine") or "re")
+        if error:
+            return False, error
+        if found:
+            return True, None
         return False, "Response does not match regex"
 
     if criteria_type == "has_code_block":
@@ -60,10 +200,11 @@ def evaluate_criteria(completion_criteria: dict[str, Any], response: str) -> tup
     if criteria_type == "valid_json":
         text = response.strip()
         # Try full response first
+        # RecursionError: nesting deeper than the C decoder's limit
         try:
             json.loads(text)
             return True, None
-        except json.JSONDecodeError:
+        except (json.JSONDecodeError, RecursionError):
             pass
         # Try to find first {...} or [...] and parse
         for start, end in (("{", "}"), ("[", "]")):
@@ -80,7 +221,7 @@ def evaluate_criteria(completion_criteria: dict[str, Any], response: str) -> tup
                         try:
                             json.loads(text[i : j + 1])
                             return True, None
-                        except json.JSONDecodeError:
+                        except (json.JSONDecodeError, RecursionError):
                             break
         return False, "Response is not valid JSON"
 
@@ -1,14 +1,20 @@
 """Workflow execution engine: sequential steps, retries, context passing, DB-backed state."""
 import logging
+import time
 from datetime import datetime, timezone
 from typing import Any
 
 from core.database import get_connection, return_connection
 from core import db_pg
-from services.unbound_client import call_llm
+from core.logging import clear_log_context, set_log_context
+from services import cancellation, generation, hedging, routing
+from services.budget import BudgetExceeded, ExecutionBudget
+from services.cancellation import ExecutionCancelled
+from services.hedging import LLMRequest
+from services.unbound_client import DEFAULT_MAX_TOKENS, LLM_TIMEOUT_SECONDS, call_llm
 from services.criteria import evaluate_criteria
 from services.context import extract_context
-from utils.enums import WorkflowExecutionStatus, StepAttemptStatus
+from utils.enums import ExecutionFailureReason, WorkflowExecutionStatus, StepAttemptStatus
 
 logger = logging.getLogger(__name__)
 
@@ -19,12 +25,167 @@ def _utc_now():
     return datetime.now(timezone.utc)
 
 
-def run_execution(execution_id: int) -> None:
+def _elapsed_ms(start: float) -> float:
+    return (time.monotonic() - start) * 1000
+
+
+def build_prompt(prompt: str, context: str) -> str:
+    """The text sent for a step: its prompt, then the previous step's context (if any)."""
+    if not context:
+        return prompt
+    return f"{prompt}\n\n--- Context from previous step ---\n{context}"
+
+
+def _finish_request(
+    conn,
+    request: LLMRequest,
+    execution_id: int,
+    workflow_id: int,
+    step_id: int,
+    model: str,
+    budget: ExecutionBudget,
+    execution_created_at: Any,
+    status: StepAttemptStatus,
+    failure_reason: str | None,
+    criteria_passed: bool | None,
+) -> None:
+    """
+    Write the outcome of a request that did not answer the attempt (lost, cancelled or errored)
+    and charge its usage. Model health only counts requests that ran to the end.
+    criteria_passed stays None when the criteria never ran on the response.
+    The attempt row is written last so its db_write_ms covers the usage and stats writes.
+    """
+    result = request.result
+    tokens_used = result.tokens_used if result else None
+    writes_started = time.monotonic()
+    if result is not None:
+        routing.record(model, request.elapsed_ms, ok=True)
+        cost = budget.charge(model, tokens_used)
+        db_pg.execution_add_usage(conn, execution_id, tokens_used, cost)
+    elif request.error is not None and not isinstance(request.error, ExecutionCancelled):
+        routing.record(model, request.elapsed_ms, ok=False)
+    if status in (StepAttemptStatus.PASSED, StepAttemptStatus.FAILED):
+        db_pg.stats_record_attempt(
+            conn, workflow_id, step_id, model, criteria_passed,
+            tokens_used=tokens_used, duration_ms=request.elapsed_ms,
+        )
+    db_pg.step_attempt_update(
+        conn, request.attempt_id,
+        status=status.value, response=result.content if result else None,
+        criteria_passed=criteria_passed, failure_reason=failure_reason,
+        tokens_used=tokens_used, execution_created_at=execution_created_at,
+        ttfb_ms=result.ttfb_ms if result else None, llm_ms=request.elapsed_ms,
+        db_write_ms=request.db_write_ms + _elapsed_ms(writes_started),
+    )
+
+
+def _split_tokens(total: int | None, parts: int) -> list[int | None]:
+    """Spread one request's tokens over its candidates (remainder on the first)."""
+    if total is None:
+        return [None] * parts
+    share, rest = divmod(total, parts)
+    return [share + rest] + [share] * (parts - 1)
+
+
+def _finish_candidates(
+    conn,
+    request: LLMRequest,
+    execution_id: int,
+    workflow_id: int,
+    step_id: int,
+    model: str,
+    budget: ExecutionBudget,
+    execution_created_at: Any,
+    attempt_number: int,
+    prompt_sent: str,
+    completion_criteria: dict,
+    context_bytes: int,
+) -> tuple[bool, str, str | None, int]:
     """
-    Run a workflow execution to completion (or failure). Call from a background thread.
+    Store the answering request's candidates, each as its own attempt: the first reuses the
+    request's row, the others take the following attempt numbers. Returns (passed, response to
+    carry forward, failure reason, number of candidates stored); the first passing candidate wins.
+    Candidates share the request's LLM timings; each has its own criteria time.
+    """
+    result = request.result
+    candidates = result.choices or [result.content]
+    routing.record(model, request.elapsed_ms, ok=True)
+    writes_started = time.monotonic()
+    cost = budget.charge(model, result.tokens_used)
+    db_pg.execution_add_usage(conn, execution_id, result.tokens_used, cost)
+    shared_db_ms = request.db_write_ms + _elapsed_ms(writes_started)
+
+    chosen: str | None = None
+    failure_reason: str | None = None
+    for i, (text, tokens_used) in enumerate(zip(candidates, _split_tokens(result.tokens_used, len(candidates)))):
+        criteria_started = time.monotonic()
+        ok, reason = evaluate_criteria(completion_criteria, text)
+        criteria_ms = _elapsed_ms(criteria_started)
+        status = StepAttemptStatus.PASSED.value if ok else StepAttemptStatus.FAILED.value
+        writes_started = time.monotonic()
+        db_pg.stats_record_attempt(
+            conn, workflow_id, step_id, model, ok, tokens_used=tokens_used, duration_ms=request.elapsed_ms,
+        )
+        timings = {
+            "ttfb_ms": result.ttfb_ms,
+            "llm_ms": request.elapsed_ms,
+            "criteria_ms": criteria_ms,
+            "db_write_ms": (shared_db_ms if i == 0 else 0.0) + _elapsed_ms(writes_started),
+        }
+        if i == 0:
+            db_pg.step_attempt_update(
+                conn, request.attempt_id,
+                status=status, response=text, criteria_passed=ok, failure_reason=reason,
+                tokens_used=tokens_used, execution_created_at=execution_created_at, **timings,
+            )
+        else:
+            db_pg.step_attempt_insert(
+                conn, execution_id, step_id, attempt_number + i,
+                status=status, prompt_sent=prompt_sent, response=text, criteria_passed=ok,
+                failure_reason=reason, tokens_used=tokens_used,
+                execution_created_at=execution_created_at, model=model, is_hedge=request.is_hedge,
+                context_bytes=context_bytes, **timings,
+            )
+        if ok and chosen is None:
+            chosen = text
+        elif not ok:
+            failure_reason = reason
+    if chosen is not None:
+        return True, chosen, None, len(candidates)
+    return False, candidates[-1], failure_reason, len(candidates)
+
+
+def run_execution(execution_id: int, queue_wait_ms: float | None = None) -> None:
+    """
+    Run a workflow execution to completion (or failure). Call from a background thread
+    (services.scheduler, which passes how long the run waited to be admitted).
     Uses its own DB connection. Persists every attempt; retries per step up to MAX_RETRIES_PER_STEP.
+    Stops between attempts, or mid LLM call, once the execution is cancelled (see services.cancellation).
+    Workflow deadline / step timeout / token and cost budgets (services.budget) cap each LLM call's
+    timeout, skip retries that cannot finish in time, and fail the run with a distinct failure_reason.
+    Each attempt's model is picked by services.routing from the step's model and fallback_models;
+    steps with hedge_percentile may send a backup request per attempt (services.hedging).
+    Steps with candidates > 1 ask for several completions per request; each is stored as an attempt
+    and counts against MAX_RETRIES_PER_STEP.
+    A step's max_tokens (default DEFAULT_MAX_TOKENS, capped by the token budget) and sampling
+    parameters (services.generation) are sent with every request of the step.
+    Timings use the monotonic clock: per attempt (services.hedging.LLMRequest and the finish
+    helpers above) and per step, appended with execution_record_step when the step ends.
     """
+    set_log_context(execution_id=execution_id)
     conn = get_connection()
+    cancel = cancellation.register(execution_id)
+    step_clock: tuple[int, int, float] | None = None  # (step_index, step_id, start) of the step in progress
+    workflow_id: int | None = None  # set once the run is claimed; failures before that are not counted
+    run_started: float | None = None
+
+    def record_step() -> None:
+        nonlocal step_clock
+        if step_clock is not None:
+            step_index, step_id, started = step_clock
+            step_clock = None
+            db_pg.execution_record_step(conn, execution_id, step_index, step_id, _elapsed_ms(started))
+
     try:
         ex = db_pg.execution_get(conn, execution_id)
         if not ex:
@@ -33,98 +194,196 @@ def run_execution(execution_id: int) -> None:
         if ex["status"] != WorkflowExecutionStatus.PENDING.value:
             logger.warning("Execution %s already running or finished: %s", execution_id, ex["status"])
             return
+        # Atomic pending -> running: a run queued in two processes (see scheduler.resume_pending) runs once
+        claimed = db_pg.execution_claim(conn, execution_id, _utc_now(), queue_wait_ms)
+        conn.commit()
+        if not claimed:
+            logger.warning("Execution %s was started elsewhere or cancelled before it started", execution_id)
+            return
 
         workflow_id = ex["workflow_id"]
+        # Partition key for step_attempts; lets attempt writes hit a single partition
+        execution_created_at = ex.get("created_at")
         steps = db_pg.step_list_by_workflow(conn, workflow_id)
         if not steps:
             db_pg.execution_update(
                 conn, execution_id, WorkflowExecutionStatus.COMPLETED.value,
-                current_step_index=None, started_at=_utc_now(), finished_at=_utc_now(),
+                current_step_index=None, started_at=None, finished_at=_utc_now(),
             )
+            db_pg.stats_record_run(conn, workflow_id, WorkflowExecutionStatus.COMPLETED.value, 0.0)
             conn.commit()
             return
 
-        db_pg.execution_update(
-            conn, execution_id, WorkflowExecutionStatus.RUNNING.value,
-            current_step_index=0, started_at=_utc_now(), finished_at=None,
-        )
+        workflow = db_pg.workflow_get(conn, workflow_id) or {}
         conn.commit()
+        run_started = time.monotonic()
+        budget = ExecutionBudget.for_workflow(workflow)
 
         context_from_previous = ""
+        responses: list[str] = []  # chosen response of each finished step (last_n_steps context)
         for step_index, step in enumerate(steps):
             step_id = step["id"]
+            step_clock = (step_index, step_id, time.monotonic())
+            set_log_context(step_id=step_id, attempt=None)
             db_pg.execution_update(conn, execution_id, WorkflowExecutionStatus.RUNNING.value, current_step_index=step_index, started_at=None, finished_at=None)
             conn.commit()
+            budget.start_step(step.get("timeout_seconds"))
 
-            prompt_with_context = step["prompt"]
-            if context_from_previous:
-                prompt_with_context = f"{step['prompt']}\n\n--- Context from previous step ---\n{context_from_previous}"
+            prompt_with_context = build_prompt(step["prompt"], context_from_previous)
+            context_bytes = len(context_from_previous.encode("utf-8"))
+            sampling = generation.request_params(step)
 
             attempt_number = 0
             passed = False
             last_response = ""
             last_failure_reason = None
+            last_attempt_seconds = 0.0
+            errored_models: set[str] = set()
 
             while attempt_number < MAX_RETRIES_PER_STEP:
+                cancel.raise_if_cancelled()
+                budget.check()
+                if attempt_number and not budget.can_retry(last_attempt_seconds):
+                    raise BudgetExceeded(
+                        budget.deadline_reason(),
+                        f"Not enough time left to retry step {step_id} (last attempt took {last_attempt_seconds:.1f}s)",
+                    )
+                llm_timeout = budget.timeout_for(LLM_TIMEOUT_SECONDS)
+                n = max(1, min(step.get("candidates") or 1, MAX_RETRIES_PER_STEP - attempt_number))
+                max_tokens = budget.max_tokens_for((step.get("max_tokens") or DEFAULT_MAX_TOKENS) * n) // n or 1
                 attempt_number += 1
-                logger.info("Execution %s step %s attempt %s", execution_id, step_id, attempt_number)
+                set_log_context(attempt=attempt_number)
+                model = routing.choose_model(step, errored_models)
+                logger.info("Execution %s step %s attempt %s model %s", execution_id, step_id, attempt_number, model)
 
-                attempt_id = db_pg.step_attempt_insert(
-                    conn, execution_id, step_id, attempt_number,
-                    status=StepAttemptStatus.RUNNING.value, prompt_sent=prompt_with_context,
-                    response=None, criteria_passed=None, failure_reason=None, tokens_used=None,
-                )
-                conn.commit()
-
-                try:
-                    result = call_llm(prompt_with_context, step["model"])
-                    last_response = result.content
-                    passed, last_failure_reason = evaluate_criteria(step["completion_criteria"], last_response)
-                    db_pg.step_attempt_update(
-                        conn, attempt_id,
-                        status=StepAttemptStatus.PASSED.value if passed else StepAttemptStatus.FAILED.value,
-                        response=last_response, criteria_passed=passed, failure_reason=last_failure_reason,
-                        tokens_used=result.tokens_used,
+                def insert_attempt(is_hedge: bool = False) -> LLMRequest:
+                    write_started = time.monotonic()
+                    attempt_id = db_pg.step_attempt_insert(
+                        conn, execution_id, step_id, attempt_number,
+                        status=StepAttemptStatus.RUNNING.value, prompt_sent=prompt_with_context,
+                        response=None, criteria_passed=None, failure_reason=None, tokens_used=None,
+                        execution_created_at=execution_created_at, model=model, is_hedge=is_hedge,
+                        context_bytes=context_bytes,
                     )
                     conn.commit()
-                except Exception as e:
-                    logger.exception("Execution %s step %s attempt %s LLM error: %s", execution_id, step_id, attempt_number, e)
-                    db_pg.step_attempt_update(
-                        conn, attempt_id,
-                        status=StepAttemptStatus.FAILED.value, response=None, criteria_passed=False,
-                        failure_reason=str(e), tokens_used=None,
+                    return LLMRequest(attempt_id, is_hedge=is_hedge, db_write_ms=_elapsed_ms(write_started))
+
+                def call(token) -> Any:
+                    return call_llm(
+                        prompt_with_context, model, cancel=token, timeout=llm_timeout, max_tokens=max_tokens, n=n,
+                        **sampling,
                     )
-                    conn.commit()
-                    last_failure_reason = str(e)
+
+                primary = insert_attempt()
+                hedge_after = hedging.hedge_delay_seconds(model, step.get("hedge_percentile"), llm_timeout)
+                if hedge_after is None:
+                    hedging.run_request(primary, call, cancel)
+                    requests = [primary]
+                else:
+                    requests = hedging.run_hedged(primary, call, cancel, hedge_after, lambda: insert_attempt(is_hedge=True))
+
+                winner = next((r for r in requests if r.result is not None and not r.lost), None)
+                for r in requests:
+                    if r is winner:
+                        passed, last_response, last_failure_reason, stored = _finish_candidates(
+                            conn, r, execution_id, workflow_id, step_id, model, budget, execution_created_at,
+                            attempt_number, prompt_with_context, step["completion_criteria"], context_bytes,
+                        )
+                        if n > 1 and stored == 1:
+                            logger.info("Model %s returned 1 of %s candidates; retrying sequentially", model, n)
+                        attempt_number += stored - 1
+                    elif r.lost:
+                        _finish_request(
+                            conn, r, execution_id, workflow_id, step_id, model, budget, execution_created_at,
+                            StepAttemptStatus.CANCELLED, "Lost hedge race", None,
+                        )
+                    elif isinstance(r.error, ExecutionCancelled):
+                        _finish_request(
+                            conn, r, execution_id, workflow_id, step_id, model, budget, execution_created_at,
+                            StepAttemptStatus.CANCELLED, "Cancelled", None,
+                        )
+                    else:
+                        logger.error(
+                            "Execution %s step %s attempt %s LLM error: %s", execution_id, step_id, attempt_number, r.error,
+                            exc_info=r.error,
+                        )
+                        errored_models.add(model)
+                        last_failure_reason = str(r.error)
+                        _finish_request(
+                            conn, r, execution_id, workflow_id, step_id, model, budget, execution_created_at,
+                            StepAttemptStatus.FAILED, last_failure_reason, None,
+                        )
+                conn.commit()
+                if winner is None and any(isinstance(r.error, ExecutionCancelled) for r in requests):
+                    raise ExecutionCancelled(f"Execution {execution_id} cancelled during LLM call")
+                last_attempt_seconds = max(r.elapsed_ms for r in requests) / 1000
 
                 if passed:
                     break
 
             if not passed:
+                # Out of retries; report a budget that ran out meanwhile over plain step failure
+                budget.check()
+                record_step()
                 db_pg.execution_update(
                     conn, execution_id, WorkflowExecutionStatus.FAILED.value,
                     current_step_index=step_index, started_at=None, finished_at=_utc_now(),
+                    failure_reason=ExecutionFailureReason.STEP_FAILED.value,
                 )
+                db_pg.stats_record_run(conn, workflow_id, WorkflowExecutionStatus.FAILED.value, _elapsed_ms(run_started))
                 conn.commit()
                 return
 
-            context_from_previous = extract_context(last_response, step["context_strategy"])
+            responses.append(last_response)
+            context_from_previous = extract_context(
+                last_response, step["context_strategy"], step.get("context_config"), responses,
+            )
+            record_step()
 
         db_pg.execution_update(
             conn, execution_id, WorkflowExecutionStatus.COMPLETED.value,
             current_step_index=len(steps) - 1, started_at=None, finished_at=_utc_now(),
         )
+        db_pg.stats_record_run(conn, workflow_id, WorkflowExecutionStatus.COMPLETED.value, _elapsed_ms(run_started))
+        conn.commit()
+    except BudgetExceeded as e:
+        logger.info("Execution %s stopped: %s (%s)", execution_id, e.reason.value, e)
+        record_step()
+        db_pg.execution_update(
+            conn, execution_id, WorkflowExecutionStatus.FAILED.value,
+            current_step_index=None, started_at=None, finished_at=_utc_now(),
+            failure_reason=e.reason.value,
+        )
+        db_pg.stats_record_run(conn, workflow_id, WorkflowExecutionStatus.FAILED.value, _elapsed_ms(run_started))
+        conn.commit()
+    except ExecutionCancelled:
+        # Cancelled runs are not counted in run stats
+        logger.info("Execution %s cancelled", execution_id)
+        record_step()
+        db_pg.execution_update(
+            conn, execution_id, WorkflowExecutionStatus.CANCELLED.value,
+            current_step_index=None, started_at=None, finished_at=_utc_now(),
+        )
         conn.commit()
     except Exception as e:
         logger.exception("Execution %s failed: %s", execution_id, e)
         try:
+            record_step()
             db_pg.execution_update(
                 conn, execution_id, WorkflowExecutionStatus.FAILED.value,
                 current_step_index=None, started_at=None, finished_at=_utc_now(),
+                failure_reason=ExecutionFailureReason.ERROR.value,
             )
+            if workflow_id is not None:
+                db_pg.stats_record_run(
+                    conn, workflow_id, WorkflowExecutionStatus.FAILED.value,
+                    _elapsed_ms(run_started) if run_started is not None else None,
+                )
             conn.commit()
         except Exception:
             conn.rollback()
         raise
     finally:
+        cancellation.unregister(execution_id)
         return_connection(conn)
+        clear_log_context()
@@ -0,0 +1,151 @@
+"""Streaming execution export: NDJSON (one execution per line) or CSV (one attempt per row)."""
+import csv
+import io
+import json
+import logging
+import zlib
+from datetime import datetime
+from typing import Any, Iterable, Iterator
+
+from core.database import get_read_connection, return_connection
+from core import db_pg
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per server-side cursor round trip
+EXPORT_ITERSIZE = 500
+# Flush output once this many bytes are buffered
+EXPORT_FLUSH_BYTES = 64 * 1024
+
+EXECUTION_FIELDS = ("execution_id", "workflow_id", "execution_status", "current_step_index", "started_at", "finished_at")
+ATTEMPT_FIELDS = (
+    "attempt_id", "step_id", "attempt_number", "attempt_status", "model", "is_hedge", "prompt_sent", "response",
+    "criteria_passed", "failure_reason", "tokens_used", "created_at",
+)
+CSV_COLUMNS = EXECUTION_FIELDS + ATTEMPT_FIELDS
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+def _execution_record(row: dict) -> dict:
+    """Shape like WorkflowExecutionRead, attempts appended as rows arrive."""
+    return {
+        "id": row["execution_id"],
+        "workflow_id": row["workflow_id"],
+        "status": row["execution_status"],
+        "current_step_index": row["current_step_index"],
+        "started_at": row["started_at"],
+        "finished_at": row["finished_at"],
+        "step_attempts": [],
+    }
+
+
+def _attempt_record(row: dict, include_bodies: bool) -> dict:
+    a = {
+        "id": row["attempt_id"],
+        "step_id": row["step_id"],
+        "attempt_number": row["attempt_number"],
+        "status": row["attempt_status"],
+        "model": row["model"],
+        "is_hedge": row["is_hedge"],
+        "criteria_passed": row["criteria_passed"],
+        "failure_reason": row["failure_reason"],
+        "tokens_used": row["tokens_used"],
+        "created_at": row["created_at"],
+    }
+    if include_bodies:
+        a["prompt_sent"] = row["prompt_sent"]
+        a["response"] = row["response"]
+    return a
+
+
+def ndjson_lines(rows: Iterable[dict], include_bodies: bool = True) -> Iterator[str]:
+    """Group consecutive rows (ordered by execution) into one JSON line per execution."""
+    current: dict | None = None
+    for row in rows:
+        if current is None or current["id"] != row["execution_id"]:
+            if current is not None:
+                yield json.dumps(current, default=_json_default) + "\n"
+            current = _execution_record(row)
+        if row["attempt_id"] is not None:
+            current["step_attempts"].append(_attempt_record(row, include_bodies))
+    if current is not None:
+        yield json.dumps(current, default=_json_default) + "\n"
+
+
+def csv_lines(rows: Iterable[dict], include_bodies: bool = True) -> Iterator[str]:
+    """Header plus one flat CSV row per attempt."""
+    columns = CSV_COLUMNS if include_bodies else tuple(c for c in CSV_COLUMNS if c not in ("prompt_sent", "response"))
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([
+            row[c].isoformat() if isinstance(row[c], datetime) else row[c]
+            for c in columns
+        ])
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate(0)
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def _buffered(lines: Iterable[str]) -> Iterator[bytes]:
+    """Coalesce small lines into ~EXPORT_FLUSH_BYTES chunks."""
+    parts: list[bytes] = []
+    size = 0
+    for line in lines:
+        b = line.encode("utf-8")
+        parts.append(b)
+        size += len(b)
+        if size >= EXPORT_FLUSH_BYTES:
+            yield b"".join(parts)
+            parts, size = [], 0
+    if parts:
+        yield b"".join(parts)
+
+
+def _gzipped(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def stream_export(
+    fmt: str,
+    workflow_id: int | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    include_bodies: bool = True,
+    gzip: bool = False,
+) -> Iterator[bytes]:
+    """
+    Generator for StreamingResponse. Holds its own connection for the lifetime of the
+    stream (the request's get_db connection is released before the body is sent). Reads from
+    the replica when one is configured and ready.
+    """
+    conn = get_read_connection()
+    try:
+        rows = db_pg.execution_export_iter(
+            conn, workflow_id, since, until, include_bodies, itersize=EXPORT_ITERSIZE,
+        )
+        lines = csv_lines(rows, include_bodies) if fmt == "csv" else ndjson_lines(rows, include_bodies)
+        chunks = _buffered(lines)
+        if gzip:
+            chunks = _gzipped(chunks)
+        yield from chunks
+        conn.commit()
+    except Exception:
+        logger.exception("Execution export failed")
+        conn.rollback()
+        raise
+    finally:
+        return_connection(conn)
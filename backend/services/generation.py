@@ -0,0 +1,84 @@
+"""
+Per-step generation parameters (max_tokens, temperature, top_p, stop, response_format).
+
+Unset parameters are left out of the request, so the provider default applies (temperature and
+max_tokens keep the executor's defaults, see services.unbound_client). lint_generation checks a
+step's parameters against the limits of its model and of each fallback model, since every
+attempt sends the same parameters whichever model it is routed to.
+"""
+from dataclasses import dataclass
+from typing import Any
+
+MAX_STOP_SEQUENCES = 4
+MAX_STOP_CHARS = 64
+RESPONSE_FORMAT_TYPES = ("text", "json_object", "json_schema")
+
+
+@dataclass(frozen=True)
+class ModelLimits:
+    max_output_tokens: int
+    max_temperature: float = 2.0
+    response_formats: tuple[str, ...] = RESPONSE_FORMAT_TYPES
+
+
+# Keep the model list in sync with services/pricing.py
+MODEL_LIMITS: dict[str, ModelLimits] = {
+    "kimi-k2p5": ModelLimits(max_output_tokens=32768, max_temperature=1.0, response_formats=("text", "json_object")),
+    "kimi-k2-instruct-0905": ModelLimits(
+        max_output_tokens=16384, max_temperature=1.0, response_formats=("text", "json_object"),
+    ),
+}
+
+# Models not listed above (e.g. added on the gateway later) are only held to the API-wide ranges
+DEFAULT_LIMITS = ModelLimits(max_output_tokens=32768)
+
+
+def limits_for(model: str) -> ModelLimits:
+    return MODEL_LIMITS.get(model, DEFAULT_LIMITS)
+
+
+def _lint_response_format(response_format: dict[str, Any], limits: ModelLimits, model: str) -> str | None:
+    kind = response_format.get("type")
+    if kind not in RESPONSE_FORMAT_TYPES:
+        return f"response_format 'type' must be one of {', '.join(RESPONSE_FORMAT_TYPES)}"
+    if kind == "json_schema":
+        spec = response_format.get("json_schema")
+        if not isinstance(spec, dict) or not isinstance(spec.get("name"), str) or not isinstance(spec.get("schema"), dict):
+            return "json_schema response_format requires 'json_schema': {\"name\": ..., \"schema\": {...}}"
+    if kind not in limits.response_formats:
+        return f"Model {model} does not support response_format '{kind}'"
+    return None
+
+
+def lint_generation(
+    models: list[str],
+    max_tokens: int | None,
+    temperature: float | None,
+    stop: list[str] | None,
+    response_format: dict[str, Any] | None,
+) -> str | None:
+    """Save-time checks of a step's generation parameters for each of its models. Returns a problem or None."""
+    if stop and any(not s or len(s) > MAX_STOP_CHARS for s in stop):
+        return f"stop sequences must be 1-{MAX_STOP_CHARS} characters"
+    for model in models:
+        limits = limits_for(model)
+        if max_tokens is not None and max_tokens > limits.max_output_tokens:
+            return f"max_tokens {max_tokens} exceeds the {limits.max_output_tokens} output tokens of model {model}"
+        if temperature is not None and temperature > limits.max_temperature:
+            return f"temperature {temperature} exceeds the maximum {limits.max_temperature} of model {model}"
+        if response_format is not None:
+            problem = _lint_response_format(response_format, limits, model)
+            if problem:
+                return problem
+    return None
+
+
+def request_params(step: dict[str, Any]) -> dict[str, Any]:
+    """The call_llm keyword arguments of a step row's set sampling parameters (max_tokens is budgeted separately)."""
+    params: dict[str, Any] = {}
+    for key in ("temperature", "top_p", "response_format"):
+        if step.get(key) is not None:
+            params[key] = step[key]
+    if step.get("stop"):
+        params["stop"] = list(step["stop"])
+    return params
@@ -0,0 +1,133 @@
+"""
+Hedged LLM requests (opt-in per step via hedge_percentile).
+
+If an attempt's request has not finished after the hedge_percentile latency of its model's recent
+calls (services.routing), one identical backup request is sent. The first request to return a
+response wins and the other is aborted. Backups are limited process-wide by a token bucket
+(settings.hedge_budget_ratio backups per hedged request) and settings.hedge_max_in_flight.
+"""
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable
+
+from core.config import settings
+from services import routing
+from services.cancellation import CancelToken
+from services.unbound_client import LLMResult
+
+# Recent successful calls needed before a model's percentile is trusted
+HEDGE_MIN_SAMPLES = 20
+# Unused hedge allowance that can accumulate (burst size)
+HEDGE_MAX_BURST = 5.0
+
+
+@dataclass
+class LLMRequest:
+    """One HTTP request of an attempt; each request has its own step_attempts row."""
+    attempt_id: int
+    is_hedge: bool = False
+    started: float = field(default_factory=time.monotonic)
+    finished: float | None = None
+    result: LLMResult | None = None
+    error: Exception | None = None
+    lost: bool = False  # aborted or discarded because the other request answered first
+    db_write_ms: float = 0.0  # inserting (and committing) its attempt row before the call
+
+    @property
+    def elapsed_ms(self) -> float:
+        return ((self.finished or time.monotonic()) - self.started) * 1000
+
+
+class _HedgeBudget:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens = HEDGE_MAX_BURST
+        self._in_flight = 0
+
+    def on_request(self) -> None:
+        with self._lock:
+            self._tokens = min(HEDGE_MAX_BURST, self._tokens + settings.hedge_budget_ratio)
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._tokens < 1 or self._in_flight >= settings.hedge_max_in_flight:
+                return False
+            self._tokens -= 1
+            self._in_flight += 1
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+
+_budget = _HedgeBudget()
+
+
+def hedge_delay_seconds(model: str, percentile: float | None, timeout: float) -> float | None:
+    """Seconds to wait before sending a backup; None = don't hedge (off, no data, or past timeout)."""
+    if percentile is None:
+        return None
+    latency_ms = routing.latency_quantile(model, percentile, min_samples=HEDGE_MIN_SAMPLES)
+    if latency_ms is None or latency_ms / 1000 >= timeout:
+        return None
+    return latency_ms / 1000
+
+
+def run_request(request: LLMRequest, call: Callable[[CancelToken], LLMResult], token: CancelToken) -> None:
+    """Run one request in this thread, storing its result or error on it."""
+    try:
+        request.result = call(token)
+    except Exception as e:
+        request.error = e
+    finally:
+        request.finished = time.monotonic()
+
+
+def run_hedged(
+    primary: LLMRequest,
+    call: Callable[[CancelToken], LLMResult],
+    cancel: CancelToken,
+    hedge_after: float,
+    start_hedge: Callable[[], LLMRequest],
+) -> list[LLMRequest]:
+    """
+    Run primary; after hedge_after seconds without an answer, and if the budget allows, call
+    start_hedge() (in this thread: it records the backup's attempt row) and run the backup too.
+    Returns the requests in start order; the winner has a result and lost=False.
+    """
+    _budget.on_request()
+    requests = [primary]
+    tokens = [cancel.child()]
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="llm-hedge") as pool:
+        futures: dict[Future, int] = {pool.submit(run_request, primary, call, tokens[0]): 0}
+        done, _ = wait(futures, timeout=hedge_after)
+        hedged = False
+        if not done and not cancel.is_cancelled() and _budget.try_acquire():
+            hedged = True
+            try:
+                requests.append(start_hedge())
+                tokens.append(cancel.child())
+                futures[pool.submit(run_request, requests[1], call, tokens[1])] = 1
+            except Exception:
+                _budget.release()
+                raise
+        try:
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                if any(requests[futures[f]].result is not None for f in done):
+                    winner = min((futures[f] for f in done if requests[futures[f]].result is not None),
+                                 key=lambda i: requests[i].finished)
+                    for i, r in enumerate(requests):
+                        if i != winner and r.error is None:
+                            r.lost = True
+                            tokens[i].cancel()
+                    wait(pending)
+                    break
+        finally:
+            if hedged:
+                _budget.release()
+    return requests
@@ -0,0 +1,14 @@
+"""Blended USD price per 1K tokens. Keep in sync with frontend/src/lib/cost.js."""
+
+MODEL_PRICE_PER_1K: dict[str, float] = {
+    "kimi-k2p5": 0.002,
+    "kimi-k2-instruct-0905": 0.0015,
+}
+
+DEFAULT_PRICE_PER_1K = 0.002
+
+
+def cost_for_tokens(model: str, tokens: int | None) -> float:
+    if not tokens or tokens <= 0:
+        return 0.0
+    return tokens / 1000 * MODEL_PRICE_PER_1K.get(model, DEFAULT_PRICE_PER_1K)
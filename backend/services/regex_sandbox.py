@@ -0,0 +1,181 @@
+"""
+Run user regexes out of process under a hard time limit.
+
+re.search with a catastrophically backtracking pattern holds the GIL and cannot be interrupted
+from another thread, so regex criteria run in worker processes instead: plain Python subprocesses
+running this file, answering one search at a time over stdin/stdout (JSON lines). A search that
+runs past its timeout gets its worker killed; the next search starts a fresh one. Idle workers
+are reused, and at most max_workers searches run at once per backend process.
+
+Standard library only: the worker side must start fast and must not import the app.
+"""
+import json
+import re
+import subprocess
+import sys
+import threading
+
+WORKER_START_TIMEOUT_SECONDS = 10.0
+_READY = "ready"
+
+
+class RegexTimeout(Exception):
+    """The search did not finish within its time limit (the worker was killed)."""
+
+
+class RegexWorkerError(Exception):
+    """The worker process died or answered garbage."""
+
+
+class _Worker:
+    def __init__(self):
+        self.proc = subprocess.Popen(
+            [sys.executable, "-I", __file__],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+        )
+        self.expired = False
+        if self._read_line(WORKER_START_TIMEOUT_SECONDS) != _READY:
+            self.kill()
+            raise RegexWorkerError("regex worker failed to start")
+
+    def alive(self) -> bool:
+        return not self.expired and self.proc.poll() is None
+
+    def _expire(self) -> None:
+        self.expired = True
+        self.proc.kill()
+
+    def kill(self) -> None:
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+        for f in (self.proc.stdin, self.proc.stdout):
+            try:
+                f.close()
+            except OSError:
+                pass
+
+    def _read_line(self, timeout: float) -> str | None:
+        """One reply line, or None if the worker was killed by the timer (or died)."""
+        timer = threading.Timer(timeout, self._expire)
+        timer.daemon = True
+        timer.start()
+        try:
+            line = self.proc.stdout.readline()
+        finally:
+            timer.cancel()
+        return line.rstrip("\n") if line else None
+
+    def request(self, req: dict, timeout: float) -> dict:
+        try:
+            self.proc.stdin.write(json.dumps(req) + "\n")
+            self.proc.stdin.flush()
+        except OSError as e:
+            raise RegexWorkerError(f"regex worker unavailable: {e}") from e
+        line = self._read_line(timeout)
+        if line is None:
+            raise RegexTimeout(f"regex search exceeded {timeout:g}s")
+        try:
+            reply = json.loads(line)
+        except ValueError as e:
+            raise RegexWorkerError(f"regex worker sent a malformed reply: {line[:80]!r}") from e
+        if not isinstance(reply, dict):
+            raise RegexWorkerError(f"regex worker sent a malformed reply: {line[:80]!r}")
+        if reply.get("error") is not None:
+            raise re.error(reply["error"])
+        return reply
+
+
+_idle: list[_Worker] = []
+_lock = threading.Lock()
+_slots: threading.BoundedSemaphore | None = None
+_slots_size = 0
+
+
+def _acquire_slot(max_workers: int) -> threading.BoundedSemaphore:
+    """The semaphore bounding concurrent searches, rebuilt when max_workers changes.
+
+    Searches already holding a slot of the old semaphore release it there, so for their duration
+    slightly more than the new max_workers may run.
+    """
+    global _slots, _slots_size
+    size = max(1, max_workers)
+    with _lock:
+        if _slots is None or _slots_size != size:
+            _slots, _slots_size = threading.BoundedSemaphore(size), size
+        return _slots
+
+
+def search(pattern: str, text: str, flags: int = 0, timeout: float = 1.0, max_workers: int = 2) -> bool:
+    """
+    re.search(pattern, text, flags) is not None, evaluated in a worker process.
+    Raises RegexTimeout past timeout seconds, re.error for an invalid pattern,
+    RegexWorkerError if no worker could serve the search.
+    """
+    req = {"pattern": pattern, "text": text, "flags": flags}
+    return bool(_run(req, timeout, max_workers)["found"])
+
+
+def search_group(
+    pattern: str, text: str, group: int | str = 0, flags: int = 0, timeout: float = 1.0, max_workers: int = 2,
+) -> str | None:
+    """Text of group (index or name) in the first match, or None (no match or group unset). Raises as search()."""
+    req = {"pattern": pattern, "text": text, "flags": flags, "group": group}
+    return _run(req, timeout, max_workers).get("group")
+
+
+def _run(req: dict, timeout: float, max_workers: int) -> dict:
+    with _acquire_slot(max_workers):
+        with _lock:
+            worker = _idle.pop() if _idle else None
+        if worker is None or not worker.alive():
+            worker = _Worker()
+        try:
+            reply = worker.request(req, timeout)
+        except re.error:
+            _release(worker)
+            raise
+        except Exception:
+            worker.kill()
+            raise
+        _release(worker)
+        return reply
+
+
+def _release(worker: _Worker) -> None:
+    """Back to the idle list, unless the timer fired while the reply was being read."""
+    if not worker.alive():
+        worker.kill()
+        return
+    with _lock:
+        _idle.append(worker)
+
+
+def shutdown() -> None:
+    """Stop idle workers (e.g. on app shutdown). Busy ones stop with their search."""
+    with _lock:
+        workers, _idle[:] = list(_idle), []
+    for w in workers:
+        w.kill()
+
+
+def _serve() -> None:
+    print(_READY, flush=True)
+    for line in sys.stdin:
+        req = json.loads(line)
+        try:
+            m = re.search(req["pattern"], req["text"], req["flags"])
+            reply = {"found": m is not None}
+            if m is not None and "group" in req:
+                reply["group"] = m.group(req["group"])
+        except (IndexError, re.error) as e:
+            reply = {"found": False, "error": str(e)}
+        print(json.dumps(reply), flush=True)
+
+
+if __name__ == "__main__":
+    _serve()
@@ -0,0 +1,117 @@
+"""
+Per-model health (rolling latency and error rate) and model selection for step attempts.
+
+Health is kept in this process only: a window of the last WINDOW_SIZE calls per model, ignoring
+calls older than WINDOW_SECONDS. A model is unhealthy once it has MIN_SAMPLES recent calls and
+an error rate of at least UNHEALTHY_ERROR_RATE; after PROBE_AFTER_SECONDS without calls it is
+tried again. Only transport/provider errors count as errors, not failed completion criteria.
+"""
+import math
+import threading
+import time
+from collections import deque
+
+from utils.enums import RoutingPolicy
+
+WINDOW_SIZE = 100
+WINDOW_SECONDS = 300.0
+MIN_SAMPLES = 5
+UNHEALTHY_ERROR_RATE = 0.5
+PROBE_AFTER_SECONDS = 30.0
+
+
+class _ModelWindow:
+    def __init__(self):
+        self.samples: deque[tuple[float, float, bool]] = deque(maxlen=WINDOW_SIZE)  # (at, latency_ms, ok)
+
+    def recent(self, now: float) -> list[tuple[float, float, bool]]:
+        return [s for s in self.samples if now - s[0] <= WINDOW_SECONDS]
+
+
+_windows: dict[str, _ModelWindow] = {}
+_lock = threading.Lock()
+
+
+def record(model: str, latency_ms: float, ok: bool) -> None:
+    """Record one finished LLM call."""
+    with _lock:
+        _windows.setdefault(model, _ModelWindow()).samples.append((time.monotonic(), latency_ms, ok))
+
+
+def known_models() -> list[str]:
+    with _lock:
+        return sorted(_windows)
+
+
+def _recent(model: str) -> list[tuple[float, float, bool]]:
+    with _lock:
+        w = _windows.get(model)
+        return w.recent(time.monotonic()) if w else []
+
+
+def _quantile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))]
+
+
+def latency_quantile(model: str, q: float, min_samples: int = 1) -> float | None:
+    """q-quantile (0..1) of recent successful call latency in ms; None with fewer than min_samples."""
+    latencies = [lat for _, lat, ok in _recent(model) if ok]
+    return _quantile(latencies, q) if len(latencies) >= max(min_samples, 1) else None
+
+
+def snapshot(model: str) -> dict:
+    samples = _recent(model)
+    errors = sum(1 for _, _, ok in samples if not ok)
+    ok_latencies = [lat for _, lat, ok in samples if ok]
+    return {
+        "model": model,
+        "samples": len(samples),
+        "error_rate": errors / len(samples) if samples else None,
+        "p50_ms": _quantile(ok_latencies, 0.5),
+        "p95_ms": _quantile(ok_latencies, 0.95),
+        "healthy": is_healthy(model),
+    }
+
+
+def is_healthy(model: str) -> bool:
+    samples = _recent(model)
+    if len(samples) < MIN_SAMPLES:
+        return True
+    if time.monotonic() - samples[-1][0] >= PROBE_AFTER_SECONDS:
+        return True
+    errors = sum(1 for _, _, ok in samples if not ok)
+    return errors / len(samples) < UNHEALTHY_ERROR_RATE
+
+
+def _error_rate(model: str) -> float:
+    samples = _recent(model)
+    return sum(1 for _, _, ok in samples if not ok) / len(samples) if samples else 0.0
+
+
+def model_chain(step: dict) -> list[str]:
+    """Step model followed by its fallbacks, without duplicates."""
+    chain = [step["model"]]
+    for m in step.get("fallback_models") or []:
+        if m not in chain:
+            chain.append(m)
+    return chain
+
+
+def choose_model(step: dict, avoid: set[str] | frozenset[str] = frozenset()) -> str:
+    """
+    Model for the next attempt of step. avoid = models that already errored on this step; they
+    are skipped while any other model is left. Unhealthy models are skipped unless all are.
+    """
+    chain = [m for m in model_chain(step) if m not in avoid] or model_chain(step)
+    healthy = [m for m in chain if is_healthy(m)]
+    if not healthy:
+        return min(chain, key=_error_rate)
+    if step.get("routing_policy") == RoutingPolicy.FASTEST.value:
+        # Models without latency data are tried first (in list order) so every model gets measured
+        p50 = {m: latency_quantile(m, 0.5) for m in healthy}
+        unmeasured = [m for m in healthy if p50[m] is None]
+        return unmeasured[0] if unmeasured else min(healthy, key=lambda m: p50[m])
+    return healthy[0]
@@ -0,0 +1,170 @@
+"""
+Admission of executions to run_execution: at most settings.max_concurrent_executions run at once
+per process; the rest wait here.
+
+Interactive runs always start before batch runs (strict priority). Within a priority class,
+tenants share the slots by weight (settings.tenant_weights, default 1) using start-time fair
+queuing: each queued run gets a virtual tag = max(class clock, tenant's last tag) + 1/weight, and
+the lowest tag starts next. A tenant that queues 500 runs therefore gets its share, not the
+whole queue, and a tenant arriving later is not stuck behind the backlog.
+
+The queue and the cap are per process, like the cancel registry and the hedge budget: with N
+workers up to N * max_concurrent runs execute at once, and queue position and estimated start
+(from recent run durations) describe this process's queue only. It lives in memory,
+so at startup resume_pending re-queues the runs still pending in the database, oldest first. Every
+process does this; run_execution claims a run atomically (execution_claim), so each runs once.
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from core import db_pg
+from core.config import settings
+from core.database import get_connection, return_connection
+from services.executor import run_execution
+from utils.enums import ExecutionPriority
+
+logger = logging.getLogger(__name__)
+
+# Assumed run duration until real runs have finished; then an EWMA of finished runs
+DEFAULT_RUN_SECONDS = 30.0
+RUN_SECONDS_ALPHA = 0.2
+
+_CLASSES = (ExecutionPriority.INTERACTIVE, ExecutionPriority.BATCH)
+
+
+@dataclass(order=True)
+class _Queued:
+    tag: float
+    seq: int
+    execution_id: int = field(compare=False)
+    tenant: str = field(compare=False)
+    enqueued_at: float = field(compare=False, default_factory=time.monotonic)
+
+
+@dataclass
+class QueueStatus:
+    position: int  # 0 = starts next
+    estimated_start_at: datetime
+
+
+class Scheduler:
+    def __init__(
+        self,
+        run: Callable[[int, float], None],
+        max_concurrent: int,
+        weights: dict[str, float] | None = None,
+    ):
+        self._run = run
+        self.max_concurrent = max(1, max_concurrent)
+        self.weights = weights or {}
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._queues: dict[ExecutionPriority, list[_Queued]] = {p: [] for p in _CLASSES}
+        self._clock: dict[ExecutionPriority, float] = {p: 0.0 for p in _CLASSES}
+        self._last_tag: dict[ExecutionPriority, dict[str, float]] = {p: {} for p in _CLASSES}
+        self._queued: dict[int, tuple[ExecutionPriority, _Queued]] = {}
+        self._running: dict[int, float] = {}  # execution_id -> monotonic start
+        self.run_seconds = DEFAULT_RUN_SECONDS
+
+    def _weight(self, tenant: str) -> float:
+        return max(float(self.weights.get(tenant, 1.0)), 0.01)
+
+    def submit(self, execution_id: int, priority: ExecutionPriority, tenant: str | None) -> None:
+        """Queue a pending execution; it starts in a daemon thread once admitted."""
+        tenant = tenant or ""
+        with self._lock:
+            last = self._last_tag[priority]
+            tag = max(self._clock[priority], last.get(tenant, 0.0)) + 1.0 / self._weight(tenant)
+            last[tenant] = tag
+            item = _Queued(tag, next(self._seq), execution_id, tenant)
+            heapq.heappush(self._queues[priority], item)
+            self._queued[execution_id] = (priority, item)
+            self._dispatch_locked()
+
+    def discard(self, execution_id: int) -> bool:
+        """Drop a queued execution (e.g. cancelled while pending). Returns True if it was queued."""
+        with self._lock:
+            entry = self._queued.pop(execution_id, None)
+            if entry is None:
+                return False
+            priority, item = entry
+            self._queues[priority].remove(item)
+            heapq.heapify(self._queues[priority])
+            return True
+
+    def _dispatch_locked(self) -> None:
+        while len(self._running) < self.max_concurrent:
+            priority = next((p for p in _CLASSES if self._queues[p]), None)
+            if priority is None:
+                return
+            item = heapq.heappop(self._queues[priority])
+            del self._queued[item.execution_id]
+            self._clock[priority] = item.tag
+            self._running[item.execution_id] = time.monotonic()
+            queue_wait_ms = (time.monotonic() - item.enqueued_at) * 1000
+            logger.info(
+                "Starting execution %s (%s, tenant %r) after %.0f ms queued",
+                item.execution_id, priority.value, item.tenant, queue_wait_ms,
+            )
+            threading.Thread(target=self._run_one, args=(item.execution_id, queue_wait_ms), daemon=True).start()
+
+    def _run_one(self, execution_id: int, queue_wait_ms: float) -> None:
+        try:
+            self._run(execution_id, queue_wait_ms)
+        finally:
+            with self._lock:
+                started = self._running.pop(execution_id)
+                elapsed = time.monotonic() - started
+                self.run_seconds += RUN_SECONDS_ALPHA * (elapsed - self.run_seconds)
+                self._dispatch_locked()
+
+    def status(self, execution_id: int) -> QueueStatus | None:
+        """Position and estimated start of a queued execution; None if it is not queued here."""
+        with self._lock:
+            if execution_id not in self._queued:
+                return None
+            order = [item.execution_id for p in _CLASSES for item in sorted(self._queues[p])]
+            position = order.index(execution_id)
+            now = time.monotonic()
+            # Each slot frees when its run is expected to finish; queued runs ahead take slots in order
+            free_at = [max(self.run_seconds - (now - s), 0.0) for s in self._running.values()]
+            free_at += [0.0] * (self.max_concurrent - len(free_at))
+            heapq.heapify(free_at)
+            for _ in range(position):
+                heapq.heappush(free_at, heapq.heappop(free_at) + self.run_seconds)
+            wait = free_at[0]
+        return QueueStatus(position, datetime.now(timezone.utc) + timedelta(seconds=wait))
+
+
+_scheduler: Scheduler | None = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> Scheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler(run_execution, settings.max_concurrent_executions, settings.tenant_weights)
+        return _scheduler
+
+
+def resume_pending() -> int:
+    """Queue the runs left pending by a previous process, oldest first. Returns how many."""
+    conn = get_connection()
+    try:
+        rows = db_pg.execution_list_pending(conn)
+        conn.commit()
+    finally:
+        return_connection(conn)
+    scheduler = get_scheduler()
+    for r in rows:
+        scheduler.submit(r["id"], ExecutionPriority(r["priority"]), r["tenant"])
+    if rows:
+        logger.info("Re-queued %d pending executions", len(rows))
+    return len(rows)
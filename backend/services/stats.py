@@ -0,0 +1,66 @@
+"""Percentiles from the log-bucket duration histograms kept in stats_* rollup tables."""
+import math
+from typing import Iterable
+
+from utils.sketch import SKETCH_BUCKETS, bucket_value_ms
+
+
+def merge_buckets(histograms: Iterable[list[int] | None]) -> list[int]:
+    """Element-wise sum of histograms."""
+    merged = [0] * SKETCH_BUCKETS
+    for h in histograms:
+        for i, n in enumerate(h or []):
+            merged[i] += n
+    return merged
+
+
+def quantile_ms(buckets: list[int] | None, q: float) -> float | None:
+    """Approximate q-quantile (0..1) in ms, or None when the histogram is empty."""
+    if not buckets:
+        return None
+    total = sum(buckets)
+    if total == 0:
+        return None
+    rank = max(1, math.ceil(q * total))
+    seen = 0
+    for i, n in enumerate(buckets):
+        seen += n
+        if seen >= rank:
+            return round(bucket_value_ms(i + 1), 1)
+    return round(bucket_value_ms(len(buckets)), 1)
+
+
+def rate(part: int, total: int) -> float | None:
+    return round(part / total, 4) if total else None
+
+
+def attempt_rollup(rows: list[dict]) -> dict:
+    """Sum attempt counters of several stats_step_model rows and derive rates/percentiles."""
+    attempts = sum(r["attempts"] for r in rows)
+    passed = sum(r["passed"] for r in rows)
+    buckets = merge_buckets(r["duration_buckets"] for r in rows)
+    return {
+        "attempts": attempts,
+        "passed": passed,
+        "failed": sum(r["failed"] for r in rows),
+        "errors": sum(r["errors"] for r in rows),
+        "pass_rate": rate(passed, attempts),
+        "tokens_used": sum(r["tokens_used"] for r in rows),
+        "duration_p50_ms": quantile_ms(buckets, 0.50),
+        "duration_p95_ms": quantile_ms(buckets, 0.95),
+    }
+
+
+def run_rollup(rows: list[dict]) -> dict:
+    """Sum stats_workflow_runs rows and derive success rate/percentiles."""
+    runs = sum(r["runs"] for r in rows)
+    completed = sum(r["completed"] for r in rows)
+    buckets = merge_buckets(r["duration_buckets"] for r in rows)
+    return {
+        "runs": runs,
+        "completed": completed,
+        "failed": sum(r["failed"] for r in rows),
+        "success_rate": rate(completed, runs),
+        "duration_p50_ms": quantile_ms(buckets, 0.50),
+        "duration_p95_ms": quantile_ms(buckets, 0.95),
+    }
@@ -1,24 +1,154 @@
 """Unbound API client — call_llm(step, context) returns response text and optional token count."""
+import asyncio
+import json
 import logging
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field
 
 import httpx
 
 from core.config import settings
+from services.cancellation import CancelToken, ExecutionCancelled
 
 logger = logging.getLogger(__name__)
 
+LLM_TIMEOUT_SECONDS = 120.0
+DEFAULT_MAX_TOKENS = 4096
+DEFAULT_TEMPERATURE = 1.0
+# How often an in-flight request checks its cancel token
+CANCEL_CHECK_SECONDS = 0.05
+
+
+class LLMTimeout(TimeoutError):
+    """The call did not finish within its (deadline-capped) timeout."""
+
 
 @dataclass
 class LLMResult:
-    """Result of a single LLM call."""
+    """
+    Result of a single LLM call. choices holds every returned candidate (content = choices[0]).
+    ttfb_ms is the time until the first streamed chunk arrived (connect included); None when the
+    provider answered with a plain JSON body instead of a stream.
+    """
     content: str
     tokens_used: int | None = None
+    choices: list[str] = field(default_factory=list)
+    ttfb_ms: float | None = None
+
+
+class _StreamedCompletion:
+    """Folds chat.completion.chunk SSE events into the non-streaming response shape."""
+
+    def __init__(self, start: float):
+        self.start = start
+        self.ttfb_ms: float | None = None
+        self.parts: dict[int, list[str]] = {}
+        self.usage: dict | None = None
+
+    def feed(self, line: str) -> None:
+        if not line.startswith("data:"):
+            return
+        data = line[len("data:"):].strip()
+        if self.ttfb_ms is None:
+            self.ttfb_ms = (time.monotonic() - self.start) * 1000
+        if not data or data == "[DONE]":
+            return
+        chunk = json.loads(data)
+        for choice in chunk.get("choices") or []:
+            piece = (choice.get("delta") or {}).get("content")
+            parts = self.parts.setdefault(choice.get("index", 0), [])
+            if piece:
+                parts.append(piece)
+        if chunk.get("usage"):
+            self.usage = chunk["usage"]
+
+    def result(self) -> dict:
+        return {
+            "choices": [{"message": {"content": "".join(self.parts[i])}} for i in sorted(self.parts)],
+            "usage": self.usage or {},
+        }
+
+
+def _is_event_stream(resp: httpx.Response) -> bool:
+    return resp.headers.get("content-type", "").startswith("text/event-stream")
+
+
+def _post(payload: dict, headers: dict, timeout: float = LLM_TIMEOUT_SECONDS) -> tuple[dict, float | None]:
+    """Returns (response in the non-streaming JSON shape, ms until the first chunk)."""
+    completion = _StreamedCompletion(time.monotonic())
+    with httpx.Client(timeout=timeout) as client:
+        with client.stream("POST", settings.unbound_api_url, json=payload, headers=headers) as resp:
+            resp.raise_for_status()
+            if not _is_event_stream(resp):
+                resp.read()
+                return resp.json(), None
+            for line in resp.iter_lines():
+                completion.feed(line)
+    return completion.result(), completion.ttfb_ms
+
+
+async def _post_cancellable(
+    payload: dict,
+    headers: dict,
+    cancel: CancelToken | None,
+    timeout: float = LLM_TIMEOUT_SECONDS,
+) -> tuple[dict, float | None]:
+    """
+    Same request as _post, but cancelling the task closes the connection mid-flight.
+    timeout bounds the whole request (httpx timeouts are per read), so a slow trickle of bytes
+    cannot outlive a deadline.
+    """
+    loop = asyncio.get_running_loop()
+    expires = loop.time() + timeout
+
+    async def fetch(client: httpx.AsyncClient) -> tuple[dict, float | None]:
+        completion = _StreamedCompletion(time.monotonic())
+        async with client.stream("POST", settings.unbound_api_url, json=payload, headers=headers) as resp:
+            resp.raise_for_status()
+            if not _is_event_stream(resp):
+                await resp.aread()
+                return resp.json(), None
+            async for line in resp.aiter_lines():
+                completion.feed(line)
+        return completion.result(), completion.ttfb_ms
+
+    async with httpx.AsyncClient(timeout=timeout) as client:
+        task = asyncio.create_task(fetch(client))
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=min(CANCEL_CHECK_SECONDS, max(expires - loop.time(), 0)))
+            if done:
+                break
+            cancelled = cancel is not None and cancel.is_cancelled()
+            if cancelled or loop.time() >= expires:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+                if cancelled:
+                    raise ExecutionCancelled(f"Execution {cancel.execution_id} cancelled during LLM call")
+                raise LLMTimeout(f"LLM call timed out after {timeout:.1f}s")
+        return task.result()
 
 
-def call_llm(prompt_with_context: str, model: str) -> LLMResult:
+def call_llm(
+    prompt_with_context: str,
+    model: str,
+    cancel: CancelToken | None = None,
+    timeout: float | None = None,
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+    n: int = 1,
+    temperature: float = DEFAULT_TEMPERATURE,
+    top_p: float | None = None,
+    stop: list[str] | None = None,
+    response_format: dict | None = None,
+) -> LLMResult:
     """
     Call Unbound chat completions API. Used by executor with step.model and built prompt.
+    With a cancel token the request is aborted as soon as the token is set (raises ExecutionCancelled).
+    timeout (default LLM_TIMEOUT_SECONDS) caps the whole call; exceeding it raises LLMTimeout.
+    n > 1 asks for that many candidates in one request; providers that ignore n return one.
+    top_p, stop and response_format are only sent when set (see services.generation).
     """
     if not settings.unbound_api_key:
         raise ValueError("UNBOUND_API_KEY is not set")
@@ -26,30 +156,38 @@ def call_llm(prompt_with_context: str, model: str) -> LLMResult:
     payload = {
         "model": model,
         "messages": [{"role": "user", "content": prompt_with_context}],
-        "max_tokens": 4096,
-        "temperature": 1.0,
-        "stream": False,
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+        # Streamed so ttfb_ms marks the first generated chunk, not the end of generation
+        "stream": True,
+        "stream_options": {"include_usage": True},
     }
+    if n > 1:
+        payload["n"] = n
+    if top_p is not None:
+        payload["top_p"] = top_p
+    if stop:
+        payload["stop"] = stop
+    if response_format is not None:
+        payload["response_format"] = response_format
     headers = {
         "Authorization": f"Bearer {settings.unbound_api_key}",
         "Content-Type": "application/json",
     }
 
-    with httpx.Client(timeout=120.0) as client:
-        resp = client.post(
-            settings.unbound_api_url,
-            json=payload,
-            headers=headers,
-        )
-        resp.raise_for_status()
-        data = resp.json()
+    if cancel is None and timeout is None:
+        data, ttfb_ms = _post(payload, headers)
+    else:
+        if cancel is not None:
+            cancel.raise_if_cancelled()
+        data, ttfb_ms = asyncio.run(_post_cancellable(payload, headers, cancel, timeout or LLM_TIMEOUT_SECONDS))
 
     choices = data.get("choices") or []
     if not choices:
         raise ValueError("Unbound API returned no choices")
 
-    content = (choices[0].get("message") or {}).get("content") or ""
+    contents = [((c.get("message") or {}).get("content") or "").strip() for c in choices[:n]]
     usage = data.get("usage") or {}
     tokens_used = usage.get("total_tokens")
 
-    return LLMResult(content=content.strip(), tokens_used=tokens_used)
+    return LLMResult(content=contents[0], tokens_used=tokens_used, choices=contents, ttfb_ms=ttfb_ms)
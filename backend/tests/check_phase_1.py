@@ -39,11 +39,15 @@ except Exception as e:
     print(f"  FAIL: Connection failed: {e}")
     sys.exit(1)
 
-# 3. Stored functions exist (workflow_list)
+# 3. Stored functions exist (workflow_list; SQLite applies its schema itself)
 try:
-    with cursor() as cur:
-        cur.execute("SELECT * FROM workflow_list()")
-        rows = cur.fetchall()
+    from core import db_pg
+    conn = get_connection()
+    try:
+        rows = db_pg.workflow_list(conn)
+        conn.commit()
+    finally:
+        return_connection(conn)
     print(f"  OK   workflow_list() works (returned {len(rows)} rows)")
 except Exception as e:
     print(f"  FAIL: workflow_list() failed. Run db/schema.sql in Supabase SQL Editor: {e}")
@@ -51,7 +55,6 @@ except Exception as e:
 
 # 4. Optional: one round-trip create/get/delete
 try:
-    from core import db_pg
     conn = get_connection()
     try:
         w_id = db_pg.workflow_create(conn, "check_phase_1_test")
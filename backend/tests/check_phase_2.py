@@ -19,6 +19,8 @@ tests = [
     ({"type": "contains_string", "value": "SUCCESS"}, "The result is FAIL.", False),
     ({"type": "regex", "pattern": r"\d{3}-\d{4}"}, "Call 555-1234 for help.", True),
     ({"type": "regex", "pattern": r"^\d+$"}, "abc", False),
+    # Catastrophic backtracking: stopped by the time limit instead of pinning a core
+    ({"type": "regex", "pattern": r"^(a+)+$"}, "a" * 40 + "b", False),
     ({"type": "has_code_block"}, "Here is code:\n```\nprint(1)\n```", True),
     ({"type": "has_code_block", "language": "python"}, "```python\nx=1\n```", True),
     ({"type": "has_code_block"}, "No code here.", False),
@@ -39,6 +41,22 @@ print(f"Criteria: {ok}/{len(tests)} passed")
 if ok != len(tests):
     sys.exit(1)
 
+# A garbled worker reply fails the criteria instead of escaping as an exception
+from services import regex_sandbox
+
+garbled = regex_sandbox._Worker()
+garbled._read_line = lambda timeout: '{"found": tr'
+regex_sandbox._idle.append(garbled)
+try:
+    passed, reason = evaluate_criteria({"type": "regex", "pattern": "x"}, "x")
+except Exception as e:
+    print(f"  FAIL regex: malformed worker reply raised {type(e).__name__}: {e}")
+    sys.exit(1)
+if passed or garbled.proc.poll() is None:
+    print(f"  FAIL regex: malformed worker reply gave passed={passed}, worker alive={garbled.proc.poll() is None}")
+    sys.exit(1)
+print(f"  OK  regex: malformed worker reply fails the criteria ({reason})")
+
 # --- 2. Unbound client (needs API key in .env) ---
 print("\nPhase 2 check: Unbound client (optional)")
 print("-" * 40)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Run from backend/ to verify services.scheduler without a database: start order (priority, then
+tenant fair share), weights, discarding queued runs, queue positions and the concurrency cap.
+Runs are fake callables that block until the check releases them.
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Ensure backend root is on path when run as script
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+from services.scheduler import Scheduler
+from utils.enums import ExecutionPriority
+
+INTERACTIVE, BATCH = ExecutionPriority.INTERACTIVE, ExecutionPriority.BATCH
+TIMEOUT = 5.0
+
+print("Scheduler check")
+print("-" * 40)
+
+failures = 0
+
+
+def check(name: str, ok: bool, detail: object = "") -> None:
+    global failures
+    if ok:
+        print(f"  OK   {name}")
+    else:
+        failures += 1
+        print(f"  FAIL {name} {detail}")
+
+
+def wait_for(predicate) -> bool:
+    deadline = time.monotonic() + TIMEOUT
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+class GatedRuns:
+    """A run callable whose runs block until released; records the start order."""
+
+    def __init__(self):
+        self.started: list[int] = []
+        self.finished: list[int] = []
+        self.gates: dict[int, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, execution_id: int, queue_wait_ms: float) -> None:
+        with self._lock:
+            gate = self.gates.setdefault(execution_id, threading.Event())
+            self.started.append(execution_id)
+        gate.wait(TIMEOUT)
+        with self._lock:
+            self.finished.append(execution_id)
+
+    def release_in_start_order(self, count: int) -> list[int]:
+        """Release runs one at a time as they start (max_concurrent=1); returns the start order."""
+        for i in range(count):
+            if not wait_for(lambda: len(self.started) > i):
+                break
+            with self._lock:
+                gate = self.gates[self.started[i]]
+            gate.set()
+        wait_for(lambda: len(self.finished) >= count)
+        return list(self.started)
+
+
+def scheduled_order(submissions: list[tuple[int, ExecutionPriority, str]], weights: dict | None = None) -> list[int]:
+    """Start order of the submissions behind a blocker run 0 holding the only slot."""
+    runs = GatedRuns()
+    scheduler = Scheduler(runs, 1, weights)
+    scheduler.submit(0, BATCH, None)
+    wait_for(lambda: runs.started == [0])
+    for execution_id, priority, tenant in submissions:
+        scheduler.submit(execution_id, priority, tenant)
+    return runs.release_in_start_order(len(submissions) + 1)
+
+
+# --- Priority: interactive runs start before batch runs queued earlier ---
+order = scheduled_order([(1, BATCH, "a"), (2, BATCH, "a"), (3, INTERACTIVE, "b"), (4, INTERACTIVE, "a")])
+check("interactive before batch, FIFO within a tenant", order == [0, 3, 4, 1, 2], order)
+
+# --- Fair share: a tenant arriving later is interleaved, not stuck behind the backlog ---
+backlog = [(10, BATCH, "a"), (11, BATCH, "a"), (12, BATCH, "a"), (13, BATCH, "a")]
+later = [(20, BATCH, "b"), (21, BATCH, "b")]
+order = scheduled_order(backlog + later)
+check("tenants take turns", order == [0, 10, 20, 11, 21, 12, 13], order)
+order = scheduled_order(backlog + later, weights={"a": 2})
+check("tenant weights (a: 2 runs per run of b)", order == [0, 10, 11, 20, 12, 13, 21], order)
+
+# --- Discard and queue status ---
+runs = GatedRuns()
+scheduler = Scheduler(runs, 1)
+scheduler.submit(0, BATCH, None)
+wait_for(lambda: runs.started == [0])
+for execution_id in (1, 2, 3):
+    scheduler.submit(execution_id, BATCH, "a")
+status = scheduler.status(3)
+check("status: queue position", status is not None and status.position == 2, status)
+check("status: running or unknown runs are not queued", scheduler.status(0) is None and scheduler.status(99) is None)
+check("discard a queued run", scheduler.discard(2) is True and scheduler.discard(2) is False)
+check("discard a running run is a no-op", scheduler.discard(0) is False)
+check("status after discard", scheduler.status(3).position == 1)
+order = runs.release_in_start_order(3)
+check("discarded run never starts", order == [0, 1, 3], order)
+
+# --- Concurrency cap ---
+active = 0
+peak = 0
+done: list[int] = []
+cap_lock = threading.Lock()
+
+
+def short_run(execution_id: int, queue_wait_ms: float) -> None:
+    global active, peak
+    with cap_lock:
+        active += 1
+        peak = max(peak, active)
+    time.sleep(0.02)
+    with cap_lock:
+        active -= 1
+        done.append(execution_id)
+
+
+scheduler = Scheduler(short_run, 3)
+for execution_id in range(12):
+    scheduler.submit(execution_id, INTERACTIVE if execution_id % 2 else BATCH, f"t{execution_id % 3}")
+wait_for(lambda: len(done) == 12)
+check("every queued run starts", sorted(done) == list(range(12)), done)
+check("at most max_concurrent run at once", peak == 3, peak)
+
+print("-" * 40)
+if failures:
+    print(f"Scheduler check: {failures} failed.")
+    sys.exit(1)
+print("Scheduler check: all good.")
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Run from backend/ to verify the storage backend behind core.db_pg (PostgreSQL or SQLite, per
+DATABASE_URL): every function, with the same expectations for both. Creates its own workflows
+and deletes them at the end.
+
+    DATABASE_URL=sqlite:////tmp/check.db python tests/check_storage.py
+"""
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Ensure backend root is on path when run as script
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+from core import db_pg
+from core.config import settings
+from core.database import get_connection, return_connection
+from utils.sketch import bucket_for_ms
+
+print(f"Storage check: {'SQLite' if settings.database_is_sqlite else 'PostgreSQL'} backend")
+print("-" * 40)
+
+failures = 0
+
+
+def check(name: str, ok: bool, detail: object = "") -> None:
+    global failures
+    if ok:
+        print(f"  OK   {name}")
+    else:
+        failures += 1
+        print(f"  FAIL {name} {detail}")
+
+
+def step_fields(i: int, **overrides) -> dict:
+    fields = {
+        "order_index": i, "model": "mock-model", "prompt": f"Step {i}",
+        "completion_criteria": {"type": "contains_string", "value": "ok"}, "context_strategy": "full",
+        "timeout_seconds": None, "fallback_models": ["mock-fallback"], "routing_policy": "ordered",
+        "hedge_percentile": None, "candidates": 1, "context_config": {},
+        "max_tokens": None, "temperature": None, "top_p": None, "stop": [], "response_format": None,
+    }
+    fields.update(overrides)
+    return fields
+
+
+conn = get_connection()
+created: list[int] = []
+try:
+    # --- Workflows ---
+    wid = db_pg.workflow_create(conn, "check_storage", deadline_seconds=60.0, token_budget=1000)
+    conn.commit()
+    created.append(wid)
+    w = db_pg.workflow_get(conn, wid)
+    check("workflow_create / workflow_get", w["name"] == "check_storage" and w["root_id"] == wid
+          and w["version"] == 1 and w["parent_id"] is None and w["token_budget"] == 1000, w)
+    check("timestamps are timezone-aware datetimes",
+          isinstance(w["created_at"], datetime) and w["created_at"].utcoffset() == timedelta(0), w["created_at"])
+
+    db_pg.workflow_update(conn, wid, "check_storage renamed", deadline_seconds=None, token_budget=None)
+    conn.commit()
+    w2 = db_pg.workflow_get(conn, wid)
+    check("workflow_update", w2["name"] == "check_storage renamed" and w2["token_budget"] is None
+          and w2["updated_at"] >= w["updated_at"], w2)
+
+    # --- Steps ---
+    s0 = db_pg.step_create(conn, wid, **step_fields(0))
+    s1 = db_pg.step_create(conn, wid, **step_fields(1, context_strategy="json_path", context_config={"path": "$.a"}))
+    conn.commit()
+    steps = db_pg.step_list_by_workflow(conn, wid)
+    check("step_create / step_list_by_workflow", [s["id"] for s in steps] == [s0, s1]
+          and steps[0]["completion_criteria"] == {"type": "contains_string", "value": "ok"}
+          and steps[0]["fallback_models"] == ["mock-fallback"] and steps[1]["context_config"] == {"path": "$.a"}, steps)
+    check("step_get", db_pg.step_get(conn, wid, s1)["order_index"] == 1 and db_pg.step_get(conn, wid, -1) is None)
+    check("generation parameters default to unset", steps[0]["max_tokens"] is None and steps[0]["temperature"] is None
+          and steps[0]["stop"] == [] and steps[0]["response_format"] is None, steps[0])
+    listed = {r["id"]: r for r in db_pg.workflow_list(conn)}
+    check("workflow_list step_count / versions", listed[wid]["step_count"] == 2 and listed[wid]["versions"] == 1,
+          listed.get(wid))
+    check("step changes touch workflows.updated_at", db_pg.workflow_get(conn, wid)["updated_at"] >= w2["updated_at"])
+
+    # --- Versions (shared steps, copy-on-write) ---
+    v2 = db_pg.workflow_create_version(conn, wid)
+    conn.commit()
+    created.append(v2)
+    v2_row = db_pg.workflow_get(conn, v2)
+    check("workflow_create_version", v2_row["root_id"] == wid and v2_row["parent_id"] == wid and v2_row["version"] == 2,
+          v2_row)
+    check("new version shares step rows", [s["id"] for s in db_pg.step_list_by_workflow(conn, v2)] == [s0, s1])
+    check("workflow_create_version of unknown id", db_pg.workflow_create_version(conn, -1) is None)
+    conn.commit()
+    latest = [r for r in db_pg.workflow_list(conn) if r["root_id"] == wid]
+    check("workflow_list shows the latest version", len(latest) == 1 and latest[0]["id"] == v2
+          and latest[0]["versions"] == 2 and latest[0]["step_count"] == 2, latest)
+    check("workflow_list_versions", [r["id"] for r in db_pg.workflow_list_versions(conn, wid)] == [v2, wid])
+
+    copied = db_pg.step_update(conn, s0, v2, **step_fields(0, prompt="Edited in v2"))
+    conn.commit()
+    check("step_update copies a shared step", copied not in (None, s0)
+          and db_pg.step_get(conn, wid, s0)["prompt"] == "Step 0"
+          and db_pg.step_get(conn, v2, copied)["prompt"] == "Edited in v2")
+    generation = {"max_tokens": 8, "temperature": 0.7, "top_p": 0.95, "stop": ["\n"], "response_format": {"type": "json_object"}}
+    same = db_pg.step_update(conn, copied, v2, **step_fields(0, prompt="Edited again", candidates=2, **generation))
+    conn.commit()
+    edited = db_pg.step_get(conn, v2, copied)
+    check("step_update edits an unshared step in place", same == copied and edited["candidates"] == 2)
+    check("step_update stores generation parameters (0.7 reads back as 0.7)", {k: edited[k] for k in generation} == generation, edited)
+    check("step_update of a step outside the workflow", db_pg.step_update(conn, s0, v2, **step_fields(0)) is None)
+    conn.commit()
+
+    n = db_pg.step_replace_all(
+        conn, v2, [step_fields(i, prompt=f"Replaced {i}", **(generation if i == 1 else {})) for i in range(3)],
+    )
+    conn.commit()
+    replaced = db_pg.step_list_by_workflow(conn, v2)
+    check("step_replace_all", n == 3 and [s["prompt"] for s in replaced] == ["Replaced 0", "Replaced 1", "Replaced 2"]
+          and [s["id"] for s in db_pg.step_list_by_workflow(conn, wid)] == [s0, s1], replaced)
+    check("step_replace_all stores generation parameters", {k: replaced[1][k] for k in generation} == generation
+          and replaced[0]["stop"] == [] and replaced[0]["max_tokens"] is None, replaced)
+    db_pg.step_delete(conn, v2, replaced[2]["id"])
+    conn.commit()
+    check("step_delete", len(db_pg.step_list_by_workflow(conn, v2)) == 2
+          and db_pg.step_get(conn, v2, replaced[2]["id"]) is None)
+    check("step_count follows the links",
+          {r["id"]: r["step_count"] for r in db_pg.workflow_list_versions(conn, wid)} == {wid: 2, v2: 2})
+
+    # --- Executions ---
+    check("workflow_has_executions before a run", db_pg.workflow_has_executions(conn, v2) is False
+          and db_pg.workflow_executions_exist(conn, v2) is False)
+    eid = db_pg.execution_create(conn, v2, "interactive", "tenant-a")
+    conn.commit()
+    ex = db_pg.execution_get(conn, eid)
+    check("execution_create / execution_get", ex["status"] == "pending" and ex["priority"] == "interactive"
+          and ex["tenant"] == "tenant-a" and ex["step_timings"] == [] and ex["tokens_used"] == 0, ex)
+    check("workflow_has_executions after a run", db_pg.workflow_has_executions(conn, v2) is True
+          and db_pg.workflow_executions_exist(conn, v2) is True)
+    check("workflow_has_running_execution while pending", db_pg.workflow_has_running_execution(conn, v2) is True)
+    resumable = [(r["id"], r["priority"], r["tenant"]) for r in db_pg.execution_list_pending(conn)]
+    check("execution_list_pending", (eid, "interactive", "tenant-a") in resumable, resumable)
+
+    started = datetime.now(timezone.utc).replace(microsecond=0)
+    claimed = db_pg.execution_claim(conn, eid, started, 12.5)
+    conn.commit()
+    check("execution_claim (once)", claimed is True and db_pg.execution_claim(conn, eid, started) is False)
+    conn.commit()
+    check("execution_list_pending skips started runs", eid not in [r["id"] for r in db_pg.execution_list_pending(conn)])
+    db_pg.execution_update(conn, eid, "running", current_step_index=0)
+    conn.commit()
+    ex = db_pg.execution_get(conn, eid)
+    check("execution_claim / execution_update", ex["status"] == "running" and ex["started_at"] == started
+          and ex["queue_wait_ms"] == 12.5 and ex["current_step_index"] == 0, ex)
+    check("workflow_has_running_execution while running", db_pg.workflow_has_running_execution(conn, v2) is True)
+    db_pg.execution_update(conn, eid, "running", current_step_index=1)
+    conn.commit()
+    check("execution_update keeps unset fields", db_pg.execution_get(conn, eid)["started_at"] == started)
+
+    step_id = db_pg.step_list_by_workflow(conn, v2)[0]["id"]
+    body = "héllo wörld ✓"
+    a1 = db_pg.step_attempt_insert(conn, eid, step_id, 1, "running", prompt_sent=body, model="mock-model",
+                                   execution_created_at=ex["created_at"], context_bytes=4)
+    db_pg.step_attempt_update(conn, a1, "failed", response="nope", criteria_passed=False, tokens_used=7,
+                              execution_created_at=ex["created_at"], llm_ms=20.5)
+    a2 = db_pg.step_attempt_insert(conn, eid, step_id, 2, "passed", prompt_sent=body, response="ok",
+                                   criteria_passed=True, tokens_used=5, model="mock-fallback", is_hedge=True)
+    conn.commit()
+    attempts = db_pg.execution_get_attempts(conn, eid)
+    check("step_attempt_insert / _update / execution_get_attempts", [a["id"] for a in attempts] == [a1, a2]
+          and attempts[0]["status"] == "failed" and attempts[0]["criteria_passed"] is False
+          and attempts[0]["llm_ms"] == 20.5 and attempts[0]["context_bytes"] == 4
+          and attempts[1]["is_hedge"] is True and attempts[1]["criteria_passed"] is True, attempts)
+    summaries = db_pg.execution_get_attempt_summaries(conn, eid)
+    check("execution_get_attempt_summaries", summaries[0]["prompt_bytes"] == len(body.encode())
+          and summaries[0]["response_bytes"] == 4 and "prompt_sent" not in summaries[0], summaries[0])
+    check("step_attempt_summary_get", db_pg.step_attempt_summary_get(conn, eid, a2) == summaries[1]
+          and db_pg.step_attempt_summary_get(conn, eid, -1) is None
+          and db_pg.step_attempt_summary_get(conn, -1, a1) is None)
+    check("step_attempt_body_range", db_pg.step_attempt_body_range(conn, eid, a1, "prompt", 1, 2) == body.encode()[1:3]
+          and db_pg.step_attempt_body_range(conn, eid, a1, "prompt") == body.encode()
+          and db_pg.step_attempt_body_range(conn, eid, -1, "prompt") is None)
+    check("step_attempt_body_chunk", db_pg.step_attempt_body_chunk(conn, eid, a1, "prompt", 2, 4) == body[1:5]
+          and db_pg.step_attempt_body_chunk(conn, eid, a1, "response", 1, 100) == "nope")
+
+    db_pg.execution_record_step(conn, eid, 0, step_id, 250.5)
+    db_pg.execution_add_usage(conn, eid, 12, 0.25)
+    db_pg.execution_add_usage(conn, eid, None, None)
+    conn.commit()
+    ex = db_pg.execution_get(conn, eid)
+    check("execution_record_step / execution_add_usage",
+          ex["step_timings"] == [{"step_index": 0, "step_id": step_id, "wall_ms": 250.5}]
+          and ex["tokens_used"] == 12 and float(ex["cost_usd"]) == 0.25, ex)
+
+    # Cancellation: running runs are flagged, pending ones cancelled, cancelled is final
+    check("execution_request_cancel (running)", db_pg.execution_request_cancel(conn, eid) == "running")
+    conn.commit()
+    check("execution_cancel_requested", db_pg.execution_cancel_requested(conn, [eid, -1]) == [eid])
+    db_pg.execution_update(conn, eid, "cancelled", finished_at=started + timedelta(seconds=2))
+    db_pg.execution_update(conn, eid, "completed")
+    conn.commit()
+    check("a cancelled run stays cancelled", db_pg.execution_get(conn, eid)["status"] == "cancelled")
+    pending = db_pg.execution_create(conn, v2)
+    conn.commit()
+    check("execution_request_cancel (pending)", db_pg.execution_request_cancel(conn, pending) == "cancelled"
+          and db_pg.execution_get(conn, pending)["finished_at"] is not None)
+    check("execution_request_cancel (unknown)", db_pg.execution_request_cancel(conn, -1) is None)
+    conn.commit()
+
+    listed = db_pg.execution_list(conn, v2)
+    check("execution_list (newest started first, never-started last)", [r["id"] for r in listed] == [eid, pending],
+          listed)
+    check("execution_list (all)", {eid, pending} <= {r["id"] for r in db_pg.execution_list(conn)})
+
+    rows = list(db_pg.execution_export_iter(conn, workflow_id=v2))
+    conn.commit()
+    check("execution_export_iter", [(r["execution_id"], r["attempt_id"]) for r in rows]
+          == [(eid, a1), (eid, a2), (pending, None)] and rows[0]["prompt_sent"] == body, rows[:1])
+    rows = list(db_pg.execution_export_iter(conn, workflow_id=v2, since=started, include_bodies=False))
+    conn.commit()
+    check("execution_export_iter (since, no bodies)", len(rows) == 2 and rows[0]["prompt_sent"] is None
+          and rows[0]["execution_status"] == "cancelled", rows[:1])
+    rows = list(db_pg.execution_export_iter(conn, workflow_id=v2, until=started))
+    conn.commit()
+    check("execution_export_iter (until)", rows == [])
+
+    # --- Stats ---
+    db_pg.stats_record_attempt(conn, v2, step_id, "mock-model", True, 5, 120.0)
+    db_pg.stats_record_attempt(conn, v2, step_id, "mock-model", False, 7, 120.0)
+    db_pg.stats_record_attempt(conn, v2, step_id, "mock-model", None)
+    db_pg.stats_record_run(conn, v2, "completed", 2000.0)
+    db_pg.stats_record_run(conn, v2, "failed")
+    conn.commit()
+    sm = db_pg.stats_step_model_list(conn, v2)
+    b = bucket_for_ms(120.0)
+    check("stats_record_attempt / stats_step_model_list", len(sm) == 1 and sm[0]["attempts"] == 3
+          and (sm[0]["passed"], sm[0]["failed"], sm[0]["errors"], sm[0]["tokens_used"]) == (1, 1, 1, 12)
+          and sm[0]["duration_buckets"][b - 1] == 2 and sum(sm[0]["duration_buckets"]) == 2, sm)
+    run = db_pg.stats_workflow_get(conn, v2)
+    check("stats_record_run / stats_workflow_get", (run["runs"], run["completed"], run["failed"]) == (2, 1, 1)
+          and run["duration_buckets"][bucket_for_ms(2000.0) - 1] == 1 and len(run["duration_buckets"]) == 160, run)
+    check("stats_workflow_runs_list", v2 in [r["workflow_id"] for r in db_pg.stats_workflow_runs_list(conn)])
+    check("stats_step_model_list (all)", any(r["workflow_id"] == v2 for r in db_pg.stats_step_model_list(conn)))
+
+    db_pg.stats_backfill(conn)
+    conn.commit()
+    sm = db_pg.stats_step_model_list(conn, v2)
+    run = db_pg.stats_workflow_get(conn, v2)
+    # Backfill counts finished attempts (a1 failed, a2 passed) and finished runs (none: eid was cancelled)
+    by_model = {r["model"]: r for r in sm}
+    check("stats_backfill", sorted(by_model) == ["mock-fallback", "mock-model"] and run is None, (sm, run))
+    check("stats_backfill keys attempts by the model that served them",
+          (by_model["mock-model"]["attempts"], by_model["mock-model"]["failed"]) == (1, 1)
+          and (by_model["mock-fallback"]["attempts"], by_model["mock-fallback"]["passed"]) == (1, 1), sm)
+    check("stats_backfill fills duration histograms from llm_ms",
+          by_model["mock-model"]["duration_buckets"][bucket_for_ms(20.5) - 1] == 1
+          and sum(by_model["mock-model"]["duration_buckets"]) == 1
+          and sum(by_model["mock-fallback"]["duration_buckets"]) == 0, sm)
+
+    # --- Partitions (no-ops or PostgreSQL-only maintenance) ---
+    db_pg.partition_ensure_upcoming(conn, 1)
+    conn.commit()
+    check("partition_list_months", isinstance(db_pg.partition_list_months(conn), list))
+    conn.commit()
+
+    # --- Delete: shared steps survive, later versions re-parent ---
+    v3 = db_pg.workflow_create_version(conn, v2)
+    conn.commit()
+    created.append(v3)
+    db_pg.workflow_delete(conn, v2)
+    conn.commit()
+    created.remove(v2)
+    check("workflow_delete keeps steps shared with other versions", len(db_pg.step_list_by_workflow(conn, v3)) == 2
+          and db_pg.workflow_get(conn, v3)["parent_id"] == wid and db_pg.workflow_get(conn, v2) is None)
+    check("workflow_delete removes its executions", db_pg.execution_get(conn, eid) is None)
+    conn.commit()
+finally:
+    for workflow_id in created:
+        db_pg.workflow_delete(conn, workflow_id)
+    conn.commit()
+    return_connection(conn)
+
+print("-" * 40)
+if failures:
+    print(f"Storage check: {failures} failed.")
+    sys.exit(1)
+print("Storage check: all good.")
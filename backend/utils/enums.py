@@ -8,6 +8,13 @@ class WorkflowExecutionStatus(str, enum.Enum):
     RUNNING = "running"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class ExecutionPriority(str, enum.Enum):
+    """Admission class of a run (services.scheduler): interactive runs start before any batch run."""
+    INTERACTIVE = "interactive"
+    BATCH = "batch"
 
 
 class StepAttemptStatus(str, enum.Enum):
@@ -16,9 +23,48 @@ class StepAttemptStatus(str, enum.Enum):
     RUNNING = "running"
     PASSED = "passed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
 
 
 class ContextStrategy(str, enum.Enum):
     """How to pass output from previous step to the next."""
     FULL = "full"
     TRUNCATE_CHARS = "truncate_chars"
+    JSON_PATH = "json_path"  # one value from the response's JSON (context_config.path)
+    CODE_BLOCK = "code_block"  # body of a fenced code block
+    REGEX_GROUP = "regex_group"  # capture group of a regex match
+    LAST_N_STEPS = "last_n_steps"  # the last n responses merged with a template
+
+
+class RoutingPolicy(str, enum.Enum):
+    """How a step picks the model for each attempt from its model + fallback_models."""
+    ORDERED = "ordered"  # first healthy model in list order; move down the chain after an error
+    FASTEST = "fastest"  # healthy model with the lowest recent latency
+
+
+class ExecutionView(str, enum.Enum):
+    """How much of each step attempt to return from execution endpoints."""
+    FULL = "full"
+    SUMMARY = "summary"
+
+
+class AttemptBodyField(str, enum.Enum):
+    """Large TEXT bodies on a step attempt that are served lazily."""
+    PROMPT = "prompt"
+    RESPONSE = "response"
+
+
+class ExportFormat(str, enum.Enum):
+    """Wire format for GET /executions/export."""
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+class ExecutionFailureReason(str, enum.Enum):
+    """Why a workflow run ended as failed (workflow_executions.failure_reason)."""
+    STEP_FAILED = "step_failed"
+    STEP_DEADLINE_EXCEEDED = "step_deadline_exceeded"
+    DEADLINE_EXCEEDED = "deadline_exceeded"
+    TOKEN_BUDGET_EXCEEDED = "token_budget_exceeded"
+    COST_BUDGET_EXCEEDED = "cost_budget_exceeded"
+    ERROR = "error"
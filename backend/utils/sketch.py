@@ -0,0 +1,19 @@
+"""Log-bucket duration histograms of the stats_* rollup tables, shared by both storage backends."""
+import math
+
+# Must match stats_duration_bucket() in db/schema.sql: SQLite rollups are bucketed by bucket_for_ms
+SKETCH_GAMMA = 1.1
+SKETCH_BUCKETS = 160
+
+
+def bucket_for_ms(ms: float) -> int:
+    """1-based bucket of a duration in ms; Python twin of stats_duration_bucket()."""
+    return min(max(math.ceil(math.log(max(ms, 1.0)) / math.log(SKETCH_GAMMA)), 0), SKETCH_BUCKETS - 1) + 1
+
+
+def bucket_value_ms(bucket: int) -> float:
+    """Representative value for a 1-based bucket (midpoint in log space, ~5% relative error)."""
+    if bucket <= 1:
+        return 1.0
+    upper = SKETCH_GAMMA ** (bucket - 1)
+    return 2 * upper / (1 + SKETCH_GAMMA)
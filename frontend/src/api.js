@@ -1,11 +1,19 @@
 const API_BASE = import.meta.env.VITE_API_URL || '/api'
 
+// WAL position of our last write (X-Write-LSN); sent back on reads so a read replica that has
+// not caught up yet is skipped and we see our own changes
+let lastWriteLsn = null
+
 async function request(path, options = {}) {
   const url = `${API_BASE}${path}`
+  const headers = { 'Content-Type': 'application/json', ...options.headers }
+  if (lastWriteLsn && !options.method) headers['X-Min-LSN'] = lastWriteLsn
   const res = await fetch(url, {
-    headers: { 'Content-Type': 'application/json', ...options.headers },
     ...options,
+    headers,
   })
+  const writeLsn = res.headers.get('X-Write-LSN')
+  if (writeLsn) lastWriteLsn = writeLsn
   if (!res.ok) {
     const err = await res.json().catch(() => ({ detail: res.statusText }))
     throw new Error(err.detail || JSON.stringify(err))
@@ -21,20 +29,36 @@ export const api = {
   createWorkflow: (body) => request('/workflows', { method: 'POST', body: JSON.stringify(body) }),
   updateWorkflow: (id, body) => request(`/workflows/${id}`, { method: 'PUT', body: JSON.stringify(body) }),
   deleteWorkflow: (id) => request(`/workflows/${id}`, { method: 'DELETE' }),
+  createVersion: (id) => request(`/workflows/${id}/versions`, { method: 'POST' }),
+  listVersions: (id) => request(`/workflows/${id}/versions`),
 
   // Steps
   createStep: (workflowId, body) =>
     request(`/workflows/${workflowId}/steps`, { method: 'POST', body: JSON.stringify(body) }),
   updateStep: (workflowId, stepId, body) =>
     request(`/workflows/${workflowId}/steps/${stepId}`, { method: 'PUT', body: JSON.stringify(body) }),
+  replaceSteps: (workflowId, steps) =>
+    request(`/workflows/${workflowId}/steps`, { method: 'PUT', body: JSON.stringify({ steps }) }),
   deleteStep: (workflowId, stepId) =>
     request(`/workflows/${workflowId}/steps/${stepId}`, { method: 'DELETE' }),
 
   // Executions
-  executeWorkflow: (workflowId) =>
-    request(`/workflows/${workflowId}/execute`, { method: 'POST' }),
+  executeWorkflow: (workflowId, { priority = 'interactive', tenant } = {}) =>
+    request(`/workflows/${workflowId}/execute`, { method: 'POST', body: JSON.stringify({ priority, tenant }) }),
   listExecutions: (workflowId) =>
     request(workflowId != null ? `/executions?workflow_id=${workflowId}` : '/executions'),
   getExecution: (id) => request(`/executions/${id}`),
   getExecutionAttempts: (id) => request(`/executions/${id}/attempts`),
+  getExecutionSummary: (id) => request(`/executions/${id}?view=summary`),
+  cancelExecution: (id) => request(`/executions/${id}/cancel`, { method: 'POST' }),
+  attemptBodyUrl: (executionId, attemptId, field) =>
+    `${API_BASE}/executions/${executionId}/attempts/${attemptId}/${field}`,
+  // Server-side streaming export; use as a download link rather than fetching into memory
+  exportExecutionsUrl: ({ format = 'ndjson', workflowId, since, until, includeBodies = true } = {}) => {
+    const params = new URLSearchParams({ format, include_bodies: String(includeBodies) })
+    if (workflowId != null) params.set('workflow_id', workflowId)
+    if (since) params.set('since', since)
+    if (until) params.set('until', until)
+    return `${API_BASE}/executions/export?${params}`
+  },
 }
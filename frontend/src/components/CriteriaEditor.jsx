@@ -54,6 +54,15 @@ export default function CriteriaEditor({ value, onChange }) {
             placeholder="e.g. \\d{3}-\\d{4}"
             className="mt-1 w-full rounded-lg border border-slate-300 px-3 py-2 font-mono text-sm focus:border-brand-500 focus:outline-none focus:ring-1 focus:ring-brand-500"
           />
+          <label className="mt-3 block text-sm font-medium text-slate-700">Engine</label>
+          <select
+            value={config.engine ?? 're'}
+            onChange={(e) => setConfig('engine', e.target.value)}
+            className="mt-1 w-full rounded-lg border border-slate-300 bg-white px-3 py-2 focus:border-brand-500 focus:outline-none focus:ring-1 focus:ring-brand-500"
+          >
+            <option value="re">Python re (time-limited)</option>
+            <option value="re2">RE2 (linear time, no backreferences)</option>
+          </select>
         </div>
       )}
 
@@ -5,7 +5,15 @@ import { costForTokens, formatCost } from '../lib/cost'
 import { downloadJson, executionSnapshotFilename } from '../lib/export'
 
 const POLL_INTERVAL_MS = 1500
-const TERMINAL_STATUSES = ['completed', 'failed']
+const FAILURE_REASON_LABELS = {
+  step_failed: 'Step did not pass',
+  step_deadline_exceeded: 'Step timeout reached',
+  deadline_exceeded: 'Run deadline reached',
+  token_budget_exceeded: 'Token budget exhausted',
+  cost_budget_exceeded: 'Cost budget exhausted',
+  error: 'Internal error',
+}
+const TERMINAL_STATUSES = ['completed', 'failed', 'cancelled']
 
 function formatTime(iso) {
   if (!iso) return '—'
@@ -19,7 +27,7 @@ function computeExecutionCost(stepAttempts, steps) {
   const byStep = {}
   for (const a of stepAttempts ?? []) {
     const tokens = a.tokens_used ?? 0
-    const model = stepById[a.step_id]?.model ?? 'kimi-k2p5'
+    const model = a.model ?? stepById[a.step_id]?.model ?? 'kimi-k2p5'
     const cost = costForTokens(model, tokens)
     total += cost
     byStep[a.step_id] = (byStep[a.step_id] ?? 0) + cost
@@ -66,6 +74,13 @@ export default function ExecutionDetail() {
     return () => clearInterval(id)
   }, [executionId, execution?.status])
 
+  const handleCancel = () => {
+    api
+      .cancelExecution(executionId)
+      .then(fetchExecution)
+      .catch((e) => setError(e.message))
+  }
+
   const handleSnapshot = () => {
     if (!execution || !workflow) return
     const snapshot = {
@@ -125,7 +140,9 @@ export default function ExecutionDetail() {
         ? 'Failed'
         : execution.status === 'running'
           ? 'Running'
-          : execution.status
+          : execution.status === 'cancelled'
+            ? 'Cancelled'
+            : execution.status
 
   return (
     <div className="space-y-8">
@@ -157,12 +174,31 @@ export default function ExecutionDetail() {
               {statusLabel}
             </span>
             <span>Started {formatTime(execution.started_at)}</span>
+            {execution.queue_position != null && (
+              <span>
+                Queued #{execution.queue_position + 1}, starts ~{formatTime(execution.estimated_start_at)}
+              </span>
+            )}
             {execution.finished_at && (
               <span>Finished {formatTime(execution.finished_at)}</span>
             )}
+            {execution.failure_reason && (
+              <span className="font-medium text-red-700">
+                {FAILURE_REASON_LABELS[execution.failure_reason] ?? execution.failure_reason}
+              </span>
+            )}
           </p>
         </div>
         <div className="flex flex-wrap gap-2">
+          {isLive && (
+            <button
+              type="button"
+              onClick={handleCancel}
+              className="rounded-xl border border-red-300 bg-white px-4 py-2.5 text-sm font-medium text-red-700 shadow-sm transition hover:border-red-400 hover:bg-red-50 focus:outline-none focus:ring-2 focus:ring-red-500 focus:ring-offset-2"
+            >
+              Cancel run
+            </button>
+          )}
           <button
             type="button"
             onClick={handleSnapshot}
@@ -222,6 +258,7 @@ export default function ExecutionDetail() {
               const retries = attempts.length
               const maxRetries = step.completion_criteria?.max_retries ?? 3
               const stepCost = costByStep[step.id] ?? 0
+              const wallMs = (execution.step_timings ?? []).find((t) => t.step_index === idx)?.wall_ms
 
               return (
                 <li
@@ -244,6 +281,9 @@ export default function ExecutionDetail() {
                           {formatCost(stepCost)}
                         </span>
                       )}
+                      {wallMs != null && (
+                        <span className="text-xs text-slate-500">{(wallMs / 1000).toFixed(1)}s</span>
+                      )}
                     </div>
                   </div>
                   <div className="p-5">
@@ -259,6 +299,13 @@ export default function ExecutionDetail() {
                         {last.failure_reason && (
                           <p className="text-sm text-red-600">Failure: {last.failure_reason}</p>
                         )}
+                        {last.llm_ms != null && (
+                          <p className="text-xs text-slate-500">
+                            LLM {Math.round(last.llm_ms)} ms (first byte {Math.round(last.ttfb_ms ?? 0)} ms)
+                            {last.criteria_ms != null && <> · criteria {last.criteria_ms.toFixed(1)} ms</>}
+                            {last.db_write_ms != null && <> · DB {Math.round(last.db_write_ms)} ms</>}
+                          </p>
+                        )}
                         {last.response && (
                           <details className="group">
                             <summary className="cursor-pointer text-sm text-slate-500 transition hover:text-slate-700">
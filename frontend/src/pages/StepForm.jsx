@@ -8,11 +8,49 @@ const MODELS = [
   { value: 'kimi-k2-instruct-0905', label: 'Kimi K2 Instruct 0905' },
 ]
 
+const ROUTING_POLICIES = [
+  { value: 'ordered', label: 'In order (fall back on errors)' },
+  { value: 'fastest', label: 'Fastest healthy model' },
+]
+
+const HEDGE_OPTIONS = [
+  { value: '', label: 'Off' },
+  { value: '0.9', label: 'After p90 latency' },
+  { value: '0.95', label: 'After p95 latency' },
+  { value: '0.99', label: 'After p99 latency' },
+]
+
+const RESPONSE_FORMATS = [
+  { value: '', label: 'Free text' },
+  { value: 'json_object', label: 'JSON object' },
+]
+
 const CONTEXT_STRATEGIES = [
   { value: 'full', label: 'Full output' },
   { value: 'truncate_chars', label: 'Truncate (first 4k chars)' },
+  { value: 'json_path', label: 'JSON field' },
+  { value: 'code_block', label: 'Code block' },
+  { value: 'regex_group', label: 'Regex capture group' },
+  { value: 'last_n_steps', label: 'Last N steps (template)' },
 ]
 
+// Options shown per strategy: [config key, label, placeholder, type]
+const CONTEXT_FIELDS = {
+  json_path: [['path', 'JSON path', '$.result.items[0]', 'text']],
+  code_block: [
+    ['language', 'Language (optional)', 'python', 'text'],
+    ['index', 'Block index (-1 = last)', '0', 'number'],
+  ],
+  regex_group: [
+    ['pattern', 'Regex pattern', 'total: (\\d+)', 'text'],
+    ['group', 'Group number', '1', 'number'],
+  ],
+  last_n_steps: [
+    ['n', 'Number of steps', '2', 'number'],
+    ['template', 'Merge template ({step_1}, {previous})', 'Plan:\n{step_1}\n\nDraft:\n{previous}', 'textarea'],
+  ],
+}
+
 export default function StepForm() {
   const { id: workflowId, stepId } = useParams()
   const isEdit = Boolean(stepId)
@@ -23,6 +61,16 @@ export default function StepForm() {
   const [prompt, setPrompt] = useState('')
   const [completionCriteria, setCompletionCriteria] = useState({ type: 'contains_string', config: { value: '' }, max_retries: 3 })
   const [contextStrategy, setContextStrategy] = useState('full')
+  const [contextConfig, setContextConfig] = useState({})
+  const [fallbackModels, setFallbackModels] = useState([])
+  const [routingPolicy, setRoutingPolicy] = useState('ordered')
+  const [hedgePercentile, setHedgePercentile] = useState('')
+  const [candidates, setCandidates] = useState(1)
+  const [maxTokens, setMaxTokens] = useState('')
+  const [temperature, setTemperature] = useState('')
+  const [topP, setTopP] = useState('')
+  const [stop, setStop] = useState('')
+  const [responseFormat, setResponseFormat] = useState(null)
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState(null)
   const [immutable, setImmutable] = useState(false)
@@ -46,6 +94,16 @@ export default function StepForm() {
         setPrompt(step.prompt)
         setCompletionCriteria(step.completion_criteria ?? { type: 'contains_string', config: {}, max_retries: 3 })
         setContextStrategy(step.context_strategy ?? 'full')
+        setContextConfig(step.context_config ?? {})
+        setFallbackModels(step.fallback_models ?? [])
+        setRoutingPolicy(step.routing_policy ?? 'ordered')
+        setHedgePercentile(step.hedge_percentile != null ? String(step.hedge_percentile) : '')
+        setCandidates(step.candidates ?? 1)
+        setMaxTokens(step.max_tokens != null ? String(step.max_tokens) : '')
+        setTemperature(step.temperature != null ? String(step.temperature) : '')
+        setTopP(step.top_p != null ? String(step.top_p) : '')
+        setStop((step.stop ?? []).map((s) => s.replace(/\n/g, '\\n').replace(/\t/g, '\\t')).join('\n'))
+        setResponseFormat(step.response_format ?? null)
       }
     }
   }, [workflow, stepId, isEdit])
@@ -67,6 +125,20 @@ export default function StepForm() {
       prompt: prompt.trim(),
       completion_criteria: criteria,
       context_strategy: contextStrategy,
+      context_config: contextConfig,
+      fallback_models: fallbackModels.filter((m) => m !== model),
+      routing_policy: routingPolicy,
+      hedge_percentile: hedgePercentile ? parseFloat(hedgePercentile) : null,
+      candidates,
+      max_tokens: maxTokens ? parseInt(maxTokens, 10) : null,
+      temperature: temperature !== '' ? parseFloat(temperature) : null,
+      top_p: topP !== '' ? parseFloat(topP) : null,
+      // One sequence per line; \n and \t escapes allowed (e.g. a blank line is \n\n)
+      stop: stop
+        .split('\n')
+        .filter((line) => line !== '')
+        .map((line) => line.replace(/\\n/g, '\n').replace(/\\t/g, '\t')),
+      response_format: responseFormat,
     }
     const promise = isEdit
       ? api.updateStep(workflowId, stepId, body)
@@ -138,6 +210,110 @@ export default function StepForm() {
           </select>
         </div>
 
+        <div>
+          <label className="block text-sm font-medium text-slate-700">Fallback models</label>
+          <div className="mt-2 flex flex-wrap gap-4">
+            {MODELS.filter((o) => o.value !== model).map((o) => (
+              <label key={o.value} className="flex items-center gap-2 text-sm text-slate-700">
+                <input
+                  type="checkbox"
+                  checked={fallbackModels.includes(o.value)}
+                  onChange={(e) =>
+                    setFallbackModels((prev) =>
+                      e.target.checked ? [...prev, o.value] : prev.filter((m) => m !== o.value),
+                    )
+                  }
+                  disabled={immutable}
+                />
+                {o.label}
+              </label>
+            ))}
+          </div>
+          <select
+            value={routingPolicy}
+            onChange={(e) => setRoutingPolicy(e.target.value)}
+            className="mt-3 w-full rounded-xl border border-slate-300 bg-white px-4 py-3 focus:border-brand-500 focus:outline-none focus:ring-2 focus:ring-brand-500"
+            disabled={immutable}
+          >
+            {ROUTING_POLICIES.map((o) => (
+              <option key={o.value} value={o.value}>{o.label}</option>
+            ))}
+          </select>
+        </div>
+
+        <div>
+          <label className="block text-sm font-medium text-slate-700">Candidates per request</label>
+          <input
+            type="number"
+            min={1}
+            max={3}
+            value={candidates}
+            onChange={(e) => setCandidates(Math.min(3, Math.max(1, parseInt(e.target.value, 10) || 1)))}
+            className="mt-2 w-24 rounded-xl border border-slate-300 px-3 py-2 focus:border-brand-500 focus:outline-none focus:ring-2 focus:ring-brand-500"
+            disabled={immutable}
+          />
+          <p className="mt-1 text-xs text-slate-500">Ask for several completions at once; the first that meets the criteria is used.</p>
+        </div>
+
+        <div>
+          <label className="block text-sm font-medium text-slate-700">Backup request for slow calls</label>
+          <select
+            value={hedgePercentile}
+            onChange={(e) => setHedgePercentile(e.target.value)}
+            className="mt-2 w-full rounded-xl border border-slate-300 bg-white px-4 py-3 focus:border-brand-500 focus:outline-none focus:ring-2 focus:ring-brand-500"
+            disabled={immutable}
+          >
+            {HEDGE_OPTIONS.map((o) => (
+              <option key={o.value} value={o.value}>{o.label}</option>
+            ))}
+          </select>
+        </div>
+
+        <div>
+          <label className="block text-sm font-medium text-slate-700">Generation</label>
+          <div className="mt-2 grid grid-cols-3 gap-3">
+            {[
+              ['Max tokens', maxTokens, setMaxTokens, { min: 1, step: 1, placeholder: '4096' }],
+              ['Temperature', temperature, setTemperature, { min: 0, max: 2, step: 0.1, placeholder: '1.0' }],
+              ['Top p', topP, setTopP, { min: 0, max: 1, step: 0.05, placeholder: 'default' }],
+            ].map(([label, value, setValue, attrs]) => (
+              <div key={label}>
+                <label className="block text-xs text-slate-500">{label}</label>
+                <input
+                  type="number"
+                  {...attrs}
+                  value={value}
+                  onChange={(e) => setValue(e.target.value)}
+                  className="mt-1 w-full rounded-lg border border-slate-300 px-3 py-2 text-sm focus:border-brand-500 focus:outline-none focus:ring-1 focus:ring-brand-500"
+                  disabled={immutable}
+                />
+              </div>
+            ))}
+          </div>
+          <label className="mt-3 block text-xs text-slate-500">Stop sequences (one per line, up to 4; \n for a newline)</label>
+          <textarea
+            rows={2}
+            value={stop}
+            onChange={(e) => setStop(e.target.value)}
+            placeholder="\n\n"
+            className="mt-1 w-full rounded-lg border border-slate-300 px-3 py-2 font-mono text-sm focus:border-brand-500 focus:outline-none focus:ring-1 focus:ring-brand-500"
+            disabled={immutable}
+          />
+          <label className="mt-3 block text-xs text-slate-500">Response format</label>
+          <select
+            value={responseFormat?.type === 'text' ? '' : responseFormat?.type ?? ''}
+            onChange={(e) => setResponseFormat(e.target.value ? { type: e.target.value } : null)}
+            className="mt-1 w-full rounded-lg border border-slate-300 bg-white px-3 py-2 text-sm focus:border-brand-500 focus:outline-none focus:ring-1 focus:ring-brand-500"
+            disabled={immutable || responseFormat?.type === 'json_schema'}
+          >
+            {RESPONSE_FORMATS.map((o) => (
+              <option key={o.value} value={o.value}>{o.label}</option>
+            ))}
+            {responseFormat?.type === 'json_schema' && <option value="json_schema">JSON schema (set via API)</option>}
+          </select>
+          <p className="mt-1 text-xs text-slate-500">Leave empty for defaults. Short answers finish faster with a low max tokens; temperature 0 makes answers repeatable.</p>
+        </div>
+
         <div>
           <label className="block text-sm font-medium text-slate-700">Prompt</label>
           <textarea
@@ -159,7 +335,10 @@ export default function StepForm() {
           <label className="block text-sm font-medium text-slate-700">Context for next step</label>
           <select
             value={contextStrategy}
-            onChange={(e) => setContextStrategy(e.target.value)}
+            onChange={(e) => {
+              setContextStrategy(e.target.value)
+              setContextConfig({})
+            }}
             className="mt-2 w-full rounded-xl border border-slate-300 bg-white px-4 py-3 focus:border-brand-500 focus:outline-none focus:ring-2 focus:ring-brand-500"
             disabled={immutable}
           >
@@ -167,6 +346,39 @@ export default function StepForm() {
               <option key={o.value} value={o.value}>{o.label}</option>
             ))}
           </select>
+          {(CONTEXT_FIELDS[contextStrategy] ?? []).map(([key, label, placeholder, type]) => {
+            const setValue = (v) => {
+              const next = { ...contextConfig }
+              if (v === '') delete next[key]
+              else next[key] = type === 'number' ? parseInt(v, 10) || 0 : v
+              setContextConfig(next)
+            }
+            const className = 'mt-1 w-full rounded-lg border border-slate-300 px-3 py-2 text-sm focus:border-brand-500 focus:outline-none focus:ring-1 focus:ring-brand-500'
+            return (
+              <div key={key} className="mt-3">
+                <label className="block text-sm font-medium text-slate-700">{label}</label>
+                {type === 'textarea' ? (
+                  <textarea
+                    rows={4}
+                    value={contextConfig[key] ?? ''}
+                    onChange={(e) => setValue(e.target.value)}
+                    placeholder={placeholder}
+                    className={`${className} font-mono`}
+                    disabled={immutable}
+                  />
+                ) : (
+                  <input
+                    type={type}
+                    value={contextConfig[key] ?? ''}
+                    onChange={(e) => setValue(e.target.value)}
+                    placeholder={placeholder}
+                    className={className}
+                    disabled={immutable}
+                  />
+                )}
+              </div>
+            )
+          })}
         </div>
 
         <div className="flex gap-3">
@@ -26,6 +26,7 @@ export default function WorkflowDetail() {
   const [error, setError] = useState(null)
   const [reordering, setReordering] = useState(false)
   const [running, setRunning] = useState(false)
+  const [versioning, setVersioning] = useState(false)
 
   const fetchWorkflow = useCallback(() => {
     if (!workflowId) return
@@ -73,6 +74,17 @@ export default function WorkflowDetail() {
       .finally(() => setRunning(false))
   }
 
+  const handleNewVersion = () => {
+    if (!workflowId) return
+    setVersioning(true)
+    setError(null)
+    api
+      .createVersion(workflowId)
+      .then((w) => navigate(`/workflows/${w.id}`))
+      .catch((e) => setError(e.message))
+      .finally(() => setVersioning(false))
+  }
+
   const handleExport = () => {
     if (!workflow) return
     const payload = {
@@ -87,6 +99,16 @@ export default function WorkflowDetail() {
         prompt: s.prompt,
         completion_criteria: s.completion_criteria,
         context_strategy: s.context_strategy,
+        context_config: s.context_config,
+        fallback_models: s.fallback_models,
+        routing_policy: s.routing_policy,
+        hedge_percentile: s.hedge_percentile,
+        candidates: s.candidates,
+        max_tokens: s.max_tokens,
+        temperature: s.temperature,
+        top_p: s.top_p,
+        stop: s.stop,
+        response_format: s.response_format,
       })),
       exported_at: new Date().toISOString(),
     }
@@ -104,17 +126,11 @@ export default function WorkflowDetail() {
     const reordered = arrayMove(steps, oldIndex, newIndex)
     setReordering(true)
 
-    const updates = reordered
-      .map((step, i) =>
-        step.order_index !== i ? { step, newOrder: i } : null
-      )
-      .filter(Boolean)
+    // One request for the whole new order (step ids are reassigned)
+    const body = reordered.map(({ id, workflow_id, ...step }, i) => ({ ...step, order_index: i }))
 
-    Promise.all(
-      updates.map(({ step, newOrder }) =>
-        api.updateStep(workflowId, step.id, { order_index: newOrder })
-      )
-    )
+    api
+      .replaceSteps(workflowId, body)
       .then(() => fetchWorkflow())
       .catch((e) => setError(e.message))
       .finally(() => setReordering(false))
@@ -152,6 +168,7 @@ export default function WorkflowDetail() {
             {workflow.name}
           </h1>
           <p className="mt-2 text-sm text-slate-500">
+            {workflow.version > 1 && <>v{workflow.version} · </>}
             {steps.length} step{steps.length !== 1 ? 's' : ''}
             {hasExecutions && (
               <> · {executions.length} run{executions.length !== 1 ? 's' : ''}</>
@@ -181,6 +198,16 @@ export default function WorkflowDetail() {
               + Add step
             </Link>
           )}
+          {immutable && (
+            <button
+              type="button"
+              onClick={handleNewVersion}
+              disabled={versioning}
+              className="rounded-xl bg-brand-500 px-5 py-2.5 text-sm font-semibold text-white shadow-md transition hover:bg-brand-600 hover:shadow-lg disabled:opacity-50 focus:outline-none focus:ring-2 focus:ring-brand-500 focus:ring-offset-2"
+            >
+              {versioning ? 'Creating…' : 'New version'}
+            </button>
+          )}
           <button
             type="button"
             onClick={handleExport}
@@ -193,7 +220,7 @@ export default function WorkflowDetail() {
 
       {immutable && (
         <div className="rounded-2xl border border-amber-200 bg-amber-50 p-5 text-sm text-amber-800 shadow-sm">
-          This workflow has been run. Name, steps, and order can’t be changed.
+          This workflow has been run. Name, steps, and order can’t be changed — create a new version to edit a copy.
         </div>
       )}
 
@@ -68,6 +68,7 @@ export default function WorkflowList() {
                 </h2>
                 <p className="mt-2 text-sm text-slate-500">
                   {w.step_count} step{w.step_count !== 1 ? 's' : ''}
+                  {w.versions > 1 && <> · v{w.version} of {w.versions}</>}
                 </p>
               </Link>
             </li>